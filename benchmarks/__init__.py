@@ -0,0 +1,5 @@
+"""Offline performance benchmarks (synthetic documents, stub chat model).
+
+Run ``python benchmarks/run.py --help``; nothing here needs network access,
+PDF parsing or downloaded models.
+"""
@@ -0,0 +1,82 @@
+"""Store benchmark results as a baseline and flag regressions against it."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Mapping
+
+# Parameters that must match for timings to be comparable.
+_COMPARABLE_PARAMS = ("spans", "language", "seed", "llm_latency_ms", "llm_429_rate")
+
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(payload, dict) or not isinstance(payload.get("stages"), dict):
+        raise ValueError(f"{path} is not a benchmark baseline (missing 'stages').")
+    return payload
+
+
+def save_baseline(path: Path, report: Mapping[str, Any]) -> None:
+    stages = {
+        name: {"median_ms": entry["median_ms"], "units": entry["units"], "unit": entry["unit"]}
+        for name, entry in report["stages"].items()
+    }
+    payload = {"params": report["params"], "environment": report["environment"], "stages": stages}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(
+    report: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    *,
+    tolerance: float = 0.2,
+    min_delta_ms: float = 1.0,
+) -> Dict[str, Any]:
+    """Compare median timings; a stage regresses when it is slower by more than
+    ``tolerance`` (relative) and ``min_delta_ms`` (absolute, to ignore jitter on
+    sub-millisecond stages)."""
+    warnings: List[str] = []
+    params = report.get("params") or {}
+    baseline_params = baseline.get("params") or {}
+    for key in _COMPARABLE_PARAMS:
+        if key in baseline_params and baseline_params.get(key) != params.get(key):
+            warnings.append(
+                f"{key} differs from the baseline ({params.get(key)!r} vs "
+                f"{baseline_params.get(key)!r}); timings are not comparable."
+            )
+
+    stages: Dict[str, Any] = {}
+    regressions: List[str] = []
+    for name, entry in (report.get("stages") or {}).items():
+        reference = (baseline.get("stages") or {}).get(name)
+        if not isinstance(reference, Mapping) or not reference.get("median_ms"):
+            stages[name] = {"status": "new"}
+            continue
+        base_ms = float(reference["median_ms"])
+        current_ms = float(entry["median_ms"])
+        ratio = current_ms / base_ms
+        delta_ms = current_ms - base_ms
+        if ratio > 1 + tolerance and delta_ms > min_delta_ms:
+            status = "regression"
+            regressions.append(name)
+        elif ratio < 1 - tolerance and -delta_ms > min_delta_ms:
+            status = "improvement"
+        else:
+            status = "ok"
+        stages[name] = {
+            "status": status,
+            "baseline_ms": base_ms,
+            "current_ms": current_ms,
+            "ratio": round(ratio, 3),
+        }
+    return {
+        "tolerance": tolerance,
+        "min_delta_ms": min_delta_ms,
+        "regressions": regressions,
+        "warnings": warnings,
+        "stages": stages,
+    }
+
+
+__all__ = ["compare", "load_baseline", "save_baseline"]
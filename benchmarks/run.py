@@ -0,0 +1,174 @@
+"""Run the offline benchmark suite and optionally compare with a stored baseline."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = PROJECT_ROOT / "src"
+for _path in (SRC_ROOT, PROJECT_ROOT):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+from benchmarks.baseline import compare, load_baseline, save_baseline  # noqa: E402
+from benchmarks.stages import STAGES, BenchContext, measure  # noqa: E402
+from benchmarks.synthetic import LANGUAGES  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time tokenization, BM25, locators, fusion, validators, domain reasoning, "
+            "aggregation and the full graph on a synthetic document with a stub LLM "
+            "(no network, no PDF parsing, no model downloads)."
+        ),
+    )
+    parser.add_argument("--spans", type=int, default=300, help="Number of synthetic spans.")
+    parser.add_argument(
+        "--language", choices=LANGUAGES, default="en", help="Synthetic document language."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage.")
+    parser.add_argument(
+        "--stages",
+        default=None,
+        help=f"Comma separated subset of: {', '.join(STAGES)} (default: all).",
+    )
+    parser.add_argument(
+        "--llm-latency-ms", type=float, default=0.0, help="Stub LLM latency per call."
+    )
+    parser.add_argument(
+        "--llm-429-rate",
+        type=float,
+        default=0.0,
+        help="Probability that a stub LLM call is rate limited (HTTP 429).",
+    )
+    parser.add_argument(
+        "--llm-max-retries", type=int, default=2, help="Stub LLM retries after a 429."
+    )
+    parser.add_argument("--seed", type=int, default=13, help="Random seed.")
+    parser.add_argument("--json", action="store_true", help="Print JSON output.")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        default=None,
+        help=f"Compare with a baseline file (default path: {DEFAULT_BASELINE.name}).",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        default=None,
+        help="Write this run as the new baseline.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative slowdown that counts as a regression (0.2 = 20%%).",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Ignore slowdowns smaller than this many milliseconds.",
+    )
+    return parser
+
+
+def _selected_stages(raw: str | None) -> list[str]:
+    if not raw:
+        return list(STAGES)
+    names = [part.strip() for part in raw.split(",") if part.strip()]
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}")
+    return names
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    if args.spans < 1 or args.repeat < 1:
+        raise SystemExit("--spans and --repeat must be >= 1")
+    if not 0.0 <= args.llm_429_rate < 1.0:
+        raise SystemExit("--llm-429-rate must be in [0, 1)")
+
+    ctx = BenchContext(
+        spans=args.spans,
+        language=args.language,
+        seed=args.seed,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_429_rate=args.llm_429_rate,
+        llm_max_retries=args.llm_max_retries,
+    )
+    stages: Dict[str, Any] = {}
+    for name in _selected_stages(args.stages):
+        stages[name] = measure(STAGES[name](ctx), repeat=args.repeat)
+
+    report: Dict[str, Any] = {
+        "params": {
+            "spans": args.spans,
+            "language": args.language,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_429_rate": args.llm_429_rate,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "stages": stages,
+        "stub_llm": ctx.llm.stats,
+    }
+    if args.baseline is not None:
+        report["comparison"] = compare(
+            report,
+            load_baseline(args.baseline),
+            tolerance=args.tolerance,
+            min_delta_ms=args.min_delta_ms,
+        )
+    if args.save_baseline is not None:
+        save_baseline(args.save_baseline, report)
+
+    regressions = (report.get("comparison") or {}).get("regressions") or []
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 1 if regressions else 0
+
+    params = report["params"]
+    print(
+        f"spans={params['spans']} language={params['language']} repeat={params['repeat']} "
+        f"llm_latency={params['llm_latency_ms']}ms llm_429_rate={params['llm_429_rate']}"
+    )
+    comparison = (report.get("comparison") or {}).get("stages") or {}
+    for name, entry in stages.items():
+        rate = entry["units_per_s"]
+        line = (
+            f"{name:>22}: median={entry['median_ms']:>10.2f}ms min={entry['min_ms']:>10.2f}ms "
+            f"{rate if rate is not None else '-':>10} {entry['unit']}/s"
+        )
+        compared = comparison.get(name)
+        if compared and compared["status"] != "new":
+            line += f"  x{compared['ratio']:.2f} {compared['status']}"
+        print(line)
+    for warning in (report.get("comparison") or {}).get("warnings") or []:
+        print(f"warning: {warning}")
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+    print(f"stub llm: {report['stub_llm']}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,390 @@
+"""Benchmark stages: each one times a pipeline step on a synthetic document.
+
+A stage's setup runs every prerequisite node outside the timed section and
+returns the callable that is measured, so a stage's numbers only cover its own
+work (``full_graph`` is the exception and covers the whole workflow).
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+from benchmarks.stub_llm import StubChatModel
+from benchmarks.synthetic import Language, synthetic_doc
+from pipelines.graphs.nodes.aggregate import aggregate_node
+from pipelines.graphs.nodes.domains.d1_randomization import d1_randomization_node
+from pipelines.graphs.nodes.domains.d2_deviations import d2_deviations_node
+from pipelines.graphs.nodes.domains.d3_missing_data import d3_missing_data_node
+from pipelines.graphs.nodes.domains.d4_measurement import d4_measurement_node
+from pipelines.graphs.nodes.domains.d5_reporting import d5_reporting_node
+from pipelines.graphs.nodes.fusion import fusion_node
+from pipelines.graphs.nodes.locators.retrieval_bm25 import bm25_retrieval_locator_node
+from pipelines.graphs.nodes.locators.rule_based import rule_based_locator_node
+from pipelines.graphs.nodes.planner import planner_node
+from pipelines.graphs.nodes.state_models import (
+    MODEL_CONTEXT_KEY,
+    ValidatedModelContext,
+    doc_structure_ref,
+    expand_candidates,
+    validated_doc_structure,
+    validated_question_set,
+)
+from pipelines.graphs.nodes.validators.completeness import completeness_validator_node
+from pipelines.graphs.nodes.validators.consistency import consistency_validator_node
+from pipelines.graphs.nodes.validators.existence import existence_validator_node
+from pipelines.graphs.nodes.validators.relevance import relevance_validator_node
+from pipelines.graphs.rob2_graph import build_rob2_graph
+from retrieval.batching import (
+    padded_token_count,
+    plan_token_batches,
+    resolve_max_tokens_per_batch,
+)
+from retrieval.engines.bm25 import build_bm25_index
+from retrieval.tokenization import resolve_tokenizer_config, tokenize_text
+from schemas.requests import Rob2RunOptions
+from services.rob2_runner import build_debug_payload, build_run_state
+from utils.tracing import trace_run
+
+NodeFn = Callable[[dict], dict]
+
+_DOMAIN_NODES: tuple[NodeFn, ...] = (
+    d1_randomization_node,
+    d2_deviations_node,
+    d3_missing_data_node,
+    d4_measurement_node,
+    d5_reporting_node,
+)
+
+# Node order of the graph's happy path (no validation retries).
+_PIPELINE: tuple[tuple[str, tuple[NodeFn, ...]], ...] = (
+    ("rule_based_locator", (rule_based_locator_node,)),
+    ("bm25_locator", (bm25_retrieval_locator_node,)),
+    ("fusion", (fusion_node,)),
+    ("relevance_validator", (relevance_validator_node,)),
+    ("existence_validator", (existence_validator_node,)),
+    ("consistency_validator", (consistency_validator_node,)),
+    ("completeness_validator", (completeness_validator_node,)),
+    ("domains", _DOMAIN_NODES),
+    ("aggregate", (aggregate_node,)),
+)
+_LLM_STATE_KEYS = (
+    "relevance_llm",
+    "consistency_llm",
+    "d1_llm",
+    "d2_llm",
+    "d3_llm",
+    "d4_llm",
+    "d5_llm",
+)
+
+# doc_structure / question_set reads of one graph run, in node order:
+# (node, reads doc_structure, question_set reads).
+_VALIDATION_PASS: Tuple[Tuple[str, bool, int], ...] = (
+    ("rule_based_locator", True, 1),
+    ("bm25_locator", True, 1),
+    ("splade_locator", True, 1),
+    ("llm_locator", True, 1),
+    ("fusion", False, 1),
+    ("relevance_validator", False, 1),
+    ("existence_validator", True, 2),
+    ("consistency_validator", False, 1),
+    ("completeness_validator", False, 1),
+)
+_DOMAIN_PASS: Tuple[Tuple[str, bool, int], ...] = (
+    ("d1_randomization", False, 1),
+    ("d1_audit", True, 1),
+    ("d2_deviations", False, 1),
+    ("d2_audit", True, 1),
+    ("d3_missing_data", False, 1),
+    ("d3_audit", True, 1),
+    ("d4_measurement", False, 1),
+    ("d4_audit", True, 1),
+    ("d5_reporting", False, 1),
+    ("d5_audit", True, 1),
+    ("final_domain_audit", True, 1),
+    ("aggregate", True, 1),
+)
+# Validation retry loops replayed by the ``state_validation`` stage.
+_VALIDATION_RETRIES = 2
+
+
+@dataclass(frozen=True)
+class StageRun:
+    """Timed callable plus the amount of work one call performs."""
+
+    run: Callable[[], Mapping[str, Any] | None]
+    units: int
+    unit: str
+
+
+class BenchContext:
+    """Synthetic document, stub LLM and lazily computed pipeline states."""
+
+    def __init__(
+        self,
+        *,
+        spans: int,
+        language: Language,
+        seed: int,
+        llm_latency_ms: float = 0.0,
+        llm_429_rate: float = 0.0,
+        llm_max_retries: int = 2,
+    ) -> None:
+        self.doc = synthetic_doc(spans, language=language, seed=seed)
+        self.doc_payload = self.doc.model_dump()
+        self.llm = StubChatModel(
+            latency_ms=llm_latency_ms,
+            rate_limit_rate=llm_429_rate,
+            max_retries=llm_max_retries,
+            seed=seed,
+        )
+        options = Rob2RunOptions(
+            reranker="none",
+            relevance_mode="llm",
+            consistency_mode="llm",
+            domain_audit_mode="none",
+            llm_locator_mode="none",
+        )
+        # Same option resolution as a real run; SPLADE/cross-encoder/audit are
+        # left out because they need downloaded models or a second LLM pass.
+        self.run_state: Dict[str, Any] = build_run_state("bench.pdf", options, [])
+        self.run_state.update({key: self.llm for key in _LLM_STATE_KEYS})
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def spans(self) -> int:
+        return len(self.doc.sections)
+
+    def questions(self) -> List[Mapping[str, Any]]:
+        return list(self.state_before("rule_based_locator")["question_set"]["questions"])
+
+    def state_before(self, step: str) -> Dict[str, Any]:
+        """Return the state the graph hands to ``step`` (computed once per context)."""
+        if not self._states:
+            state = dict(self.run_state)
+            state.update(
+                {
+                    "doc_structure": self.doc_payload,
+                    "doc_structure_ref": doc_structure_ref("bench"),
+                    MODEL_CONTEXT_KEY: ValidatedModelContext(),
+                }
+            )
+            state.update(planner_node(state))
+            for name, nodes in _PIPELINE:
+                self._states[name] = dict(state)
+                for node in nodes:
+                    state.update(node(state))
+        return dict(self._states[step])
+
+
+def _tokenize(ctx: BenchContext) -> StageRun:
+    config = _tokenizer_config(ctx)
+    texts = [span.text for span in ctx.doc.sections]
+
+    def run() -> Mapping[str, Any]:
+        return {"tokens": sum(len(tokenize_text(text, config=config)) for text in texts)}
+
+    return StageRun(run, ctx.spans, "spans")
+
+
+def _bm25_build(ctx: BenchContext) -> StageRun:
+    config = _tokenizer_config(ctx)
+    spans = ctx.doc.sections
+
+    def run() -> None:
+        build_bm25_index(spans, tokenizer=config)
+
+    return StageRun(run, ctx.spans, "spans")
+
+
+def _bm25_search(ctx: BenchContext) -> StageRun:
+    index = build_bm25_index(ctx.doc.sections, tokenizer=_tokenizer_config(ctx))
+    queries = [str(question["text"]) for question in ctx.questions()]
+    top_n = int(ctx.run_state.get("per_query_top_n") or 50)
+
+    def run() -> None:
+        for query in queries:
+            index.search(query, top_n=top_n)
+
+    return StageRun(run, len(queries), "queries")
+
+
+def _token_batching(ctx: BenchContext) -> StageRun:
+    # BM25 token counts stand in for SPLADE word pieces; only the plan is timed.
+    config = _tokenizer_config(ctx)
+    max_length = int(ctx.run_state.get("splade_doc_max_length") or 256)
+    batch_size = int(ctx.run_state.get("splade_batch_size") or 8)
+    budget = resolve_max_tokens_per_batch(
+        ctx.run_state.get("splade_max_tokens_per_batch"),
+        batch_size=batch_size,
+        max_length=max_length,
+    )
+    lengths = [
+        max(1, min(max_length, len(tokenize_text(span.text, config=config)) + 2))
+        for span in ctx.doc.sections
+    ]
+    fixed_batches = [
+        list(range(start, min(start + batch_size, len(lengths))))
+        for start in range(0, len(lengths), batch_size)
+    ]
+
+    def run() -> Mapping[str, Any]:
+        batches = plan_token_batches(lengths, max_tokens_per_batch=budget)
+        return {
+            "real_tokens": sum(lengths),
+            "fixed_padded_tokens": padded_token_count(lengths, fixed_batches),
+            "sorted_padded_tokens": padded_token_count(lengths, batches),
+            "sorted_batches": len(batches),
+        }
+
+    return StageRun(run, ctx.spans, "spans")
+
+
+def _node_stage(step: str, unit: str) -> Callable[[BenchContext], StageRun]:
+    nodes = dict(_PIPELINE)[step]
+
+    def setup(ctx: BenchContext) -> StageRun:
+        state = ctx.state_before(step)
+
+        def run() -> None:
+            local = dict(state)
+            for node in nodes:
+                local.update(node(local))
+
+        units = ctx.spans if unit == "spans" else len(ctx.questions())
+        return StageRun(run, units, unit)
+
+    return setup
+
+
+def _state_validation(ctx: BenchContext) -> StageRun:
+    state = ctx.state_before("rule_based_locator")
+    reads = list(_VALIDATION_PASS) * (_VALIDATION_RETRIES + 1) + list(_DOMAIN_PASS)
+
+    def run() -> Mapping[str, Any]:
+        context = ValidatedModelContext()
+        local = {**state, MODEL_CONTEXT_KEY: context}
+        for _node, reads_doc, question_reads in reads:
+            if reads_doc:
+                validated_doc_structure(local, local["doc_structure"])
+            for _ in range(question_reads):
+                validated_question_set(local, local["question_set"])
+        return {"reads": sum(int(doc) + count for _, doc, count in reads), **context.stats()}
+
+    return StageRun(run, 1, "runs")
+
+
+def _candidate_refs(ctx: BenchContext) -> StageRun:
+    # The LLM clients are bench-only state; a real run's final state has none.
+    state = {
+        key: value
+        for key, value in ctx.state_before("domains").items()
+        if key not in _LLM_STATE_KEYS
+    }
+    debug_state = build_debug_payload(state, "full")["state"]
+    expanded_bytes = _json_bytes({"state": expand_candidates(state, debug_state)})
+
+    def run() -> Mapping[str, Any]:
+        # What debug_level=full writes to debug.json.
+        payload = build_debug_payload(state, "full")
+        return {"debug_bytes": _json_bytes(payload), "expanded_bytes": expanded_bytes}
+
+    return StageRun(run, len(ctx.questions()), "questions")
+
+
+def _full_graph(ctx: BenchContext) -> StageRun:
+    doc_update = {
+        "doc_structure": ctx.doc_payload,
+        "doc_structure_ref": doc_structure_ref("bench"),
+    }
+    app = build_rob2_graph(
+        node_overrides={
+            "preprocess": lambda state: dict(doc_update),
+            "splade_locator": lambda state: {
+                "splade_candidates": {},
+                "splade_evidence": [],
+                "splade_debug": {},
+            },
+        }
+    )
+
+    def run() -> Mapping[str, Any]:
+        state = dict(ctx.run_state)
+        state[MODEL_CONTEXT_KEY] = ValidatedModelContext()
+        error: str | None = None
+        with trace_run() as tracer:
+            try:
+                app.invoke(state, config={"callbacks": [tracer.callback_handler()]})
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+        totals = tracer.summary()["totals"]
+        return {
+            "llm_calls": totals.get("llm_calls", 0),
+            "llm_retries": totals.get("llm_retries", 0),
+            "llm_errors": totals.get("llm_errors", 0),
+            "input_tokens": totals.get("input_tokens", 0),
+            "output_tokens": totals.get("output_tokens", 0),
+            "error": error,
+        }
+
+    return StageRun(run, 1, "runs")
+
+
+def _tokenizer_config(ctx: BenchContext):
+    return resolve_tokenizer_config(
+        ctx.run_state.get("locator_tokenizer"), ctx.run_state.get("locator_char_ngram")
+    )
+
+
+def _json_bytes(payload: Any) -> int:
+    return len(json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+STAGES: Dict[str, Callable[[BenchContext], StageRun]] = {
+    "tokenize": _tokenize,
+    "bm25_build": _bm25_build,
+    "bm25_search": _bm25_search,
+    "token_batching": _token_batching,
+    "state_validation": _state_validation,
+    "rule_based_locator": _node_stage("rule_based_locator", "spans"),
+    "bm25_locator": _node_stage("bm25_locator", "spans"),
+    "fusion": _node_stage("fusion", "questions"),
+    "relevance_validator": _node_stage("relevance_validator", "questions"),
+    "existence_validator": _node_stage("existence_validator", "questions"),
+    "consistency_validator": _node_stage("consistency_validator", "questions"),
+    "completeness_validator": _node_stage("completeness_validator", "questions"),
+    "candidate_refs": _candidate_refs,
+    "domains": _node_stage("domains", "questions"),
+    "aggregate": _node_stage("aggregate", "questions"),
+    "full_graph": _full_graph,
+}
+
+
+def measure(stage: StageRun, *, repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Time ``stage.run`` ``repeat`` times after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        stage.run()
+    samples: List[float] = []
+    details: Mapping[str, Any] | None = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        details = stage.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    median_ms = statistics.median(samples)
+    result: Dict[str, Any] = {
+        "median_ms": round(median_ms, 3),
+        "min_ms": round(min(samples), 3),
+        "units": stage.units,
+        "unit": stage.unit,
+        "units_per_s": round(stage.units / (median_ms / 1000), 1) if median_ms > 0 else None,
+    }
+    if details:
+        result["details"] = dict(details)
+    return result
+
+
+__all__ = ["BenchContext", "STAGES", "StageRun", "measure"]
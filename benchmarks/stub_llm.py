@@ -0,0 +1,111 @@
+"""Deterministic chat model standing in for the real LLM providers.
+
+Answers come from :func:`services.llm_stub.synthesize_response` (the same
+prompt-aware answers the ``rob2 dev llm-stub`` server returns), so the graph
+runs end to end without network access. Latency and HTTP 429 responses can be
+injected; a 429 is retried inside the model (like provider clients with
+``max_retries``) and surfaces as an error once the retries are exhausted.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from services.llm_stub import synthesize_response
+
+
+class StubRateLimitError(RuntimeError):
+    """Injected rate limit; carries ``status_code`` like provider SDK errors."""
+
+    status_code = 429
+
+    def __init__(self) -> None:
+        super().__init__("Error code: 429 - rate limit exceeded (injected)")
+
+
+class StubChatModel(BaseChatModel):
+    latency_ms: float = 0.0
+    rate_limit_rate: float = 0.0
+    max_retries: int = 2
+    retry_backoff_ms: float = 0.0
+    seed: int = 13
+
+    _rng: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+        self._stats = {"calls": 0, "rate_limited": 0, "retries": 0, "errors": 0}
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = str(messages[-1].content) if messages else ""
+        for attempt in range(self.max_retries + 1):
+            self._count("calls")
+            if self.latency_ms > 0:
+                time.sleep(self.latency_ms / 1000)
+            if not self._inject_rate_limit():
+                break
+            self._count("rate_limited")
+            if attempt == self.max_retries:
+                self._count("errors")
+                raise StubRateLimitError()
+            self._count("retries")
+            if run_manager is not None:
+                run_manager.on_retry(SimpleNamespace(attempt_number=attempt + 1))
+            if self.retry_backoff_ms > 0:
+                time.sleep(self.retry_backoff_ms * (2**attempt) / 1000)
+
+        content = json.dumps(synthesize_response(prompt), ensure_ascii=False)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": _approx_tokens(messages),
+                "output_tokens": max(1, len(content) // 4),
+                "total_tokens": _approx_tokens(messages) + max(1, len(content) // 4),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _inject_rate_limit(self) -> bool:
+        if self.rate_limit_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.rate_limit_rate
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+def _approx_tokens(messages: list[BaseMessage]) -> int:
+    return max(1, sum(len(str(message.content)) for message in messages) // 4)
+
+
+__all__ = ["StubChatModel", "StubRateLimitError"]
@@ -0,0 +1,301 @@
+"""Load-test `rob2 batch run` against the local LLM stub and report docs/hour per worker count."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = PROJECT_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from reporting.batch_plot import SUMMARY_FILE_NAME  # noqa: E402
+from services.llm_stub import (  # noqa: E402
+    LATENCY_DISTRIBUTIONS,
+    StubBehavior,
+    create_llm_stub_app,
+)
+
+# Every chat-model stage is pointed at the stub.
+_MODEL_SETTINGS = (
+    "QUERY_PLANNER_MODEL",
+    "LLM_LOCATOR_MODEL",
+    "RELEVANCE_MODEL",
+    "CONSISTENCY_MODEL",
+    "D1_MODEL",
+    "D2_MODEL",
+    "D3_MODEL",
+    "D4_MODEL",
+    "D5_MODEL",
+    "DOMAIN_AUDIT_MODEL",
+)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run `rob2 batch run` on a PDF directory once per worker count with every "
+            "LLM call served by the local stub (`rob2 dev llm-stub`), and report "
+            "docs/hour, stub 429s and peak concurrent LLM requests."
+        ),
+    )
+    parser.add_argument("pdf_dir", type=Path, help="Directory with PDFs.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated worker counts.")
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N PDFs.")
+    parser.add_argument(
+        "--model", default="openai:gpt-4o-mini", help="Model id used for every LLM stage."
+    )
+    parser.add_argument(
+        "--set",
+        dest="set_values",
+        action="append",
+        default=[],
+        help="Extra `--set key=value` passed to batch run (repeatable).",
+    )
+    parser.add_argument(
+        "--batch-arg",
+        action="append",
+        default=[],
+        help="Extra raw argument passed to batch run, e.g. --batch-arg=--max-inflight-llm=4.",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Run one untimed single-worker pass first so parsing is served from the cache.",
+    )
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Shared cache directory.")
+    parser.add_argument("--keep-output", action="store_true", help="Keep per-round output dirs.")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Stub median latency.")
+    parser.add_argument(
+        "--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal"
+    )
+    parser.add_argument("--latency-spread", type=float, default=0.4)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-s", type=float, default=1.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-hang-s", type=float, default=120.0)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=13, help="Random seed.")
+    parser.add_argument("--json", action="store_true", help="Print JSON output.")
+    return parser
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _start_stub(behavior: StubBehavior) -> tuple[Any, str]:
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_llm_stub_app(behavior), host="127.0.0.1", port=port, log_level="warning"
+        )
+    )
+    threading.Thread(target=server.run, name="llm-stub", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _stub_call(base_url: str, path: str, *, method: str = "GET") -> Dict[str, Any]:
+    request = urllib.request.Request(f"{base_url}{path}", method=method)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _prepare_inputs(pdf_dir: Path, limit: int | None, target: Path) -> int:
+    pdfs = sorted(path for path in pdf_dir.rglob("*.pdf") if path.is_file())
+    if limit is not None:
+        pdfs = pdfs[:limit]
+    if not pdfs:
+        raise SystemExit(f"No PDFs found under {pdf_dir}")
+    target.mkdir(parents=True, exist_ok=True)
+    for index, pdf in enumerate(pdfs):
+        link = target / f"{index:04d}_{pdf.name}"
+        try:
+            link.symlink_to(pdf.resolve())
+        except OSError:
+            shutil.copy2(pdf, link)
+    return len(pdfs)
+
+
+def _run_round(
+    args: argparse.Namespace,
+    *,
+    workers: int,
+    input_dir: Path,
+    round_dir: Path,
+    cache_dir: Path,
+    env: Dict[str, str],
+) -> Dict[str, Any]:
+    command = [
+        sys.executable,
+        "-c",
+        "from cli.app import main; main()",
+        "batch",
+        "run",
+        str(input_dir),
+        "--output-dir",
+        str(round_dir / "output"),
+        "--persist-dir",
+        str(round_dir / "persist"),
+        "--cache-dir",
+        str(cache_dir),
+        "--workers",
+        str(workers),
+        "--reset",
+        "--no-html",
+        "--no-docx",
+        "--no-pdf",
+        "--no-table",
+        "--no-plot",
+        "--no-excel",
+    ]
+    for value in args.set_values:
+        command.extend(["--set", value])
+    command.extend(args.batch_arg)
+
+    started = time.perf_counter()
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+
+    summary_path = round_dir / "output" / SUMMARY_FILE_NAME
+    counts: Dict[str, Any] = {}
+    if summary_path.exists():
+        counts = json.loads(summary_path.read_text(encoding="utf-8")).get("counts") or {}
+    succeeded = int(counts.get("success", 0))
+    result: Dict[str, Any] = {
+        "workers": workers,
+        "elapsed_s": round(elapsed, 1),
+        "succeeded": succeeded,
+        "failed": int(counts.get("failed", 0)),
+        "docs_per_hour": round(succeeded / elapsed * 3600, 1) if elapsed > 0 else None,
+        "exit_code": completed.returncode,
+    }
+    if completed.returncode != 0 and not counts:
+        result["stderr_tail"] = completed.stderr[-2000:]
+    return result
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    worker_counts = [int(part) for part in str(args.workers).split(",") if part.strip()]
+    if not worker_counts or min(worker_counts) < 1:
+        raise SystemExit("--workers must list positive integers")
+
+    behavior = StubBehavior(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_s=args.retry_after_s,
+        timeout_rate=args.timeout_rate,
+        timeout_hang_s=args.timeout_hang_s,
+        tokens_per_minute=args.tokens_per_minute,
+        seed=args.seed,
+    )
+    server, base_url = _start_stub(behavior)
+    work_dir = Path(tempfile.mkdtemp(prefix="rob2-load-"))
+    cache_dir = args.cache_dir or work_dir / "cache"
+    input_dir = work_dir / "input"
+    documents = _prepare_inputs(args.pdf_dir, args.limit, input_dir)
+
+    env = dict(os.environ)
+    env.update(
+        {
+            "PYTHONPATH": os.pathsep.join(
+                part for part in (str(SRC_ROOT), env.get("PYTHONPATH", "")) if part
+            ),
+            "OPENAI_BASE_URL": f"{base_url}/v1",
+            "OPENAI_API_KEY": "stub",
+            "ANTHROPIC_BASE_URL": base_url,
+            "ANTHROPIC_API_KEY": "stub",
+            "LLM_CASSETTE_MODE": "none",
+            **{name: args.model for name in _MODEL_SETTINGS},
+        }
+    )
+
+    rounds: List[Dict[str, Any]] = []
+    try:
+        if args.warmup:
+            _run_round(
+                args,
+                workers=1,
+                input_dir=input_dir,
+                round_dir=work_dir / "warmup",
+                cache_dir=cache_dir,
+                env=env,
+            )
+        for workers in worker_counts:
+            _stub_call(base_url, "/stub/reset", method="POST")
+            result = _run_round(
+                args,
+                workers=workers,
+                input_dir=input_dir,
+                round_dir=work_dir / f"workers_{workers}",
+                cache_dir=cache_dir,
+                env=env,
+            )
+            stats = _stub_call(base_url, "/stub/stats")
+            result["llm"] = {
+                key: stats[key]
+                for key in (
+                    "requests",
+                    "completed",
+                    "rate_limited",
+                    "quota_limited",
+                    "timeouts",
+                    "max_in_flight",
+                    "prompt_tokens",
+                    "completion_tokens",
+                )
+            }
+            rounds.append(result)
+            if not args.json:
+                llm = result["llm"]
+                print(
+                    f"workers={workers:>3} docs={result['succeeded']}/{documents} "
+                    f"elapsed={result['elapsed_s']:>8.1f}s docs/h={result['docs_per_hour']} "
+                    f"llm_requests={llm['requests']} 429={llm['rate_limited'] + llm['quota_limited']} "
+                    f"timeouts={llm['timeouts']} max_in_flight={llm['max_in_flight']}"
+                )
+                if "stderr_tail" in result:
+                    print(result["stderr_tail"], file=sys.stderr)
+    finally:
+        server.should_exit = True
+        if not args.keep_output:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        payload = {
+            "documents": documents,
+            "stub": behavior.__dict__,
+            "model": args.model,
+            "rounds": rounds,
+        }
+        if args.keep_output:
+            payload["work_dir"] = str(work_dir)
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+    elif args.keep_output:
+        print(f"outputs kept in {work_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""Benchmark torch vs ONNX Runtime (fp32 / int8) backends for SPLADE and the reranker (CPU)."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = PROJECT_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from retrieval.onnx_backend import INFERENCE_BACKENDS  # noqa: E402
+
+_WORDS = (
+    "participants were randomly allocated using a computer generated sequence "
+    "outcome assessors blinded allocation concealment sealed opaque envelopes "
+    "intention to treat analysis missing data imputation protocol deviations"
+).split()
+_QUERY = "Was the allocation sequence random?"
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare throughput and parity of inference backends on CPU.",
+    )
+    parser.add_argument("--model", choices=("splade", "reranker"), default="splade")
+    parser.add_argument("--model-id", default=None, help="Override model id/path.")
+    parser.add_argument(
+        "--backends",
+        default=",".join(INFERENCE_BACKENDS),
+        help="Comma-separated backends (torch,onnx,onnx-int8).",
+    )
+    parser.add_argument("--spans", type=int, default=200, help="Number of synthetic spans.")
+    parser.add_argument("--max-length", type=int, default=256, help="Truncation length.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size.")
+    parser.add_argument("--onnx-cache-dir", default=None, help="ONNX export cache dir.")
+    parser.add_argument("--seed", type=int, default=13, help="Random seed.")
+    parser.add_argument("--json", action="store_true", help="Print JSON output.")
+    return parser
+
+
+def _synthetic_texts(count: int, *, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    texts: List[str] = []
+    for _ in range(count):
+        length = max(4, int(rng.lognormvariate(3.6, 0.7)))
+        texts.append(" ".join(rng.choice(_WORDS) for _ in range(length)))
+    return texts
+
+
+def _load(args: argparse.Namespace, backend: str) -> Any:
+    if args.model == "splade":
+        from retrieval.engines.splade import DEFAULT_SPLADE_MODEL_ID, SpladeEncoder
+
+        return SpladeEncoder(
+            model_id=args.model_id or DEFAULT_SPLADE_MODEL_ID,
+            device="cpu",
+            backend=backend,
+            onnx_cache_dir=args.onnx_cache_dir,
+        )
+    from retrieval.rerankers.cross_encoder import (
+        DEFAULT_CROSS_ENCODER_MODEL_ID,
+        CrossEncoderReranker,
+    )
+
+    return CrossEncoderReranker(
+        model_id=args.model_id or DEFAULT_CROSS_ENCODER_MODEL_ID,
+        device="cpu",
+        backend=backend,
+        onnx_cache_dir=args.onnx_cache_dir,
+    )
+
+
+def _run(args: argparse.Namespace, model: Any, texts: List[str]) -> np.ndarray:
+    if args.model == "splade":
+        return model.encode(texts, max_length=args.max_length, batch_size=args.batch_size)
+    result = model.rerank(_QUERY, texts, max_length=args.max_length, batch_size=args.batch_size)
+    return np.asarray(result.scores, dtype=np.float32)
+
+
+def _top_overlap(reference: np.ndarray, candidate: np.ndarray, *, k: int = 10) -> float:
+    """Return top-k overlap of reranker scores, or of SPLADE self-similarity rankings."""
+    if reference.ndim == 2:
+        reference = reference @ reference[0]
+        candidate = candidate @ candidate[0]
+    k = min(k, reference.shape[0])
+    ref_top = set(np.argsort(-reference)[:k].tolist())
+    cand_top = set(np.argsort(-candidate)[:k].tolist())
+    return len(ref_top & cand_top) / float(k) if k else 1.0
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    backends = [item.strip() for item in args.backends.split(",") if item.strip()]
+    texts = _synthetic_texts(args.spans, seed=args.seed)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    reference: np.ndarray | None = None
+    for backend in backends:
+        started = time.perf_counter()
+        model = _load(args, backend)
+        load_seconds = time.perf_counter() - started
+        _run(args, model, texts[: args.batch_size])  # warm-up
+        started = time.perf_counter()
+        output = _run(args, model, texts)
+        seconds = time.perf_counter() - started
+        entry: Dict[str, Any] = {
+            "load_seconds": round(load_seconds, 3),
+            "seconds": round(seconds, 3),
+            "spans_per_second": round(len(texts) / seconds, 2) if seconds > 0 else None,
+        }
+        if reference is None:
+            reference = output
+        else:
+            entry["max_abs_diff"] = float(np.abs(output - reference).max())
+            entry["top10_overlap"] = _top_overlap(reference, output)
+        results[backend] = entry
+
+    payload = {
+        "model": args.model,
+        "spans": len(texts),
+        "max_length": args.max_length,
+        "batch_size": args.batch_size,
+        "reference_backend": backends[0] if backends else None,
+        "backends": results,
+    }
+    if args.json:
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"model={args.model} spans={len(texts)} max_length={args.max_length}")
+    for backend, entry in results.items():
+        extra = ""
+        if "max_abs_diff" in entry:
+            extra = (
+                f" max_abs_diff={entry['max_abs_diff']:.5f}"
+                f" top10_overlap={entry['top10_overlap']:.2f}"
+            )
+        print(
+            f"{backend:>10}: {entry['spans_per_second']} spans/s "
+            f"(run={entry['seconds']}s load={entry['load_seconds']}s){extra}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
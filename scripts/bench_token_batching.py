@@ -0,0 +1,193 @@
+"""Benchmark length-sorted token batching for SPLADE / cross-encoder inference (CPU)."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = PROJECT_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from retrieval.batching import (  # noqa: E402
+    padded_token_count,
+    plan_token_batches,
+    resolve_max_tokens_per_batch,
+)
+
+_WORDS = (
+    "participants were randomly allocated using a computer generated sequence "
+    "outcome assessors blinded allocation concealment sealed opaque envelopes "
+    "intention to treat analysis missing data imputation protocol deviations"
+).split()
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare fixed-size batching with length-sorted, token-budgeted batching "
+            "on a synthetic span-length distribution."
+        ),
+    )
+    parser.add_argument("--spans", type=int, default=400, help="Number of synthetic spans.")
+    parser.add_argument("--max-length", type=int, default=256, help="Truncation length.")
+    parser.add_argument("--batch-size", type=int, default=8, help="Legacy batch size.")
+    parser.add_argument(
+        "--max-tokens-per-batch",
+        type=int,
+        default=None,
+        help="Padded-token budget (default: batch_size * max_length).",
+    )
+    parser.add_argument("--seed", type=int, default=13, help="Random seed.")
+    parser.add_argument(
+        "--model",
+        choices=("none", "splade", "reranker"),
+        default="none",
+        help="Also time real CPU inference with the given model (default: plan only).",
+    )
+    parser.add_argument("--model-id", default=None, help="Override model id/path.")
+    parser.add_argument("--json", action="store_true", help="Print JSON output.")
+    return parser
+
+
+def _synthetic_lengths(count: int, *, max_length: int, seed: int) -> List[int]:
+    """Sample span token lengths from a skewed (log-normal) distribution."""
+    rng = random.Random(seed)
+    lengths: List[int] = []
+    for _ in range(count):
+        value = int(rng.lognormvariate(4.0, 0.8))
+        lengths.append(max(4, min(max_length, value)))
+    return lengths
+
+
+def _synthetic_texts(lengths: List[int], *, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(length)) for length in lengths]
+
+
+def _time_model(args: argparse.Namespace, texts: List[str], budget: int) -> dict:
+    if args.model == "splade":
+        from retrieval.engines.splade import DEFAULT_SPLADE_MODEL_ID, SpladeEncoder
+
+        encoder = SpladeEncoder(model_id=args.model_id or DEFAULT_SPLADE_MODEL_ID, device="cpu")
+
+        def _legacy() -> None:
+            for start in range(0, len(texts), args.batch_size):
+                encoder.encode(
+                    texts[start : start + args.batch_size],
+                    max_length=args.max_length,
+                    batch_size=args.batch_size,
+                    max_tokens_per_batch=args.batch_size * args.max_length,
+                )
+
+        def _sorted() -> None:
+            encoder.encode(
+                texts,
+                max_length=args.max_length,
+                batch_size=args.batch_size,
+                max_tokens_per_batch=budget,
+            )
+
+    else:
+        from retrieval.rerankers.cross_encoder import (
+            DEFAULT_CROSS_ENCODER_MODEL_ID,
+            CrossEncoderReranker,
+        )
+
+        reranker = CrossEncoderReranker(
+            model_id=args.model_id or DEFAULT_CROSS_ENCODER_MODEL_ID, device="cpu"
+        )
+        query = "Was the allocation sequence random?"
+
+        def _legacy() -> None:
+            for start in range(0, len(texts), args.batch_size):
+                reranker.rerank(
+                    query,
+                    texts[start : start + args.batch_size],
+                    max_length=args.max_length,
+                    batch_size=args.batch_size,
+                    max_tokens_per_batch=args.batch_size * args.max_length,
+                )
+
+        def _sorted() -> None:
+            reranker.rerank(
+                query,
+                texts,
+                max_length=args.max_length,
+                batch_size=args.batch_size,
+                max_tokens_per_batch=budget,
+            )
+
+    timings = {}
+    for label, fn in (("fixed_seconds", _legacy), ("sorted_seconds", _sorted)):
+        started = time.perf_counter()
+        fn()
+        timings[label] = round(time.perf_counter() - started, 3)
+    if timings["sorted_seconds"] > 0:
+        timings["speedup"] = round(timings["fixed_seconds"] / timings["sorted_seconds"], 2)
+    return timings
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    budget = resolve_max_tokens_per_batch(
+        args.max_tokens_per_batch,
+        batch_size=args.batch_size,
+        max_length=args.max_length,
+    )
+    lengths = _synthetic_lengths(args.spans, max_length=args.max_length, seed=args.seed)
+
+    fixed_batches = [
+        list(range(start, min(start + args.batch_size, len(lengths))))
+        for start in range(0, len(lengths), args.batch_size)
+    ]
+    sorted_batches = plan_token_batches(lengths, max_tokens_per_batch=budget)
+    real_tokens = sum(lengths)
+    fixed_padded = padded_token_count(lengths, fixed_batches)
+    sorted_padded = padded_token_count(lengths, sorted_batches)
+
+    result = {
+        "spans": len(lengths),
+        "max_length": args.max_length,
+        "batch_size": args.batch_size,
+        "max_tokens_per_batch": budget,
+        "real_tokens": real_tokens,
+        "fixed": {
+            "batches": len(fixed_batches),
+            "padded_tokens": fixed_padded,
+            "efficiency": round(real_tokens / fixed_padded, 3) if fixed_padded else 1.0,
+        },
+        "sorted": {
+            "batches": len(sorted_batches),
+            "padded_tokens": sorted_padded,
+            "efficiency": round(real_tokens / sorted_padded, 3) if sorted_padded else 1.0,
+        },
+    }
+    if args.model != "none":
+        texts = _synthetic_texts(lengths, seed=args.seed)
+        result["timing"] = _time_model(args, texts, budget)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"spans={result['spans']} real_tokens={real_tokens} budget={budget}")
+    for label in ("fixed", "sorted"):
+        entry = result[label]
+        print(
+            f"{label:>6}: batches={entry['batches']} padded_tokens={entry['padded_tokens']} "
+            f"efficiency={entry['efficiency']:.3f}"
+        )
+    if "timing" in result:
+        print(f"timing: {result['timing']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,6 +5,7 @@ from pydantic import Json
 from schemas.requests import Rob2Input, Rob2RunOptions
 from schemas.responses import Rob2RunResult
 from services.rob2_runner import run_rob2
+from utils.metrics import RUNS_QUEUED
 
 router = APIRouter()
 
@@ -30,13 +31,26 @@ async def run_pipeline(
         filename=filename
     )
     
+    # Requests waiting for a threadpool slot show up as rob2_runs_queued.
+    RUNS_QUEUED.inc()
+    started = False
+
+    def _start_run(**kwargs):
+        nonlocal started
+        started = True
+        RUNS_QUEUED.dec()
+        return run_rob2(**kwargs)
+
     try:
         # run_rob2 is blocking, so we run it in a threadpool
         result = await run_in_threadpool(
-            run_rob2,
+            _start_run,
             input_data=input_data,
             options=options or Rob2RunOptions()
         )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pipeline execution failed: {str(e)}")
+    finally:
+        if not started:
+            RUNS_QUEUED.dec()
@@ -0,0 +1,83 @@
+import threading
+
+from fastapi import APIRouter, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from core.config import get_settings
+from services.model_warmup import model_status, parse_model_names, warm_models
+from utils.metrics import MODEL_WARM, render_metrics
+
+router = APIRouter()
+
+_EXPOSITION_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_warmup_lock = threading.Lock()
+_warmup_required: tuple[str, ...] = ()
+_warmup_errors: dict[str, str | None] = {}
+_warmup_thread: threading.Thread | None = None
+
+
+class ModelReadiness(BaseModel):
+    warm: bool
+    required: bool
+    error: str | None = None
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    warmup_running: bool
+    models: dict[str, ModelReadiness]
+
+
+def start_model_warmup() -> threading.Thread | None:
+    """Load the models listed in ``API_WARMUP_MODELS`` in a background thread."""
+    global _warmup_required, _warmup_thread
+    names = parse_model_names(get_settings().api_warmup_models)
+    with _warmup_lock:
+        _warmup_required = names
+        _warmup_errors.clear()
+        if not names:
+            return None
+        _warmup_thread = threading.Thread(
+            target=_run_warmup, args=(names,), name="model-warmup", daemon=True
+        )
+        _warmup_thread.start()
+        return _warmup_thread
+
+
+def _run_warmup(names: tuple[str, ...]) -> None:
+    errors = warm_models(names)
+    with _warmup_lock:
+        _warmup_errors.update(errors)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["System"])
+async def metrics():
+    """Prometheus text exposition of this process's pipeline metrics."""
+    for name, warm in model_status().items():
+        MODEL_WARM.set(1 if warm else 0, model=name)
+    return PlainTextResponse(render_metrics(), media_type=_EXPOSITION_CONTENT_TYPE)
+
+
+@router.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    tags=["System"],
+    responses={503: {"model": ReadinessResponse}},
+)
+async def readiness(response: Response):
+    """Report which local models are warm; 503 until every warmup model is loaded."""
+    status = model_status()
+    with _warmup_lock:
+        required = _warmup_required
+        errors = dict(_warmup_errors)
+        running = _warmup_thread is not None and _warmup_thread.is_alive()
+    models = {
+        name: ModelReadiness(warm=warm, required=name in required, error=errors.get(name))
+        for name, warm in status.items()
+    }
+    ready = all(status[name] for name in required)
+    if not ready:
+        response.status_code = 503
+    return ReadinessResponse(ready=ready, warmup_running=running, models=models)
@@ -1,20 +1,29 @@
+from contextlib import asynccontextmanager
 from importlib.metadata import version
 from typing import Any, cast
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.actions import config, graph, health, preprocess
+from api.actions import config, graph, health, metrics, preprocess
 
 try:
     app_version = version("eagent")
 except Exception:
     app_version = "0.0.0"
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    metrics.start_model_warmup()
+    yield
+
+
 app = FastAPI(
     title="EAgent API",
     description="Production-ready LangGraph agent API",
     version=app_version,
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -28,6 +37,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(config.router)
 app.include_router(preprocess.router)
 app.include_router(graph.router, prefix="/graph")
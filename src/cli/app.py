@@ -29,6 +29,7 @@ _SUBCOMMAND_SPECS: list[tuple[str, str, str]] = [
     ("cache", "cli.commands.cache", "缓存查看与清理"),
     ("preprocess", "cli.commands.preprocess", "预处理调试"),
     ("playground", "cli.commands.playground", "交互式调试工具"),
+    ("dev", "cli.commands.dev", "开发与压测工具"),
 ]
 _SUBCOMMAND_NAMES = {name for name, _, _ in _SUBCOMMAND_SPECS}
 _SUBCOMMANDS_REGISTERED = False
@@ -172,10 +173,23 @@ def run(
         "--pdf",
         help="生成 PDF 报告 (需要 --output-dir)",
     ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="按节点采样 CPU 栈并统计 tracemalloc 内存分配，"
+        "在输出目录写入 profile.folded（火焰图）与 profile.md（汇总表）",
+    ),
+    profile_interval_ms: float = typer.Option(
+        5.0,
+        "--profile-interval-ms",
+        min=0.1,
+        help="--profile 的采样间隔（毫秒）",
+    ),
 ) -> None:
     from cli.common import build_options, load_options_payload
     from schemas.requests import Rob2Input
     from services.rob2_runner import run_rob2
+    from utils.profiling import RunProfiler
 
     if output_dir is None:
         output_dir = Path("results")
@@ -204,6 +218,7 @@ def run(
             table = True
 
     options_obj = build_options(payload)
+    profiler = RunProfiler(interval_ms=profile_interval_ms) if profile else None
     result = run_rob2(
         Rob2Input(pdf_path=str(pdf_path)),
         options_obj,
@@ -214,6 +229,7 @@ def run(
         cache_scope=cache_scope,
         batch_id=batch_id,
         batch_name=batch_name,
+        profiler=profiler,
     )
     _emit_result(result, json_out=json_out, table=table)
     _write_output_dir(
@@ -225,6 +241,9 @@ def run(
         pdf=pdf,
         pdf_name=pdf_path.name,
     )
+    if profiler is not None:
+        written = profiler.write(output_dir, timings=result.timings)
+        typer.echo(f"性能剖析已写入: {', '.join(str(path) for path in written)}", err=json_out)
 
 
 def _emit_result(result: Any, *, json_out: bool, table: bool) -> None:
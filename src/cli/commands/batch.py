@@ -6,13 +6,19 @@ import csv
 import json
 import os
 import shutil
+import socket
+import threading
 from collections import deque
+from collections.abc import Callable, Iterable, Iterator
 from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import partial
 from datetime import datetime, timezone
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep
 from typing import Any, Literal
+from uuid import uuid4
 
 import typer
 
@@ -20,11 +26,14 @@ from cli.common import (
     build_options,
     emit_json,
     load_options_payload,
+    render_run_reports,
     write_run_output_dir,
 )
 from core.config import get_settings
+from persistence.fingerprints import fingerprint_files
 from persistence.hashing import hash_payload, sha256_file
 from persistence.sqlite_store import SqliteStore
+from persistence.work_queue import BatchWorkQueue, QueueItem
 from reporting.batch_plot import (
     DEFAULT_BATCH_PLOT_FILE,
     SUMMARY_FILE_NAME,
@@ -35,8 +44,14 @@ from reporting.batch_excel import (
     DEFAULT_BATCH_EXCEL_FILE,
     generate_batch_summary_excel,
 )
+from retrieval.serving.server import DEFAULT_MAX_WAIT_MS, start_inference_server
 from schemas.requests import Rob2Input
+from services.batch_scheduling import estimate_pdf_costs, order_by_policy, scheduling_policies
+from services.llm_batch import BATCH_BACKENDS, DEFAULT_POLL_INTERVAL_S, LLMBatchSubmitter
 from services.rob2_runner import run_rob2
+from utils.llm_cassette import LLMBatchPending, cassette_path
+from utils.memory import RssWindow, current_rss_mb
+from utils.profiling import RunProfiler
 
 
 app = typer.Typer(
@@ -96,6 +111,24 @@ _ADAPTIVE_SUCCESS_WINDOW = 3
 _DEFAULT_RETRY_BACKOFF_MS = 800
 
 _PROCESS_POOL_EXECUTOR = ProcessPoolExecutor
+_RENDER_POOL_EXECUTOR = ProcessPoolExecutor
+_DEFAULT_RENDER_WORKERS = 1
+
+_QUEUE_FILE = "batch_queue.sqlite"
+_DEFAULT_LEASE_SECONDS = 120
+_DEFAULT_QUEUE_POLL_INTERVAL_S = 5.0
+# Summary files cover the whole batch, so queue workers refresh them on this
+# interval (and once the queue drains) rather than after every item.
+_QUEUE_SUMMARY_INTERVAL_S = 30.0
+_DEFAULT_MAX_LEASE_ATTEMPTS = 3
+
+_DEFAULT_MEMORY_MB_PER_PAGE = 25.0
+_LLM_MODES = ("realtime", "provider-batch")
+_LLM_BATCH_DIR = "llm_batch"
+_LLM_BATCH_STATE_FILE = "submissions.json"
+_DEFAULT_LLM_BATCH_MAX_ROUNDS = 60
+# Assumed page count when the pre-scan could not open the PDF.
+_DEFAULT_MEMORY_PAGES = 20
 
 
 @dataclass(slots=True)
@@ -121,6 +154,11 @@ class _BatchTask:
     batch_id: str | None
     retry_429_max: int
     retry_429_backoff_ms: int
+    # Reports are rendered by the parent's render queue, not by the worker.
+    defer_reports: bool = False
+    # Write profile.folded/profile.md next to result.json (``--profile-every``).
+    profile: bool = False
+    profile_interval_ms: float = 5.0
 
 
 @dataclass(slots=True)
@@ -157,6 +195,187 @@ class _AdaptiveConcurrencyController:
         self._success_streak = 0
 
 
+@dataclass(slots=True)
+class _MemoryAdmissionController:
+    """Delay dispatch while worker RSS plus in-flight estimates exceed the budget.
+
+    In-flight documents reserve ``pages * mb_per_page``; resident worker memory
+    is the latest RSS each worker process reported. One task is always
+    admitted when nothing is in flight, so an undersized budget cannot stall
+    the batch.
+    """
+
+    budget_mb: float | None
+    mb_per_page: float = _DEFAULT_MEMORY_MB_PER_PAGE
+    worker_rss_mb: dict[int, float] = field(default_factory=dict)
+    inflight_mb: dict[str, float] = field(default_factory=dict)
+
+    def estimate_mb(self, item: dict[str, Any]) -> float:
+        pages = item.get("pages")
+        if not isinstance(pages, int) or pages <= 0:
+            pages = _DEFAULT_MEMORY_PAGES
+        return pages * self.mb_per_page
+
+    def admits(self, estimate_mb: float) -> bool:
+        if self.budget_mb is None or not self.inflight_mb:
+            return True
+        in_use = sum(self.worker_rss_mb.values()) + sum(self.inflight_mb.values())
+        return in_use + estimate_mb <= self.budget_mb
+
+    def reserve(self, key: str, estimate_mb: float) -> None:
+        self.inflight_mb[key] = estimate_mb
+
+    def release(self, key: str) -> None:
+        self.inflight_mb.pop(key, None)
+
+    def observe(self, task_result: dict[str, Any]) -> None:
+        pid = task_result.get("worker_pid")
+        rss_mb = task_result.get("rss_mb")
+        if isinstance(pid, int) and isinstance(rss_mb, (int, float)):
+            self.worker_rss_mb[pid] = float(rss_mb)
+
+    def forget_workers(self) -> None:
+        self.worker_rss_mb.clear()
+
+
+@dataclass(slots=True)
+class _WorkerRecycler:
+    """Worker recycling limits for the document process pool.
+
+    ``max_tasks`` is handed to the executor as ``max_tasks_per_child``, which
+    replaces each worker on its own after that many tasks while the others
+    keep running. A worker reporting RSS above ``max_rss_mb`` makes the pool
+    drain and restart, since the executor cannot retire one specific worker.
+    """
+
+    max_tasks: int | None = None
+    max_rss_mb: float | None = None
+    reason: str | None = None
+
+    @property
+    def due(self) -> bool:
+        return self.reason is not None
+
+    def pool_kwargs(self) -> dict[str, Any]:
+        return {"max_tasks_per_child": self.max_tasks} if self.max_tasks else {}
+
+    def observe(self, task_result: dict[str, Any]) -> None:
+        if self.reason is not None:
+            return
+        rss_mb = task_result.get("rss_mb")
+        if (
+            self.max_rss_mb is not None
+            and isinstance(rss_mb, (int, float))
+            and rss_mb > self.max_rss_mb
+        ):
+            self.reason = f"worker RSS {rss_mb:.0f}MB > {self.max_rss_mb:.0f}MB"
+
+    def reset(self) -> None:
+        self.reason = None
+
+
+class _ReportRenderQueue:
+    """Render HTML/DOCX/PDF reports in a separate process pool.
+
+    Document workers only write ``result.json``; reports are rendered from it
+    here, so slow WeasyPrint/DOCX rendering no longer holds a worker slot.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self._workers = max(1, int(workers))
+        self._executor: Any = None
+        self._pending: dict[Future[None], str] = {}
+
+    def submit(
+        self,
+        result_dir: Path,
+        *,
+        label: str,
+        pdf_name: str,
+        html: bool,
+        docx: bool,
+        pdf: bool,
+    ) -> None:
+        if not (html or docx or pdf):
+            return
+        if self._executor is None:
+            self._executor = _RENDER_POOL_EXECUTOR(max_workers=self._workers)
+        future = self._executor.submit(
+            render_run_reports,
+            result_dir,
+            html=html,
+            docx=docx,
+            pdf=pdf,
+            pdf_name=pdf_name,
+        )
+        self._pending[future] = label
+
+    def submit_task(self, task: _BatchTask) -> None:
+        if task.defer_reports:
+            self.submit(
+                Path(task.batch_output_dir) / task.output_subdir,
+                label=task.relative_path,
+                pdf_name=task.pdf_name,
+                html=task.html,
+                docx=task.docx,
+                pdf=task.pdf,
+            )
+
+    def drain(self, *, block: bool = True) -> dict[str, str | None]:
+        """Collect queued renders; returns ``{label: error or None}`` per render.
+
+        With ``block=False`` only renders that already finished are collected.
+        """
+        outcomes: dict[str, str | None] = {}
+        for future, label in list(self._pending.items()):
+            if not block and not future.done():
+                continue
+            del self._pending[future]
+            try:
+                future.result()
+            except Exception as exc:
+                outcomes[label] = _format_error(exc)
+                typer.echo(f"Warning: 报告生成失败: {label} ({outcomes[label]})")
+            else:
+                outcomes[label] = None
+        return outcomes
+
+    def close(self) -> dict[str, str | None]:
+        outcomes = self.drain()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        return outcomes
+
+
+class _ReusableProcessPool:
+    """Process pool kept warm across dispatch rounds (``batch watch``).
+
+    Used in place of the executor class: leaving the ``with`` block keeps the
+    worker processes alive, ``close()`` shuts them down so the next round
+    starts fresh ones.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Any = None
+
+    def __call__(self, *, max_workers: int, **kwargs: Any) -> "_ReusableProcessPool":
+        if self._executor is None:
+            self._executor = _PROCESS_POOL_EXECUTOR(max_workers=max_workers, **kwargs)
+        return self
+
+    def __enter__(self) -> Any:
+        return self._executor
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
 @app.command("run", help="批量运行目录中的 PDF")
 def run_batch(
     input_dir: Path = typer.Argument(
@@ -319,6 +538,41 @@ def run_batch(
         min=1,
         help="任务预取长度（默认: workers*2）",
     ),
+    inference_server: bool | None = typer.Option(
+        None,
+        "--inference-server/--no-inference-server",
+        help="多 worker 时由主进程托管共享 SPLADE/Cross-Encoder 推理服务（默认读取配置）",
+    ),
+    schedule: str | None = typer.Option(
+        None,
+        "--schedule",
+        help="调度策略：lpt（按预估耗时从大到小，缩短总耗时）|sjf（从小到大，尽早出结果）|fifo（目录顺序）；默认读取配置或 lpt",
+    ),
+    distributed: bool = typer.Option(
+        False,
+        "--distributed/--no-distributed",
+        help="分布式模式：待运行条目登记到输出目录下的共享队列，"
+        "由本进程及其他主机上的 rob2 batch worker 按租约领取执行",
+    ),
+    profile_every: int | None = typer.Option(
+        None,
+        "--profile-every",
+        min=1,
+        help="每 N 个文件抽样 1 个做性能剖析（按目录顺序第 1、N+1、… 个），"
+        "在该文件输出目录写入 profile.folded 与 profile.md",
+    ),
+    profile_interval_ms: float = typer.Option(
+        5.0,
+        "--profile-interval-ms",
+        min=0.1,
+        help="--profile-every 的采样间隔（毫秒）",
+    ),
+    llm_mode: str = typer.Option(
+        "realtime",
+        "--llm-mode",
+        help="LLM 调用方式：realtime（逐次实时调用）|provider-batch（按流水线阶段汇总所有文件的 "
+        "LLM 请求，经供应商批处理接口离线提交、轮询后续跑各文件，成本更低、耗时更长）",
+    ),
 ) -> None:
     input_dir_abs = input_dir.resolve()
     output_dir_abs = output_dir.resolve()
@@ -329,19 +583,37 @@ def run_batch(
     if not pdf_files:
         raise typer.BadParameter(f"目录中未发现 PDF: {input_dir_abs}")
 
-    file_entries = _build_file_entries(input_dir_abs, pdf_files)
+    settings = get_settings()
+    resolved_persistence_dir = str(persist_dir) if persist_dir else settings.persistence_dir
+
+    persistence_store = (
+        SqliteStore(Path(resolved_persistence_dir) / "metadata.sqlite") if persist else None
+    )
+    file_entries = _build_file_entries(input_dir_abs, pdf_files, store=persistence_store)
     relative_paths = [str(entry["relative_path"]) for entry in file_entries]
     file_list_hash = _build_file_list_hash(file_entries)
 
     payload = load_options_payload(options, options_file, set_values)
     options_obj = build_options(payload)
+    if llm_mode not in _LLM_MODES:
+        raise typer.BadParameter(f"--llm-mode 必须是 {'|'.join(_LLM_MODES)}")
+    provider_batch = llm_mode == "provider-batch"
+    if provider_batch and distributed:
+        raise typer.BadParameter("--llm-mode provider-batch 不支持 --distributed")
+    if provider_batch and (options_obj.llm_cassette_mode or "none") not in ("none", "collect"):
+        raise typer.BadParameter("--llm-mode provider-batch 不能与 llm_cassette_mode 录制/回放同时使用")
 
-    settings = get_settings()
-    resolved_persistence_dir = str(persist_dir) if persist_dir else settings.persistence_dir
     resolved_persist_scope = persist_scope or settings.persistence_scope
     resolved_cache_dir = str(cache_dir) if cache_dir else settings.cache_dir
     resolved_cache_scope = cache_scope or settings.cache_scope
+    if provider_batch and str(resolved_cache_scope).strip().lower() == "none":
+        # Every round re-runs each document up to its next LLM step; without the
+        # stage cache, preprocessing and retrieval would be recomputed each round.
+        raise typer.BadParameter(
+            "--llm-mode provider-batch 需要启用阶段缓存（--cache-scope deterministic）"
+        )
     resolved_workers = _resolve_workers(workers, getattr(settings, "batch_workers", None))
+    resolved_schedule = _resolve_schedule(schedule, getattr(settings, "batch_schedule", None))
     resolved_max_inflight_llm = _resolve_int_with_default(
         max_inflight_llm,
         getattr(settings, "max_inflight_llm", None),
@@ -370,6 +642,16 @@ def run_batch(
         resolved_rate_limit_init = resolved_rate_limit_max
 
     resolved_prefetch = max(1, prefetch if prefetch is not None else resolved_workers * 2)
+    resolved_inference_server = (
+        inference_server
+        if inference_server is not None
+        else bool(getattr(settings, "inference_server", False))
+    )
+    resolved_inference_max_wait_ms = _resolve_int_with_default(
+        None,
+        getattr(settings, "inference_server_max_wait_ms", None),
+        fallback=DEFAULT_MAX_WAIT_MS,
+    )
 
     options_hash = hash_payload(
         {
@@ -446,9 +728,26 @@ def run_batch(
         max_inflight_llm=resolved_max_inflight_llm,
         rate_limit_mode=resolved_rate_limit_mode,
     )
+    checkpoint["runtime_meta"]["schedule"] = resolved_schedule
 
     run_tasks: deque[_BatchTask] = deque()
     options_payload = options_obj.model_dump()
+    llm_batch_dir = output_dir_abs / _LLM_BATCH_DIR
+    if provider_batch:
+        # Every document runs against its cassette in collect mode; answers
+        # from the provider batches accumulate there across rounds.
+        options_payload["llm_cassette_mode"] = "collect"
+        options_payload["llm_cassette_dir"] = options_obj.llm_cassette_dir or str(
+            llm_batch_dir / "cassettes"
+        )
+        checkpoint["runtime_meta"]["llm_mode"] = llm_mode
+    render_workers = _resolve_int_with_default(
+        None,
+        getattr(settings, "batch_render_workers", None),
+        fallback=_DEFAULT_RENDER_WORKERS,
+    )
+    # Distributed workers render inline: there is no parent process to hand off to.
+    defer_reports = render_workers > 0 and not distributed and (html or docx or pdf)
 
     for index, entry in enumerate(file_entries, start=1):
         rel_path = str(entry["relative_path"])
@@ -473,29 +772,18 @@ def run_batch(
             typer.echo(f"[{index}/{total}] skip {rel_path}")
             continue
 
-        reusable_dir = reusable_by_hash.get(pdf_sha256)
-        if reusable_dir is not None:
-            _materialize_reused_output(source_dir=reusable_dir, target_dir=subdir)
-            reused_summary = _read_result_summary(result_file)
-            if reused_summary is not None:
-                _write_batch_item_meta(
-                    output_dir=subdir,
-                    pdf_sha256=pdf_sha256,
-                    relative_path=rel_path,
-                )
-                item["status"] = "skipped"
-                item["run_id"] = reused_summary["run_id"]
-                item["runtime_ms"] = reused_summary["runtime_ms"]
-                item["overall_risk"] = reused_summary["overall_risk"]
-                item["domain_risks"] = reused_summary["domain_risks"]
-                item["error"] = None
-                item["updated_at"] = _now_iso()
-                reusable_by_hash[pdf_sha256] = subdir.resolve()
-                _increment_runtime_meta(checkpoint, completed=1)
-                _write_checkpoint(checkpoint_path, checkpoint)
-                _write_summary_files(checkpoint, output_dir_abs)
-                typer.echo(f"[{index}/{total}] skip {rel_path} (hash)")
-                continue
+        if _reuse_output_by_hash(
+            pdf_sha256=pdf_sha256,
+            relative_path=rel_path,
+            subdir=subdir,
+            item=item,
+            checkpoint=checkpoint,
+            checkpoint_path=checkpoint_path,
+            output_dir=output_dir_abs,
+            reusable_by_hash=reusable_by_hash,
+        ):
+            typer.echo(f"[{index}/{total}] skip {rel_path} (hash)")
+            continue
 
         run_tasks.append(
             _BatchTask(
@@ -520,57 +808,140 @@ def run_batch(
                 batch_id=effective_batch_id,
                 retry_429_max=retry_429_max,
                 retry_429_backoff_ms=retry_429_backoff_ms,
+                defer_reports=defer_reports,
+                profile=profile_every is not None and (index - 1) % profile_every == 0,
+                profile_interval_ms=profile_interval_ms,
             )
         )
 
-    _write_checkpoint(checkpoint_path, checkpoint)
-    _write_summary_files(checkpoint, output_dir_abs)
-
-    if run_tasks:
-        _execute_batch_tasks(
-            tasks=run_tasks,
+    if not distributed:
+        _render_pending_reports(
+            workers=max(1, render_workers),
+            html=html,
+            docx=docx,
+            pdf=pdf,
             checkpoint=checkpoint,
-            items=items,
             checkpoint_path=checkpoint_path,
             output_dir=output_dir_abs,
-            reusable_by_hash=reusable_by_hash,
-            workers=resolved_workers,
-            prefetch=resolved_prefetch,
-            limiter_mode=resolved_rate_limit_mode,
-            limiter_init=min(resolved_rate_limit_init, resolved_workers),
-            limiter_max=min(resolved_rate_limit_max, resolved_workers),
         )
 
-    summary = _build_summary_payload(checkpoint)
-    if plot:
-        if plot_output is None:
-            resolved_plot_output = output_dir_abs / _BATCH_PLOT_FILE
-        else:
-            resolved_plot_output = plot_output.resolve()
-        try:
-            plotted = _generate_batch_plot(
-                summary,
-                resolved_plot_output,
-                include_non_success=False,
-            )
-            typer.echo(f"已写入: {resolved_plot_output} (rows={plotted})")
-        except Exception as exc:  # pragma: no cover - defensive
-            typer.echo(f"Warning: 红绿灯图生成失败: {exc}")
+    _schedule_tasks(
+        run_tasks,
+        items=items,
+        policy=resolved_schedule,
+        store=persistence_store,
+    )
+    _write_checkpoint(checkpoint_path, checkpoint)
+    _write_summary_files(checkpoint, output_dir_abs)
 
-    if excel:
-        if excel_output is None:
-            resolved_excel_output = output_dir_abs / _BATCH_EXCEL_FILE
-        else:
-            resolved_excel_output = excel_output.resolve()
-        try:
-            exported = _generate_batch_excel(
-                summary,
-                output_dir_abs / _SUMMARY_JSON_FILE,
-                resolved_excel_output,
+    if distributed:
+        queue = BatchWorkQueue(output_dir_abs / _QUEUE_FILE)
+        queue.register(
+            ((task.relative_path, asdict(task)) for task in run_tasks),
+            reset=reset,
+        )
+        queue.requeue(task.relative_path for task in run_tasks)
+        counts = queue.counts()
+        typer.echo(
+            f"已登记到共享队列: {queue.db_path} "
+            f"(pending={counts['pending']}, running={counts['running']})"
+        )
+        with _inference_server_scope(
+            enabled=resolved_inference_server and resolved_workers > 1,
+            max_wait_ms=resolved_inference_max_wait_ms,
+        ) as inference_server_active:
+            checkpoint["runtime_meta"]["inference_server"] = inference_server_active
+            checkpoint["runtime_meta"]["distributed"] = True
+            _write_checkpoint(checkpoint_path, checkpoint)
+            _run_queue_workers(
+                queue_path=queue.db_path,
+                output_dir=output_dir_abs,
+                slots=resolved_workers,
+                lease_seconds=_DEFAULT_LEASE_SECONDS,
+                poll_interval=_DEFAULT_QUEUE_POLL_INTERVAL_S,
+                max_attempts=_DEFAULT_MAX_LEASE_ATTEMPTS,
             )
-            typer.echo(f"已写入: {resolved_excel_output} (rows={exported})")
-        except Exception as exc:  # pragma: no cover - defensive
-            typer.echo(f"Warning: Excel 汇总生成失败: {exc}")
+        checkpoint = _sync_checkpoint_from_queue(queue, checkpoint_path, output_dir_abs)
+    elif run_tasks:
+        with _inference_server_scope(
+            enabled=resolved_inference_server and resolved_workers > 1,
+            max_wait_ms=resolved_inference_max_wait_ms,
+        ) as inference_server_active:
+            checkpoint["runtime_meta"]["inference_server"] = inference_server_active
+            renderer = _ReportRenderQueue(render_workers) if defer_reports else None
+            execute = partial(
+                _execute_batch_tasks,
+                checkpoint=checkpoint,
+                items=items,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir_abs,
+                reusable_by_hash=reusable_by_hash,
+                workers=resolved_workers,
+                prefetch=resolved_prefetch,
+                limiter_mode=resolved_rate_limit_mode,
+                limiter_init=min(resolved_rate_limit_init, resolved_workers),
+                limiter_max=min(resolved_rate_limit_max, resolved_workers),
+                memory=_MemoryAdmissionController(
+                    budget_mb=getattr(settings, "batch_memory_budget_mb", None),
+                    mb_per_page=float(
+                        getattr(settings, "batch_memory_mb_per_page", None)
+                        or _DEFAULT_MEMORY_MB_PER_PAGE
+                    ),
+                ),
+                recycler=_WorkerRecycler(
+                    max_tasks=getattr(settings, "batch_worker_max_tasks", None),
+                    max_rss_mb=getattr(settings, "batch_worker_max_rss_mb", None),
+                ),
+                renderer=renderer,
+            )
+            try:
+                if provider_batch:
+                    _execute_provider_batch_rounds(
+                        tasks=run_tasks,
+                        checkpoint=checkpoint,
+                        items=items,
+                        checkpoint_path=checkpoint_path,
+                        output_dir=output_dir_abs,
+                        cassette_dir=Path(options_payload["llm_cassette_dir"]),
+                        submitter=LLMBatchSubmitter(
+                            llm_batch_dir / _LLM_BATCH_STATE_FILE,
+                            backend=_resolve_llm_batch_backend(
+                                getattr(settings, "llm_batch_backend", None)
+                            ),
+                            poll_interval_s=(
+                                getattr(settings, "llm_batch_poll_interval_s", None)
+                                or DEFAULT_POLL_INTERVAL_S
+                            ),
+                            log=typer.echo,
+                        ),
+                        max_rounds=_resolve_int_with_default(
+                            None,
+                            getattr(settings, "llm_batch_max_rounds", None),
+                            fallback=_DEFAULT_LLM_BATCH_MAX_ROUNDS,
+                        ),
+                        execute=execute,
+                    )
+                else:
+                    execute(tasks=run_tasks)
+            finally:
+                if renderer is not None:
+                    _record_report_outcomes(
+                        renderer.close(),
+                        checkpoint=checkpoint,
+                        items=items,
+                        checkpoint_path=checkpoint_path,
+                        output_dir=output_dir_abs,
+                    )
+
+    summary = _build_summary_payload(checkpoint)
+    _write_batch_reports(
+        summary,
+        output_dir_abs,
+        plot=plot,
+        plot_output=plot_output,
+        excel=excel,
+        excel_output=excel_output,
+    )
 
     if json_out:
         emit_json(summary)
@@ -601,135 +972,1356 @@ def plot_batch(
         help="将 failed/pending/running 条目以灰色占位纳入图中",
     ),
 ) -> None:
-    summary_path, default_output = _resolve_summary_input(source.resolve())
-    summary = _load_summary_or_raise(summary_path)
-    output_path = output.resolve() if output is not None else default_output
-    plotted = _generate_batch_plot(
-        summary,
-        output_path,
-        include_non_success=include_non_success,
+    summary_path, default_output = _resolve_summary_input(source.resolve())
+    summary = _load_summary_or_raise(summary_path)
+    output_path = output.resolve() if output is not None else default_output
+    plotted = _generate_batch_plot(
+        summary,
+        output_path,
+        include_non_success=include_non_success,
+    )
+    typer.echo(f"已写入: {output_path} (rows={plotted})")
+
+
+@app.command("excel", help="根据批量 summary 生成 Excel 汇总（XLSX）")
+def excel_batch(
+    source: Path = typer.Argument(
+        ...,
+        exists=True,
+        file_okay=True,
+        dir_okay=True,
+        readable=True,
+        metavar="目录或summary路径",
+    ),
+    output: Path | None = typer.Option(
+        None,
+        "--output",
+        help="输出 Excel 路径（默认: <batch-output-dir>/batch_summary.xlsx）",
+    ),
+) -> None:
+    summary_path, _ = _resolve_summary_input(source.resolve())
+    summary = _load_summary_or_raise(summary_path)
+    default_output = _default_excel_output(summary_path)
+    output_path = output.resolve() if output is not None else default_output
+    exported = _generate_batch_excel(summary, summary_path, output_path)
+    typer.echo(f"已写入: {output_path} (rows={exported})")
+
+
+@app.command("render", help="根据已有 result.json 重新生成报告（HTML/DOCX/PDF）")
+def render_batch(
+    source: Path = typer.Argument(
+        ...,
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        readable=True,
+        metavar="批量输出目录",
+    ),
+    html: bool = typer.Option(
+        True,
+        "--html/--no-html",
+        help="生成交互式 HTML 报告",
+    ),
+    docx: bool = typer.Option(
+        True,
+        "--docx/--no-docx",
+        help="生成 Word 报告",
+    ),
+    pdf: bool = typer.Option(
+        True,
+        "--pdf/--no-pdf",
+        help="生成 PDF 报告",
+    ),
+    workers: int = typer.Option(
+        _DEFAULT_RENDER_WORKERS,
+        "--workers",
+        min=1,
+        help="渲染进程数",
+    ),
+    missing_only: bool = typer.Option(
+        False,
+        "--missing-only",
+        help="仅生成缺失的报告文件",
+    ),
+) -> None:
+    root = source.resolve()
+    result_dirs = sorted(path.parent for path in root.rglob("result.json"))
+    if not result_dirs:
+        raise typer.BadParameter(f"目录中未发现 result.json: {root}")
+
+    renderer = _ReportRenderQueue(workers)
+    submitted = 0
+    for result_dir in result_dirs:
+        meta = _load_batch_item_meta(result_dir / _BATCH_ITEM_META_FILE) or {}
+        rel_path = str(meta.get("relative_path") or result_dir.relative_to(root).as_posix())
+        wanted = {
+            "html": html and not (missing_only and (result_dir / "report.html").exists()),
+            "docx": docx and not (missing_only and (result_dir / "report.docx").exists()),
+            "pdf": pdf and not (missing_only and (result_dir / "report.pdf").exists()),
+        }
+        if not any(wanted.values()):
+            continue
+        pdf_name = Path(rel_path).name if meta else f"{result_dir.name}.pdf"
+        renderer.submit(result_dir, label=rel_path, pdf_name=pdf_name, **wanted)
+        submitted += 1
+    failures = [label for label, error in renderer.close().items() if error]
+    typer.echo(f"报告已生成: {submitted - len(failures)}/{submitted}")
+    if failures:
+        raise typer.Exit(code=1)
+
+
+@app.command("worker", help="从共享队列领取并执行批量条目（配合 run --distributed，可在多台主机上运行）")
+def worker_batch(
+    output_dir: Path = typer.Argument(
+        ...,
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        readable=True,
+        metavar="批量输出目录",
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        min=1,
+        help="本机并发 worker 进程数",
+    ),
+    lease_seconds: int = typer.Option(
+        _DEFAULT_LEASE_SECONDS,
+        "--lease-seconds",
+        min=10,
+        help="租约时长（秒）；超时未续约的条目会被其他 worker 回收",
+    ),
+    poll_interval: float = typer.Option(
+        _DEFAULT_QUEUE_POLL_INTERVAL_S,
+        "--poll-interval",
+        min=0.1,
+        help="无可领取条目时的轮询间隔（秒）",
+    ),
+    max_attempts: int = typer.Option(
+        _DEFAULT_MAX_LEASE_ATTEMPTS,
+        "--max-attempts",
+        min=1,
+        help="单个条目最多被领取次数（租约过期后重新领取也计入）",
+    ),
+) -> None:
+    output_dir_abs = output_dir.resolve()
+    queue_path = output_dir_abs / _QUEUE_FILE
+    if not queue_path.exists():
+        raise typer.BadParameter(
+            f"未找到共享队列: {queue_path}。请先运行 rob2 batch run --distributed。"
+        )
+    settings = get_settings()
+    with _inference_server_scope(
+        enabled=workers > 1 and bool(getattr(settings, "inference_server", False)),
+        max_wait_ms=_resolve_int_with_default(
+            None,
+            getattr(settings, "inference_server_max_wait_ms", None),
+            fallback=DEFAULT_MAX_WAIT_MS,
+        ),
+    ):
+        processed = _run_queue_workers(
+            queue_path=queue_path,
+            output_dir=output_dir_abs,
+            slots=workers,
+            lease_seconds=lease_seconds,
+            poll_interval=poll_interval,
+            max_attempts=max_attempts,
+        )
+    counts = BatchWorkQueue(queue_path).counts()
+    typer.echo(
+        f"worker 结束: processed={processed} "
+        f"success={counts['success']} failed={counts['failed']} total={counts['total']}"
+    )
+
+
+@app.command("watch", help="监听目录，增量运行新增或修改的 PDF（常驻）")
+def watch_batch(
+    input_dir: Path = typer.Argument(
+        ...,
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        readable=True,
+        metavar="目录路径",
+    ),
+    output_dir: Path = typer.Option(
+        Path("results/batch"),
+        "--output-dir",
+        help="批量输出目录（默认: ./results/batch）",
+    ),
+    options: str | None = typer.Option(
+        None,
+        "--options",
+        help="Rob2RunOptions 的 JSON 字符串",
+    ),
+    options_file: Path | None = typer.Option(
+        None,
+        "--options-file",
+        help="包含 Rob2RunOptions 的 JSON/YAML 文件路径",
+    ),
+    set_values: list[str] | None = typer.Option(
+        None,
+        "--set",
+        help="使用 key=value 覆盖单个选项，可重复传入",
+    ),
+    batch_id: str | None = typer.Option(
+        None,
+        "--batch-id",
+        help="绑定已有批次 ID",
+    ),
+    table: bool = typer.Option(
+        True,
+        "--table/--no-table",
+        help="每文件输出 ROB2 Markdown 表格",
+    ),
+    html: bool = typer.Option(
+        True,
+        "--html/--no-html",
+        help="每文件生成交互式 HTML 报告（默认开启）",
+    ),
+    docx: bool = typer.Option(
+        True,
+        "--docx/--no-docx",
+        help="每文件生成 Word 报告（默认开启）",
+    ),
+    pdf: bool = typer.Option(
+        True,
+        "--pdf/--no-pdf",
+        help="每文件生成 PDF 报告（默认开启）",
+    ),
+    persist: bool = typer.Option(
+        True,
+        "--persist/--no-persist",
+        help="写入持久化运行记录与分析包",
+    ),
+    persist_dir: Path | None = typer.Option(
+        None,
+        "--persist-dir",
+        help="持久化根目录（默认使用配置项）",
+    ),
+    persist_scope: str | None = typer.Option(
+        None,
+        "--persist-scope",
+        help="持久化范围（analysis 等）",
+    ),
+    cache_dir: Path | None = typer.Option(
+        None,
+        "--cache-dir",
+        help="缓存根目录（默认使用配置项）",
+    ),
+    cache_scope: str | None = typer.Option(
+        None,
+        "--cache-scope",
+        help="缓存范围（deterministic|none）",
+    ),
+    workers: int | None = typer.Option(
+        None,
+        "--workers",
+        min=1,
+        help="并发 worker 数（默认使用配置或 CPU 自动值）",
+    ),
+    schedule: str | None = typer.Option(
+        None,
+        "--schedule",
+        help="每次轮询新到条目的调度策略（lpt|sjf|fifo，默认读取配置或 lpt）",
+    ),
+    poll_interval: float = typer.Option(
+        5.0,
+        "--poll-interval",
+        min=0.1,
+        help="目录轮询间隔（秒）；文件大小与修改时间连续两次一致才会入队",
+    ),
+    summary_interval: float = typer.Option(
+        60.0,
+        "--summary-interval",
+        min=0.0,
+        help="红绿灯图 / Excel 汇总的刷新间隔（秒，有新结果时刷新）",
+    ),
+    idle_exit: float = typer.Option(
+        0.0,
+        "--idle-exit",
+        min=0.0,
+        help="连续空闲多少秒后退出（0 表示常驻）",
+    ),
+    plot: bool = typer.Option(
+        True,
+        "--plot/--no-plot",
+        help="定期刷新红绿灯图（PNG）",
+    ),
+    excel: bool = typer.Option(
+        True,
+        "--excel/--no-excel",
+        help="定期刷新 Excel 汇总（XLSX）",
+    ),
+) -> None:
+    input_dir_abs = input_dir.resolve()
+    output_dir_abs = output_dir.resolve()
+    _ensure_output_dir_writable(output_dir_abs)
+
+    settings = get_settings()
+    resolved_persistence_dir = str(persist_dir) if persist_dir else settings.persistence_dir
+    persistence_store = (
+        SqliteStore(Path(resolved_persistence_dir) / "metadata.sqlite") if persist else None
+    )
+    payload = load_options_payload(options, options_file, set_values)
+    options_payload = build_options(payload).model_dump()
+    resolved_workers = _resolve_workers(workers, getattr(settings, "batch_workers", None))
+    resolved_schedule = _resolve_schedule(schedule, getattr(settings, "batch_schedule", None))
+    resolved_max_inflight_llm = _resolve_int_with_default(
+        None,
+        getattr(settings, "max_inflight_llm", None),
+        fallback=max(1, resolved_workers),
+    )
+    resolved_rate_limit_mode = _resolve_rate_limit_mode(
+        None, getattr(settings, "rate_limit_mode", None)
+    )
+    retry_429_max = _resolve_int_with_default(
+        None, getattr(settings, "retry_429_max", None), fallback=4
+    )
+    retry_429_backoff_ms = _resolve_int_with_default(
+        None,
+        getattr(settings, "retry_429_backoff_ms", None),
+        fallback=_DEFAULT_RETRY_BACKOFF_MS,
+    )
+
+    checkpoint_path = output_dir_abs / _CHECKPOINT_FILE
+    if checkpoint_path.exists():
+        checkpoint = _load_checkpoint(checkpoint_path)
+        if checkpoint.get("input_dir_abs") != str(input_dir_abs) or checkpoint.get(
+            "output_dir_abs"
+        ) != str(output_dir_abs):
+            raise typer.BadParameter(
+                "checkpoint 与当前输入/输出目录不一致，请更换 --output-dir。"
+            )
+    else:
+        checkpoint = _build_initial_checkpoint(
+            input_dir_abs=str(input_dir_abs),
+            output_dir_abs=str(output_dir_abs),
+            options_hash=hash_payload(options_payload),
+            file_list_hash=_build_file_list_hash([]),
+            batch_id=batch_id,
+            batch_name=None,
+            file_entries=[],
+        )
+    checkpoint["batch_id"] = _resolve_batch_id(
+        checkpoint=checkpoint,
+        explicit_batch_id=batch_id,
+        explicit_batch_name=None,
+        persist_enabled=persist,
+        persistence_dir=resolved_persistence_dir,
+    )
+    _ensure_runtime_meta(
+        checkpoint,
+        workers=resolved_workers,
+        max_inflight_llm=resolved_max_inflight_llm,
+        rate_limit_mode=resolved_rate_limit_mode,
+    )
+    checkpoint["runtime_meta"]["mode"] = "watch"
+    checkpoint["runtime_meta"]["schedule"] = resolved_schedule
+    _write_checkpoint(checkpoint_path, checkpoint)
+    _write_summary_files(checkpoint, output_dir_abs)
+
+    task_defaults = {
+        "batch_output_dir": str(output_dir_abs),
+        "options_payload": options_payload,
+        "include_table": table,
+        "html": html,
+        "docx": docx,
+        "pdf": pdf,
+        "persist_enabled": persist,
+        "persistence_dir": resolved_persistence_dir,
+        "persistence_scope": persist_scope or settings.persistence_scope,
+        "cache_dir": str(cache_dir) if cache_dir else settings.cache_dir,
+        "cache_scope": cache_scope or settings.cache_scope,
+        "batch_id": checkpoint["batch_id"],
+        "retry_429_max": retry_429_max,
+        "retry_429_backoff_ms": retry_429_backoff_ms,
+    }
+    render_workers = _resolve_int_with_default(
+        None,
+        getattr(settings, "batch_render_workers", None),
+        fallback=_DEFAULT_RENDER_WORKERS,
+    )
+    task_defaults["defer_reports"] = render_workers > 0 and (html or docx or pdf)
+    renderer = _ReportRenderQueue(render_workers) if task_defaults["defer_reports"] else None
+    _render_pending_reports(
+        workers=max(1, render_workers),
+        html=html,
+        docx=docx,
+        pdf=pdf,
+        checkpoint=checkpoint,
+        checkpoint_path=checkpoint_path,
+        output_dir=output_dir_abs,
+    )
+    watcher = _InputDirWatcher(input_dir_abs, checkpoint)
+    reusable_by_hash = _build_reusable_result_index(output_dir_abs)
+    pool = _ReusableProcessPool()
+    limiter = _AdaptiveConcurrencyController(
+        mode=resolved_rate_limit_mode,
+        current_limit=min(
+            resolved_workers,
+            _resolve_int_with_default(
+                None,
+                getattr(settings, "rate_limit_init", None),
+                fallback=min(resolved_workers, resolved_max_inflight_llm),
+            ),
+        ),
+        min_limit=1,
+        max_limit=min(
+            resolved_workers,
+            _resolve_int_with_default(
+                None,
+                getattr(settings, "rate_limit_max", None),
+                fallback=resolved_max_inflight_llm,
+            ),
+        ),
+    )
+    memory = _MemoryAdmissionController(
+        budget_mb=getattr(settings, "batch_memory_budget_mb", None),
+        mb_per_page=float(
+            getattr(settings, "batch_memory_mb_per_page", None) or _DEFAULT_MEMORY_MB_PER_PAGE
+        ),
+    )
+    recycler = _WorkerRecycler(
+        max_tasks=getattr(settings, "batch_worker_max_tasks", None),
+        max_rss_mb=getattr(settings, "batch_worker_max_rss_mb", None),
+    )
+
+    typer.echo(f"[watch] 监听: {input_dir_abs} -> {output_dir_abs}")
+    items = {str(item["relative_path"]): item for item in checkpoint["items"]}
+    last_activity = monotonic()
+    last_report = 0.0
+    reports_dirty = False
+
+    def refill(tasks: deque[_BatchTask], inflight: int) -> bool:
+        """Feed newly stable files into the running loop; False once idle long enough."""
+        nonlocal last_activity, last_report, reports_dirty
+        # A file edited while its previous version still runs is left unseen,
+        # so the next poll after that run finishes picks it up.
+        ready = [
+            path
+            for path in watcher.poll()
+            if items.get(path.relative_to(input_dir_abs).as_posix(), {}).get("status")
+            != "running"
+        ]
+        if ready:
+            entries = _build_file_entries(input_dir_abs, ready, store=persistence_store)
+            arrived = _enqueue_watch_entries(
+                entries,
+                checkpoint=checkpoint,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir_abs,
+                reusable_by_hash=reusable_by_hash,
+                task_defaults=task_defaults,
+                watcher=watcher,
+            )
+            watcher.mark_seen(ready)
+            items.update((str(item["relative_path"]), item) for item in checkpoint["items"])
+            _schedule_tasks(arrived, items=items, policy=resolved_schedule, store=persistence_store)
+            replaced = {task.relative_path for task in arrived}
+            queued = [task for task in tasks if task.relative_path not in replaced]
+            tasks.clear()
+            tasks.extend(queued)
+            tasks.extend(arrived)
+            _write_checkpoint(checkpoint_path, checkpoint)
+            _write_summary_files(checkpoint, output_dir_abs)
+        if renderer is not None:
+            _record_report_outcomes(
+                renderer.drain(block=False),
+                checkpoint=checkpoint,
+                items=items,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir_abs,
+            )
+        if ready or tasks or inflight:
+            reports_dirty = True
+            last_activity = monotonic()
+
+        if reports_dirty and monotonic() - last_report >= summary_interval:
+            _write_batch_reports(
+                _build_summary_payload(checkpoint),
+                output_dir_abs,
+                plot=plot,
+                plot_output=None,
+                excel=excel,
+                excel_output=None,
+            )
+            last_report = monotonic()
+            reports_dirty = False
+
+        if idle_exit and monotonic() - last_activity >= idle_exit:
+            typer.echo(f"[watch] 空闲 {idle_exit:g}s，退出")
+            return False
+        return True
+
+    try:
+        # One long-lived submission loop: new files join the running pool as
+        # slots free up instead of waiting for the previous poll's stragglers.
+        _execute_batch_tasks(
+            tasks=deque(),
+            checkpoint=checkpoint,
+            items=items,
+            checkpoint_path=checkpoint_path,
+            output_dir=output_dir_abs,
+            reusable_by_hash=reusable_by_hash,
+            workers=resolved_workers,
+            prefetch=resolved_workers * 2,
+            limiter_mode=resolved_rate_limit_mode,
+            limiter_init=limiter.current_limit,
+            limiter_max=limiter.max_limit,
+            memory=memory,
+            recycler=recycler,
+            limiter=limiter,
+            pool=pool,
+            renderer=renderer,
+            refill=refill,
+            refill_interval=poll_interval,
+        )
+    except KeyboardInterrupt:
+        typer.echo("[watch] 收到中断，退出")
+    finally:
+        pool.close()
+        outcomes = renderer.close() if renderer is not None else {}
+        if outcomes:
+            _record_report_outcomes(
+                outcomes,
+                checkpoint=checkpoint,
+                items=items,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir_abs,
+            )
+            reports_dirty = True
+        if reports_dirty:
+            _write_batch_reports(
+                _build_summary_payload(checkpoint),
+                output_dir_abs,
+                plot=plot,
+                plot_output=None,
+                excel=excel,
+                excel_output=None,
+            )
+
+
+class _InputDirWatcher:
+    """Poll an input directory for new or modified PDFs.
+
+    Files are compared by (size, mtime_ns); a change is reported once the
+    stat is unchanged across two polls, so files still being copied are not
+    picked up. Unchanged files are never re-hashed.
+    """
+
+    def __init__(self, input_dir: Path, checkpoint: dict[str, Any]) -> None:
+        self._input_dir = input_dir
+        self._seen: dict[str, tuple[int, int]] = {}
+        self._previous: dict[str, tuple[int, int]] = {}
+        # Items finished by an earlier run/watch keep their recorded stat.
+        for item in checkpoint.get("items") or []:
+            stat = item.get("file_stat")
+            if (
+                item.get("status") in {"success", "skipped"}
+                and isinstance(stat, list)
+                and len(stat) == 2
+            ):
+                self._seen[str(item["relative_path"])] = (int(stat[0]), int(stat[1]))
+
+    def poll(self) -> list[Path]:
+        current: dict[str, tuple[int, int]] = {}
+        for path in _discover_pdfs(self._input_dir):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            current[path.relative_to(self._input_dir).as_posix()] = (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+        ready = [
+            self._input_dir / rel_path
+            for rel_path, stat in current.items()
+            if self._seen.get(rel_path) != stat and self._previous.get(rel_path) == stat
+        ]
+        self._previous = current
+        return ready
+
+    def mark_seen(self, paths: list[Path]) -> None:
+        for path in paths:
+            rel_path = path.relative_to(self._input_dir).as_posix()
+            stat = self._previous.get(rel_path)
+            if stat is not None:
+                self._seen[rel_path] = stat
+
+    def stat_of(self, rel_path: str) -> tuple[int, int] | None:
+        return self._previous.get(rel_path)
+
+
+def _enqueue_watch_entries(
+    entries: list[dict[str, Any]],
+    *,
+    checkpoint: dict[str, Any],
+    checkpoint_path: Path,
+    output_dir: Path,
+    reusable_by_hash: dict[str, Path],
+    task_defaults: dict[str, Any],
+    watcher: _InputDirWatcher,
+) -> deque[_BatchTask]:
+    """Add new/changed files to the checkpoint and return the tasks to run."""
+    items = {str(item["relative_path"]): item for item in checkpoint["items"]}
+    tasks: deque[_BatchTask] = deque()
+    for entry in entries:
+        rel_path = str(entry["relative_path"])
+        pdf_sha256 = str(entry["pdf_sha256"])
+        item = items.get(rel_path)
+        if item is None:
+            item = _new_checkpoint_item(rel_path, pdf_sha256)
+            checkpoint["items"].append(item)
+            items[rel_path] = item
+        elif item.get("pdf_sha256") != pdf_sha256:
+            item.update(_new_checkpoint_item(rel_path, pdf_sha256))
+        stat = watcher.stat_of(rel_path)
+        item["file_stat"] = list(stat) if stat is not None else None
+
+        subdir = output_dir / str(item["output_subdir"])
+        if item.get("status") in {"success", "skipped"} and (subdir / "result.json").exists():
+            continue
+        if _reuse_output_by_hash(
+            pdf_sha256=pdf_sha256,
+            relative_path=rel_path,
+            subdir=subdir,
+            item=item,
+            checkpoint=checkpoint,
+            checkpoint_path=checkpoint_path,
+            output_dir=output_dir,
+            reusable_by_hash=reusable_by_hash,
+        ):
+            typer.echo(f"[watch] skip {rel_path} (hash)")
+            continue
+        tasks.append(
+            _BatchTask(
+                index=checkpoint["items"].index(item) + 1,
+                total=len(checkpoint["items"]),
+                relative_path=rel_path,
+                pdf_path=str(entry["pdf_path"]),
+                pdf_sha256=pdf_sha256,
+                output_subdir=str(item["output_subdir"]),
+                pdf_name=Path(str(entry["pdf_path"])).name,
+                **task_defaults,
+            )
+        )
+
+    checkpoint["file_list_hash"] = _build_file_list_hash(checkpoint["items"])
+    return tasks
+
+
+def _execute_batch_tasks(
+    *,
+    tasks: deque[_BatchTask],
+    checkpoint: dict[str, Any],
+    items: dict[str, dict[str, Any]],
+    checkpoint_path: Path,
+    output_dir: Path,
+    reusable_by_hash: dict[str, Path],
+    workers: int,
+    prefetch: int,
+    limiter_mode: Literal["adaptive", "fixed"],
+    limiter_init: int,
+    limiter_max: int,
+    memory: _MemoryAdmissionController | None = None,
+    recycler: _WorkerRecycler | None = None,
+    limiter: _AdaptiveConcurrencyController | None = None,
+    pool: _ReusableProcessPool | None = None,
+    renderer: _ReportRenderQueue | None = None,
+    staged: dict[str, list[dict[str, Any]]] | None = None,
+    refill: Callable[[deque[_BatchTask], int], bool] | None = None,
+    refill_interval: float = 0.0,
+) -> None:
+    """Run ``tasks`` to completion on ``workers`` processes.
+
+    Tasks stopped for a provider batch (status ``llm_pending``) put their
+    staged LLM requests into ``staged`` by relative path.
+
+    With ``refill`` the loop outlives ``tasks`` (``batch watch``): every
+    ``refill_interval`` seconds ``refill(tasks, inflight)`` may append newly
+    arrived tasks, which start as soon as a slot frees up. The loop returns
+    once ``refill`` reports False and nothing is queued or in flight.
+    """
+    memory = memory or _MemoryAdmissionController(budget_mb=None)
+    recycler = recycler or _WorkerRecycler()
+    limiter = limiter or _AdaptiveConcurrencyController(
+        mode=limiter_mode,
+        current_limit=max(1, limiter_init),
+        min_limit=1,
+        max_limit=max(1, limiter_max),
+        success_window=_ADAPTIVE_SUCCESS_WINDOW,
+    )
+    pool_factory = pool if pool is not None else _PROCESS_POOL_EXECUTOR
+    followers = _split_duplicate_tasks(tasks)
+    accepting = refill is not None
+    next_refill = 0.0
+
+    def poll_refill(running: Iterable[str], inflight: int) -> None:
+        nonlocal accepting, next_refill
+        if refill is None or not accepting or monotonic() < next_refill:
+            return
+        accepting = refill(tasks, inflight)
+        _split_duplicate_tasks(tasks, running=running, followers=followers)
+        next_refill = monotonic() + refill_interval
+
+    if workers <= 1:
+        while True:
+            poll_refill((), 0)
+            if not tasks:
+                if not accepting:
+                    break
+                sleep(max(0.0, next_refill - monotonic()))
+                continue
+            task = tasks.popleft()
+            _mark_task_running(
+                task=task,
+                items=items,
+                checkpoint=checkpoint,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir,
+            )
+            typer.echo(f"[{task.index}/{task.total}] run {task.relative_path}")
+            task_result = _run_batch_item_task(task)
+            _collect_staged_requests(staged, task_result)
+            _apply_task_result(
+                task_result=task_result,
+                checkpoint=checkpoint,
+                items=items,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir,
+                reusable_by_hash=reusable_by_hash,
+            )
+            if renderer is not None and task_result.get("status") == "success":
+                renderer.submit_task(task)
+            _resolve_duplicate_followers(
+                leader=task,
+                task_result=task_result,
+                followers=followers,
+                tasks=tasks,
+                checkpoint=checkpoint,
+                items=items,
+                checkpoint_path=checkpoint_path,
+                output_dir=output_dir,
+                reusable_by_hash=reusable_by_hash,
+                renderer=renderer,
+            )
+            limiter.observe(
+                success=task_result.get("status") != "failed",
+                had_retryable_error=bool(task_result.get("had_retryable_error")),
+            )
+        return
+
+    inflight_cap = max(1, prefetch)
+    futures: dict[Future[dict[str, Any]], _BatchTask] = {}
+    while tasks or accepting:
+        # One pool generation; a recycle drains it and starts fresh processes.
+        with pool_factory(max_workers=workers, **recycler.pool_kwargs()) as executor:
+            while True:
+                poll_refill((task.pdf_sha256 for task in futures.values()), len(futures))
+                if not (tasks or futures or accepting):
+                    break
+                if recycler.due and not futures:
+                    break
+                allowed = max(1, min(limiter.current_limit, inflight_cap))
+                while tasks and len(futures) < allowed and not recycler.due:
+                    task = tasks[0]
+                    reserve_mb = memory.estimate_mb(items[task.relative_path])
+                    if not memory.admits(reserve_mb):
+                        break
+                    tasks.popleft()
+                    memory.reserve(task.relative_path, reserve_mb)
+                    _mark_task_running(
+                        task=task,
+                        items=items,
+                        checkpoint=checkpoint,
+                        checkpoint_path=checkpoint_path,
+                        output_dir=output_dir,
+                    )
+                    typer.echo(f"[{task.index}/{task.total}] run {task.relative_path}")
+                    future = executor.submit(_run_batch_item_task, task)
+                    futures[future] = task
+
+                if not futures:
+                    if not tasks:
+                        # Idle watcher: nothing to run until the next refill.
+                        sleep(max(0.0, next_refill - monotonic()))
+                    continue
+
+                done, _ = wait(
+                    set(futures),
+                    timeout=max(0.0, next_refill - monotonic()) if accepting else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    task = futures.pop(future)
+                    try:
+                        task_result = future.result()
+                    except Exception as exc:  # pragma: no cover - defensive
+                        task_result = _task_failure_payload(task, exc)
+
+                    memory.release(task.relative_path)
+                    memory.observe(task_result)
+                    recycler.observe(task_result)
+                    _collect_staged_requests(staged, task_result)
+                    _apply_task_result(
+                        task_result=task_result,
+                        checkpoint=checkpoint,
+                        items=items,
+                        checkpoint_path=checkpoint_path,
+                        output_dir=output_dir,
+                        reusable_by_hash=reusable_by_hash,
+                    )
+                    if renderer is not None and task_result.get("status") == "success":
+                        renderer.submit_task(task)
+                    _resolve_duplicate_followers(
+                        leader=task,
+                        task_result=task_result,
+                        followers=followers,
+                        tasks=tasks,
+                        checkpoint=checkpoint,
+                        items=items,
+                        checkpoint_path=checkpoint_path,
+                        output_dir=output_dir,
+                        reusable_by_hash=reusable_by_hash,
+                        renderer=renderer,
+                    )
+
+                    before = limiter.current_limit
+                    limiter.observe(
+                        success=task_result.get("status") != "failed",
+                        had_retryable_error=bool(task_result.get("had_retryable_error")),
+                    )
+                    after = limiter.current_limit
+                    if after != before:
+                        typer.echo(f"[rate-limit] 并发额度调整: {before} -> {after}")
+
+        if recycler.due:
+            typer.echo(f"[memory] 回收 worker 进程: {recycler.reason}")
+            _increment_runtime_meta(checkpoint, worker_recycles=1)
+            _write_checkpoint(checkpoint_path, checkpoint)
+            recycler.reset()
+            memory.forget_workers()
+            if pool is not None:
+                pool.close()
+
+
+def _execute_provider_batch_rounds(
+    *,
+    tasks: deque[_BatchTask],
+    checkpoint: dict[str, Any],
+    items: dict[str, dict[str, Any]],
+    checkpoint_path: Path,
+    output_dir: Path,
+    cassette_dir: Path,
+    submitter: LLMBatchSubmitter,
+    max_rounds: int,
+    execute: Callable[..., None],
+) -> None:
+    """Run ``tasks`` in rounds, answering staged LLM requests via provider batches.
+
+    Each round runs every unfinished document in cassette collect mode. A run
+    stops at the first graph step with unanswered LLM requests. The requests
+    staged by all documents are then submitted together, and the answers are
+    written into the documents' cassettes before the next round.
+    """
+    resumed = submitter.resume()
+    if resumed is not None:
+        _increment_runtime_meta(checkpoint, llm_batch_requests=resumed["submitted"])
+
+    remaining = list(tasks)
+    for round_index in range(1, max_rounds + 1):
+        for task in remaining:
+            items[task.relative_path]["status"] = "llm_pending"
+        staged: dict[str, list[dict[str, Any]]] = {}
+        execute(tasks=deque(remaining), staged=staged)
+        remaining = [
+            task for task in remaining if items[task.relative_path]["status"] == "llm_pending"
+        ]
+        if not remaining:
+            return
+
+        requests = [
+            (cassette_path(cassette_dir, task.pdf_sha256), staged[task.relative_path])
+            for task in remaining
+            if task.relative_path in staged
+        ]
+        request_count = sum(len(batch) for _, batch in requests)
+        typer.echo(
+            f"[llm-batch] 第 {round_index} 轮：{len(requests)} 个文件共 {request_count} "
+            "个 LLM 请求提交到批处理接口"
+        )
+        stats = submitter.submit_and_wait(requests)
+        typer.echo(
+            f"[llm-batch] 第 {round_index} 轮完成：answered={stats['answered']} "
+            f"errors={stats['errors']} retry={stats['retry']}"
+        )
+        _increment_runtime_meta(
+            checkpoint, llm_batch_rounds=1, llm_batch_requests=stats["submitted"]
+        )
+        _write_checkpoint(checkpoint_path, checkpoint)
+
+    for task in remaining:
+        _apply_task_result(
+            task_result={
+                "index": task.index,
+                "total": task.total,
+                "relative_path": task.relative_path,
+                "status": "failed",
+                "error": f"LLM requests still unanswered after {max_rounds} provider batch rounds",
+            },
+            checkpoint=checkpoint,
+            items=items,
+            checkpoint_path=checkpoint_path,
+            output_dir=output_dir,
+            reusable_by_hash={},
+        )
+
+
+def _collect_staged_requests(
+    staged: dict[str, list[dict[str, Any]]] | None, task_result: dict[str, Any]
+) -> None:
+    if staged is not None and task_result.get("status") == "llm_pending":
+        staged[str(task_result["relative_path"])] = list(task_result.get("llm_requests") or [])
+
+
+@contextmanager
+def _inference_server_scope(*, enabled: bool, max_wait_ms: int) -> Iterator[bool]:
+    """Host SPLADE/cross-encoder models in one shared process for pool workers.
+
+    The server address is exported through environment variables before the
+    process pool starts, so workers pick it up via ``get_splade_encoder`` /
+    ``get_cross_encoder_reranker``. Startup failures fall back to in-process models;
+    a server that dies later is respawned, and workers that cannot reach it fall
+    back on their own.
+    """
+    if not enabled:
+        yield False
+        return
+    try:
+        handle = start_inference_server(max_wait_ms=max_wait_ms)
+    except Exception as exc:
+        typer.echo(f"Warning: 推理服务启动失败，回退到进程内模型: {exc}")
+        yield False
+        return
+
+    exported = handle.environ()
+    previous = {key: os.environ.get(key) for key in exported}
+    os.environ.update(exported)
+    typer.echo(f"[inference-server] 已启动: {handle.address}")
+    handle.supervise(on_event=lambda message: typer.echo(f"[inference-server] {message}"))
+    try:
+        yield True
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        handle.stop()
+
+
+def _run_queue_workers(
+    *,
+    queue_path: Path,
+    output_dir: Path,
+    slots: int,
+    lease_seconds: float,
+    poll_interval: float,
+    max_attempts: int,
+) -> int:
+    """Drain the shared queue with ``slots`` worker loops; returns items processed."""
+    kwargs = {
+        "queue_path": str(queue_path),
+        "output_dir": str(output_dir),
+        "lease_seconds": lease_seconds,
+        "poll_interval": poll_interval,
+        "max_attempts": max_attempts,
+    }
+    if slots <= 1:
+        return _queue_worker_loop(**kwargs)
+    with _PROCESS_POOL_EXECUTOR(max_workers=slots) as executor:
+        futures = [executor.submit(_queue_worker_loop, **kwargs) for _ in range(slots)]
+        return sum(future.result() for future in futures)
+
+
+def _queue_worker_loop(
+    *,
+    queue_path: str,
+    output_dir: str,
+    lease_seconds: float,
+    poll_interval: float,
+    max_attempts: int,
+) -> int:
+    """Claim, run and record queue items until nothing is pending or leased."""
+    queue = BatchWorkQueue(queue_path)
+    output_dir_abs = Path(output_dir)
+    checkpoint_path = output_dir_abs / _CHECKPOINT_FILE
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+    processed = 0
+    last_summary = monotonic()
+    while True:
+        claimed = queue.claim(owner, lease_seconds=lease_seconds, max_attempts=max_attempts)
+        if claimed is None:
+            if queue.is_drained():
+                break
+            # Other workers hold the remaining leases; wait in case one expires.
+            sleep(poll_interval)
+            continue
+
+        task = _BatchTask(**claimed.payload)
+        typer.echo(f"[{task.index}/{task.total}] run {task.relative_path} ({owner})")
+        with _lease_heartbeat(queue, owner, claimed.item_key, lease_seconds=lease_seconds):
+            task_result = _reuse_queue_result_by_hash(queue, task)
+            if task_result is None:
+                task_result = _run_batch_item_task(task)
+
+        status = "failed" if task_result.get("status") == "failed" else "success"
+        if not queue.complete(owner, claimed.item_key, status=status, result=task_result):
+            typer.echo(
+                f"[{task.index}/{task.total}] lease lost {task.relative_path}; result discarded"
+            )
+            continue
+        processed += 1
+        if status == "success":
+            typer.echo(f"[{task.index}/{task.total}] done {task.relative_path}")
+        else:
+            typer.echo(
+                f"[{task.index}/{task.total}] failed {task.relative_path}: {task_result.get('error')}"
+            )
+        write_summaries = monotonic() - last_summary >= _QUEUE_SUMMARY_INTERVAL_S
+        _record_queue_completion(
+            queue,
+            checkpoint_path,
+            output_dir_abs,
+            item_key=claimed.item_key,
+            write_summaries=write_summaries,
+        )
+        if write_summaries:
+            last_summary = monotonic()
+
+    _sync_checkpoint_from_queue(queue, checkpoint_path, output_dir_abs)
+    return processed
+
+
+@contextmanager
+def _lease_heartbeat(
+    queue: BatchWorkQueue,
+    owner: str,
+    item_key: str,
+    *,
+    lease_seconds: float,
+) -> Iterator[None]:
+    """Renew the lease in the background while the item runs."""
+    stop = threading.Event()
+    interval = max(1.0, lease_seconds / 3.0)
+
+    def beat() -> None:
+        while not stop.wait(interval):
+            try:
+                if not queue.heartbeat(owner, item_key, lease_seconds=lease_seconds):
+                    typer.echo(f"Warning: 租约已被回收: {item_key}")
+                    return
+            except Exception as exc:  # pragma: no cover - shared volume hiccups
+                typer.echo(f"Warning: 租约续期失败: {item_key} ({exc})")
+
+    thread = threading.Thread(target=beat, name=f"lease-{item_key}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _reuse_queue_result_by_hash(
+    queue: BatchWorkQueue,
+    task: _BatchTask,
+) -> dict[str, Any] | None:
+    """Reuse another queue item's finished output for the same PDF hash."""
+    subdir = Path(task.batch_output_dir) / task.output_subdir
+    for queued in queue.find_success_by_sha256(task.pdf_sha256, exclude_key=task.relative_path):
+        result_dir = (queued.result or {}).get("result_dir")
+        if not isinstance(result_dir, str) or not (Path(result_dir) / "result.json").exists():
+            continue
+        _materialize_reused_output(source_dir=Path(result_dir), target_dir=subdir)
+        reused_summary = _read_result_summary(subdir / "result.json")
+        if reused_summary is None:
+            continue
+        _write_batch_item_meta(
+            output_dir=subdir,
+            pdf_sha256=task.pdf_sha256,
+            relative_path=task.relative_path,
+        )
+        return {
+            "index": task.index,
+            "total": task.total,
+            "relative_path": task.relative_path,
+            "status": "skipped",
+            **reused_summary,
+            "error": None,
+            "pdf_sha256": task.pdf_sha256,
+            "result_dir": str(subdir),
+            "retry_count": 0,
+            "retryable_errors": 0,
+            "had_retryable_error": False,
+        }
+    return None
+
+
+def _record_queue_completion(
+    queue: BatchWorkQueue,
+    checkpoint_path: Path,
+    output_dir: Path,
+    *,
+    item_key: str,
+    write_summaries: bool,
+) -> None:
+    """Fold one finished queue item into the shared checkpoint.
+
+    Only that item's row is read back from the queue; the batch-wide summary
+    files are rewritten only when ``write_summaries`` is set.
+    """
+    with queue.exclusive():
+        queued = queue.get(item_key)
+        if queued is None:
+            return
+        checkpoint = _load_checkpoint(checkpoint_path)
+        item = next(
+            (entry for entry in checkpoint["items"] if entry.get("relative_path") == item_key),
+            None,
+        )
+        if item is None:
+            return
+        _apply_queue_item(item, queued)
+        _record_peak_rss(checkpoint, item, queued.result or {})
+        _refresh_completed_items(checkpoint)
+        _write_checkpoint(checkpoint_path, checkpoint)
+        if write_summaries:
+            _write_summary_files(checkpoint, output_dir)
+
+
+def _sync_checkpoint_from_queue(
+    queue: BatchWorkQueue,
+    checkpoint_path: Path,
+    output_dir: Path,
+) -> dict[str, Any]:
+    """Fold queue state into the shared checkpoint and rewrite the summary files.
+
+    Runs under the queue write lock so concurrent workers never interleave
+    checkpoint or summary writes.
+    """
+    with queue.exclusive():
+        checkpoint = _load_checkpoint(checkpoint_path)
+        items = {str(item["relative_path"]): item for item in checkpoint["items"]}
+        for queued in queue.items():
+            item = items.get(queued.item_key)
+            if item is not None:
+                _apply_queue_item(item, queued)
+                _record_peak_rss(checkpoint, item, queued.result or {})
+        _refresh_completed_items(checkpoint)
+        _write_checkpoint(checkpoint_path, checkpoint)
+        _write_summary_files(checkpoint, output_dir)
+    return checkpoint
+
+
+def _refresh_completed_items(checkpoint: dict[str, Any]) -> None:
+    meta = checkpoint.get("runtime_meta")
+    if isinstance(meta, dict):
+        meta["completed_items"] = sum(
+            1
+            for item in checkpoint["items"]
+            if item.get("status") in {"success", "failed", "skipped"}
+        )
+
+
+def _apply_queue_item(item: dict[str, Any], queued: QueueItem) -> None:
+    result = queued.result or {}
+    item["status"] = str(result.get("status") or queued.status)
+    if queued.status in {"pending", "running"}:
+        item["error"] = None
+    elif item["status"] == "failed":
+        item["run_id"] = None
+        item["runtime_ms"] = None
+        _record_node_timings(item, {})
+        item["overall_risk"] = None
+        item["domain_risks"] = {}
+        item["error"] = str(result.get("error") or "unknown error")
+    else:
+        item["run_id"] = result.get("run_id")
+        item["runtime_ms"] = result.get("runtime_ms")
+        _record_node_timings(item, result)
+        item["overall_risk"] = result.get("overall_risk")
+        item["domain_risks"] = result.get("domain_risks") or {}
+        item["error"] = None
+    item["updated_at"] = datetime.fromtimestamp(queued.updated_at, timezone.utc).isoformat()
+
+
+def _schedule_tasks(
+    tasks: deque[_BatchTask],
+    *,
+    items: dict[str, dict[str, Any]],
+    policy: str,
+    store: SqliteStore | None,
+) -> None:
+    """Record per-item cost estimates and reorder ``tasks`` by ``policy``.
+
+    Past runtimes come from earlier attempts in this checkpoint and, when
+    persistence is enabled, from completed runs of the same PDF hash.
+    """
+    if not tasks:
+        return
+    history: dict[str, int] = {}
+    if store is not None:
+        history.update(store.get_runtime_ms_by_sha256(sorted({t.pdf_sha256 for t in tasks})))
+    for item in items.values():
+        runtime_ms = item.get("runtime_ms")
+        if isinstance(runtime_ms, int) and runtime_ms > 0:
+            history[str(item.get("pdf_sha256"))] = runtime_ms
+
+    paths = [Path(task.pdf_path) for task in tasks]
+    estimates = estimate_pdf_costs(
+        paths,
+        past_runtime_ms={
+            Path(task.pdf_path): history[task.pdf_sha256]
+            for task in tasks
+            if task.pdf_sha256 in history
+        },
     )
-    typer.echo(f"已写入: {output_path} (rows={plotted})")
+    for task in tasks:
+        estimate = estimates[Path(task.pdf_path)]
+        item = items[task.relative_path]
+        item["pages"] = estimate.pages
+        item["estimated_cost_ms"] = estimate.estimated_ms
+        item["estimated_cost_source"] = estimate.source
+
+    by_path = {task.relative_path: task for task in tasks}
+    ordered = order_by_policy(
+        list(by_path),
+        {
+            rel_path: float(items[rel_path]["estimated_cost_ms"])
+            for rel_path in by_path
+        },
+        policy,
+    )
+    tasks.clear()
+    tasks.extend(by_path[rel_path] for rel_path in ordered)
 
 
-@app.command("excel", help="根据批量 summary 生成 Excel 汇总（XLSX）")
-def excel_batch(
-    source: Path = typer.Argument(
-        ...,
-        exists=True,
-        file_okay=True,
-        dir_okay=True,
-        readable=True,
-        metavar="目录或summary路径",
-    ),
-    output: Path | None = typer.Option(
-        None,
-        "--output",
-        help="输出 Excel 路径（默认: <batch-output-dir>/batch_summary.xlsx）",
-    ),
-) -> None:
-    summary_path, _ = _resolve_summary_input(source.resolve())
-    summary = _load_summary_or_raise(summary_path)
-    default_output = _default_excel_output(summary_path)
-    output_path = output.resolve() if output is not None else default_output
-    exported = _generate_batch_excel(summary, summary_path, output_path)
-    typer.echo(f"已写入: {output_path} (rows={exported})")
+def _split_duplicate_tasks(
+    tasks: deque[_BatchTask],
+    *,
+    running: Iterable[str] = (),
+    followers: dict[str, deque[_BatchTask]] | None = None,
+) -> dict[str, deque[_BatchTask]]:
+    """Keep the first task per PDF hash queued; return the rest as followers.
+
+    Hashes in ``running`` already have a leader in flight, so their tasks
+    become followers too; ``followers`` is extended in place when given.
+    """
+    leaders: deque[_BatchTask] = deque()
+    followers = {} if followers is None else followers
+    seen: set[str] = set(running) | set(followers)
+    for task in tasks:
+        if task.pdf_sha256 in seen:
+            followers.setdefault(task.pdf_sha256, deque()).append(task)
+            continue
+        seen.add(task.pdf_sha256)
+        leaders.append(task)
+    tasks.clear()
+    tasks.extend(leaders)
+    return followers
 
 
-def _execute_batch_tasks(
+def _resolve_duplicate_followers(
     *,
+    leader: _BatchTask,
+    task_result: dict[str, Any],
+    followers: dict[str, deque[_BatchTask]],
     tasks: deque[_BatchTask],
     checkpoint: dict[str, Any],
     items: dict[str, dict[str, Any]],
     checkpoint_path: Path,
     output_dir: Path,
     reusable_by_hash: dict[str, Path],
-    workers: int,
-    prefetch: int,
-    limiter_mode: Literal["adaptive", "fixed"],
-    limiter_init: int,
-    limiter_max: int,
+    renderer: _ReportRenderQueue | None = None,
 ) -> None:
-    limiter = _AdaptiveConcurrencyController(
-        mode=limiter_mode,
-        current_limit=max(1, limiter_init),
-        min_limit=1,
-        max_limit=max(1, limiter_max),
-        success_window=_ADAPTIVE_SUCCESS_WINDOW,
-    )
-
-    if workers <= 1:
-        while tasks:
-            task = tasks.popleft()
-            _mark_task_running(
-                task=task,
-                items=items,
-                checkpoint=checkpoint,
-                checkpoint_path=checkpoint_path,
-                output_dir=output_dir,
-            )
-            typer.echo(f"[{task.index}/{task.total}] run {task.relative_path}")
-            task_result = _run_batch_item_task(task)
-            _apply_task_result(
-                task_result=task_result,
-                checkpoint=checkpoint,
-                items=items,
-                checkpoint_path=checkpoint_path,
-                output_dir=output_dir,
-                reusable_by_hash=reusable_by_hash,
-            )
-            limiter.observe(
-                success=task_result.get("status") == "success",
-                had_retryable_error=bool(task_result.get("had_retryable_error")),
-            )
+    """Reuse a finished leader's output for identical PDFs, or promote a follower."""
+    waiting = followers.pop(leader.pdf_sha256, None)
+    if not waiting:
         return
+    if task_result.get("status") == "llm_pending":
+        # Provider batch mode: the duplicates wait for the leader's next round.
+        return
+    if task_result.get("status") != "success":
+        # The leader failed: the next duplicate runs next, the rest keep waiting.
+        promoted = waiting.popleft()
+        tasks.appendleft(promoted)
+        if waiting:
+            followers[leader.pdf_sha256] = waiting
+        return
+    for follower in waiting:
+        if _reuse_output_by_hash(
+            pdf_sha256=follower.pdf_sha256,
+            relative_path=follower.relative_path,
+            subdir=output_dir / follower.output_subdir,
+            item=items[follower.relative_path],
+            checkpoint=checkpoint,
+            checkpoint_path=checkpoint_path,
+            output_dir=output_dir,
+            reusable_by_hash=reusable_by_hash,
+        ):
+            typer.echo(
+                f"[{follower.index}/{follower.total}] skip {follower.relative_path} (hash)"
+            )
+            if renderer is not None and follower.defer_reports:
+                # The leader's reports may still be rendering; render the copy too.
+                items[follower.relative_path]["report_pending"] = True
+                _write_checkpoint(checkpoint_path, checkpoint)
+                renderer.submit_task(follower)
+        else:
+            tasks.appendleft(follower)
 
-    inflight_cap = max(1, prefetch)
-    futures: dict[Future[dict[str, Any]], _BatchTask] = {}
-    with _PROCESS_POOL_EXECUTOR(max_workers=workers) as executor:
-        while tasks or futures:
-            allowed = max(1, min(limiter.current_limit, inflight_cap))
-            while tasks and len(futures) < allowed:
-                task = tasks.popleft()
-                _mark_task_running(
-                    task=task,
-                    items=items,
-                    checkpoint=checkpoint,
-                    checkpoint_path=checkpoint_path,
-                    output_dir=output_dir,
-                )
-                typer.echo(f"[{task.index}/{task.total}] run {task.relative_path}")
-                future = executor.submit(_run_batch_item_task, task)
-                futures[future] = task
-
-            if not futures:
-                continue
-
-            done, _ = wait(set(futures), return_when=FIRST_COMPLETED)
-            for future in done:
-                task = futures.pop(future)
-                try:
-                    task_result = future.result()
-                except Exception as exc:  # pragma: no cover - defensive
-                    task_result = _task_failure_payload(task, exc)
-
-                _apply_task_result(
-                    task_result=task_result,
-                    checkpoint=checkpoint,
-                    items=items,
-                    checkpoint_path=checkpoint_path,
-                    output_dir=output_dir,
-                    reusable_by_hash=reusable_by_hash,
-                )
 
-                before = limiter.current_limit
-                limiter.observe(
-                    success=task_result.get("status") == "success",
-                    had_retryable_error=bool(task_result.get("had_retryable_error")),
-                )
-                after = limiter.current_limit
-                if after != before:
-                    typer.echo(f"[rate-limit] 并发额度调整: {before} -> {after}")
+def _reuse_output_by_hash(
+    *,
+    pdf_sha256: str,
+    relative_path: str,
+    subdir: Path,
+    item: dict[str, Any],
+    checkpoint: dict[str, Any],
+    checkpoint_path: Path,
+    output_dir: Path,
+    reusable_by_hash: dict[str, Path],
+) -> bool:
+    """Copy a finished result for the same PDF hash into ``subdir``; False if unavailable."""
+    reusable_dir = reusable_by_hash.get(pdf_sha256)
+    if reusable_dir is None:
+        return False
+    _materialize_reused_output(source_dir=reusable_dir, target_dir=subdir)
+    reused_summary = _read_result_summary(subdir / "result.json")
+    if reused_summary is None:
+        return False
+    _write_batch_item_meta(
+        output_dir=subdir,
+        pdf_sha256=pdf_sha256,
+        relative_path=relative_path,
+    )
+    item["status"] = "skipped"
+    item["run_id"] = reused_summary["run_id"]
+    item["runtime_ms"] = reused_summary["runtime_ms"]
+    _record_node_timings(item, reused_summary)
+    item["overall_risk"] = reused_summary["overall_risk"]
+    item["domain_risks"] = reused_summary["domain_risks"]
+    item["error"] = None
+    item["updated_at"] = _now_iso()
+    reusable_by_hash[pdf_sha256] = subdir.resolve()
+    _increment_runtime_meta(checkpoint, completed=1)
+    _write_checkpoint(checkpoint_path, checkpoint)
+    _write_summary_files(checkpoint, output_dir)
+    return True
 
 
 def _mark_task_running(
@@ -749,12 +2341,22 @@ def _mark_task_running(
 
 
 def _run_batch_item_task(task: _BatchTask) -> dict[str, Any]:
+    with RssWindow() as rss:
+        task_result = _run_batch_item_attempts(task)
+    task_result["worker_pid"] = os.getpid()
+    task_result["rss_mb"] = current_rss_mb()
+    task_result["peak_rss_mb"] = rss.peak_mb
+    return task_result
+
+
+def _run_batch_item_attempts(task: _BatchTask) -> dict[str, Any]:
     subdir = Path(task.batch_output_dir) / task.output_subdir
     retry_count = 0
     retryable_errors = 0
     had_retryable_error = False
 
     for attempt in range(task.retry_429_max + 1):
+        profiler = RunProfiler(interval_ms=task.profile_interval_ms) if task.profile else None
         try:
             result = run_rob2(
                 Rob2Input(pdf_path=task.pdf_path),
@@ -765,16 +2367,22 @@ def _run_batch_item_task(task: _BatchTask) -> dict[str, Any]:
                 cache_dir=task.cache_dir,
                 cache_scope=task.cache_scope,
                 batch_id=task.batch_id,
+                doc_hash=task.pdf_sha256,
+                profiler=profiler,
             )
             write_run_output_dir(
                 result,
                 subdir,
                 include_table=task.include_table,
-                html=task.html,
-                docx=task.docx,
-                pdf=task.pdf,
+                html=task.html and not task.defer_reports,
+                docx=task.docx and not task.defer_reports,
+                pdf=task.pdf and not task.defer_reports,
                 pdf_name=task.pdf_name,
             )
+            # Results from older runners (and test doubles) may lack timings.
+            timings = getattr(result, "timings", None)
+            if profiler is not None:
+                profiler.write(subdir, timings=timings)
             _write_batch_item_meta(
                 output_dir=subdir,
                 pdf_sha256=task.pdf_sha256,
@@ -790,11 +2398,27 @@ def _run_batch_item_task(task: _BatchTask) -> dict[str, Any]:
                 "status": "success",
                 "run_id": result.run_id,
                 "runtime_ms": result.runtime_ms,
+                **_timing_fields(timings),
                 "overall_risk": result.result.overall.risk,
                 "domain_risks": domain_risks,
                 "error": None,
                 "pdf_sha256": task.pdf_sha256,
                 "result_dir": str(subdir),
+                "reports_deferred": task.defer_reports,
+                "retry_count": retry_count,
+                "retryable_errors": retryable_errors,
+                "had_retryable_error": had_retryable_error,
+            }
+        except LLMBatchPending as exc:
+            return {
+                "index": task.index,
+                "total": task.total,
+                "relative_path": task.relative_path,
+                "status": "llm_pending",
+                "llm_requests": exc.requests,
+                "error": None,
+                "pdf_sha256": task.pdf_sha256,
+                "result_dir": str(subdir),
                 "retry_count": retry_count,
                 "retryable_errors": retryable_errors,
                 "had_retryable_error": had_retryable_error,
@@ -865,13 +2489,31 @@ def _apply_task_result(
     item = items[rel_path]
     status = str(task_result.get("status") or "failed")
 
+    if status == "llm_pending":
+        item["status"] = "llm_pending"
+        item["error"] = None
+        item["updated_at"] = _now_iso()
+        typer.echo(
+            f"[{task_result['index']}/{task_result['total']}] wait {rel_path}: "
+            f"{len(task_result.get('llm_requests') or [])} LLM request(s) staged"
+        )
+        _write_checkpoint(checkpoint_path, checkpoint)
+        _write_summary_files(checkpoint, output_dir)
+        return
+
     if status == "success":
         item["status"] = "success"
         item["run_id"] = task_result.get("run_id")
         item["runtime_ms"] = task_result.get("runtime_ms")
+        _record_node_timings(item, task_result)
         item["overall_risk"] = task_result.get("overall_risk")
         item["domain_risks"] = task_result.get("domain_risks") or {}
         item["error"] = None
+        if task_result.get("reports_deferred"):
+            # Cleared once the render queue has drained this item's reports.
+            item["report_pending"] = True
+        else:
+            item.pop("report_pending", None)
         pdf_sha256 = task_result.get("pdf_sha256")
         result_dir = task_result.get("result_dir")
         if isinstance(pdf_sha256, str) and isinstance(result_dir, str):
@@ -883,6 +2525,8 @@ def _apply_task_result(
         item["status"] = "failed"
         item["run_id"] = None
         item["runtime_ms"] = None
+        _record_node_timings(item, {})
+        item.pop("report_pending", None)
         item["overall_risk"] = None
         item["domain_risks"] = {}
         item["error"] = str(task_result.get("error") or "unknown error")
@@ -891,6 +2535,7 @@ def _apply_task_result(
         )
 
     item["updated_at"] = _now_iso()
+    _record_peak_rss(checkpoint, item, task_result)
     _increment_runtime_meta(
         checkpoint,
         completed=1,
@@ -919,11 +2564,84 @@ def _ensure_runtime_meta(
     meta.setdefault("retryable_error_count", 0)
 
 
+def _record_report_outcomes(
+    outcomes: dict[str, str | None],
+    *,
+    checkpoint: dict[str, Any],
+    items: dict[str, dict[str, Any]],
+    checkpoint_path: Path,
+    output_dir: Path,
+) -> None:
+    """Clear ``report_pending`` for drained renders and record their errors."""
+    if not outcomes:
+        return
+    for rel_path, error in outcomes.items():
+        item = items.get(rel_path)
+        if item is None:
+            continue
+        item.pop("report_pending", None)
+        if error:
+            item["report_error"] = error
+        else:
+            item.pop("report_error", None)
+    _write_checkpoint(checkpoint_path, checkpoint)
+    _write_summary_files(checkpoint, output_dir)
+
+
+def _render_pending_reports(
+    *,
+    workers: int,
+    html: bool,
+    docx: bool,
+    pdf: bool,
+    checkpoint: dict[str, Any],
+    checkpoint_path: Path,
+    output_dir: Path,
+) -> None:
+    """Render reports a previous run queued but never finished (``report_pending``).
+
+    Items are marked successful before their deferred render runs, so a run
+    interrupted in between leaves ``result.json`` without its reports.
+    """
+    items = {str(item["relative_path"]): item for item in checkpoint.get("items") or []}
+    pending = [
+        item
+        for item in items.values()
+        if item.get("report_pending")
+        and item.get("status") in {"success", "skipped"}
+        and (output_dir / str(item["output_subdir"]) / "result.json").exists()
+    ]
+    if not pending or not (html or docx or pdf):
+        return
+    renderer = _ReportRenderQueue(workers)
+    for item in pending:
+        rel_path = str(item["relative_path"])
+        typer.echo(f"[report] 补生成报告 {rel_path}")
+        renderer.submit(
+            output_dir / str(item["output_subdir"]),
+            label=rel_path,
+            pdf_name=Path(rel_path).name,
+            html=html,
+            docx=docx,
+            pdf=pdf,
+        )
+    _record_report_outcomes(
+        renderer.close(),
+        checkpoint=checkpoint,
+        items=items,
+        checkpoint_path=checkpoint_path,
+        output_dir=output_dir,
+    )
+
+
 def _increment_runtime_meta(
     checkpoint: dict[str, Any],
     *,
     completed: int = 0,
     retryable_errors: int = 0,
+    worker_recycles: int = 0,
+    llm_batch_rounds: int = 0,
+    llm_batch_requests: int = 0,
 ) -> None:
     meta = checkpoint.get("runtime_meta")
     if not isinstance(meta, dict):
@@ -932,6 +2650,87 @@ def _increment_runtime_meta(
     meta["retryable_error_count"] = int(meta.get("retryable_error_count") or 0) + int(
         retryable_errors
     )
+    if worker_recycles:
+        meta["worker_recycles"] = int(meta.get("worker_recycles") or 0) + int(worker_recycles)
+    if llm_batch_rounds:
+        meta["llm_batch_rounds"] = int(meta.get("llm_batch_rounds") or 0) + int(llm_batch_rounds)
+    if llm_batch_requests:
+        meta["llm_batch_requests"] = int(meta.get("llm_batch_requests") or 0) + int(
+            llm_batch_requests
+        )
+
+
+def _record_peak_rss(
+    checkpoint: dict[str, Any],
+    item: dict[str, Any],
+    task_result: dict[str, Any],
+) -> None:
+    """Store the worker's peak RSS after ``item`` ran (per item and batch-wide)."""
+    peak = task_result.get("peak_rss_mb")
+    if not isinstance(peak, (int, float)):
+        return
+    item["peak_rss_mb"] = peak
+    meta = checkpoint.get("runtime_meta")
+    if not isinstance(meta, dict):
+        return
+    per_item = meta.setdefault("item_peak_rss_mb", {})
+    per_item[str(item.get("relative_path"))] = peak
+    meta["peak_rss_mb"] = max(float(meta.get("peak_rss_mb") or 0.0), float(peak))
+
+
+def _timing_fields(timings: Any) -> dict[str, Any]:
+    """Reduce a run's ``timings`` to the per-item fields kept in the checkpoint."""
+    if not isinstance(timings, dict):
+        return {}
+    nodes = timings.get("nodes") if isinstance(timings.get("nodes"), dict) else {}
+    totals = timings.get("totals") if isinstance(timings.get("totals"), dict) else {}
+    return {
+        "node_timings_ms": {
+            str(name): node["wall_ms"]
+            for name, node in nodes.items()
+            if isinstance(node, dict) and isinstance(node.get("wall_ms"), (int, float))
+        },
+        "llm_tokens": {
+            "input": int(totals.get("input_tokens") or 0),
+            "output": int(totals.get("output_tokens") or 0),
+        },
+    }
+
+
+def _record_node_timings(item: dict[str, Any], task_result: dict[str, Any]) -> None:
+    """Copy per-node wall times and token totals onto ``item`` (or clear them)."""
+    for key in ("node_timings_ms", "llm_tokens"):
+        value = task_result.get(key)
+        if isinstance(value, dict) and value:
+            item[key] = value
+        else:
+            item.pop(key, None)
+
+
+def _percentile(sorted_values: list[Any], fraction: float) -> Any:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _node_timing_stats(items: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Per-node p50/p95 wall time over all items that recorded node timings."""
+    per_node: dict[str, list[float]] = {}
+    for item in items:
+        timings = item.get("node_timings_ms")
+        if not isinstance(timings, dict):
+            continue
+        for node, wall_ms in timings.items():
+            if isinstance(wall_ms, (int, float)):
+                per_node.setdefault(str(node), []).append(float(wall_ms))
+    stats: dict[str, dict[str, Any]] = {}
+    for node, values in per_node.items():
+        values.sort()
+        stats[node] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 0.5), 1),
+            "p95_ms": round(_percentile(values, 0.95), 1),
+            "total_ms": round(sum(values), 1),
+        }
+    return stats
 
 
 def _resolve_workers(cli_value: int | None, config_value: int | None) -> int:
@@ -966,6 +2765,22 @@ def _resolve_rate_limit_mode(
     return "adaptive" if raw == "adaptive" else "fixed"
 
 
+def _resolve_schedule(cli_value: str | None, config_value: str | None) -> str:
+    raw = (cli_value or config_value or "lpt").strip().lower()
+    if raw not in scheduling_policies():
+        raise typer.BadParameter(
+            f"--schedule 仅支持 {'|'.join(scheduling_policies())}"
+        )
+    return raw
+
+
+def _resolve_llm_batch_backend(config_value: str | None) -> str:
+    value = (config_value or "auto").strip().lower()
+    if value not in BATCH_BACKENDS:
+        raise typer.BadParameter(f"LLM_BATCH_BACKEND 必须是 {'|'.join(BATCH_BACKENDS)}")
+    return value
+
+
 def _is_retryable_error(error_text: str) -> bool:
     normalized = error_text.strip().lower()
     if not normalized:
@@ -983,25 +2798,10 @@ def _build_initial_checkpoint(
     batch_name: str | None,
     file_entries: list[dict[str, Any]],
 ) -> dict[str, Any]:
-    items = []
-    for entry in file_entries:
-        rel_path = str(entry["relative_path"])
-        pdf_sha256 = str(entry["pdf_sha256"])
-        output_subdir = str(Path(rel_path).with_suffix(""))
-        items.append(
-            {
-                "relative_path": rel_path,
-                "pdf_sha256": pdf_sha256,
-                "output_subdir": output_subdir,
-                "status": "pending",
-                "run_id": None,
-                "runtime_ms": None,
-                "overall_risk": None,
-                "domain_risks": {},
-                "error": None,
-                "updated_at": _now_iso(),
-            }
-        )
+    items = [
+        _new_checkpoint_item(str(entry["relative_path"]), str(entry["pdf_sha256"]))
+        for entry in file_entries
+    ]
 
     return {
         "version": _CHECKPOINT_VERSION,
@@ -1015,6 +2815,21 @@ def _build_initial_checkpoint(
     }
 
 
+def _new_checkpoint_item(rel_path: str, pdf_sha256: str) -> dict[str, Any]:
+    return {
+        "relative_path": rel_path,
+        "pdf_sha256": pdf_sha256,
+        "output_subdir": str(Path(rel_path).with_suffix("")),
+        "status": "pending",
+        "run_id": None,
+        "runtime_ms": None,
+        "overall_risk": None,
+        "domain_risks": {},
+        "error": None,
+        "updated_at": _now_iso(),
+    }
+
+
 def _load_checkpoint(path: Path) -> dict[str, Any]:
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
@@ -1108,17 +2923,21 @@ def _discover_pdfs(input_dir: Path) -> list[Path]:
     return files
 
 
-def _build_file_entries(input_dir: Path, pdf_files: list[Path]) -> list[dict[str, Any]]:
-    entries: list[dict[str, Any]] = []
-    for path in pdf_files:
-        entries.append(
-            {
-                "relative_path": path.relative_to(input_dir).as_posix(),
-                "pdf_path": path,
-                "pdf_sha256": sha256_file(path),
-            }
-        )
-    return entries
+def _build_file_entries(
+    input_dir: Path,
+    pdf_files: list[Path],
+    *,
+    store: SqliteStore | None = None,
+) -> list[dict[str, Any]]:
+    hashes = fingerprint_files(pdf_files, store=store)
+    return [
+        {
+            "relative_path": path.relative_to(input_dir).as_posix(),
+            "pdf_path": path,
+            "pdf_sha256": hashes[path],
+        }
+        for path in pdf_files
+    ]
 
 
 def _build_file_list_hash(entries: list[dict[str, Any]]) -> str:
@@ -1264,6 +3083,7 @@ def _read_result_summary(result_path: Path) -> dict[str, Any] | None:
     return {
         "run_id": run_id if isinstance(run_id, str) else None,
         "runtime_ms": runtime_ms if isinstance(runtime_ms, int) else None,
+        **_timing_fields(payload.get("timings")),
         "overall_risk": overall_risk,
         "domain_risks": domain_risks,
     }
@@ -1281,6 +3101,9 @@ def _build_summary_payload(checkpoint: dict[str, Any]) -> dict[str, Any]:
     }
     for item in items:
         status = str(item.get("status") or "pending")
+        if status == "llm_pending":
+            # Waiting for a provider batch: still in progress.
+            status = "running"
         if status in counts:
             counts[status] += 1
     summary = {
@@ -1303,7 +3126,17 @@ def _build_summary_payload(checkpoint: dict[str, Any]) -> dict[str, Any]:
         )
         if runtime_values:
             metrics["avg_runtime_ms"] = int(sum(runtime_values) / len(runtime_values))
-            metrics["p95_runtime_ms"] = runtime_values[min(len(runtime_values) - 1, int(len(runtime_values) * 0.95))]
+            metrics["p95_runtime_ms"] = _percentile(runtime_values, 0.95)
+
+        node_timings = _node_timing_stats(items)
+        if node_timings:
+            metrics["node_timings"] = node_timings
+            metrics["llm_tokens"] = {
+                key: sum(
+                    int((item.get("llm_tokens") or {}).get(key) or 0) for item in items
+                )
+                for key in ("input", "output")
+            }
 
         started_at = metrics.get("started_at")
         completed_items = int(metrics.get("completed_items") or 0)
@@ -1353,6 +3186,46 @@ def _write_summary_files(checkpoint: dict[str, Any], output_dir: Path) -> None:
             writer.writerow(row)
 
 
+def _write_batch_reports(
+    summary: dict[str, Any],
+    output_dir: Path,
+    *,
+    plot: bool,
+    plot_output: Path | None,
+    excel: bool,
+    excel_output: Path | None,
+) -> None:
+    if plot:
+        if plot_output is None:
+            resolved_plot_output = output_dir / _BATCH_PLOT_FILE
+        else:
+            resolved_plot_output = plot_output.resolve()
+        try:
+            plotted = _generate_batch_plot(
+                summary,
+                resolved_plot_output,
+                include_non_success=False,
+            )
+            typer.echo(f"已写入: {resolved_plot_output} (rows={plotted})")
+        except Exception as exc:  # pragma: no cover - defensive
+            typer.echo(f"Warning: 红绿灯图生成失败: {exc}")
+
+    if excel:
+        if excel_output is None:
+            resolved_excel_output = output_dir / _BATCH_EXCEL_FILE
+        else:
+            resolved_excel_output = excel_output.resolve()
+        try:
+            exported = _generate_batch_excel(
+                summary,
+                output_dir / _SUMMARY_JSON_FILE,
+                resolved_excel_output,
+            )
+            typer.echo(f"已写入: {resolved_excel_output} (rows={exported})")
+        except Exception as exc:  # pragma: no cover - defensive
+            typer.echo(f"Warning: Excel 汇总生成失败: {exc}")
+
+
 def _resolve_summary_input(source: Path) -> tuple[Path, Path]:
     if source.is_dir():
         summary_path = source / _SUMMARY_JSON_FILE
@@ -51,7 +51,7 @@ def cache_stats() -> None:
         payload[name] = info()._asdict() if callable(info) else {"cached": False}
     persistent = _persistent_cache_stats()
     if persistent is not None:
-        payload["persistent_cache"] = {"stages": persistent}
+        payload["persistent_cache"] = persistent
     emit_json(payload)
 
 
@@ -80,12 +80,22 @@ def cache_prune(
         emit_json({"removed": 0, "reason": "cache_disabled"})
         return
     removed = manager.prune_older_than(days=days)
-    emit_json({"removed": removed})
+    evicted = manager.evict_to_budget()
+    emit_json({"removed": removed, "evicted": evicted})
+
+
+@app.command("verify", help="按内容哈希校验持久化缓存，删除损坏条目")
+def cache_verify() -> None:
+    manager = _build_cache_manager()
+    if manager is None:
+        emit_json({"checked": 0, "removed": 0, "reason": "cache_disabled"})
+        return
+    emit_json(manager.verify_all())
 
 
 def _build_cache_manager() -> "CacheManager | None":
     from core.config import get_settings
-    from persistence.cache import CacheManager
+    from persistence.cache import CacheManager, cache_budgets_from_settings
     from persistence.sqlite_store import SqliteStore
 
     settings = get_settings()
@@ -96,14 +106,14 @@ def _build_cache_manager() -> "CacheManager | None":
         settings, "persistence_dir", "data/rob2"
     )
     store = SqliteStore(Path(base_dir) / "metadata.sqlite")
-    return CacheManager(base_dir, store, scope=scope)
+    return CacheManager(base_dir, store, scope=scope, **cache_budgets_from_settings(settings))
 
 
-def _persistent_cache_stats() -> list[dict] | None:
+def _persistent_cache_stats() -> dict[str, Any] | None:
     manager = _build_cache_manager()
     if manager is None:
         return None
-    return manager.stats()
+    return {"stages": manager.stats(), "budgets": manager.budgets}
 
 
 __all__ = ["app"]
@@ -256,6 +256,12 @@ def _options_catalog() -> list[dict[str, Any]]:
                 {"key": "reranker_max_length", "desc": "重排 max_length"},
                 {"key": "reranker_batch_size", "desc": "重排 batch size"},
                 {"key": "rerank_top_n", "desc": "重排 top-N"},
+                {"key": "reranker_max_tokens_per_batch", "desc": "重排每批最大 token 数（按长度排序动态分批）"},
+                {
+                    "key": "reranker_backend",
+                    "desc": "重排推理后端（ONNX 仅 CPU）",
+                    "choices": ["torch", "onnx", "onnx-int8"],
+                },
                 {"key": "use_structure", "desc": "启用结构感知过滤"},
                 {"key": "section_bonus_weight", "desc": "章节加权系数"},
                 {"key": "locator_tokenizer", "desc": "定位分词器策略"},
@@ -266,6 +272,12 @@ def _options_catalog() -> list[dict[str, Any]]:
                 {"key": "splade_query_max_length", "desc": "SPLADE 查询最大长度"},
                 {"key": "splade_doc_max_length", "desc": "SPLADE 文档最大长度"},
                 {"key": "splade_batch_size", "desc": "SPLADE batch size"},
+                {"key": "splade_max_tokens_per_batch", "desc": "SPLADE 每批最大 token 数（按长度排序动态分批）"},
+                {
+                    "key": "splade_backend",
+                    "desc": "SPLADE 推理后端（ONNX 仅 CPU）",
+                    "choices": ["torch", "onnx", "onnx-int8"],
+                },
                 {"key": "fusion_top_k", "desc": "融合后保留 top_k"},
                 {"key": "fusion_rrf_k", "desc": "融合 RRF 常量"},
                 {"key": "fusion_engine_weights", "desc": "融合引擎权重映射"},
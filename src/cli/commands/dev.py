@@ -0,0 +1,76 @@
+"""Development and load-testing tools."""
+
+from __future__ import annotations
+
+import typer
+
+
+app = typer.Typer(
+    help="开发与压测工具",
+    context_settings={"help_option_names": ["-h", "--help"]},
+    add_completion=False,
+    no_args_is_help=True,
+    options_metavar="[选项]",
+    subcommand_metavar="命令 [参数]",
+)
+
+
+@app.command("llm-stub", help="启动本地 OpenAI/Anthropic 兼容的 LLM 桩服务（压测用）")
+def llm_stub(
+    host: str = typer.Option("127.0.0.1", "--host", help="监听地址"),
+    port: int = typer.Option(8765, "--port", help="监听端口"),
+    latency_ms: float = typer.Option(300.0, "--latency-ms", help="每次请求的延迟（中位数，毫秒）"),
+    latency_distribution: str = typer.Option(
+        "fixed",
+        "--latency-distribution",
+        help="延迟分布：fixed|uniform|lognormal",
+    ),
+    latency_spread: float = typer.Option(
+        0.3,
+        "--latency-spread",
+        help="延迟离散度：uniform 为 ±比例，lognormal 为 sigma",
+    ),
+    rate_limit_rate: float = typer.Option(
+        0.0, "--rate-limit-rate", help="随机返回 429 的概率（0-1）"
+    ),
+    retry_after_s: float = typer.Option(
+        1.0, "--retry-after-s", help="429 响应的 retry-after（秒）"
+    ),
+    timeout_rate: float = typer.Option(
+        0.0, "--timeout-rate", help="请求挂起直至客户端超时的概率（0-1）"
+    ),
+    timeout_hang_s: float = typer.Option(
+        600.0, "--timeout-hang-s", help="挂起请求的时长（秒），结束后返回 504"
+    ),
+    tokens_per_minute: int | None = typer.Option(
+        None, "--tokens-per-minute", help="每分钟输入 token 配额，超出返回 429"
+    ),
+    seed: int | None = typer.Option(None, "--seed", help="随机种子"),
+) -> None:
+    """启动本地 LLM 桩服务"""
+    from services.llm_stub import StubBehavior, run_llm_stub
+
+    try:
+        behavior = StubBehavior(
+            latency_ms=latency_ms,
+            latency_distribution=latency_distribution.strip().lower(),  # type: ignore[arg-type]
+            latency_spread=latency_spread,
+            rate_limit_rate=rate_limit_rate,
+            retry_after_s=retry_after_s,
+            timeout_rate=timeout_rate,
+            timeout_hang_s=timeout_hang_s,
+            tokens_per_minute=tokens_per_minute,
+            seed=seed,
+        )
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc)) from exc
+
+    base_url = f"http://{host}:{port}"
+    typer.echo(f"LLM 桩服务: {base_url}（统计: {base_url}/stub/stats）")
+    typer.echo("让 rob2 使用桩服务，请设置：")
+    typer.echo(f"  OPENAI_BASE_URL={base_url}/v1 OPENAI_API_KEY=stub")
+    typer.echo(f"  ANTHROPIC_BASE_URL={base_url} ANTHROPIC_API_KEY=stub")
+    run_llm_stub(behavior, host=host, port=port)
+
+
+__all__ = ["app"]
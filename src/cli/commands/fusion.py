@@ -10,6 +10,7 @@ from pipelines.graphs.nodes.fusion import fusion_node
 from pipelines.graphs.nodes.locators.retrieval_bm25 import bm25_retrieval_locator_node
 from pipelines.graphs.nodes.locators.retrieval_splade import splade_retrieval_locator_node
 from pipelines.graphs.nodes.locators.rule_based import rule_based_locator_node
+from pipelines.graphs.nodes.state_models import expand_candidates, load_candidates
 from schemas.internal.evidence import FusedEvidenceCandidate
 from .shared import emit_json, load_doc_structure, load_question_set, print_candidates, resolve_splade_model
 
@@ -102,7 +103,9 @@ def run_fusion(
     fusion = fusion_node({**base_state, **rule_based, **bm25, **splade})
 
     if json_out:
-        emit_json({**base_state, **rule_based, **bm25, **splade, **fusion})
+        emit_json(
+            expand_candidates(base_state, {**base_state, **rule_based, **bm25, **splade, **fusion})
+        )
         return
 
     candidates_by_q = fusion.get("fusion_candidates") or {}
@@ -110,13 +113,13 @@ def run_fusion(
         if question_id not in candidates_by_q:
             raise typer.BadParameter(f"Unknown question_id: {question_id}")
         typer.echo(f"\n== {question_id} ==")
-        candidates = [FusedEvidenceCandidate.model_validate(item) for item in candidates_by_q[question_id]]
+        candidates = load_candidates(base_state, candidates_by_q[question_id], FusedEvidenceCandidate)
         print_candidates(question_id, candidates, limit=top_k, full=full)
         return
 
     for qid, raw_items in candidates_by_q.items():
         typer.echo(f"\n== {qid} ==")
-        candidates = [FusedEvidenceCandidate.model_validate(item) for item in raw_items]
+        candidates = load_candidates(base_state, raw_items, FusedEvidenceCandidate)
         print_candidates(qid, candidates, limit=top_k, full=full)
 
 
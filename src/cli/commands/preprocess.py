@@ -10,6 +10,7 @@ import typer
 
 from schemas.internal.documents import DocStructure
 from persistence import CacheManager
+from persistence.cache import cache_budgets_from_settings
 from persistence.hashing import sha256_file
 from persistence.sqlite_store import SqliteStore
 from pipelines.graphs.nodes.preprocess import preprocess_node
@@ -248,7 +249,12 @@ def extract_metadata(
     if use_cache and settings.cache_scope != "none":
         base_dir = Path(settings.cache_dir or settings.persistence_dir)
         store = SqliteStore(base_dir / "metadata.sqlite")
-        cache_manager = CacheManager(base_dir, store, scope=settings.cache_scope)
+        cache_manager = CacheManager(
+            base_dir,
+            store,
+            scope=settings.cache_scope,
+            **cache_budgets_from_settings(settings),
+        )
 
     state: dict[str, Any] = {
         "pdf_path": str(pdf_path),
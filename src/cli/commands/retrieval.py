@@ -8,6 +8,7 @@ import typer
 
 from pipelines.graphs.nodes.locators.retrieval_bm25 import bm25_retrieval_locator_node
 from pipelines.graphs.nodes.locators.retrieval_splade import splade_retrieval_locator_node
+from pipelines.graphs.nodes.state_models import expand_candidates, load_candidates
 from schemas.internal.evidence import EvidenceCandidate
 from .shared import emit_json, load_doc_structure, load_question_set, print_candidates, resolve_splade_model
 
@@ -87,20 +88,20 @@ def bm25(
     candidates_by_q = output.get("bm25_candidates") or {}
 
     if json_out:
-        emit_json(output)
+        emit_json(expand_candidates(state, output))
         return
 
     if question_id:
         if question_id not in candidates_by_q:
             raise typer.BadParameter(f"Unknown question_id: {question_id}")
         typer.echo(f"\n== {question_id} ==")
-        candidates = [EvidenceCandidate.model_validate(item) for item in candidates_by_q[question_id]]
+        candidates = load_candidates(state, candidates_by_q[question_id], EvidenceCandidate)
         print_candidates(question_id, candidates, limit=top_k, full=full)
         return
 
     for qid, raw_items in candidates_by_q.items():
         typer.echo(f"\n== {qid} ==")
-        candidates = [EvidenceCandidate.model_validate(item) for item in raw_items]
+        candidates = load_candidates(state, raw_items, EvidenceCandidate)
         print_candidates(qid, candidates, limit=top_k, full=full)
 
 
@@ -181,20 +182,20 @@ def splade(
     candidates_by_q = output.get("splade_candidates") or {}
 
     if json_out:
-        emit_json(output)
+        emit_json(expand_candidates(state, output))
         return
 
     if question_id:
         if question_id not in candidates_by_q:
             raise typer.BadParameter(f"Unknown question_id: {question_id}")
         typer.echo(f"\n== {question_id} ==")
-        candidates = [EvidenceCandidate.model_validate(item) for item in candidates_by_q[question_id]]
+        candidates = load_candidates(state, candidates_by_q[question_id], EvidenceCandidate)
         print_candidates(question_id, candidates, limit=top_k, full=full)
         return
 
     for qid, raw_items in candidates_by_q.items():
         typer.echo(f"\n== {qid} ==")
-        candidates = [EvidenceCandidate.model_validate(item) for item in raw_items]
+        candidates = load_candidates(state, raw_items, EvidenceCandidate)
         print_candidates(qid, candidates, limit=top_k, full=full)
 
 
@@ -14,6 +14,7 @@ from pipelines.graphs.nodes.validators.completeness import completeness_validato
 from pipelines.graphs.nodes.validators.consistency import consistency_validator_node
 from pipelines.graphs.nodes.validators.existence import existence_validator_node
 from pipelines.graphs.nodes.validators.relevance import relevance_validator_node
+from pipelines.graphs.nodes.state_models import expand_candidates, load_candidates
 from schemas.internal.evidence import FusedEvidenceCandidate
 from .shared import emit_json, load_doc_structure, load_question_set, print_candidates, resolve_splade_model
 
@@ -212,7 +213,7 @@ def validate_full(
     state = {**state, **completeness_out}
 
     if json_out:
-        emit_json(state)
+        emit_json(expand_candidates(state, state))
         return
 
     passed = state.get("completeness_passed")
@@ -281,7 +282,7 @@ def validate_relevance(
     )
     relevance_out = relevance_validator_node(state)
     if json_out:
-        emit_json({**state, **relevance_out})
+        emit_json(expand_candidates(state, {**state, **relevance_out}))
         return
 
     candidates_by_q = relevance_out.get("relevance_candidates") or {}
@@ -289,13 +290,13 @@ def validate_relevance(
         if question_id not in candidates_by_q:
             raise typer.BadParameter(f"Unknown question_id: {question_id}")
         typer.echo(f"\n== {question_id} ==")
-        candidates = [FusedEvidenceCandidate.model_validate(item) for item in candidates_by_q[question_id]]
+        candidates = load_candidates(state, candidates_by_q[question_id], FusedEvidenceCandidate)
         print_candidates(question_id, candidates, limit=top_k, full=False)
         return
 
     for qid, raw_items in candidates_by_q.items():
         typer.echo(f"\n== {qid} ==")
-        candidates = [FusedEvidenceCandidate.model_validate(item) for item in raw_items]
+        candidates = load_candidates(state, raw_items, FusedEvidenceCandidate)
         print_candidates(qid, candidates, limit=top_k, full=False)
 
 
@@ -365,7 +366,9 @@ def validate_consistency(
         }
     )
     if json_out:
-        emit_json({**state, **relevance_out, **existence_out, **consistency_out})
+        emit_json(
+            expand_candidates(state, {**state, **relevance_out, **existence_out, **consistency_out})
+        )
         return
 
     failed = consistency_out.get("consistency_failed_questions") or []
@@ -433,7 +436,9 @@ def validate_completeness(
         }
     )
     if json_out:
-        emit_json({**state, **relevance_out, **existence_out, **completeness_out})
+        emit_json(
+            expand_candidates(state, {**state, **relevance_out, **existence_out, **completeness_out})
+        )
         return
     typer.echo(f"completeness_passed={completeness_out.get('completeness_passed')}")
     failed = completeness_out.get("completeness_failed_questions") or []
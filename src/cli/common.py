@@ -89,6 +89,33 @@ def write_run_output_dir(
             encoding="utf-8",
         )
 
+    _render_reports(result, output_dir, html=html, docx=docx, pdf=pdf, pdf_name=pdf_name)
+
+
+def render_run_reports(
+    output_dir: Path,
+    *,
+    html: bool = True,
+    docx: bool = True,
+    pdf: bool = True,
+    pdf_name: str = "Unknown",
+) -> None:
+    """(Re)generate report files from an existing ``result.json``."""
+    result = Rob2RunResult.model_validate_json(
+        (output_dir / "result.json").read_text(encoding="utf-8")
+    )
+    _render_reports(result, output_dir, html=html, docx=docx, pdf=pdf, pdf_name=pdf_name)
+
+
+def _render_reports(
+    result: Rob2RunResult,
+    output_dir: Path,
+    *,
+    html: bool,
+    docx: bool,
+    pdf: bool,
+    pdf_name: str,
+) -> None:
     if html or docx or pdf:
         from services.reports import (
             generate_docx_report,
@@ -26,9 +26,33 @@ class Settings(BaseSettings):
     cache_scope: str = Field(
         default="deterministic", validation_alias="CACHE_SCOPE"
     )
+    cache_max_mb: float | None = Field(
+        default=None, validation_alias="CACHE_MAX_MB"
+    )
+    cache_stage_max_mb: str | None = Field(
+        default=None, validation_alias="CACHE_STAGE_MAX_MB"
+    )
     batch_workers: int | None = Field(
         default=None, validation_alias="BATCH_WORKERS"
     )
+    batch_schedule: str | None = Field(
+        default=None, validation_alias="BATCH_SCHEDULE"
+    )
+    batch_memory_budget_mb: float | None = Field(
+        default=None, validation_alias="BATCH_MEMORY_BUDGET_MB"
+    )
+    batch_memory_mb_per_page: float | None = Field(
+        default=None, validation_alias="BATCH_MEMORY_MB_PER_PAGE"
+    )
+    batch_worker_max_tasks: int | None = Field(
+        default=None, validation_alias="BATCH_WORKER_MAX_TASKS"
+    )
+    batch_worker_max_rss_mb: float | None = Field(
+        default=None, validation_alias="BATCH_WORKER_MAX_RSS_MB"
+    )
+    batch_render_workers: int | None = Field(
+        default=None, validation_alias="BATCH_RENDER_WORKERS"
+    )
     max_inflight_llm: int | None = Field(
         default=None, validation_alias="MAX_INFLIGHT_LLM"
     )
@@ -47,6 +71,41 @@ class Settings(BaseSettings):
     retry_429_backoff_ms: int | None = Field(
         default=None, validation_alias="RETRY_429_BACKOFF_MS"
     )
+    inference_server: bool = Field(
+        default=False, validation_alias="INFERENCE_SERVER"
+    )
+    inference_server_max_wait_ms: int | None = Field(
+        default=None, validation_alias="INFERENCE_SERVER_MAX_WAIT_MS"
+    )
+    api_warmup_models: str | None = Field(
+        default=None, validation_alias="API_WARMUP_MODELS"
+    )
+    llm_cassette_mode: str | None = Field(
+        default=None, validation_alias="LLM_CASSETTE_MODE"
+    )
+    llm_cassette_dir: str | None = Field(
+        default=None, validation_alias="LLM_CASSETTE_DIR"
+    )
+    llm_cassette_replay_latency: bool = Field(
+        default=False, validation_alias="LLM_CASSETTE_REPLAY_LATENCY"
+    )
+    llm_hedge_delay: str | None = Field(default=None, validation_alias="LLM_HEDGE_DELAY")
+    llm_hedge_max_rate: float | None = Field(
+        default=None, validation_alias="LLM_HEDGE_MAX_RATE"
+    )
+    llm_fallback_model: str | None = Field(
+        default=None, validation_alias="LLM_FALLBACK_MODEL"
+    )
+    llm_failover: bool = Field(default=False, validation_alias="LLM_FAILOVER")
+    llm_batch_backend: str | None = Field(
+        default=None, validation_alias="LLM_BATCH_BACKEND"
+    )
+    llm_batch_poll_interval_s: float | None = Field(
+        default=None, validation_alias="LLM_BATCH_POLL_INTERVAL_S"
+    )
+    llm_batch_max_rounds: int | None = Field(
+        default=None, validation_alias="LLM_BATCH_MAX_ROUNDS"
+    )
 
     docling_layout_model: str | None = Field(
         default=None, validation_alias="DOCLING_LAYOUT_MODEL"
@@ -176,6 +235,12 @@ class Settings(BaseSettings):
     reranker_max_length: int = Field(default=512, validation_alias="RERANKER_MAX_LENGTH")
     reranker_batch_size: int = Field(default=8, validation_alias="RERANKER_BATCH_SIZE")
     reranker_top_n: int = Field(default=50, validation_alias="RERANKER_TOP_N")
+    reranker_max_tokens_per_batch: int | None = Field(
+        default=None, validation_alias="RERANKER_MAX_TOKENS_PER_BATCH"
+    )
+    reranker_backend: str | None = Field(
+        default=None, validation_alias="RERANKER_BACKEND"
+    )
 
     splade_model_id: str | None = Field(
         default=None, validation_alias="SPLADE_MODEL_ID"
@@ -195,6 +260,15 @@ class Settings(BaseSettings):
     splade_batch_size: int = Field(
         default=8, validation_alias="SPLADE_BATCH_SIZE"
     )
+    splade_max_tokens_per_batch: int | None = Field(
+        default=None, validation_alias="SPLADE_MAX_TOKENS_PER_BATCH"
+    )
+    splade_backend: str | None = Field(
+        default=None, validation_alias="SPLADE_BACKEND"
+    )
+    onnx_cache_dir: str | None = Field(
+        default=None, validation_alias="ONNX_CACHE_DIR"
+    )
 
     llm_locator_mode: str = Field(
         default="none", validation_alias="LLM_LOCATOR_MODE"
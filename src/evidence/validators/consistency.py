@@ -100,7 +100,7 @@ def judge_consistency(
 
 
 def _init_chat_model(config: LLMConsistencyValidatorConfig) -> ChatModelLike:
-    from langchain.chat_models import init_chat_model
+    from utils.llm_cassette import init_chat_model
 
     kwargs: dict[str, Any] = {}
     if config.model_provider:
@@ -93,7 +93,7 @@ def annotate_relevance(
 
 
 def _init_chat_model(config: LLMRelevanceValidatorConfig) -> ChatModelLike:
-    from langchain.chat_models import init_chat_model
+    from utils.llm_cassette import init_chat_model
 
     kwargs: dict[str, Any] = {}
     if config.model_provider:
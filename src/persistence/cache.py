@@ -3,24 +3,46 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterator, Mapping
 
 import numpy as np
 
-from persistence.hashing import sha256_bytes
+from persistence.hashing import sha256_bytes, sha256_file
+
+try:  # POSIX only; single-flight locking is a no-op elsewhere.
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
 from persistence.sqlite_store import SqliteStore
 from persistence.models import CacheEntry
+from utils.tracing import record_cache_lookup
 
 
 _DETERMINISTIC_STAGES = {
     "preprocess",
     "bm25_index",
     "splade_doc_vectors",
+    "rerank_scores",
 }
 
+# JSON payloads are written as compact, zlib-compressed JSON behind this header.
+# Entries written before the header existed are plain (indented) JSON text and
+# are still read transparently.
+_JSON_PAYLOAD_MAGIC = b"EAGCJ1\n"
+_JSON_COMPRESS_LEVEL = 3
+
+# single_flight locks keys through a fixed set of lock files per stage, so
+# the lock directory stays bounded however many keys are written or evicted.
+# Unrelated keys that share a stripe only wait for each other.
+_LOCK_STRIPES = 64
+
 
 @dataclass(frozen=True)
 class CachePayload:
@@ -30,17 +52,50 @@ class CachePayload:
 
 
 class CacheManager:
-    def __init__(self, base_dir: str | Path, store: SqliteStore, *, scope: str = "deterministic") -> None:
+    """Deterministic on-disk cache with optional LRU byte budgets.
+
+    ``max_bytes`` bounds the whole cache and ``stage_max_bytes`` bounds single
+    stages. Budgets are enforced after every write by evicting the least
+    recently used entries (by ``last_accessed``, falling back to ``created_at``).
+
+    Files are written to a temp file and renamed into place. Reads compare the
+    file's size and mtime with the row recorded at write time, which catches
+    torn or replaced files without reading them; ``verify=True`` additionally
+    checks the content hash on every hit, and :meth:`verify_all` checks every
+    entry (``rob2 cache verify``).
+    """
+
+    def __init__(
+        self,
+        base_dir: str | Path,
+        store: SqliteStore,
+        *,
+        scope: str = "deterministic",
+        max_bytes: int | None = None,
+        stage_max_bytes: Mapping[str, int] | None = None,
+        verify: bool = False,
+    ) -> None:
         self._base_dir = Path(base_dir)
         self._cache_dir = self._base_dir / "cache"
         self._cache_dir.mkdir(parents=True, exist_ok=True)
         self._store = store
         self._scope = scope.strip().lower() if scope else "none"
+        self._verify = verify
+        self._max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self._stage_max_bytes = {
+            stage: int(limit)
+            for stage, limit in (stage_max_bytes or {}).items()
+            if limit and int(limit) > 0
+        }
 
     @property
     def scope(self) -> str:
         return self._scope
 
+    @property
+    def budgets(self) -> dict[str, int | None]:
+        return {"total": self._max_bytes, **self._stage_max_bytes}
+
     def enabled_for(self, stage: str) -> bool:
         if self._scope == "none":
             return False
@@ -49,70 +104,111 @@ class CacheManager:
         return False
 
     def get_json(self, *, stage: str, key: str) -> dict[str, Any] | None:
-        if not self.enabled_for(stage):
-            return None
-        entry = self._store.get_cache_entry(stage=stage, cache_key=key)
-        if entry is None:
+        path = self._verified_path(stage, key, suffixes=(".jsonz", ".json"))
+        if path is None:
             return None
-        path = Path(entry.path)
-        if not path.exists():
-            return None
-        payload = json.loads(path.read_text(encoding="utf-8"))
+        payload = _decode_json_payload(path.read_bytes())
         self._store.touch_cache_entry(stage=stage, cache_key=key)
         return payload
 
     def set_json(self, *, stage: str, key: str, payload: dict[str, Any]) -> CacheEntry:
         if not self.enabled_for(stage):
             raise ValueError(f"Cache stage not enabled: {stage}")
-        path = self._cache_path(stage, key, "json")
-        path.parent.mkdir(parents=True, exist_ok=True)
-        text = json.dumps(payload, ensure_ascii=False, sort_keys=True, indent=2)
-        path.write_text(text, encoding="utf-8")
-        entry = CacheEntry(
-            cache_key=key,
-            stage=stage,
-            content_hash=sha256_bytes(text.encode("utf-8")),
-            path=str(path),
-            created_at=datetime.now(timezone.utc),
-            last_accessed=None,
-        )
-        self._store.put_cache_entry(entry)
-        return entry
+        data = _encode_json_payload(payload)
+        path = self._write_atomic(stage, key, "jsonz", lambda handle: handle.write(data))
+        return self._put_entry(stage=stage, key=key, path=path, content_hash=sha256_bytes(data))
 
-    def get_numpy(self, *, stage: str, key: str) -> np.ndarray | None:
-        if not self.enabled_for(stage):
-            return None
-        entry = self._store.get_cache_entry(stage=stage, cache_key=key)
-        if entry is None:
+    def get_arrays(self, *, stage: str, key: str) -> dict[str, np.ndarray] | None:
+        """Return a named-array payload written by :meth:`set_arrays`.
+
+        Returns None for misses and for legacy entries stored in another format.
+        """
+        path = self._verified_path(stage, key, suffixes=(".npz",))
+        if path is None:
             return None
-        path = Path(entry.path)
-        if not path.exists():
+        with np.load(path, allow_pickle=False) as archive:
+            arrays = {name: archive[name] for name in archive.files}
+        self._store.touch_cache_entry(stage=stage, cache_key=key)
+        return arrays
+
+    def set_arrays(
+        self, *, stage: str, key: str, arrays: Mapping[str, np.ndarray]
+    ) -> CacheEntry:
+        if not self.enabled_for(stage):
+            raise ValueError(f"Cache stage not enabled: {stage}")
+        named = {name: np.asarray(value) for name, value in arrays.items()}
+        path = self._write_atomic(stage, key, "npz", lambda handle: np.savez(handle, **named))
+        return self._put_entry(stage=stage, key=key, path=path, content_hash=sha256_file(path))
+
+    def get_numpy(
+        self, *, stage: str, key: str, mmap_mode: str | None = None
+    ) -> np.ndarray | None:
+        """Return a cached array; ``mmap_mode="r"`` maps it instead of reading it."""
+        path = self._verified_path(stage, key, suffixes=(".npy",))
+        if path is None:
             return None
-        data = np.load(path)
+        data = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
         self._store.touch_cache_entry(stage=stage, cache_key=key)
         return data
 
     def set_numpy(self, *, stage: str, key: str, array: np.ndarray) -> CacheEntry:
         if not self.enabled_for(stage):
             raise ValueError(f"Cache stage not enabled: {stage}")
-        path = self._cache_path(stage, key, "npy")
-        path.parent.mkdir(parents=True, exist_ok=True)
-        np.save(path, array)
-        content_hash = sha256_bytes(path.read_bytes())
-        entry = CacheEntry(
-            cache_key=key,
-            stage=stage,
-            content_hash=content_hash,
-            path=str(path),
-            created_at=datetime.now(timezone.utc),
-            last_accessed=None,
-        )
-        self._store.put_cache_entry(entry)
-        return entry
+        path = self._write_atomic(stage, key, "npy", lambda handle: np.save(handle, array))
+        return self._put_entry(stage=stage, key=key, path=path, content_hash=sha256_file(path))
+
+    @contextmanager
+    def single_flight(self, *, stage: str, key: str) -> Iterator[None]:
+        """Hold a cross-process lock covering ``(stage, key)``.
+
+        Callers re-check the cache after acquiring it, so only the first worker
+        computes an expensive stage while the others wait and then read the result.
+        Keys share striped lock files, so do not nest calls for the same stage.
+        """
+        if not self.enabled_for(stage) or fcntl is None:
+            yield
+            return
+        stripe = zlib.crc32(key.encode("utf-8")) % _LOCK_STRIPES
+        lock_path = self._cache_dir / ".locks" / stage / f"{stripe:02d}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with lock_path.open("a+b") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def flush(self) -> None:
+        """Persist buffered cache-hit bookkeeping to the metadata store."""
+        self._store.flush()
 
     def stats(self) -> list[dict[str, Any]]:
         return self._store.list_cache_stats()
 
+    def evict_to_budget(self, *, protect: tuple[str, str] | None = None) -> dict[str, int]:
+        """Evict LRU entries until every configured budget holds.
+
+        ``protect`` is a ``(stage, key)`` pair that is never evicted (the entry
+        that was just written). Returns the number of entries and bytes removed.
+        """
+        removed = {"entries": 0, "bytes": 0}
+        for stage, limit in self._stage_max_bytes.items():
+            self._evict(stage=stage, limit=limit, protect=protect, removed=removed)
+        if self._max_bytes is not None:
+            self._evict(stage=None, limit=self._max_bytes, protect=protect, removed=removed)
+        return removed
+
+    def verify_all(self) -> dict[str, int]:
+        """Hash every entry and drop those whose content no longer matches."""
+        checked = removed = 0
+        for entry in self._store.list_cache_entries_lru():
+            checked += 1
+            path = Path(entry.path)
+            if not path.exists() or sha256_file(path) != entry.content_hash:
+                self._drop(entry.stage, entry.cache_key, path)
+                removed += 1
+        return {"checked": checked, "removed": removed}
+
     def prune_older_than(self, *, days: int) -> int:
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
         entries = self._store.list_cache_entries_older_than(cutoff)
@@ -129,5 +225,171 @@ class CacheManager:
         cleaned_ext = ext.lstrip(".") or "bin"
         return self._cache_dir / stage / f"{key}.{cleaned_ext}"
 
+    def _verified_path(
+        self, stage: str, key: str, *, suffixes: tuple[str, ...]
+    ) -> Path | None:
+        """Return the entry's file if it exists, has a readable format and intact content."""
+        if not self.enabled_for(stage):
+            return None
+        path = self._lookup_path(stage, key, suffixes=suffixes)
+        record_cache_lookup(stage=stage, hit=path is not None)
+        return path
+
+    def _lookup_path(
+        self, stage: str, key: str, *, suffixes: tuple[str, ...]
+    ) -> Path | None:
+        entry = self._store.get_cache_entry(stage=stage, cache_key=key)
+        if entry is None:
+            return None
+        path = Path(entry.path)
+        if path.suffix not in suffixes:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if entry.bytes is not None and stat.st_size != entry.bytes:
+            intact = False
+        elif entry.mtime_ns is not None and not self._verify:
+            intact = stat.st_mtime_ns == entry.mtime_ns
+        else:
+            # Opt-in full check, or a row written before mtimes were recorded:
+            # hash once and record the stat so later hits stay cheap.
+            intact = sha256_file(path) == entry.content_hash
+            if intact and entry.mtime_ns is None:
+                self._store.put_cache_entry(
+                    replace(entry, bytes=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                )
+        if not intact:
+            # Torn or replaced file: drop it so the stage is recomputed.
+            self._drop(stage, key, path)
+            return None
+        return path
+
+    def _drop(self, stage: str, key: str, path: Path) -> None:
+        path.unlink(missing_ok=True)
+        self._store.delete_cache_entry(stage=stage, cache_key=key)
+
+    def _write_atomic(
+        self, stage: str, key: str, ext: str, write: Callable[[BinaryIO], object]
+    ) -> Path:
+        """Write via a temp file in the target directory and rename into place."""
+        path = self._cache_path(stage, key, ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                write(handle)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return path
+
+    def _put_entry(self, *, stage: str, key: str, path: Path, content_hash: str) -> CacheEntry:
+        previous = self._store.get_cache_entry(stage=stage, cache_key=key)
+        if previous is not None and Path(previous.path) != path:
+            Path(previous.path).unlink(missing_ok=True)
+        stat = path.stat()
+        entry = CacheEntry(
+            cache_key=key,
+            stage=stage,
+            content_hash=content_hash,
+            path=str(path),
+            created_at=datetime.now(timezone.utc),
+            last_accessed=None,
+            bytes=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+        self._store.put_cache_entry(entry)
+        if self._max_bytes is not None or stage in self._stage_max_bytes:
+            self.evict_to_budget(protect=(stage, key))
+        return entry
+
+    def _evict(
+        self,
+        *,
+        stage: str | None,
+        limit: int,
+        protect: tuple[str, str] | None,
+        removed: dict[str, int],
+    ) -> None:
+        entries = self._store.list_cache_entries_lru(stage=stage)
+        sizes = [_entry_size(entry) for entry in entries]
+        total = sum(sizes)
+        evicted: dict[str, list[int]] = {}
+        for entry, size in zip(entries, sizes, strict=True):
+            if total <= limit:
+                break
+            if protect is not None and (entry.stage, entry.cache_key) == protect:
+                continue
+            Path(entry.path).unlink(missing_ok=True)
+            self._store.delete_cache_entry(stage=entry.stage, cache_key=entry.cache_key)
+            total -= size
+            counts = evicted.setdefault(entry.stage, [0, 0])
+            counts[0] += 1
+            counts[1] += size
+        for evicted_stage, (count, size) in evicted.items():
+            self._store.record_cache_evictions(
+                stage=evicted_stage, entries=count, bytes_size=size
+            )
+            removed["entries"] += count
+            removed["bytes"] += size
+
+
+def parse_stage_budgets(value: str | Mapping[str, Any] | None) -> dict[str, int]:
+    """Parse ``"stage=MB,stage=MB"`` (or a mapping of stage -> MB) into byte budgets."""
+    if not value:
+        return {}
+    if isinstance(value, Mapping):
+        items = [(str(stage), limit) for stage, limit in value.items()]
+    else:
+        items = []
+        for part in str(value).split(","):
+            if not part.strip():
+                continue
+            stage, sep, limit = part.partition("=")
+            if not sep:
+                raise ValueError(f"Invalid cache stage budget: {part.strip()!r} (expected stage=MB)")
+            items.append((stage.strip(), limit.strip()))
+    budgets: dict[str, int] = {}
+    for stage, limit in items:
+        megabytes = float(limit)
+        if megabytes <= 0:
+            raise ValueError(f"Cache stage budget must be > 0: {stage}")
+        budgets[stage] = int(megabytes * 1024 * 1024)
+    return budgets
+
+
+def cache_budgets_from_settings(settings: Any) -> dict[str, Any]:
+    """Return ``CacheManager`` budget kwargs from ``CACHE_MAX_MB`` / ``CACHE_STAGE_MAX_MB``."""
+    max_mb = getattr(settings, "cache_max_mb", None)
+    return {
+        "max_bytes": int(float(max_mb) * 1024 * 1024) if max_mb else None,
+        "stage_max_bytes": parse_stage_budgets(getattr(settings, "cache_stage_max_mb", None)),
+    }
+
+
+def _entry_size(entry: CacheEntry) -> int:
+    if entry.bytes is not None:
+        return int(entry.bytes)
+    try:
+        return Path(entry.path).stat().st_size
+    except OSError:
+        return 0
+
+
+def _encode_json_payload(payload: dict[str, Any]) -> bytes:
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return _JSON_PAYLOAD_MAGIC + zlib.compress(text.encode("utf-8"), _JSON_COMPRESS_LEVEL)
+
+
+def _decode_json_payload(data: bytes) -> dict[str, Any]:
+    if data.startswith(_JSON_PAYLOAD_MAGIC):
+        data = zlib.decompress(data[len(_JSON_PAYLOAD_MAGIC) :])
+    return json.loads(data.decode("utf-8"))
+
 
-__all__ = ["CacheManager"]
+__all__ = ["CacheManager", "cache_budgets_from_settings", "parse_stage_budgets"]
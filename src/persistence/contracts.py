@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Any, Protocol
+from typing import Any, Mapping, Protocol
 
 from persistence.models import (
     ArtifactRecord,
@@ -29,6 +29,10 @@ class RunStore(Protocol):
 
     def insert_run_summary(self, summary: RunSummaryRecord) -> None: ...
 
+    def insert_run_node_timings(
+        self, run_id: str, nodes: Mapping[str, Mapping[str, Any]]
+    ) -> None: ...
+
     def list_run_summaries(self, *, batch_id: str | None = None) -> list[dict[str, Any]]: ...
 
 
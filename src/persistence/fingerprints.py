@@ -0,0 +1,71 @@
+"""Parallel, cached sha256 fingerprints for input files."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Sequence
+
+from persistence.hashing import sha256_file
+from persistence.sqlite_store import SqliteStore
+
+_DEFAULT_MAX_WORKERS = 8
+
+
+def fingerprint_files(
+    paths: Sequence[Path],
+    *,
+    store: SqliteStore | None = None,
+    max_workers: int | None = None,
+) -> dict[Path, str]:
+    """Return ``{path: sha256}`` for ``paths``.
+
+    Files whose (size, mtime_ns, inode) match the fingerprint stored in
+    ``store`` are not read again; the rest are hashed on a thread pool (hashing
+    is I/O bound and releases the GIL) and written back in one transaction.
+    """
+    stats = {path: os.stat(path) for path in paths}
+    keys = {path: str(path.resolve()) for path in paths}
+    known = store.get_file_fingerprints(list(keys.values())) if store is not None else {}
+
+    hashes: dict[Path, str] = {}
+    missing: list[Path] = []
+    for path in paths:
+        row = known.get(keys[path])
+        stat = stats[path]
+        if (
+            row is not None
+            and row["size"] == stat.st_size
+            and row["mtime_ns"] == stat.st_mtime_ns
+            and row["inode"] == stat.st_ino
+        ):
+            hashes[path] = str(row["sha256"])
+        else:
+            missing.append(path)
+
+    if missing:
+        workers = max(1, min(max_workers or _DEFAULT_MAX_WORKERS, len(missing)))
+        if workers == 1:
+            computed = [sha256_file(path) for path in missing]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                computed = list(executor.map(sha256_file, missing))
+        hashes.update(zip(missing, computed, strict=True))
+        if store is not None:
+            store.put_file_fingerprints(
+                [
+                    (
+                        keys[path],
+                        stats[path].st_size,
+                        stats[path].st_mtime_ns,
+                        stats[path].st_ino,
+                        digest,
+                    )
+                    for path, digest in zip(missing, computed, strict=True)
+                ]
+            )
+    return hashes
+
+
+__all__ = ["fingerprint_files"]
@@ -82,6 +82,7 @@ def splade_cache_key(
     model_id: str,
     doc_max_length: int,
     code_version: str | None = None,
+    backend: str | None = None,
 ) -> str:
     payload = {
         "stage": "splade_doc_vectors",
@@ -89,6 +90,24 @@ def splade_cache_key(
         "model_id": model_id,
         "doc_max_length": int(doc_max_length),
     }
+    if backend and backend != "torch":
+        # Keep historical keys stable for the default torch backend.
+        payload["backend"] = backend
+    if code_version:
+        payload["code_version"] = code_version
+    return hash_payload(payload)
+
+
+def rerank_scores_cache_key(
+    doc_hash: str,
+    model_key: str,
+    code_version: str | None = None,
+) -> str:
+    payload = {
+        "stage": "rerank_scores",
+        "doc_hash": doc_hash,
+        "model_key": model_key,
+    }
     if code_version:
         payload["code_version"] = code_version
     return hash_payload(payload)
@@ -104,6 +123,7 @@ __all__ = [
     "bm25_cache_key",
     "hash_payload",
     "preprocess_cache_key",
+    "rerank_scores_cache_key",
     "sha256_bytes",
     "sha256_file",
     "splade_cache_key",
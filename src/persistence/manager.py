@@ -12,7 +12,7 @@ from uuid import uuid4
 from eagent import __version__ as _code_version
 from persistence.fs_store import FsArtifactStore
 from persistence.hashing import hash_payload
-from persistence.models import RunRecord, RunSummaryRecord
+from persistence.models import ArtifactRecord, RunRecord, RunSummaryRecord
 from persistence.sqlite_store import SqliteStore
 
 
@@ -102,88 +102,34 @@ class PersistenceManager:
         validation_reports: dict | None,
         audit_reports: list[dict] | None,
     ) -> None:
-        artifacts = []
-
-        manifest_record = self._artifacts.write_json(manifest)
-        self._store.insert_artifact(manifest_record)
-        self._store.link_artifact(
-            run_id=run_ctx.run_id,
-            artifact_id=manifest_record.artifact_id,
-            artifact_type="run_manifest",
-        )
-        self._artifacts.link_run_artifact(run_ctx.run_id, name="run_manifest.json", artifact=manifest_record)
-        artifacts.append(manifest_record)
-
-        result_record = self._artifacts.write_json(result_payload)
-        self._store.insert_artifact(result_record)
-        self._store.link_artifact(
-            run_id=run_ctx.run_id,
-            artifact_id=result_record.artifact_id,
-            artifact_type="result",
-        )
-        self._artifacts.link_run_artifact(run_ctx.run_id, name="result.json", artifact=result_record)
-        artifacts.append(result_record)
-
+        named: list[tuple[str, str, ArtifactRecord]] = [
+            ("run_manifest", "run_manifest.json", self._artifacts.write_json(manifest)),
+            ("result", "result.json", self._artifacts.write_json(result_payload)),
+        ]
         if table_markdown:
-            table_record = self._artifacts.write_text(table_markdown, ext="md")
-            self._store.insert_artifact(table_record)
-            self._store.link_artifact(
-                run_id=run_ctx.run_id,
-                artifact_id=table_record.artifact_id,
-                artifact_type="table",
-            )
-            self._artifacts.link_run_artifact(run_ctx.run_id, name="table.md", artifact=table_record)
-            artifacts.append(table_record)
-
-        if doc_structure is not None:
-            doc_record = self._artifacts.write_json(doc_structure)
-            self._store.insert_artifact(doc_record)
-            self._store.link_artifact(
-                run_id=run_ctx.run_id,
-                artifact_id=doc_record.artifact_id,
-                artifact_type="doc_structure",
-            )
-            self._artifacts.link_run_artifact(run_ctx.run_id, name="doc_structure.json", artifact=doc_record)
-
-        if question_set is not None:
-            qs_record = self._artifacts.write_json(question_set)
-            self._store.insert_artifact(qs_record)
-            self._store.link_artifact(
-                run_id=run_ctx.run_id,
-                artifact_id=qs_record.artifact_id,
-                artifact_type="question_set",
-            )
-            self._artifacts.link_run_artifact(run_ctx.run_id, name="question_set.json", artifact=qs_record)
-
-        if validated_candidates is not None:
-            vc_record = self._artifacts.write_json(validated_candidates)
-            self._store.insert_artifact(vc_record)
-            self._store.link_artifact(
-                run_id=run_ctx.run_id,
-                artifact_id=vc_record.artifact_id,
-                artifact_type="validated_candidates",
-            )
-            self._artifacts.link_run_artifact(run_ctx.run_id, name="validated_candidates.json", artifact=vc_record)
-
-        if validation_reports is not None:
-            vr_record = self._artifacts.write_json(validation_reports)
-            self._store.insert_artifact(vr_record)
-            self._store.link_artifact(
-                run_id=run_ctx.run_id,
-                artifact_id=vr_record.artifact_id,
-                artifact_type="validation_reports",
-            )
-            self._artifacts.link_run_artifact(run_ctx.run_id, name="validation_reports.json", artifact=vr_record)
-
-        if audit_reports is not None:
-            ar_record = self._artifacts.write_json(audit_reports)
-            self._store.insert_artifact(ar_record)
-            self._store.link_artifact(
-                run_id=run_ctx.run_id,
-                artifact_id=ar_record.artifact_id,
-                artifact_type="audit_reports",
-            )
-            self._artifacts.link_run_artifact(run_ctx.run_id, name="audit_reports.json", artifact=ar_record)
+            named.append(("table", "table.md", self._artifacts.write_text(table_markdown, ext="md")))
+        optional_json: list[tuple[str, Any]] = [
+            ("doc_structure", doc_structure),
+            ("question_set", question_set),
+            ("validated_candidates", validated_candidates),
+            ("validation_reports", validation_reports),
+            ("audit_reports", audit_reports),
+        ]
+        for artifact_type, payload in optional_json:
+            if payload is not None:
+                named.append((artifact_type, f"{artifact_type}.json", self._artifacts.write_json(payload)))
+
+        # Files are written first; all metadata rows for the run share one commit.
+        with self._store.transaction():
+            for artifact_type, _, record in named:
+                self._store.insert_artifact(record)
+                self._store.link_artifact(
+                    run_id=run_ctx.run_id,
+                    artifact_id=record.artifact_id,
+                    artifact_type=artifact_type,
+                )
+        for _, name, record in named:
+            self._artifacts.link_run_artifact(run_ctx.run_id, name=name, artifact=record)
 
     def finalize_run(
         self,
@@ -192,19 +138,24 @@ class PersistenceManager:
         result_payload: dict[str, Any],
         summary: RunSummaryRecord,
         runtime_ms: int | None,
+        node_timings: Mapping[str, Mapping[str, Any]] | None = None,
         warnings: list[str],
         question_set_version: str | None,
     ) -> None:
         warnings_json = json.dumps(warnings, ensure_ascii=False)
-        self._store.update_run(
-            run_ctx.run_id,
-            status="completed",
-            completed_at=datetime.now(timezone.utc),
-            runtime_ms=runtime_ms,
-            question_set_version=question_set_version,
-            warnings_json=warnings_json,
-        )
-        self._store.insert_run_summary(summary)
+        with self._store.transaction():
+            self._store.update_run(
+                run_ctx.run_id,
+                status="completed",
+                completed_at=datetime.now(timezone.utc),
+                runtime_ms=runtime_ms,
+                question_set_version=question_set_version,
+                warnings_json=warnings_json,
+            )
+            self._store.insert_run_summary(summary)
+            if node_timings:
+                self._store.insert_run_node_timings(run_ctx.run_id, node_timings)
+        self._store.flush()
 
 
 def build_manifest(
@@ -67,6 +67,8 @@ class CacheEntry:
     path: str
     created_at: datetime
     last_accessed: datetime | None
+    bytes: int | None = None
+    mtime_ns: int | None = None
 
 
 __all__ = [
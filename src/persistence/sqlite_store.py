@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import json
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Mapping
 from uuid import uuid4
 
 from persistence.models import (
@@ -67,6 +70,25 @@ CREATE TABLE IF NOT EXISTS run_summary (
     FOREIGN KEY(run_id) REFERENCES runs(run_id)
 );
 
+CREATE TABLE IF NOT EXISTS run_node_timings (
+    run_id TEXT NOT NULL,
+    node TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    wall_ms REAL NOT NULL,
+    cpu_ms REAL NOT NULL,
+    llm_calls INTEGER NOT NULL,
+    llm_ms REAL NOT NULL,
+    llm_errors INTEGER NOT NULL,
+    llm_retries INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_hits INTEGER NOT NULL,
+    cache_misses INTEGER NOT NULL,
+    peak_rss_mb REAL,
+    PRIMARY KEY(run_id, node),
+    FOREIGN KEY(run_id) REFERENCES runs(run_id)
+);
+
 CREATE TABLE IF NOT EXISTS artifacts (
     artifact_id TEXT PRIMARY KEY,
     content_hash TEXT NOT NULL,
@@ -93,16 +115,77 @@ CREATE TABLE IF NOT EXISTS cache_entries (
     path TEXT NOT NULL,
     created_at TEXT NOT NULL,
     last_accessed TEXT,
+    bytes INTEGER,
     PRIMARY KEY(stage, cache_key)
 );
 CREATE INDEX IF NOT EXISTS idx_cache_entries_stage ON cache_entries(stage);
+
+CREATE TABLE IF NOT EXISTS file_fingerprints (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cache_evictions (
+    stage TEXT PRIMARY KEY,
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_evicted_at TEXT
+);
 """
 
+# Columns added after the first schema version, applied to existing databases.
+_MIGRATIONS = (
+    ("cache_entries", "bytes", "INTEGER"),
+    ("cache_entries", "mtime_ns", "INTEGER"),
+)
+
+# Numeric run_node_timings columns, in table order after (run_id, node).
+_NODE_TIMING_COLUMNS = (
+    "calls",
+    "wall_ms",
+    "cpu_ms",
+    "llm_calls",
+    "llm_ms",
+    "llm_errors",
+    "llm_retries",
+    "input_tokens",
+    "output_tokens",
+    "cache_hits",
+    "cache_misses",
+)
+
+# Applied to every connection. WAL + synchronous=NORMAL keeps commits durable
+# across process crashes without an fsync per transaction.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+)
+_DEFAULT_BUSY_TIMEOUT_S = 30.0
+# Cache hits only record last_accessed; buffer that many before writing them.
+_TOUCH_FLUSH_THRESHOLD = 64
+
 
 class SqliteStore:
-    def __init__(self, path: str | Path) -> None:
+    """Metadata store with one reused connection per thread (and process).
+
+    Each write method commits on its own unless it runs inside
+    :meth:`transaction`, which groups writes into one commit (nested blocks join
+    the outer transaction).
+    """
+
+    def __init__(self, path: str | Path, *, busy_timeout: float = _DEFAULT_BUSY_TIMEOUT_S) -> None:
         self._path = Path(path)
         self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._busy_timeout = float(busy_timeout)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+        self._pending_touches: dict[tuple[str, str], str] = {}
         self._initialize()
 
     @property
@@ -110,14 +193,81 @@ class SqliteStore:
         return self._path
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self._path)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
         conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.depth = 0
+        with self._lock:
+            self._connections.append(conn)
         return conn
 
     def _initialize(self) -> None:
-        with self._connect() as conn:
-            conn.executescript(_SCHEMA)
-            conn.commit()
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        for table, column, decl in _MIGRATIONS:
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed writes in a single transaction (one commit)."""
+        conn = self._connect()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def flush(self) -> None:
+        """Write buffered cache ``last_accessed`` updates."""
+        with self._lock:
+            pending = self._pending_touches
+            self._pending_touches = {}
+        if not pending:
+            return
+        with self.transaction() as conn:
+            conn.executemany(
+                "UPDATE cache_entries SET last_accessed = ? WHERE stage = ? AND cache_key = ?",
+                [(stamp, stage, key) for (stage, key), stamp in pending.items()],
+            )
+
+    def close(self) -> None:
+        """Flush pending updates and close every connection opened by this store."""
+        self.flush()
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
 
     def create_document(
         self,
@@ -133,12 +283,11 @@ class SqliteStore:
             return _row_to_document(existing)
         doc_id = _new_id("doc")
         created_at = _now_iso()
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 "INSERT INTO documents (doc_id, sha256, filename, bytes, created_at) VALUES (?, ?, ?, ?, ?)",
                 (doc_id, sha256, filename, bytes_size, created_at),
             )
-            conn.commit()
         return DocumentRecord(
             doc_id=doc_id,
             sha256=sha256,
@@ -156,12 +305,11 @@ class SqliteStore:
         batch_id = _new_id("batch")
         created_at = _now_iso()
         metadata_json = json.dumps(metadata, ensure_ascii=False, sort_keys=True) if metadata else None
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 "INSERT INTO batches (batch_id, name, metadata_json, created_at) VALUES (?, ?, ?, ?)",
                 (batch_id, name, metadata_json, created_at),
             )
-            conn.commit()
         return BatchRecord(
             batch_id=batch_id,
             name=name,
@@ -170,7 +318,7 @@ class SqliteStore:
         )
 
     def create_run(self, record: RunRecord) -> None:
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 """
                 INSERT INTO runs (
@@ -194,7 +342,6 @@ class SqliteStore:
                     record.warnings_json,
                 ),
             )
-            conn.commit()
 
     def update_run(self, run_id: str, **fields: object) -> None:
         if not fields:
@@ -208,15 +355,14 @@ class SqliteStore:
             else:
                 values.append(value)
         values.append(run_id)
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 f"UPDATE runs SET {', '.join(columns)} WHERE run_id = ?",
                 values,
             )
-            conn.commit()
 
     def insert_run_summary(self, summary: RunSummaryRecord) -> None:
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 """
                 INSERT OR REPLACE INTO run_summary (
@@ -231,10 +377,42 @@ class SqliteStore:
                     summary.validated_evidence_count,
                 ),
             )
-            conn.commit()
+
+    def insert_run_node_timings(
+        self, run_id: str, nodes: Mapping[str, Mapping[str, Any]]
+    ) -> None:
+        """Store per-node measurements of a run (see ``utils.tracing``)."""
+        rows = [
+            (
+                run_id,
+                node,
+                *(timing.get(column) or 0 for column in _NODE_TIMING_COLUMNS),
+                timing.get("peak_rss_mb"),
+            )
+            for node, timing in nodes.items()
+        ]
+        if not rows:
+            return
+        columns = ", ".join(("run_id", "node", *_NODE_TIMING_COLUMNS, "peak_rss_mb"))
+        placeholders = ", ".join("?" for _ in range(len(_NODE_TIMING_COLUMNS) + 3))
+        with self.transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO run_node_timings ({columns}) VALUES ({placeholders})",
+                rows,
+            )
+
+    def list_run_node_timings(self, run_id: str) -> dict[str, dict[str, Any]]:
+        rows = self._fetch_all(
+            "SELECT * FROM run_node_timings WHERE run_id = ? ORDER BY rowid",
+            (run_id,),
+        )
+        return {
+            row["node"]: {key: row[key] for key in row.keys() if key not in {"run_id", "node"}}
+            for row in rows
+        }
 
     def insert_artifact(self, record: ArtifactRecord) -> None:
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 """
                 INSERT OR REPLACE INTO artifacts (
@@ -250,15 +428,13 @@ class SqliteStore:
                     record.created_at.isoformat(),
                 ),
             )
-            conn.commit()
 
     def link_artifact(self, *, run_id: str, artifact_id: str, artifact_type: str) -> None:
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 "INSERT INTO run_artifacts (run_id, artifact_id, type) VALUES (?, ?, ?)",
                 (run_id, artifact_id, artifact_type),
             )
-            conn.commit()
 
     def get_cache_entry(self, *, stage: str, cache_key: str) -> CacheEntry | None:
         row = self._fetch_one(
@@ -268,12 +444,13 @@ class SqliteStore:
         return _row_to_cache(row) if row else None
 
     def put_cache_entry(self, entry: CacheEntry) -> None:
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 """
                 INSERT OR REPLACE INTO cache_entries (
-                    cache_key, stage, content_hash, path, created_at, last_accessed
-                ) VALUES (?, ?, ?, ?, ?, ?)
+                    cache_key, stage, content_hash, path, created_at, last_accessed, bytes,
+                    mtime_ns
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     entry.cache_key,
@@ -282,36 +459,82 @@ class SqliteStore:
                     entry.path,
                     entry.created_at.isoformat(),
                     entry.last_accessed.isoformat() if entry.last_accessed else None,
+                    entry.bytes,
+                    entry.mtime_ns,
                 ),
             )
-            conn.commit()
 
     def touch_cache_entry(self, *, stage: str, cache_key: str) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                "UPDATE cache_entries SET last_accessed = ? WHERE stage = ? AND cache_key = ?",
-                (_now_iso(), stage, cache_key),
-            )
-            conn.commit()
+        """Record a cache hit; written in batches (see :meth:`flush`)."""
+        with self._lock:
+            self._pending_touches[(stage, cache_key)] = _now_iso()
+            due = len(self._pending_touches) >= _TOUCH_FLUSH_THRESHOLD
+        if due:
+            self.flush()
 
     def delete_cache_entry(self, *, stage: str, cache_key: str) -> None:
-        with self._connect() as conn:
+        with self.transaction() as conn:
             conn.execute(
                 "DELETE FROM cache_entries WHERE stage = ? AND cache_key = ?",
                 (stage, cache_key),
             )
-            conn.commit()
 
     def list_cache_stats(self) -> list[dict[str, Any]]:
         rows = self._fetch_all(
             """
-            SELECT stage, COUNT(*) AS count FROM cache_entries
-            GROUP BY stage
-            ORDER BY stage
+            SELECT s.stage AS stage,
+                   COALESCE(c.count, 0) AS count,
+                   COALESCE(c.bytes, 0) AS bytes,
+                   COALESCE(e.entries, 0) AS evicted_entries,
+                   COALESCE(e.bytes, 0) AS evicted_bytes,
+                   e.last_evicted_at AS last_evicted_at
+              FROM (SELECT stage FROM cache_entries UNION SELECT stage FROM cache_evictions) s
+              LEFT JOIN (
+                    SELECT stage, COUNT(*) AS count, SUM(COALESCE(bytes, 0)) AS bytes
+                      FROM cache_entries GROUP BY stage
+                   ) c ON c.stage = s.stage
+              LEFT JOIN cache_evictions e ON e.stage = s.stage
+             ORDER BY s.stage
             """
         )
         return [dict(row) for row in rows]
 
+    def cache_usage_bytes(self, *, stage: str | None = None) -> int:
+        if stage is None:
+            row = self._fetch_one("SELECT SUM(COALESCE(bytes, 0)) AS total FROM cache_entries")
+        else:
+            row = self._fetch_one(
+                "SELECT SUM(COALESCE(bytes, 0)) AS total FROM cache_entries WHERE stage = ?",
+                (stage,),
+            )
+        return int(row["total"] or 0) if row else 0
+
+    def list_cache_entries_lru(self, *, stage: str | None = None) -> list[CacheEntry]:
+        """Return cache entries least-recently used first (pending touches included)."""
+        self.flush()
+        order = "ORDER BY COALESCE(last_accessed, created_at) ASC, created_at ASC"
+        if stage is None:
+            rows = self._fetch_all(f"SELECT * FROM cache_entries {order}")
+        else:
+            rows = self._fetch_all(
+                f"SELECT * FROM cache_entries WHERE stage = ? {order}", (stage,)
+            )
+        return [_row_to_cache(row) for row in rows]
+
+    def record_cache_evictions(self, *, stage: str, entries: int, bytes_size: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO cache_evictions (stage, entries, bytes, last_evicted_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(stage) DO UPDATE SET
+                    entries = entries + excluded.entries,
+                    bytes = bytes + excluded.bytes,
+                    last_evicted_at = excluded.last_evicted_at
+                """,
+                (stage, int(entries), int(bytes_size), _now_iso()),
+            )
+
     def list_cache_entries_older_than(self, cutoff: datetime) -> list[CacheEntry]:
         rows = self._fetch_all(
             "SELECT * FROM cache_entries WHERE created_at < ?",
@@ -319,6 +542,56 @@ class SqliteStore:
         )
         return [_row_to_cache(row) for row in rows]
 
+    def get_file_fingerprints(self, paths: list[str]) -> dict[str, sqlite3.Row]:
+        """Return stored fingerprints for the given absolute paths."""
+        found: dict[str, sqlite3.Row] = {}
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(paths), 500):
+            chunk = paths[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._fetch_all(
+                f"SELECT * FROM file_fingerprints WHERE path IN ({placeholders})",
+                tuple(chunk),
+            )
+            found.update({row["path"]: row for row in rows})
+        return found
+
+    def put_file_fingerprints(self, rows: list[tuple[str, int, int, int, str]]) -> None:
+        """Upsert ``(path, size, mtime_ns, inode, sha256)`` rows in one transaction."""
+        if not rows:
+            return
+        updated_at = _now_iso()
+        with self.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO file_fingerprints (
+                    path, size, mtime_ns, inode, sha256, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [(*row, updated_at) for row in rows],
+            )
+
+    def get_runtime_ms_by_sha256(self, sha256s: list[str]) -> dict[str, int]:
+        """Return the mean runtime of completed runs per document hash."""
+        found: dict[str, int] = {}
+        for start in range(0, len(sha256s), 500):
+            chunk = sha256s[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._fetch_all(
+                f"""
+                SELECT d.sha256 AS sha256, AVG(r.runtime_ms) AS runtime_ms
+                  FROM runs r
+                  JOIN documents d ON d.doc_id = r.doc_id
+                 WHERE r.status = 'completed'
+                   AND r.runtime_ms IS NOT NULL
+                   AND d.sha256 IN ({placeholders})
+                 GROUP BY d.sha256
+                """,
+                tuple(chunk),
+            )
+            found.update({row["sha256"]: int(row["runtime_ms"]) for row in rows})
+        return found
+
     def list_run_summaries(self, *, batch_id: str | None = None) -> list[dict[str, Any]]:
         if batch_id:
             rows = self._fetch_all(
@@ -345,14 +618,10 @@ class SqliteStore:
         return [dict(row) for row in rows]
 
     def _fetch_one(self, query: str, params: tuple[object, ...] = ()) -> sqlite3.Row | None:
-        with self._connect() as conn:
-            cur = conn.execute(query, params)
-            return cur.fetchone()
+        return self._connect().execute(query, params).fetchone()
 
     def _fetch_all(self, query: str, params: tuple[object, ...] = ()) -> list[sqlite3.Row]:
-        with self._connect() as conn:
-            cur = conn.execute(query, params)
-            return cur.fetchall()
+        return self._connect().execute(query, params).fetchall()
 
 
 def _new_id(prefix: str) -> str:
@@ -385,6 +654,8 @@ def _row_to_cache(row: sqlite3.Row) -> CacheEntry:
         path=row["path"],
         created_at=_from_iso(row["created_at"]),
         last_accessed=_from_iso(row["last_accessed"]) if row["last_accessed"] else None,
+        bytes=row["bytes"],
+        mtime_ns=row["mtime_ns"],
     )
 
 
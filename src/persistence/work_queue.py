@@ -0,0 +1,375 @@
+"""Lease-based work queue for multi-host batch execution.
+
+The queue lives in a SQLite file next to the batch outputs (typically on a
+shared volume). Workers claim one item at a time under a time-bounded lease,
+renew it with heartbeats while the item runs, and record the result when they
+finish. Items whose lease expired without a result are handed to the next
+worker that asks.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_items (
+    item_key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    payload_json TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_json TEXT,
+    pdf_sha256 TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_items_status ON queue_items(status, position);
+"""
+
+# Created after the column migration so queue files from older versions open.
+_SHA256_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_queue_items_sha256 ON queue_items(pdf_sha256, status)"
+)
+
+# WAL needs shared memory between readers, which does not work across hosts;
+# the rollback journal only relies on file locks.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=DELETE",
+    "PRAGMA synchronous=FULL",
+)
+_DEFAULT_BUSY_TIMEOUT_S = 60.0
+
+QUEUE_STATUSES = ("pending", "running", "success", "failed")
+_TERMINAL_STATUSES = ("success", "failed")
+
+
+@dataclass(frozen=True)
+class QueueItem:
+    item_key: str
+    payload: dict[str, Any]
+    status: str
+    attempts: int
+    lease_owner: str | None
+    lease_expires_at: float | None
+    result: dict[str, Any] | None
+    updated_at: float
+
+
+class BatchWorkQueue:
+    """Shared queue of batch items with lease/heartbeat semantics.
+
+    Every operation opens a short-lived connection so that the file can be
+    used safely from several processes and hosts at once.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        *,
+        busy_timeout_s: float = _DEFAULT_BUSY_TIMEOUT_S,
+    ) -> None:
+        self._db_path = Path(db_path)
+        self._busy_timeout_s = busy_timeout_s
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        with self.exclusive() as conn:
+            _migrate_schema(conn)
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(
+            self._db_path,
+            timeout=self._busy_timeout_s,
+            isolation_level=None,
+        )
+        conn.row_factory = sqlite3.Row
+        try:
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[sqlite3.Connection]:
+        """Hold the queue write lock; also serializes shared summary writes."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def register(
+        self,
+        items: Iterable[tuple[str, Mapping[str, Any]]],
+        *,
+        reset: bool = False,
+    ) -> int:
+        """Add ``(item_key, payload)`` pairs; returns the number of new items.
+
+        Existing items keep their status and result. Pending items get the new
+        payload so that re-registering with changed options takes effect.
+        """
+        now = time.time()
+        added = 0
+        with self.exclusive() as conn:
+            if reset:
+                conn.execute("DELETE FROM queue_items")
+            position = conn.execute(
+                "SELECT COALESCE(MAX(position), -1) FROM queue_items"
+            ).fetchone()[0]
+            for item_key, payload in items:
+                payload_json = json.dumps(dict(payload), ensure_ascii=False, sort_keys=True)
+                row = conn.execute(
+                    "SELECT status FROM queue_items WHERE item_key = ?",
+                    (item_key,),
+                ).fetchone()
+                if row is None:
+                    position += 1
+                    conn.execute(
+                        """
+                        INSERT INTO queue_items (
+                            item_key, position, payload_json, status, pdf_sha256, updated_at
+                        ) VALUES (?, ?, ?, 'pending', ?, ?)
+                        """,
+                        (item_key, position, payload_json, _sha256_of(payload), now),
+                    )
+                    added += 1
+                elif row["status"] == "pending":
+                    conn.execute(
+                        """
+                        UPDATE queue_items SET payload_json = ?, pdf_sha256 = ?, updated_at = ?
+                        WHERE item_key = ?
+                        """,
+                        (payload_json, _sha256_of(payload), now, item_key),
+                    )
+        return added
+
+    def requeue(self, item_keys: Iterable[str]) -> int:
+        """Return failed items to ``pending`` so the next worker retries them."""
+        now = time.time()
+        count = 0
+        with self.exclusive() as conn:
+            for item_key in item_keys:
+                cursor = conn.execute(
+                    """
+                    UPDATE queue_items
+                    SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                        attempts = 0, result_json = NULL, updated_at = ?
+                    WHERE item_key = ? AND status = 'failed'
+                    """,
+                    (now, item_key),
+                )
+                count += cursor.rowcount
+        return count
+
+    def claim(
+        self,
+        owner: str,
+        *,
+        lease_seconds: float,
+        max_attempts: int | None = None,
+    ) -> QueueItem | None:
+        """Lease the next pending (or expired) item to ``owner``.
+
+        Expired items that already used ``max_attempts`` leases are marked
+        failed instead of being handed out again.
+        """
+        now = time.time()
+        with self.exclusive() as conn:
+            while True:
+                row = conn.execute(
+                    """
+                    SELECT * FROM queue_items
+                    WHERE status = 'pending'
+                       OR (status = 'running' AND lease_expires_at < ?)
+                    ORDER BY position
+                    LIMIT 1
+                    """,
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                attempts = int(row["attempts"])
+                if (
+                    row["status"] == "running"
+                    and max_attempts is not None
+                    and attempts >= max_attempts
+                ):
+                    result = {
+                        "status": "failed",
+                        "error": f"lease expired after {attempts} attempts "
+                        f"(last owner: {row['lease_owner']})",
+                    }
+                    conn.execute(
+                        """
+                        UPDATE queue_items
+                        SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL,
+                            result_json = ?, updated_at = ?
+                        WHERE item_key = ?
+                        """,
+                        (json.dumps(result, ensure_ascii=False), now, row["item_key"]),
+                    )
+                    continue
+                conn.execute(
+                    """
+                    UPDATE queue_items
+                    SET status = 'running', lease_owner = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE item_key = ?
+                    """,
+                    (owner, now + lease_seconds, now, row["item_key"]),
+                )
+                return QueueItem(
+                    item_key=str(row["item_key"]),
+                    payload=json.loads(row["payload_json"]),
+                    status="running",
+                    attempts=attempts + 1,
+                    lease_owner=owner,
+                    lease_expires_at=now + lease_seconds,
+                    result=None,
+                    updated_at=now,
+                )
+
+    def heartbeat(self, owner: str, item_key: str, *, lease_seconds: float) -> bool:
+        """Extend the lease; returns False when ``owner`` no longer holds it."""
+        now = time.time()
+        with self.exclusive() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE queue_items SET lease_expires_at = ?, updated_at = ?
+                WHERE item_key = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (now + lease_seconds, now, item_key, owner),
+            )
+            return cursor.rowcount == 1
+
+    def complete(
+        self,
+        owner: str,
+        item_key: str,
+        *,
+        status: str,
+        result: Mapping[str, Any],
+    ) -> bool:
+        """Record a terminal result; ignored if the lease was taken over."""
+        if status not in _TERMINAL_STATUSES:
+            raise ValueError(f"status must be one of {_TERMINAL_STATUSES}, got {status!r}")
+        now = time.time()
+        with self.exclusive() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE queue_items
+                SET status = ?, lease_owner = NULL, lease_expires_at = NULL,
+                    result_json = ?, pdf_sha256 = COALESCE(?, pdf_sha256), updated_at = ?
+                WHERE item_key = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (
+                    status,
+                    json.dumps(dict(result), ensure_ascii=False),
+                    _sha256_of(result),
+                    now,
+                    item_key,
+                    owner,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def counts(self) -> dict[str, int]:
+        counts = {status: 0 for status in QUEUE_STATUSES}
+        with self._connect() as conn:
+            for row in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM queue_items GROUP BY status"
+            ):
+                counts[str(row["status"])] = int(row["n"])
+        counts["total"] = sum(counts[status] for status in QUEUE_STATUSES)
+        return counts
+
+    def is_drained(self) -> bool:
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["running"] == 0
+
+    def get(self, item_key: str) -> QueueItem | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM queue_items WHERE item_key = ?", (item_key,)
+            ).fetchone()
+        return _row_to_item(row) if row is not None else None
+
+    def find_success_by_sha256(
+        self,
+        pdf_sha256: str,
+        *,
+        exclude_key: str | None = None,
+    ) -> list[QueueItem]:
+        """Successful items for the same PDF content, oldest first (indexed lookup)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT * FROM queue_items
+                WHERE status = 'success' AND pdf_sha256 = ? AND item_key != ?
+                ORDER BY position
+                """,
+                (pdf_sha256, exclude_key or ""),
+            ).fetchall()
+        return [_row_to_item(row) for row in rows]
+
+    def items(self) -> list[QueueItem]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM queue_items ORDER BY position").fetchall()
+        return [_row_to_item(row) for row in rows]
+
+
+def _migrate_schema(conn: sqlite3.Connection) -> None:
+    """Add the ``pdf_sha256`` column to queue files created before it existed."""
+    columns = {str(row["name"]) for row in conn.execute("PRAGMA table_info(queue_items)")}
+    if "pdf_sha256" not in columns:
+        conn.execute("ALTER TABLE queue_items ADD COLUMN pdf_sha256 TEXT")
+        rows = conn.execute("SELECT item_key, payload_json, result_json FROM queue_items")
+        for row in rows.fetchall():
+            result = json.loads(row["result_json"]) if row["result_json"] else {}
+            sha256 = _sha256_of(result) or _sha256_of(json.loads(row["payload_json"]))
+            if sha256 is not None:
+                conn.execute(
+                    "UPDATE queue_items SET pdf_sha256 = ? WHERE item_key = ?",
+                    (sha256, row["item_key"]),
+                )
+    conn.execute(_SHA256_INDEX)
+
+
+def _sha256_of(data: Mapping[str, Any]) -> str | None:
+    value = data.get("pdf_sha256")
+    return value if isinstance(value, str) and value else None
+
+
+def _row_to_item(row: sqlite3.Row) -> QueueItem:
+    result_json = row["result_json"]
+    return QueueItem(
+        item_key=str(row["item_key"]),
+        payload=json.loads(row["payload_json"]),
+        status=str(row["status"]),
+        attempts=int(row["attempts"]),
+        lease_owner=row["lease_owner"],
+        lease_expires_at=row["lease_expires_at"],
+        result=json.loads(result_json) if result_json else None,
+        updated_at=float(row["updated_at"]),
+    )
+
+
+__all__ = ["BatchWorkQueue", "QUEUE_STATUSES", "QueueItem"]
@@ -5,7 +5,6 @@ from __future__ import annotations
 from typing import Any, Dict, Iterable, List, Mapping, Sequence
 
 from schemas.internal.decisions import DomainDecision
-from schemas.internal.documents import DocStructure
 from schemas.internal.locator import DomainId
 from schemas.internal.results import (
     Citation,
@@ -16,7 +15,8 @@ from schemas.internal.results import (
     Rob2FinalOutput,
     Rob2OverallResult,
 )
-from schemas.internal.rob2 import QuestionSet, Rob2Question
+from schemas.internal.rob2 import Rob2Question
+from pipelines.graphs.nodes.state_models import validated_doc_structure, validated_question_set
 
 
 _DOMAIN_ORDER: list[DomainId] = ["D1", "D2", "D3", "D4", "D5"]
@@ -33,12 +33,12 @@ def aggregate_node(state: dict) -> dict:
     raw_doc = state.get("doc_structure")
     if raw_doc is None:
         raise ValueError("aggregate_node requires 'doc_structure'.")
-    doc_structure = DocStructure.model_validate(raw_doc)
+    doc_structure = validated_doc_structure(state, raw_doc)
 
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("aggregate_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
 
     decisions = _load_domain_decisions(state)
     questions_by_id = {q.question_id: q for q in question_set.questions}
@@ -29,6 +29,7 @@ from schemas.internal.evidence import (
 )
 from schemas.internal.locator import DomainId
 from schemas.internal.rob2 import QuestionCondition, QuestionSet, Rob2Question
+from pipelines.graphs.nodes.state_models import validated_doc_structure, validated_question_set
 from utils.text import normalize_block
 from utils.llm_json import extract_json_object
 
@@ -145,12 +146,12 @@ def _run_domain_audit_node(
     raw_doc = state.get("doc_structure")
     if raw_doc is None:
         raise ValueError("domain_audit_node requires 'doc_structure'.")
-    doc_structure = DocStructure.model_validate(raw_doc)
+    doc_structure = validated_doc_structure(state, raw_doc)
 
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("domain_audit_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
 
     raw_candidates = state.get("validated_candidates")
     if raw_candidates is None:
@@ -263,12 +264,12 @@ def _run_all_domains_audit_node(state: dict, *, effect_type: str) -> dict:
     raw_doc = state.get("doc_structure")
     if raw_doc is None:
         raise ValueError("domain_audit_node requires 'doc_structure'.")
-    doc_structure = DocStructure.model_validate(raw_doc)
+    doc_structure = validated_doc_structure(state, raw_doc)
 
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("domain_audit_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
 
     mode = _read_audit_mode(state)
     if mode == "none":
@@ -466,7 +467,7 @@ def _invoke_audit_model(
 ) -> _AuditOutput:
     model = llm
     if model is None:
-        from langchain.chat_models import init_chat_model
+        from utils.llm_cassette import init_chat_model
 
         kwargs: dict[str, Any] = {}
         if model_provider:
@@ -261,7 +261,7 @@ def _format_conditions(conditions: Sequence[QuestionCondition]) -> List[dict]:
 
 
 def _init_chat_model(config: LLMReasoningConfig) -> ChatModelLike:
-    from langchain.chat_models import init_chat_model
+    from utils.llm_cassette import init_chat_model
 
     kwargs: dict[str, Any] = {}
     if config.model_provider:
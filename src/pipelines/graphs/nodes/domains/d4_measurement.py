@@ -9,14 +9,14 @@ from pipelines.graphs.nodes.domains.common import (
     run_domain_reasoning,
 )
 from schemas.internal.decisions import DomainDecision
-from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import expand_candidate_map, validated_question_set
 
 
 def d4_measurement_node(state: dict) -> dict:
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("d4_measurement_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
 
     raw_candidates = state.get("validated_candidates")
     if raw_candidates is None:
@@ -32,7 +32,7 @@ def d4_measurement_node(state: dict) -> dict:
     decision: DomainDecision = run_domain_reasoning(
         domain="D4",
         question_set=question_set,
-        validated_candidates=raw_candidates,
+        validated_candidates=expand_candidate_map(state, raw_candidates),
         llm=llm,
         llm_config=None if llm is not None else config,
         evidence_top_k=int(state.get("domain_evidence_top_k") or 5),
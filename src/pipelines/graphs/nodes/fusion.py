@@ -10,7 +10,12 @@ from typing import Any, Dict, Iterable, List, Mapping
 
 from evidence.fusion import fuse_candidates_for_question
 from schemas.internal.evidence import EvidenceCandidate, FusedEvidenceBundle
-from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    load_candidates,
+    validated_question_set,
+)
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_bundles,
@@ -58,7 +63,7 @@ def fusion_node(state: dict) -> dict:
     if retry_ids:
         if raw_questions is not None:
             try:
-                question_set = QuestionSet.model_validate(raw_questions)
+                question_set = validated_question_set(state, raw_questions)
                 filtered = filter_question_set(question_set, retry_ids)
                 question_ids = [q.question_id for q in filtered.questions]
                 missing = sorted(retry_ids - set(question_ids))
@@ -76,9 +81,7 @@ def fusion_node(state: dict) -> dict:
             raw_list = payload.get(question_id)
             if not isinstance(raw_list, list) or not raw_list:
                 continue
-            per_engine[engine] = [
-                EvidenceCandidate.model_validate(item) for item in raw_list
-            ]
+            per_engine[engine] = load_candidates(state, raw_list, EvidenceCandidate)
 
         fused = fuse_candidates_for_question(
             question_id,
@@ -86,9 +89,11 @@ def fusion_node(state: dict) -> dict:
             rrf_k=rrf_k,
             engine_weights=weights,
         )
-        fused_candidates[question_id] = [item.model_dump() for item in fused]
+        fused_candidates[question_id] = compact_candidates(state, fused)
         bundles.append(
-            FusedEvidenceBundle(question_id=question_id, items=fused[:top_k]).model_dump()
+            compact_bundle(
+                state, FusedEvidenceBundle(question_id=question_id, items=fused[:top_k])
+            )
         )
 
     if retry_ids:
@@ -97,7 +102,7 @@ def fusion_node(state: dict) -> dict:
         )
         if raw_questions is not None:
             try:
-                question_set = QuestionSet.model_validate(raw_questions)
+                question_set = validated_question_set(state, raw_questions)
                 bundles = merge_bundles(state.get("fusion_evidence"), bundles, question_set)
             except Exception:
                 pass
@@ -130,7 +135,7 @@ def _ordered_question_ids(
         return sorted(union)
 
     try:
-        question_set = QuestionSet.model_validate(raw_questions)
+        question_set = validated_question_set(state, raw_questions)
     except Exception:
         return sorted(union)
 
@@ -14,9 +14,15 @@ from pydantic import BaseModel, ConfigDict, Field, ValidationError
 from retrieval.engines.bm25 import BM25Index, build_bm25_index
 from retrieval.structure.section_prior import normalize_for_match, score_section_title
 from retrieval.tokenization import resolve_tokenizer_config
-from schemas.internal.documents import DocStructure, SectionSpan
+from schemas.internal.documents import SectionSpan
 from schemas.internal.evidence import EvidenceCandidate
-from schemas.internal.rob2 import QuestionSet, Rob2Question
+from schemas.internal.rob2 import Rob2Question
+from pipelines.graphs.nodes.state_models import (
+    compact_candidates,
+    expand_candidate,
+    validated_doc_structure,
+    validated_question_set,
+)
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_by_question,
@@ -67,7 +73,7 @@ class LLMLocatorConfig:
     max_retries: int | None = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class _CandidateInfo:
     span: SectionSpan
     score: float
@@ -109,8 +115,8 @@ def llm_locator_node(state: dict) -> dict:
     if raw_questions is None:
         raise ValueError("llm_locator_node requires 'question_set'.")
 
-    doc_structure = DocStructure.model_validate(raw_doc)
-    question_set = QuestionSet.model_validate(raw_questions)
+    doc_structure = validated_doc_structure(state, raw_doc)
+    question_set = validated_question_set(state, raw_questions)
 
     mode = str(state.get("llm_locator_mode") or "none").strip().lower()
     if mode not in {"llm", "none"}:
@@ -248,7 +254,7 @@ def llm_locator_node(state: dict) -> dict:
                 max_candidates=max_candidates,
             )
 
-        candidates_by_q[question_id] = [candidate.model_dump() for candidate in evidence_pool]
+        candidates_by_q[question_id] = compact_candidates(state, evidence_pool)
         debug[question_id] = {
             "steps": debug_steps,
             "seed_top_n": seed_top_n,
@@ -268,7 +274,7 @@ def llm_locator_node(state: dict) -> dict:
 
 
 def _init_chat_model(config: LLMLocatorConfig) -> ChatModelLike:
-    from langchain.chat_models import init_chat_model
+    from utils.llm_cassette import init_chat_model
 
     kwargs: dict[str, Any] = {}
     if config.model_provider:
@@ -406,7 +412,7 @@ def _seed_from_map(
         return
     for raw in raw_list[:seed_top_n]:
         try:
-            candidate = EvidenceCandidate.model_validate(raw)
+            candidate = EvidenceCandidate.model_validate(expand_candidate(raw, spans_by_pid))
         except Exception:
             continue
         span = spans_by_pid.get(candidate.paragraph_id)
@@ -0,0 +1,74 @@
+"""Cross-question reranking with reusable (query, passage) score caches."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Tuple
+
+from eagent import __version__ as _code_version
+from persistence.hashing import rerank_scores_cache_key
+from retrieval.rerankers.apply import (
+    RerankBatchStats,
+    RerankJob,
+    apply_reranker_batch,
+    reranker_model_key,
+)
+from retrieval.rerankers.contracts import Reranker
+from schemas.internal.evidence import EvidenceCandidate
+
+_CACHE_STAGE = "rerank_scores"
+
+
+def rerank_jobs_with_cache(
+    state: Mapping[str, Any],
+    *,
+    reranker: Reranker,
+    jobs: Mapping[str, RerankJob],
+    top_n: int,
+    max_length: int,
+    batch_size: int,
+    max_tokens_per_batch: int | None,
+) -> Tuple[Dict[str, List[EvidenceCandidate]], RerankBatchStats, Dict[str, Dict[str, float]]]:
+    """Rerank all jobs in one pass, reusing scores from state and the persistent cache.
+
+    Returns the reranked candidates per job, batch stats, and the updated
+    ``rerank_scores`` state payload (``{model_key: {pair_key: score}}``).
+    """
+    model_key = reranker_model_key(reranker, max_length=max_length)
+    state_scores: Dict[str, Dict[str, float]] = {
+        key: dict(value)
+        for key, value in (state.get("rerank_scores") or {}).items()
+        if isinstance(value, Mapping)
+    }
+    scores = state_scores.setdefault(model_key, {})
+
+    cache = state.get("cache_manager")
+    doc_hash = state.get("doc_hash")
+    cache_key: str | None = None
+    if cache is not None and doc_hash and cache.enabled_for(_CACHE_STAGE):
+        cache_key = rerank_scores_cache_key(
+            str(doc_hash), model_key, code_version=_code_version
+        )
+        cached = cache.get_json(stage=_CACHE_STAGE, key=cache_key) or {}
+        for pair_key, score in (cached.get("scores") or {}).items():
+            scores.setdefault(str(pair_key), float(score))
+
+    reranked, stats = apply_reranker_batch(
+        reranker=reranker,
+        jobs=jobs,
+        top_n=top_n,
+        max_length=max_length,
+        batch_size=batch_size,
+        max_tokens_per_batch=max_tokens_per_batch,
+        score_cache=scores,
+    )
+
+    if cache is not None and cache_key and stats.scored:
+        cache.set_json(
+            stage=_CACHE_STAGE,
+            key=cache_key,
+            payload={"model_key": model_key, "scores": scores},
+        )
+    return reranked, stats, state_scores
+
+
+__all__ = ["rerank_jobs_with_cache"]
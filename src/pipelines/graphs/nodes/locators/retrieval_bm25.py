@@ -12,19 +12,25 @@ from typing import Dict, List, Tuple
 
 from retrieval.engines.bm25 import BM25Hit, BM25Index, build_bm25_index
 from retrieval.engines.fusion import rrf_fuse
+from retrieval.onnx_backend import normalize_inference_backend
 from retrieval.query_planning.llm import LLMQueryPlannerConfig, generate_query_plan_llm
 from retrieval.query_planning.planner import generate_query_plan
-from retrieval.rerankers.apply import apply_reranker
+from retrieval.rerankers.apply import RerankJob
 from retrieval.rerankers.cross_encoder import (
     DEFAULT_CROSS_ENCODER_MODEL_ID,
     get_cross_encoder_reranker,
 )
 from retrieval.structure.filters import filter_spans_by_section_priors
-from retrieval.tokenization import resolve_tokenizer_config
+from retrieval.tokenization import TokenizerConfig, resolve_tokenizer_config
 from rob2.locator_rules import get_locator_rules
-from schemas.internal.documents import DocStructure
 from schemas.internal.evidence import EvidenceBundle, EvidenceCandidate
-from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    validated_doc_structure,
+    validated_question_set,
+)
+from pipelines.graphs.nodes.locators.rerank_cache import rerank_jobs_with_cache
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_bundles,
@@ -32,6 +38,7 @@ from pipelines.graphs.nodes.retry_utils import (
     read_retry_question_ids,
 )
 from eagent import __version__ as _code_version
+from persistence.cache import CacheManager
 from persistence.hashing import bm25_cache_key
 
 
@@ -63,8 +70,8 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
     if raw_questions is None:
         raise ValueError("bm25_retrieval_locator_node requires 'question_set'.")
 
-    doc_structure = DocStructure.model_validate(raw_doc)
-    question_set = QuestionSet.model_validate(raw_questions)
+    doc_structure = validated_doc_structure(state, raw_doc)
+    question_set = validated_question_set(state, raw_questions)
     retry_ids = read_retry_question_ids(state)
     target_questions = filter_question_set(question_set, retry_ids)
 
@@ -151,6 +158,8 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
     reranker_max_length: int | None = None
     reranker_batch_size: int | None = None
     reranker_top_n: int | None = None
+    reranker_max_tokens_per_batch: int | None = None
+    reranker_backend: str | None = None
     cross_encoder = None
 
     if reranker_requested == "cross_encoder":
@@ -169,6 +178,12 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
             state.get("reranker_batch_size") or _DEFAULT_RERANKER_BATCH_SIZE
         )
         reranker_top_n = int(state.get("rerank_top_n") or _DEFAULT_RERANKER_TOP_N)
+        reranker_max_tokens_raw = state.get("reranker_max_tokens_per_batch")
+        reranker_max_tokens_per_batch = (
+            None
+            if reranker_max_tokens_raw is None
+            else int(str(reranker_max_tokens_raw))
+        )
 
         if reranker_max_length < 1:
             raise ValueError("reranker_max_length must be >= 1")
@@ -176,11 +191,16 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
             raise ValueError("reranker_batch_size must be >= 1")
         if reranker_top_n < 1:
             raise ValueError("rerank_top_n must be >= 1")
+        if reranker_max_tokens_per_batch is not None and reranker_max_tokens_per_batch < 1:
+            raise ValueError("reranker_max_tokens_per_batch must be >= 1")
+        reranker_backend = normalize_inference_backend(state.get("reranker_backend"))
 
         try:
             cross_encoder = get_cross_encoder_reranker(
                 model_id=reranker_model_id,
                 device=reranker_device,
+                backend=reranker_backend,
+                onnx_cache_dir=state.get("onnx_cache_dir"),
             )
         except Exception as exc:
             reranker_used = "none"
@@ -205,51 +225,24 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
     cache_key: str | None = None
     full_index: BM25Index
 
-    cached_payload = None
+    cached_index = None
     if cache is not None and doc_hash:
         tokenizer_payload = {
             "mode": tokenizer_config.mode,
             "char_ngram": tokenizer_config.char_ngram,
         }
         cache_key = bm25_cache_key(doc_hash, tokenizer_payload, code_version=_code_version)
-        cached_payload = cache.get_json(stage="bm25_index", key=cache_key)
+        cached_index = _load_cached_bm25_index(
+            cache, cache_key, span_count=len(spans), tokenizer=tokenizer_config
+        )
 
-    if cached_payload:
-        try:
-            if int(cached_payload.get("span_count") or 0) == len(spans):
-                full_index = BM25Index(
-                    term_freqs=cached_payload["term_freqs"],
-                    doc_lengths=cached_payload["doc_lengths"],
-                    idf=cached_payload["idf"],
-                    avgdl=cached_payload["avgdl"],
-                    k1=cached_payload.get("k1", 1.5),
-                    b=cached_payload.get("b", 0.75),
-                    tokenizer=tokenizer_config,
-                )
-            else:
-                cached_payload = None
-                full_index = build_bm25_index(spans, tokenizer=tokenizer_config)
-        except Exception:
-            cached_payload = None
-            full_index = build_bm25_index(spans, tokenizer=tokenizer_config)
+    if cached_index is not None:
+        full_index = cached_index
     else:
         full_index = build_bm25_index(spans, tokenizer=tokenizer_config)
 
-    if cache is not None and doc_hash and cache_key and not cached_payload:
-        cache_payload = {
-            "term_freqs": full_index._term_freqs,  # noqa: SLF001
-            "doc_lengths": full_index._doc_lengths,  # noqa: SLF001
-            "idf": full_index._idf,  # noqa: SLF001
-            "avgdl": full_index._avgdl,  # noqa: SLF001
-            "k1": full_index._k1,  # noqa: SLF001
-            "b": full_index._b,  # noqa: SLF001
-            "tokenizer": {
-                "mode": tokenizer_config.mode,
-                "char_ngram": tokenizer_config.char_ngram,
-            },
-            "span_count": len(spans),
-        }
-        cache.set_json(stage="bm25_index", key=cache_key, payload=cache_payload)
+    if cache is not None and doc_hash and cache_key and cached_index is None:
+        cache.set_arrays(stage="bm25_index", key=cache_key, arrays=full_index.to_arrays())
     full_mapping = list(range(len(spans)))
 
     domain_indices: Dict[str, _StructuredIndex] = {}
@@ -283,6 +276,7 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
     candidates_by_q: Dict[str, List[EvidenceCandidate]] = {}
     bundles: List[EvidenceBundle] = []
     structure_debug: Dict[str, dict] = {}
+    rerank_jobs: Dict[str, RerankJob] = {}
 
     for question in target_questions.questions:
         question_id = question.question_id
@@ -364,19 +358,9 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
             )
 
         if cross_encoder is not None and candidates:
-            candidates = apply_reranker(
-                reranker=cross_encoder,
-                query=question.text,
-                candidates=candidates,
-                top_n=min(reranker_top_n or len(candidates), len(candidates)),
-                max_length=reranker_max_length or 512,
-                batch_size=reranker_batch_size or 8,
-            )
+            rerank_jobs[question_id] = RerankJob(query=question.text, candidates=candidates)
 
         candidates_by_q[question_id] = candidates
-        bundles.append(
-            EvidenceBundle(question_id=question_id, items=candidates[:top_k])
-        )
         if use_structure:
             structure_debug[question_id] = {
                 "domain": question.domain,
@@ -388,6 +372,26 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
                 "section_priors": selected.priors_used,
             }
 
+    rerank_stats: dict[str, int] | None = None
+    rerank_scores = state.get("rerank_scores")
+    if cross_encoder is not None and rerank_jobs:
+        reranked, stats, rerank_scores = rerank_jobs_with_cache(
+            state,
+            reranker=cross_encoder,
+            jobs=rerank_jobs,
+            top_n=reranker_top_n or _DEFAULT_RERANKER_TOP_N,
+            max_length=reranker_max_length or 512,
+            batch_size=reranker_batch_size or 8,
+            max_tokens_per_batch=reranker_max_tokens_per_batch,
+        )
+        candidates_by_q.update(reranked)
+        rerank_stats = stats.as_dict()
+
+    for question_id, candidates in candidates_by_q.items():
+        bundles.append(
+            EvidenceBundle(question_id=question_id, items=candidates[:top_k])
+        )
+
     rankings_payload = {
         question_id: {
             query: [
@@ -402,10 +406,10 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
         for question_id, per_query in rankings.items()
     }
     candidates_payload = {
-        question_id: [candidate.model_dump() for candidate in candidates]
+        question_id: compact_candidates(state, candidates)
         for question_id, candidates in candidates_by_q.items()
     }
-    bundles_payload = [bundle.model_dump() for bundle in bundles]
+    bundles_payload = [compact_bundle(state, bundle) for bundle in bundles]
     structure_payload = structure_debug if use_structure else None
 
     if retry_ids:
@@ -443,6 +447,9 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
             "top_n": reranker_top_n,
             "max_length": reranker_max_length,
             "batch_size": reranker_batch_size,
+            "max_tokens_per_batch": reranker_max_tokens_per_batch,
+            "backend": reranker_backend,
+            "pairs": rerank_stats,
             "error": reranker_error,
         },
         "bm25_rankings": rankings_payload,
@@ -460,12 +467,42 @@ def bm25_retrieval_locator_node(state: dict) -> dict:
             "char_ngram": tokenizer_config.char_ngram,
         },
         "bm25_structure": structure_payload,
+        "rerank_scores": rerank_scores or {},
     }
 
 
 __all__ = ["bm25_retrieval_locator_node"]
 
 
+def _load_cached_bm25_index(
+    cache: CacheManager,
+    cache_key: str,
+    *,
+    span_count: int,
+    tokenizer: TokenizerConfig,
+) -> BM25Index | None:
+    """Load a cached index (binary arrays, or a legacy JSON entry); None on miss."""
+    try:
+        arrays = cache.get_arrays(stage="bm25_index", key=cache_key)
+        if arrays is not None:
+            index = BM25Index.from_arrays(arrays, tokenizer=tokenizer)
+            return index if index.size == span_count else None
+        payload = cache.get_json(stage="bm25_index", key=cache_key)
+        if not payload or int(payload.get("span_count") or 0) != span_count:
+            return None
+        return BM25Index(
+            term_freqs=payload["term_freqs"],
+            doc_lengths=payload["doc_lengths"],
+            idf=payload["idf"],
+            avgdl=payload["avgdl"],
+            k1=payload.get("k1", 1.5),
+            b=payload.get("b", 0.75),
+            tokenizer=tokenizer,
+        )
+    except Exception:
+        return None
+
+
 def _merge_unique(base: List[str], extra: List[str]) -> List[str]:
     seen: set[str] = set()
     merged: List[str] = []
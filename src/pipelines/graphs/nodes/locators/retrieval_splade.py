@@ -10,18 +10,24 @@ import numpy as np
 from retrieval.engines.faiss_ip import build_ip_index, search_ip
 from retrieval.engines.fusion import rrf_fuse
 from retrieval.engines.splade import DEFAULT_SPLADE_MODEL_ID, get_splade_encoder
+from retrieval.onnx_backend import normalize_inference_backend
 from retrieval.query_planning.llm import LLMQueryPlannerConfig, generate_query_plan_llm
 from retrieval.query_planning.planner import generate_query_plan
-from retrieval.rerankers.apply import apply_reranker
+from retrieval.rerankers.apply import RerankJob
 from retrieval.rerankers.cross_encoder import (
     DEFAULT_CROSS_ENCODER_MODEL_ID,
     get_cross_encoder_reranker,
 )
 from retrieval.structure.filters import filter_spans_by_section_priors
 from rob2.locator_rules import get_locator_rules
-from schemas.internal.documents import DocStructure
 from schemas.internal.evidence import EvidenceBundle, EvidenceCandidate
-from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    validated_doc_structure,
+    validated_question_set,
+)
+from pipelines.graphs.nodes.locators.rerank_cache import rerank_jobs_with_cache
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_bundles,
@@ -63,8 +69,8 @@ def splade_retrieval_locator_node(state: dict) -> dict:
     if raw_questions is None:
         raise ValueError("splade_retrieval_locator_node requires 'question_set'.")
 
-    doc_structure = DocStructure.model_validate(raw_doc)
-    question_set = QuestionSet.model_validate(raw_questions)
+    doc_structure = validated_doc_structure(state, raw_doc)
+    question_set = validated_question_set(state, raw_questions)
     retry_ids = read_retry_question_ids(state)
     target_questions = filter_question_set(question_set, retry_ids)
 
@@ -151,6 +157,8 @@ def splade_retrieval_locator_node(state: dict) -> dict:
     reranker_max_length: int | None = None
     reranker_batch_size: int | None = None
     reranker_top_n: int | None = None
+    reranker_max_tokens_per_batch: int | None = None
+    reranker_backend: str | None = None
     cross_encoder = None
 
     if reranker_requested == "cross_encoder":
@@ -169,6 +177,12 @@ def splade_retrieval_locator_node(state: dict) -> dict:
             state.get("reranker_batch_size") or _DEFAULT_RERANKER_BATCH_SIZE
         )
         reranker_top_n = int(state.get("rerank_top_n") or _DEFAULT_RERANKER_TOP_N)
+        reranker_max_tokens_raw = state.get("reranker_max_tokens_per_batch")
+        reranker_max_tokens_per_batch = (
+            None
+            if reranker_max_tokens_raw is None
+            else int(str(reranker_max_tokens_raw))
+        )
 
         if reranker_max_length < 1:
             raise ValueError("reranker_max_length must be >= 1")
@@ -176,11 +190,16 @@ def splade_retrieval_locator_node(state: dict) -> dict:
             raise ValueError("reranker_batch_size must be >= 1")
         if reranker_top_n < 1:
             raise ValueError("rerank_top_n must be >= 1")
+        if reranker_max_tokens_per_batch is not None and reranker_max_tokens_per_batch < 1:
+            raise ValueError("reranker_max_tokens_per_batch must be >= 1")
+        reranker_backend = normalize_inference_backend(state.get("reranker_backend"))
 
         try:
             cross_encoder = get_cross_encoder_reranker(
                 model_id=reranker_model_id,
                 device=reranker_device,
+                backend=reranker_backend,
+                onnx_cache_dir=state.get("onnx_cache_dir"),
             )
         except Exception as exc:
             reranker_used = "none"
@@ -210,6 +229,13 @@ def splade_retrieval_locator_node(state: dict) -> dict:
         state.get("splade_doc_max_length") or _DEFAULT_SPLADE_DOC_MAX
     )
     batch_size = int(state.get("splade_batch_size") or _DEFAULT_SPLADE_BATCH)
+    splade_max_tokens_raw = state.get("splade_max_tokens_per_batch")
+    max_tokens_per_batch = (
+        None if splade_max_tokens_raw is None else int(str(splade_max_tokens_raw))
+    )
+    if max_tokens_per_batch is not None and max_tokens_per_batch < 1:
+        raise ValueError("splade_max_tokens_per_batch must be >= 1")
+    backend = normalize_inference_backend(state.get("splade_backend"))
 
     spans = doc_structure.sections
     if not spans:
@@ -256,6 +282,8 @@ def splade_retrieval_locator_node(state: dict) -> dict:
                 "top_n": reranker_top_n,
                 "max_length": reranker_max_length,
                 "batch_size": reranker_batch_size,
+                "max_tokens_per_batch": reranker_max_tokens_per_batch,
+                "backend": reranker_backend,
                 "error": reranker_error,
             },
             "splade_rankings": empty_rankings,
@@ -273,6 +301,8 @@ def splade_retrieval_locator_node(state: dict) -> dict:
                 "doc_max_length": doc_max_length,
                 "query_max_length": query_max_length,
                 "batch_size": batch_size,
+                "max_tokens_per_batch": max_tokens_per_batch,
+                "backend": backend,
                 "index_size": 0,
             },
             "splade_structure": structure_payload,
@@ -284,20 +314,45 @@ def splade_retrieval_locator_node(state: dict) -> dict:
     doc_vectors = None
     if cache is not None and doc_hash:
         cache_key = splade_cache_key(
-            doc_hash, model_id, doc_max_length, code_version=_code_version
+            doc_hash,
+            model_id,
+            doc_max_length,
+            code_version=_code_version,
+            backend=backend,
+        )
+        doc_vectors = cache.get_numpy(
+            stage="splade_doc_vectors", key=cache_key, mmap_mode="r"
         )
-        doc_vectors = cache.get_numpy(stage="splade_doc_vectors", key=cache_key)
 
-    encoder = get_splade_encoder(model_id=model_id, device=device, hf_token=hf_token)
+    encoder = get_splade_encoder(
+        model_id=model_id,
+        device=device,
+        hf_token=hf_token,
+        backend=backend,
+        onnx_cache_dir=state.get("onnx_cache_dir"),
+    )
 
     if doc_vectors is None:
-        doc_vectors = encoder.encode(
-            [span.text for span in spans],
-            max_length=doc_max_length,
-            batch_size=batch_size,
-        )
-        if cache is not None and doc_hash and cache_key:
-            cache.set_numpy(stage="splade_doc_vectors", key=cache_key, array=doc_vectors)
+        encode_kwargs: dict[str, int] = {
+            "max_length": doc_max_length,
+            "batch_size": batch_size,
+        }
+        if max_tokens_per_batch is not None:
+            encode_kwargs["max_tokens_per_batch"] = max_tokens_per_batch
+        if cache is not None and cache_key:
+            with cache.single_flight(stage="splade_doc_vectors", key=cache_key):
+                doc_vectors = cache.get_numpy(
+                    stage="splade_doc_vectors", key=cache_key, mmap_mode="r"
+                )
+                if doc_vectors is None:
+                    doc_vectors = encoder.encode(
+                        [span.text for span in spans], **encode_kwargs
+                    )
+                    cache.set_numpy(
+                        stage="splade_doc_vectors", key=cache_key, array=doc_vectors
+                    )
+        else:
+            doc_vectors = encoder.encode([span.text for span in spans], **encode_kwargs)
     if doc_vectors.shape[0] != len(spans):
         raise RuntimeError("SPLADE doc embedding count mismatch.")
 
@@ -332,6 +387,7 @@ def splade_retrieval_locator_node(state: dict) -> dict:
     candidates_by_q: Dict[str, List[EvidenceCandidate]] = {}
     bundles: List[EvidenceBundle] = []
     structure_debug: Dict[str, dict] = {}
+    rerank_jobs: Dict[str, RerankJob] = {}
 
     for question in target_questions.questions:
         question_id = question.question_id
@@ -413,17 +469,9 @@ def splade_retrieval_locator_node(state: dict) -> dict:
             )
 
         if cross_encoder is not None and candidates:
-            candidates = apply_reranker(
-                reranker=cross_encoder,
-                query=question.text,
-                candidates=candidates,
-                top_n=min(reranker_top_n or len(candidates), len(candidates)),
-                max_length=reranker_max_length or 512,
-                batch_size=reranker_batch_size or 8,
-            )
+            rerank_jobs[question_id] = RerankJob(query=question.text, candidates=candidates)
 
         candidates_by_q[question_id] = candidates
-        bundles.append(EvidenceBundle(question_id=question_id, items=candidates[:top_k]))
 
         if use_structure:
             structure_debug[question_id] = {
@@ -436,6 +484,24 @@ def splade_retrieval_locator_node(state: dict) -> dict:
                 "section_priors": selected.priors_used,
             }
 
+    rerank_stats: dict[str, int] | None = None
+    rerank_scores = state.get("rerank_scores")
+    if cross_encoder is not None and rerank_jobs:
+        reranked, stats, rerank_scores = rerank_jobs_with_cache(
+            state,
+            reranker=cross_encoder,
+            jobs=rerank_jobs,
+            top_n=reranker_top_n or _DEFAULT_RERANKER_TOP_N,
+            max_length=reranker_max_length or 512,
+            batch_size=reranker_batch_size or 8,
+            max_tokens_per_batch=reranker_max_tokens_per_batch,
+        )
+        candidates_by_q.update(reranked)
+        rerank_stats = stats.as_dict()
+
+    for question_id, candidates in candidates_by_q.items():
+        bundles.append(EvidenceBundle(question_id=question_id, items=candidates[:top_k]))
+
     rankings_payload = {
         question_id: {
             query: [
@@ -450,10 +516,10 @@ def splade_retrieval_locator_node(state: dict) -> dict:
         for question_id, per_query in rankings.items()
     }
     candidates_payload = {
-        question_id: [candidate.model_dump() for candidate in candidates]
+        question_id: compact_candidates(state, candidates)
         for question_id, candidates in candidates_by_q.items()
     }
-    bundles_payload = [bundle.model_dump() for bundle in bundles]
+    bundles_payload = [compact_bundle(state, bundle) for bundle in bundles]
     structure_payload = structure_debug if use_structure else None
 
     if retry_ids:
@@ -491,6 +557,9 @@ def splade_retrieval_locator_node(state: dict) -> dict:
             "top_n": reranker_top_n,
             "max_length": reranker_max_length,
             "batch_size": reranker_batch_size,
+            "max_tokens_per_batch": reranker_max_tokens_per_batch,
+            "backend": reranker_backend,
+            "pairs": rerank_stats,
             "error": reranker_error,
         },
         "splade_rankings": rankings_payload,
@@ -508,10 +577,13 @@ def splade_retrieval_locator_node(state: dict) -> dict:
             "doc_max_length": doc_max_length,
             "query_max_length": query_max_length,
             "batch_size": batch_size,
+            "max_tokens_per_batch": max_tokens_per_batch,
+            "backend": backend,
             "index_size": len(spans),
             "vector_dim": int(doc_vectors.shape[1]),
         },
         "splade_structure": structure_payload,
+        "rerank_scores": rerank_scores or {},
     }
 
 
@@ -11,6 +11,12 @@ from schemas.internal.documents import DocStructure, SectionSpan
 from schemas.internal.evidence import EvidenceBundle, EvidenceCandidate
 from schemas.internal.locator import LocatorRules
 from schemas.internal.rob2 import QuestionSet, Rob2Question
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    validated_doc_structure,
+    validated_question_set,
+)
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_bundles,
@@ -28,8 +34,8 @@ def rule_based_locator_node(state: dict) -> dict:
     if raw_questions is None:
         raise ValueError("rule_based_locator_node requires 'question_set'.")
 
-    doc_structure = DocStructure.model_validate(raw_doc)
-    question_set = QuestionSet.model_validate(raw_questions)
+    doc_structure = validated_doc_structure(state, raw_doc)
+    question_set = validated_question_set(state, raw_questions)
     retry_ids = read_retry_question_ids(state)
     target_questions = filter_question_set(question_set, retry_ids)
     rules = get_locator_rules()
@@ -43,10 +49,10 @@ def rule_based_locator_node(state: dict) -> dict:
     )
 
     candidates_payload = {
-        question_id: [candidate.model_dump() for candidate in candidates]
+        question_id: compact_candidates(state, candidates)
         for question_id, candidates in candidates_by_q.items()
     }
-    bundles_payload = [bundle.model_dump() for bundle in bundles]
+    bundles_payload = [compact_bundle(state, bundle) for bundle in bundles]
 
     if retry_ids:
         candidates_payload = merge_by_question(
@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+from pipelines.graphs.nodes.state_models import question_set_ref
 from rob2.question_bank import get_question_bank
 
 
 def planner_node(state: dict) -> dict:
     """Return the standardized ROB2 question set."""
     question_set = get_question_bank()
-    return {"question_set": question_set.model_dump()}
+    return {
+        "question_set": question_set.model_dump(),
+        "question_set_ref": question_set_ref(question_set),
+    }
 
 
 __all__ = ["planner_node"]
@@ -11,12 +11,13 @@ from urllib.parse import urlparse
 from pathlib import Path
 from typing import Any, Iterable, List, Optional, Sequence, TYPE_CHECKING, cast
 
-from core.config import get_settings
+from core.config import Settings, get_settings
 from langchain_docling.loader import DoclingLoader
 from schemas.internal.documents import BoundingBox, DocStructure, FigureSpan, SectionSpan
 from utils.text import normalize_block
 from eagent import __version__ as _code_version
 from persistence.hashing import preprocess_cache_key
+from pipelines.graphs.nodes.state_models import doc_structure_ref
 from preprocessing.doc_scope import apply_doc_scope, parse_paragraph_ids
 from preprocessing.document_metadata import extract_document_metadata
 
@@ -47,6 +48,11 @@ _REFERENCE_SPLIT_RE = re.compile(r"[>/|]+")
 
 def preprocess_node(state: dict) -> dict:
     """LangGraph node: parse PDF into a normalized document structure."""
+    payload = _load_doc_structure(state)
+    return {**payload, "doc_structure_ref": doc_structure_ref(state.get("doc_hash"))}
+
+
+def _load_doc_structure(state: dict) -> dict:
     pdf_path = state.get("pdf_path")
     if not pdf_path:
         raise ValueError("preprocess_node requires 'pdf_path'.")
@@ -205,6 +211,19 @@ def preprocess_node(state: dict) -> dict:
         if cached is not None:
             return cached
 
+    if cache is None or not cache_key:
+        return _parse_and_enrich(pdf_path, state, settings)
+    # Duplicate PDFs in a batch: one worker parses, the others wait and hit the cache.
+    with cache.single_flight(stage="preprocess", key=cache_key):
+        cached = cache.get_json(stage="preprocess", key=cache_key)
+        if cached is not None:
+            return cached
+        payload = _parse_and_enrich(pdf_path, state, settings)
+        cache.set_json(stage="preprocess", key=cache_key, payload=payload)
+    return payload
+
+
+def _parse_and_enrich(pdf_path: str, state: dict, settings: Settings) -> dict:
     overrides = _read_docling_overrides(state)
     doc_structure = parse_docling_pdf(pdf_path, overrides=overrides)
     doc_structure, scope_report = _apply_doc_scope_if_enabled(
@@ -245,13 +264,10 @@ def preprocess_node(state: dict) -> dict:
     )
     if metadata is not None:
         doc_structure = doc_structure.model_copy(update={"document_metadata": metadata})
-    payload = {
+    return {
         "doc_structure": doc_structure.model_dump(),
         "doc_scope_report": scope_report,
     }
-    if cache is not None and doc_hash and cache_key:
-        cache.set_json(stage="preprocess", key=cache_key, payload=payload)
-    return payload
 
 
 def parse_docling_pdf(
@@ -591,6 +607,22 @@ def _build_docling_converter(
     return converter, config
 
 
+def docling_converter_loaded() -> bool:
+    """Return True once the default Docling converter exists in this process."""
+    return _CONVERTER_CACHE is not None and _CONVERTER_CACHE[0] is not None
+
+
+def warm_docling_converter() -> None:
+    """Build the default Docling converter and chunker and load the PDF pipeline models."""
+    converter, _config = _build_docling_converter()
+    if converter is None:
+        raise RuntimeError("Docling is not installed")
+    _build_docling_chunker()
+    from docling.datamodel.base_models import InputFormat
+
+    converter.initialize_pipeline(InputFormat.PDF)
+
+
 def _build_docling_chunker(
     *,
     overrides: Optional[dict[str, object]] = None,
@@ -1060,7 +1092,7 @@ def _build_figure_description_model(
     timeout: float | None,
     max_retries: int,
 ) -> "ChatModelLike":
-    from langchain.chat_models import init_chat_model
+    from utils.llm_cassette import init_chat_model
 
     kwargs: dict[str, Any] = {"temperature": 0.0, "max_tokens": max_tokens}
     if model_provider:
@@ -1394,4 +1426,9 @@ def _aggregate_sections_by_title(spans: Iterable[SectionSpan]) -> dict[str, str]
     return {title: "\n\n".join(parts) for title, parts in aggregated.items()}
 
 
-__all__ = ["parse_docling_pdf", "preprocess_node"]
+__all__ = [
+    "docling_converter_loaded",
+    "parse_docling_pdf",
+    "preprocess_node",
+    "warm_docling_converter",
+]
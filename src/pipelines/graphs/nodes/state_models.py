@@ -0,0 +1,244 @@
+"""Validate-once access to the document and question set carried in graph state.
+
+Graph state stays serializable: ``doc_structure`` and ``question_set`` hold
+plain dicts, and ``doc_structure_ref`` / ``question_set_ref`` hold short keys
+(doc hash, question set version). The validated model instances live in a
+:class:`ValidatedModelContext` that the runner places under
+``state["model_context"]`` next to the cache manager, so every node after the
+first reuses the same instance instead of re-running pydantic validation.
+
+Cached instances are shared between nodes and must be treated as read-only;
+derive new objects with ``model_copy`` instead of mutating them.
+
+Evidence candidates are stored the same way: the state copy of a candidate
+omits ``title``/``page``/``text`` whenever they match the span with the same
+``paragraph_id`` in ``doc_structure.sections``, and readers restore them from
+that span table (:func:`load_candidates`, :func:`expand_candidates`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping, Sequence, TypeVar
+
+from pydantic import BaseModel
+
+from schemas.internal.documents import DocStructure, SectionSpan
+from schemas.internal.rob2 import QuestionSet
+
+M = TypeVar("M", bound=BaseModel)
+
+MODEL_CONTEXT_KEY = "model_context"
+
+# Candidate fields that duplicate the referenced span.
+_SPAN_FIELDS = frozenset({"title", "page", "text"})
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    payload: Any
+    model: BaseModel
+
+
+class ValidatedModelContext:
+    """Per-run store of validated models keyed by their state reference.
+
+    An entry is only reused while the state still carries the exact payload
+    object it was validated from, so a node that replaces ``doc_structure``
+    without updating the reference cannot be served a stale model.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._span_doc: DocStructure | None = None
+        self._spans: dict[str, SectionSpan] = {}
+        self.validations = 0
+        self.hits = 0
+
+    def resolve(
+        self,
+        model_type: type[M],
+        ref: str | None,
+        payload: Any,
+        *,
+        count_hit: bool = True,
+    ) -> M:
+        if isinstance(payload, model_type):
+            return payload
+        key = (model_type.__name__, ref) if ref else None
+        if key is not None:
+            entry = self._entries.get(key)
+            if entry is not None and entry.payload is payload:
+                if count_hit:
+                    self.hits += 1
+                return entry.model  # type: ignore[return-value]
+        model = model_type.model_validate(payload)
+        self.validations += 1
+        if key is not None:
+            self._entries[key] = _Entry(payload=payload, model=model)
+        return model
+
+    def span_table(self, doc: DocStructure) -> Mapping[str, SectionSpan]:
+        if self._span_doc is not doc:
+            self._span_doc = doc
+            self._spans = _build_span_table(doc)
+        return self._spans
+
+    def stats(self) -> dict[str, int]:
+        return {"validations": self.validations, "hits": self.hits}
+
+
+def doc_structure_ref(doc_hash: str | None) -> str | None:
+    return f"doc:{doc_hash}" if doc_hash else None
+
+
+def question_set_ref(question_set: QuestionSet | Mapping[str, Any]) -> str:
+    if isinstance(question_set, QuestionSet):
+        version, variant = question_set.version, question_set.variant
+    else:
+        version, variant = question_set.get("version"), question_set.get("variant")
+    return f"questions:{version}:{variant}"
+
+
+def validated_doc_structure(state: Mapping[str, Any], raw_doc: Any) -> DocStructure:
+    """Return ``raw_doc`` as a DocStructure, validating it at most once per run."""
+    return _resolve(state, DocStructure, "doc_structure_ref", raw_doc)
+
+
+def validated_question_set(state: Mapping[str, Any], raw_questions: Any) -> QuestionSet:
+    """Return ``raw_questions`` as a QuestionSet, validating it at most once per run."""
+    return _resolve(state, QuestionSet, "question_set_ref", raw_questions)
+
+
+def span_table(state: Mapping[str, Any]) -> Mapping[str, SectionSpan]:
+    """Return ``paragraph_id -> span`` for the document in ``state`` (empty if none)."""
+    raw_doc = state.get("doc_structure")
+    if raw_doc is None:
+        return {}
+    # Candidate (de)compaction looks the document up per item; those lookups
+    # are bookkeeping and do not count as reuse in ``stats()``.
+    doc = _resolve(state, DocStructure, "doc_structure_ref", raw_doc, count_hit=False)
+    context = state.get(MODEL_CONTEXT_KEY)
+    if isinstance(context, ValidatedModelContext):
+        return context.span_table(doc)
+    return _build_span_table(doc)
+
+
+def compact_candidates(
+    state: Mapping[str, Any],
+    candidates: Iterable[BaseModel],
+) -> list[dict[str, Any]]:
+    """Dump evidence candidates for graph state, referencing spans by paragraph_id.
+
+    Span fields are only dropped when they equal the referenced span, and unset
+    optional fields (all defaulting to None) are omitted, so
+    :func:`load_candidates` restores the original candidate exactly.
+    """
+    spans = span_table(state)
+    dumped: list[dict[str, Any]] = []
+    for candidate in candidates:
+        span = spans.get(getattr(candidate, "paragraph_id", ""))
+        if span is not None and all(
+            getattr(candidate, field) == getattr(span, field) for field in _SPAN_FIELDS
+        ):
+            dumped.append(candidate.model_dump(exclude=set(_SPAN_FIELDS), exclude_none=True))
+        else:
+            dumped.append(candidate.model_dump(exclude_none=True))
+    return dumped
+
+
+def compact_bundle(state: Mapping[str, Any], bundle: BaseModel) -> dict[str, Any]:
+    """Dump an evidence bundle with compact items (see :func:`compact_candidates`)."""
+    payload = bundle.model_dump(exclude={"items"})
+    payload["items"] = compact_candidates(state, getattr(bundle, "items"))
+    return payload
+
+
+def load_candidates(
+    state: Mapping[str, Any],
+    raw_list: Sequence[Any],
+    model_type: type[M],
+) -> list[M]:
+    """Validate candidate payloads from state, restoring span fields by reference."""
+    spans = span_table(state)
+    return [model_type.model_validate(expand_candidate(item, spans)) for item in raw_list]
+
+
+def expand_candidate_map(
+    state: Mapping[str, Any],
+    raw_map: Mapping[str, Any],
+) -> dict[str, Any]:
+    """Return a question-keyed candidate map with full span fields restored."""
+    spans = span_table(state)
+    return {
+        question_id: [expand_candidate(item, spans) for item in items]
+        if isinstance(items, list)
+        else items
+        for question_id, items in raw_map.items()
+    }
+
+
+def expand_candidates(state: Mapping[str, Any], payload: Mapping[str, Any]) -> dict[str, Any]:
+    """Restore span fields in every ``*_candidates`` map and ``*_evidence`` bundle
+    list of ``payload``, for exports that are read without the document."""
+    spans = span_table(state)
+    expanded = dict(payload)
+    for key, value in payload.items():
+        if key.endswith("_candidates") and isinstance(value, Mapping):
+            expanded[key] = expand_candidate_map(state, value)
+        elif key.endswith("_evidence") and isinstance(value, list):
+            expanded[key] = [
+                {**bundle, "items": [expand_candidate(item, spans) for item in bundle["items"]]}
+                if isinstance(bundle, Mapping) and isinstance(bundle.get("items"), list)
+                else bundle
+                for bundle in value
+            ]
+    return expanded
+
+
+def expand_candidate(item: Any, spans: Mapping[str, SectionSpan]) -> Any:
+    """Return ``item`` with ``title``/``page``/``text`` filled from its span."""
+    if not isinstance(item, Mapping) or "text" in item:
+        return item
+    span = spans.get(str(item.get("paragraph_id") or ""))
+    if span is None:
+        return item
+    return {**item, "title": span.title, "page": span.page, "text": span.text}
+
+
+def _build_span_table(doc: DocStructure) -> dict[str, SectionSpan]:
+    return {span.paragraph_id: span for span in doc.sections}
+
+
+def _resolve(
+    state: Mapping[str, Any],
+    model_type: type[M],
+    ref_key: str,
+    payload: Any,
+    *,
+    count_hit: bool = True,
+) -> M:
+    context = state.get(MODEL_CONTEXT_KEY)
+    if not isinstance(context, ValidatedModelContext):
+        if isinstance(payload, model_type):
+            return payload
+        return model_type.model_validate(payload)
+    ref = state.get(ref_key)
+    return context.resolve(model_type, str(ref) if ref else None, payload, count_hit=count_hit)
+
+
+__all__ = [
+    "MODEL_CONTEXT_KEY",
+    "ValidatedModelContext",
+    "compact_bundle",
+    "compact_candidates",
+    "doc_structure_ref",
+    "expand_candidate",
+    "expand_candidate_map",
+    "expand_candidates",
+    "load_candidates",
+    "question_set_ref",
+    "span_table",
+    "validated_doc_structure",
+    "validated_question_set",
+]
@@ -15,13 +15,19 @@ from evidence.validators.completeness import (
 from evidence.validators.selectors import select_passed_candidates
 from schemas.internal.evidence import FusedEvidenceBundle, FusedEvidenceCandidate
 from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    load_candidates,
+    validated_question_set,
+)
 
 
 def completeness_validator_node(state: dict) -> dict:
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("completeness_validator_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
 
     raw_candidates = state.get("existence_candidates")
     source_key = "existence_candidates"
@@ -65,7 +71,7 @@ def completeness_validator_node(state: dict) -> dict:
                 FusedEvidenceBundle(question_id=question_id, items=[]).model_dump()
             )
             continue
-        parsed = [FusedEvidenceCandidate.model_validate(item) for item in raw_list]
+        parsed = load_candidates(state, raw_list, FusedEvidenceCandidate)
         if require_relevance:
             passed = select_passed_candidates(
                 parsed, min_relevance_confidence=min_confidence
@@ -78,7 +84,9 @@ def completeness_validator_node(state: dict) -> dict:
             ]
         validated_by_q[question_id] = passed
         bundles.append(
-            FusedEvidenceBundle(question_id=question_id, items=passed[:top_k]).model_dump()
+            compact_bundle(
+                state, FusedEvidenceBundle(question_id=question_id, items=passed[:top_k])
+            )
         )
 
     enforce = bool(state.get("completeness_enforce") or False)
@@ -106,7 +114,7 @@ def completeness_validator_node(state: dict) -> dict:
 
     return {
         "validated_candidates": {
-            question_id: [candidate.model_dump() for candidate in candidates]
+            question_id: compact_candidates(state, candidates)
             for question_id, candidates in validated_by_q.items()
         },
         "validated_evidence": bundles,
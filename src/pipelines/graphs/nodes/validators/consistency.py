@@ -12,6 +12,7 @@ from evidence.validators.consistency import (
 from evidence.validators.selectors import select_passed_candidates
 from schemas.internal.evidence import ConsistencyVerdict, FusedEvidenceCandidate
 from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import load_candidates, validated_question_set
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_by_question,
@@ -23,7 +24,7 @@ def consistency_validator_node(state: dict) -> dict:
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("consistency_validator_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
     retry_ids = read_retry_question_ids(state)
     question_text_by_id = {
         question.question_id: question.text for question in question_set.questions
@@ -110,7 +111,7 @@ def consistency_validator_node(state: dict) -> dict:
             reports[question_id] = ConsistencyVerdict(label="unknown", confidence=None, conflicts=[]).model_dump()
             continue
 
-        candidates = [FusedEvidenceCandidate.model_validate(item) for item in raw_list]
+        candidates = load_candidates(state, raw_list, FusedEvidenceCandidate)
         min_conf_raw = state.get("relevance_min_confidence")
         min_confidence = 0.6 if min_conf_raw is None else float(str(min_conf_raw))
         passed = select_passed_candidates(
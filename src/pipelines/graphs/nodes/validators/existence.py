@@ -5,9 +5,14 @@ from __future__ import annotations
 from typing import Any, Dict, List, Mapping
 
 from evidence.validators.existence import ExistenceValidatorConfig, annotate_existence
-from schemas.internal.documents import DocStructure
 from schemas.internal.evidence import FusedEvidenceBundle, FusedEvidenceCandidate
-from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    load_candidates,
+    validated_doc_structure,
+    validated_question_set,
+)
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_bundles,
@@ -20,12 +25,12 @@ def existence_validator_node(state: dict) -> dict:
     raw_doc = state.get("doc_structure")
     if raw_doc is None:
         raise ValueError("existence_validator_node requires 'doc_structure'.")
-    doc_structure = DocStructure.model_validate(raw_doc)
+    doc_structure = validated_doc_structure(state, raw_doc)
 
     raw_questions = state.get("question_set")
     if raw_questions is None:
         raise ValueError("existence_validator_node requires 'question_set'.")
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
 
     raw_candidates = state.get("relevance_candidates")
     source_key = "relevance_candidates"
@@ -75,7 +80,7 @@ def existence_validator_node(state: dict) -> dict:
             )
             debug[question_id] = {"total": 0, "passed": 0, "failed": 0}
             continue
-        parsed = [FusedEvidenceCandidate.model_validate(item) for item in raw_list]
+        parsed = load_candidates(state, raw_list, FusedEvidenceCandidate)
         annotated = annotate_existence(doc_structure, parsed, config=config)
 
         passed = [
@@ -83,8 +88,12 @@ def existence_validator_node(state: dict) -> dict:
             for candidate in annotated
             if candidate.existence is not None and candidate.existence.label == "pass"
         ]
-        bundles.append(FusedEvidenceBundle(question_id=question_id, items=passed[:top_k]).model_dump())
-        candidates_by_q[question_id] = [candidate.model_dump() for candidate in annotated]
+        bundles.append(
+            compact_bundle(
+                state, FusedEvidenceBundle(question_id=question_id, items=passed[:top_k])
+            )
+        )
+        candidates_by_q[question_id] = compact_candidates(state, annotated)
         debug[question_id] = {
             "total": len(annotated),
             "passed": len(passed),
@@ -118,7 +127,7 @@ def _ordered_question_ids(state: dict, payload: Mapping[str, Any]) -> List[str]:
         return sorted(union)
 
     try:
-        question_set = QuestionSet.model_validate(raw_questions)
+        question_set = validated_question_set(state, raw_questions)
     except Exception:
         return sorted(union)
 
@@ -19,6 +19,12 @@ from schemas.internal.evidence import (
     RelevanceVerdict,
 )
 from schemas.internal.rob2 import QuestionSet
+from pipelines.graphs.nodes.state_models import (
+    compact_bundle,
+    compact_candidates,
+    load_candidates,
+    validated_question_set,
+)
 from pipelines.graphs.nodes.retry_utils import (
     filter_question_set,
     merge_bundles,
@@ -44,7 +50,7 @@ def relevance_validator_node(state: dict) -> dict:
     if not isinstance(raw_candidates, Mapping):
         raise ValueError("fusion_candidates must be a mapping")
 
-    question_set = QuestionSet.model_validate(raw_questions)
+    question_set = validated_question_set(state, raw_questions)
     retry_ids = read_retry_question_ids(state)
     question_text_by_id = {
         question.question_id: question.text for question in question_set.questions
@@ -135,7 +141,7 @@ def relevance_validator_node(state: dict) -> dict:
             }
             continue
 
-        fused = [FusedEvidenceCandidate.model_validate(item) for item in raw_list]
+        fused = load_candidates(state, raw_list, FusedEvidenceCandidate)
         to_validate = fused[:top_n]
         skipped = fused[top_n:]
         question_text = question_text_by_id.get(question_id) or question_id
@@ -174,7 +180,7 @@ def relevance_validator_node(state: dict) -> dict:
             for candidate in skipped
         ]
         annotated = [*annotated_validated, *annotated_skipped]
-        candidates_by_q[question_id] = [candidate.model_dump() for candidate in annotated]
+        candidates_by_q[question_id] = compact_candidates(state, annotated)
 
         passed = [
             candidate
@@ -198,7 +204,7 @@ def relevance_validator_node(state: dict) -> dict:
                     break
 
         bundles.append(
-            FusedEvidenceBundle(question_id=question_id, items=selected).model_dump()
+            compact_bundle(state, FusedEvidenceBundle(question_id=question_id, items=selected))
         )
         debug[question_id] = {
             "validated": len(to_validate),
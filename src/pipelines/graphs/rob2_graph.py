@@ -46,13 +46,16 @@ from pipelines.graphs.routing import (
     domain_audit_should_run_final,
     validation_should_retry,
 )
+from utils.tracing import traced_node
 
 
 class Rob2GraphState(TypedDict, total=False):
     pdf_path: str
     doc_hash: str
     doc_structure: dict
+    doc_structure_ref: str
     question_set: dict
+    question_set_ref: str
     docling_layout_model: str
     docling_artifacts_path: str
     docling_chunker_model: str
@@ -97,6 +100,8 @@ class Rob2GraphState(TypedDict, total=False):
     reranker_max_length: int
     reranker_batch_size: int
     rerank_top_n: int
+    reranker_max_tokens_per_batch: int
+    reranker_backend: Literal["torch", "onnx", "onnx-int8"]
     use_structure: bool
     section_bonus_weight: float
     locator_tokenizer: str
@@ -107,6 +112,9 @@ class Rob2GraphState(TypedDict, total=False):
     splade_query_max_length: int
     splade_doc_max_length: int
     splade_batch_size: int
+    splade_max_tokens_per_batch: int
+    splade_backend: Literal["torch", "onnx", "onnx-int8"]
+    onnx_cache_dir: str
     llm_locator_mode: Literal["llm", "none"]
     llm_locator_model: str
     llm_locator_model_provider: str
@@ -227,6 +235,7 @@ class Rob2GraphState(TypedDict, total=False):
     rule_based_candidates: dict
     bm25_candidates: dict
     splade_candidates: dict
+    rerank_scores: dict
     fulltext_candidates: dict
     fusion_candidates: dict
     relevance_candidates: dict
@@ -254,6 +263,7 @@ class Rob2GraphState(TypedDict, total=False):
     retry_question_ids: list[str]
     fulltext_fallback_used: bool
     cache_manager: object
+    model_context: object
 
 
 NodeFn = object
@@ -368,104 +378,130 @@ def _enable_fulltext_fallback_node(state: Rob2GraphState) -> dict:
     }
 
 
+def _add_node(builder: StateGraph, name: str, node: Any) -> None:
+    """Register ``node`` wrapped for per-node tracing (no-op outside a traced run)."""
+    builder.add_node(name, traced_node(name, node))
+
+
 def build_rob2_graph(*, node_overrides: dict[str, NodeFn] | None = None):
     """Build and compile the ROB2 workflow graph."""
     overrides = node_overrides or {}
     builder: StateGraph = StateGraph(cast(Any, Rob2GraphState))
 
-    builder.add_node(
-        "preprocess", cast(Any, overrides.get("preprocess") or preprocess_node)
+    _add_node(
+        builder, "preprocess", cast(Any, overrides.get("preprocess") or preprocess_node)
     )
-    builder.add_node("planner", cast(Any, overrides.get("planner") or planner_node))
-    builder.add_node("init_validation", cast(Any, _init_validation_state_node))
+    _add_node(builder, "planner", cast(Any, overrides.get("planner") or planner_node))
+    _add_node(builder, "init_validation", cast(Any, _init_validation_state_node))
 
-    builder.add_node(
+    _add_node(
+        builder,
         "rule_based_locator",
         cast(Any, overrides.get("rule_based_locator") or rule_based_locator_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "bm25_locator",
         cast(Any, overrides.get("bm25_locator") or bm25_retrieval_locator_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "splade_locator",
         cast(Any, overrides.get("splade_locator") or splade_retrieval_locator_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "llm_locator",
         cast(Any, overrides.get("llm_locator") or llm_locator_node),
     )
-    builder.add_node("fusion", cast(Any, overrides.get("fusion") or fusion_node))
+    _add_node(builder, "fusion", cast(Any, overrides.get("fusion") or fusion_node))
 
-    builder.add_node(
+    _add_node(
+        builder,
         "relevance_validator",
         cast(Any, overrides.get("relevance_validator") or relevance_validator_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "existence_validator",
         cast(Any, overrides.get("existence_validator") or existence_validator_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "consistency_validator",
         cast(Any, overrides.get("consistency_validator") or consistency_validator_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "completeness_validator",
         cast(
             Any, overrides.get("completeness_validator") or completeness_validator_node
         ),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d1_randomization",
         cast(Any, overrides.get("d1_randomization") or d1_randomization_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d2_deviations",
         cast(Any, overrides.get("d2_deviations") or d2_deviations_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d3_missing_data",
         cast(Any, overrides.get("d3_missing_data") or d3_missing_data_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d4_measurement",
         cast(Any, overrides.get("d4_measurement") or d4_measurement_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d5_reporting",
         cast(Any, overrides.get("d5_reporting") or d5_reporting_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d1_audit",
         cast(Any, overrides.get("d1_audit") or d1_audit_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d2_audit",
         cast(Any, overrides.get("d2_audit") or d2_audit_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d3_audit",
         cast(Any, overrides.get("d3_audit") or d3_audit_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d4_audit",
         cast(Any, overrides.get("d4_audit") or d4_audit_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "d5_audit",
         cast(Any, overrides.get("d5_audit") or d5_audit_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "final_domain_audit",
         cast(Any, overrides.get("final_domain_audit") or final_domain_audit_node),
     )
-    builder.add_node(
+    _add_node(
+        builder,
         "aggregate",
         cast(Any, overrides.get("aggregate") or aggregate_node),
     )
 
-    builder.add_node("prepare_retry", cast(Any, _prepare_validation_retry_node))
-    builder.add_node(
+    _add_node(builder, "prepare_retry", cast(Any, _prepare_validation_retry_node))
+    _add_node(
+        builder,
         "enable_fulltext_fallback", cast(Any, _enable_fulltext_fallback_node)
     )
 
@@ -37,6 +37,7 @@ from pipelines.graphs.nodes.preprocess import (
     filter_reference_sections,
     parse_docling_pdf,
 )
+from pipelines.graphs.nodes.state_models import expand_candidate_map
 from pipelines.graphs.nodes.validators.completeness import completeness_validator_node
 from pipelines.graphs.nodes.validators.existence import existence_validator_node
 from pipelines.graphs.nodes.validators.relevance import relevance_validator_node
@@ -432,7 +433,9 @@ def _pipeline_run(
     return {
         "doc": doc,
         "question_set": question_set,
-        "validated_candidates": completeness.get("validated_candidates") or {},
+        "validated_candidates": expand_candidate_map(
+            completeness_state, completeness.get("validated_candidates") or {}
+        ),
     }
 
 
@@ -2,20 +2,28 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, Template
 
 from reporting.context import build_report_context
 from schemas.responses import Rob2RunResult
 
 
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+
+@lru_cache(maxsize=1)
+def _report_template() -> Template:
+    # One environment per process: Jinja compiles and caches the template once.
+    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)), auto_reload=False)
+    return env.get_template("report.html")
+
+
 def render_html(result: Rob2RunResult, *, pdf_name: str) -> str:
-    template_dir = Path(__file__).parent / "templates"
-    env = Environment(loader=FileSystemLoader(str(template_dir)))
-    template = env.get_template("report.html")
     context = build_report_context(result, pdf_name=pdf_name)
-    return template.render(**context)
+    return _report_template().render(**context)
 
 
 def generate_html_report(result: Rob2RunResult, output_path: Path, pdf_name: str = "Unknown") -> None:
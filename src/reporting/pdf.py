@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 
-from reporting.html import render_html
+from reporting.html import TEMPLATE_DIR, render_html
 from schemas.responses import Rob2RunResult
 
 try:
@@ -21,10 +22,16 @@ def generate_pdf_report(result: Rob2RunResult, output_path: Path, pdf_name: str
         print("Warning: WeasyPrint not installed, skipping PDF generation.")
         return
 
-    template_dir = Path(__file__).parent / "templates"
     html_content = render_html(result, pdf_name=pdf_name)
+    HTML(string=html_content, base_url=str(TEMPLATE_DIR)).write_pdf(
+        output_path, stylesheets=[_print_stylesheet()]
+    )
+
 
-    css = CSS(
+@lru_cache(maxsize=1)
+def _print_stylesheet() -> "CSS":
+    # Parsed once per process and reused for every report.
+    return CSS(
         string="""
         .domain-content { display: block !important; }
         .container { box-shadow: none; padding: 0; }
@@ -32,9 +39,5 @@ def generate_pdf_report(result: Rob2RunResult, output_path: Path, pdf_name: str
     """
     )
 
-    HTML(string=html_content, base_url=str(template_dir)).write_pdf(
-        output_path, stylesheets=[css]
-    )
-
 
 __all__ = ["generate_pdf_report", "WEASYPRINT_AVAILABLE"]
@@ -0,0 +1,70 @@
+"""Token-budgeted batching helpers for transformer inference (SPLADE / rerankers)."""
+
+from __future__ import annotations
+
+from typing import List, Sequence
+
+
+def resolve_max_tokens_per_batch(
+    max_tokens_per_batch: int | None,
+    *,
+    batch_size: int,
+    max_length: int,
+) -> int:
+    """Return the padded-token budget per forward pass.
+
+    When no explicit budget is configured, fall back to ``batch_size * max_length``
+    so the worst-case activation size matches the historical count-based batching.
+    """
+    if max_tokens_per_batch is None:
+        return max(1, int(batch_size)) * max(1, int(max_length))
+    if max_tokens_per_batch < 1:
+        raise ValueError("max_tokens_per_batch must be >= 1")
+    return int(max_tokens_per_batch)
+
+
+def plan_token_batches(
+    lengths: Sequence[int],
+    *,
+    max_tokens_per_batch: int,
+) -> List[List[int]]:
+    """Group input indices into length-sorted batches under a padded-token budget.
+
+    Inputs are sorted by token length (longest first, ties by original index) so
+    each batch pads to a similar length. A batch is closed once adding another
+    row would exceed ``max_tokens_per_batch`` padded tokens (rows * longest row);
+    a single over-budget row still forms its own batch.
+    """
+    if max_tokens_per_batch < 1:
+        raise ValueError("max_tokens_per_batch must be >= 1")
+
+    order = sorted(range(len(lengths)), key=lambda idx: (-int(lengths[idx]), idx))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_width = 0
+    for idx in order:
+        width = max(1, int(lengths[idx]))
+        if current:
+            padded_width = max(current_width, width)
+            if padded_width * (len(current) + 1) > max_tokens_per_batch:
+                batches.append(current)
+                current = []
+                current_width = 0
+        current.append(idx)
+        current_width = max(current_width, width)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def padded_token_count(lengths: Sequence[int], batches: Sequence[Sequence[int]]) -> int:
+    """Return the total tokens processed (including padding) for a batch plan."""
+    total = 0
+    for batch in batches:
+        if not batch:
+            continue
+        total += len(batch) * max(int(lengths[idx]) for idx in batch)
+    return total
+
+
+__all__ = ["padded_token_count", "plan_token_batches", "resolve_max_tokens_per_batch"]
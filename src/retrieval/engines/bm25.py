@@ -4,20 +4,36 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
 
 from schemas.internal.documents import SectionSpan
 from retrieval.tokenization import TokenizerConfig, tokenize_text
 
 
-@dataclass(frozen=True)
+# Version of the array layout produced by BM25Index.to_arrays().
+# v1 stored document-major (CSR) postings; v2 stores them term-major with a
+# sorted vocabulary, which is also the search representation. v1 entries are
+# still accepted and converted on load.
+BM25_ARRAY_FORMAT_VERSION = 2
+
+
+@dataclass(frozen=True, slots=True)
 class BM25Hit:
     doc_index: int
     score: float
 
 
 class BM25Index:
-    """A lightweight BM25 index over paragraph spans."""
+    """A lightweight BM25 index over paragraph spans.
+
+    Postings are numpy arrays grouped by term: the documents containing the
+    term with id ``t`` (its position in the sorted vocabulary) and their term
+    counts sit in ``[term_offsets[t], term_offsets[t + 1])`` of ``post_docs`` /
+    ``post_counts``. A cached index is used as loaded, and a query only reads
+    the postings of its own terms.
+    """
 
     def __init__(
         self,
@@ -30,17 +46,103 @@ class BM25Index:
         b: float = 0.75,
         tokenizer: TokenizerConfig | None = None,
     ) -> None:
-        self._term_freqs = term_freqs
-        self._doc_lengths = doc_lengths
+        vocab = sorted(idf)
+        postings: Dict[str, List[tuple[int, int]]] = {term: [] for term in vocab}
+        for doc_index, tf in enumerate(term_freqs):
+            for term, count in tf.items():
+                # Terms without an idf can never score; keep them out of the postings.
+                if term in postings:
+                    postings[term].append((doc_index, count))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum([len(postings[term]) for term in vocab], out=offsets[1:])
+        flat = [posting for term in vocab for posting in postings[term]]
+        self._set_arrays(
+            vocab=np.asarray(vocab, dtype=np.str_),
+            idf=np.asarray([idf[term] for term in vocab], dtype=np.float64),
+            term_offsets=offsets,
+            post_docs=np.asarray([doc for doc, _ in flat], dtype=np.int32),
+            post_counts=np.asarray([count for _, count in flat], dtype=np.int32),
+            doc_lengths=np.asarray(doc_lengths, dtype=np.int64),
+            avgdl=float(avgdl),
+            k1=k1,
+            b=b,
+            tokenizer=tokenizer,
+        )
+
+    def _set_arrays(
+        self,
+        *,
+        vocab: np.ndarray,
+        idf: np.ndarray,
+        term_offsets: np.ndarray,
+        post_docs: np.ndarray,
+        post_counts: np.ndarray,
+        doc_lengths: np.ndarray,
+        avgdl: float,
+        k1: float,
+        b: float,
+        tokenizer: TokenizerConfig | None,
+    ) -> None:
+        self._vocab = vocab
         self._idf = idf
+        self._term_offsets = term_offsets
+        self._post_docs = post_docs
+        self._post_counts = post_counts
+        self._doc_lengths = doc_lengths
         self._avgdl = avgdl
         self._k1 = k1
         self._b = b
         self._tokenizer = tokenizer or TokenizerConfig()
+        if avgdl > 0:
+            self._norm = k1 * (1.0 - b + b * (doc_lengths / avgdl))
+        else:
+            self._norm = np.full(len(doc_lengths), k1, dtype=np.float64)
 
     @property
     def size(self) -> int:
-        return len(self._term_freqs)
+        return len(self._doc_lengths)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Return the index as term-major postings arrays (for binary caching)."""
+        return {
+            "format_version": np.asarray([BM25_ARRAY_FORMAT_VERSION], dtype=np.int32),
+            "vocab": self._vocab,
+            "idf": self._idf,
+            "term_offsets": self._term_offsets,
+            "post_docs": self._post_docs,
+            "post_counts": self._post_counts,
+            "doc_lengths": self._doc_lengths,
+            "params": np.asarray([self._avgdl, self._k1, self._b], dtype=np.float64),
+        }
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Mapping[str, np.ndarray],
+        *,
+        tokenizer: TokenizerConfig | None = None,
+    ) -> "BM25Index":
+        """Wrap :meth:`to_arrays` output without converting it to Python objects."""
+        version = int(np.asarray(arrays["format_version"]).reshape(-1)[0])
+        if version == 1:
+            arrays = {**arrays, **_term_major_from_csr(arrays)}
+        elif version != BM25_ARRAY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 array format version: {version}")
+        avgdl, k1, b = (float(value) for value in np.asarray(arrays["params"]).reshape(-1))
+        index = cls.__new__(cls)
+        index._set_arrays(
+            vocab=np.asarray(arrays["vocab"], dtype=np.str_),
+            idf=np.asarray(arrays["idf"], dtype=np.float64),
+            term_offsets=np.asarray(arrays["term_offsets"], dtype=np.int64),
+            post_docs=np.asarray(arrays["post_docs"], dtype=np.int32),
+            post_counts=np.asarray(arrays["post_counts"], dtype=np.int32),
+            doc_lengths=np.asarray(arrays["doc_lengths"], dtype=np.int64),
+            avgdl=avgdl,
+            k1=k1,
+            b=b,
+            tokenizer=tokenizer,
+        )
+        return index
 
     def search(self, query: str, *, top_n: int = 50) -> List[BM25Hit]:
         """Return top_n BM25 hits for the query."""
@@ -48,25 +150,52 @@ class BM25Index:
         if not tokens:
             return []
 
-        unique_terms = list(dict.fromkeys(tokens))
-        scores: List[BM25Hit] = []
-
-        for doc_index, tf in enumerate(self._term_freqs):
-            score = _bm25_score(
-                tf=tf,
-                doc_len=self._doc_lengths[doc_index],
-                avgdl=self._avgdl,
-                idf=self._idf,
-                terms=unique_terms,
-                k1=self._k1,
-                b=self._b,
+        scores = np.zeros(self.size, dtype=np.float64)
+        # Terms are added in query order, like the original per-document sum,
+        # so scores (and tie order) are unchanged.
+        for term_id in self._lookup_terms(list(dict.fromkeys(tokens))):
+            start, end = self._term_offsets[term_id], self._term_offsets[term_id + 1]
+            docs = self._post_docs[start:end]
+            counts = self._post_counts[start:end]
+            scores[docs] += self._idf[term_id] * (
+                (counts * (self._k1 + 1.0)) / (counts + self._norm[docs])
             )
-            if score <= 0:
-                continue
-            scores.append(BM25Hit(doc_index=doc_index, score=score))
 
-        scores.sort(key=lambda hit: (-hit.score, hit.doc_index))
-        return scores[:top_n]
+        matched = np.flatnonzero(scores > 0)
+        ranked = matched[np.lexsort((matched, -scores[matched]))][:top_n]
+        return [BM25Hit(doc_index=int(doc), score=float(scores[doc])) for doc in ranked]
+
+    def _lookup_terms(self, terms: Sequence[str]) -> List[int]:
+        """Return vocabulary ids of ``terms`` (in order), skipping unknown terms."""
+        if not len(self._vocab):
+            return []
+        positions = np.searchsorted(self._vocab, terms).tolist()
+        return [
+            position
+            for term, position in zip(terms, positions, strict=True)
+            if position < len(self._vocab) and self._vocab[position] == term
+        ]
+
+
+def _term_major_from_csr(arrays: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Convert v1 document-major postings to the v2 term-major layout."""
+    vocab = np.asarray(arrays["vocab"], dtype=np.str_)
+    doc_offsets = np.asarray(arrays["doc_offsets"], dtype=np.int64)
+    order = np.argsort(vocab, kind="stable")
+    new_ids = np.empty(len(vocab), dtype=np.int64)
+    new_ids[order] = np.arange(len(vocab))
+    term_ids = new_ids[np.asarray(arrays["term_ids"], dtype=np.int64)]
+    postings = np.argsort(term_ids, kind="stable")
+    docs = np.repeat(np.arange(len(doc_offsets) - 1), np.diff(doc_offsets))
+    term_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=term_offsets[1:])
+    return {
+        "vocab": vocab[order],
+        "idf": np.asarray(arrays["idf"], dtype=np.float64)[order],
+        "term_offsets": term_offsets,
+        "post_docs": docs[postings],
+        "post_counts": np.asarray(arrays["term_counts"])[postings],
+    }
 
 
 def build_bm25_index(
@@ -118,29 +247,4 @@ def _idf(n_docs: int, df: int) -> float:
     return math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
 
 
-def _bm25_score(
-    *,
-    tf: Dict[str, int],
-    doc_len: int,
-    avgdl: float,
-    idf: Dict[str, float],
-    terms: Iterable[str],
-    k1: float,
-    b: float,
-) -> float:
-    score = 0.0
-    denom_norm = k1 * (1.0 - b + b * (doc_len / avgdl)) if avgdl > 0 else k1
-    for term in terms:
-        f = tf.get(term, 0)
-        if f <= 0:
-            continue
-        term_idf = idf.get(term)
-        if term_idf is None:
-            continue
-        numerator = f * (k1 + 1.0)
-        denominator = f + denom_norm
-        score += term_idf * (numerator / denominator)
-    return score
-
-
 __all__ = ["BM25Hit", "BM25Index", "build_bm25_index", "tokenize"]
@@ -8,7 +8,25 @@ from typing import List, Optional
 
 import numpy as np
 import torch
-from transformers import AutoModelForMaskedLM, AutoTokenizer
+from transformers import AutoConfig, AutoModelForMaskedLM, AutoTokenizer
+
+from retrieval.batching import plan_token_batches, resolve_max_tokens_per_batch
+from retrieval.onnx_backend import (
+    DEFAULT_INFERENCE_BACKEND,
+    OnnxSession,
+    SpladePoolingHead,
+    ensure_onnx_model,
+    is_onnx_backend,
+    normalize_inference_backend,
+    onnx_input_names,
+)
+from retrieval.serving.client import (
+    InferenceServerUnavailable,
+    RemoteSpladeEncoder,
+    disable_inference_server,
+    get_inference_client,
+    inference_server_address,
+)
 
 DEFAULT_SPLADE_MODEL_ID = "naver/splade-v3"
 
@@ -22,21 +40,42 @@ class SpladeEncoder:
         model_id: str = DEFAULT_SPLADE_MODEL_ID,
         device: Optional[str] = None,
         hf_token: Optional[str] = None,
+        backend: str = DEFAULT_INFERENCE_BACKEND,
+        onnx_cache_dir: Optional[str] = None,
     ) -> None:
-        resolved_device = device or _default_device()
+        self.backend = normalize_inference_backend(backend)
+        onnx = is_onnx_backend(self.backend)
+        resolved_device = "cpu" if onnx else (device or _default_device())
         self._device = torch.device(resolved_device)
         token = hf_token or os.environ.get("HF_TOKEN") or os.environ.get(
             "HUGGINGFACE_HUB_TOKEN"
         )
         self._tokenizer = AutoTokenizer.from_pretrained(model_id, token=token)
-        self._model = AutoModelForMaskedLM.from_pretrained(model_id, token=token)
-        self._model.eval()
-        self._model.to(self._device)
         self.model_id = model_id
-        self.vocab_size = int(getattr(self._model.config, "vocab_size", 0) or 0)
+        config = AutoConfig.from_pretrained(model_id, token=token)
+        self.vocab_size = int(getattr(config, "vocab_size", 0) or 0)
         if self.vocab_size <= 0:
             raise ValueError("Unable to infer vocab_size from SPLADE model config.")
 
+        self._model = None
+        self._session: OnnxSession | None = None
+        if onnx:
+            onnx_path = ensure_onnx_model(
+                lambda: SpladePoolingHead(
+                    AutoModelForMaskedLM.from_pretrained(model_id, token=token)
+                ),
+                model_id=model_id,
+                kind="splade",
+                input_names=onnx_input_names(self._tokenizer),
+                quantized=self.backend == "onnx-int8",
+                cache_dir=onnx_cache_dir,
+            )
+            self._session = OnnxSession(onnx_path)
+        else:
+            self._model = AutoModelForMaskedLM.from_pretrained(model_id, token=token)
+            self._model.eval()
+            self._model.to(self._device)
+
     @property
     def device(self) -> str:
         return str(self._device)
@@ -47,35 +86,58 @@ class SpladeEncoder:
         *,
         max_length: int,
         batch_size: int = 8,
+        max_tokens_per_batch: Optional[int] = None,
     ) -> np.ndarray:
-        """Return a float32 matrix of shape (len(texts), vocab_size)."""
+        """Return a float32 matrix of shape (len(texts), vocab_size).
+
+        Texts are sorted by token length and grouped into batches whose padded size
+        stays within ``max_tokens_per_batch`` (default: ``batch_size * max_length``);
+        rows are scattered back to the input order.
+        """
         if max_length < 1:
             raise ValueError("max_length must be >= 1")
         if batch_size < 1:
             raise ValueError("batch_size must be >= 1")
+        token_budget = resolve_max_tokens_per_batch(
+            max_tokens_per_batch, batch_size=batch_size, max_length=max_length
+        )
         if not texts:
             return np.zeros((0, self.vocab_size), dtype=np.float32)
 
-        vectors: List[np.ndarray] = []
-        for start in range(0, len(texts), batch_size):
-            batch = texts[start : start + batch_size]
+        lengths = _token_lengths(self._tokenizer, list(texts), max_length=max_length)
+        vectors = np.zeros((len(texts), self.vocab_size), dtype=np.float32)
+        for indices in plan_token_batches(lengths, max_tokens_per_batch=token_budget):
+            batch = [texts[idx] for idx in indices]
+            vectors[indices] = self._encode_batch(batch, max_length=max_length)
+
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def _encode_batch(self, batch: List[str], *, max_length: int) -> np.ndarray:
+        if self._session is not None:
             tokenized = self._tokenizer(
                 batch,
                 padding=True,
                 truncation=True,
                 max_length=max_length,
-                return_tensors="pt",
+                return_tensors="np",
             )
-            tokenized = {k: v.to(self._device) for k, v in tokenized.items()}
-
-            with torch.inference_mode():
-                logits = self._model(**tokenized).logits
-                activations = torch.log1p(torch.relu(logits))
-                pooled = torch.amax(activations, dim=1)
-                pooled = pooled.to(dtype=torch.float32, device="cpu")
-            vectors.append(pooled.numpy())
+            return self._session.run(tokenized).astype(np.float32, copy=False)
+
+        tokenized = self._tokenizer(
+            batch,
+            padding=True,
+            truncation=True,
+            max_length=max_length,
+            return_tensors="pt",
+        )
+        tokenized = {k: v.to(self._device) for k, v in tokenized.items()}
 
-        return np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+        with torch.inference_mode():
+            logits = self._model(**tokenized).logits
+            activations = torch.log1p(torch.relu(logits))
+            pooled = torch.amax(activations, dim=1)
+            pooled = pooled.to(dtype=torch.float32, device="cpu")
+        return pooled.numpy()
 
 
 @lru_cache(maxsize=2)
@@ -83,9 +145,40 @@ def get_splade_encoder(
     model_id: str = DEFAULT_SPLADE_MODEL_ID,
     device: Optional[str] = None,
     hf_token: Optional[str] = None,
-) -> SpladeEncoder:
-    """Return a cached SPLADE encoder instance."""
-    return SpladeEncoder(model_id=model_id, device=device, hf_token=hf_token)
+    backend: str = DEFAULT_INFERENCE_BACKEND,
+    onnx_cache_dir: Optional[str] = None,
+) -> SpladeEncoder | RemoteSpladeEncoder:
+    """Return a cached SPLADE encoder instance.
+
+    When the batch parent advertises a shared inference server, a client proxy is
+    returned instead so worker processes do not load their own model copy.
+    """
+    address = inference_server_address()
+    if address is not None:
+        try:
+            return RemoteSpladeEncoder(
+                get_inference_client(address),
+                model_id=model_id,
+                device=device,
+                hf_token=hf_token,
+                backend=backend,
+                onnx_cache_dir=onnx_cache_dir,
+            )
+        except InferenceServerUnavailable:
+            disable_inference_server()
+    return SpladeEncoder(
+        model_id=model_id,
+        device=device,
+        hf_token=hf_token,
+        backend=backend,
+        onnx_cache_dir=onnx_cache_dir,
+    )
+
+
+def _token_lengths(tokenizer, texts: List[str], *, max_length: int) -> List[int]:
+    """Return truncated token counts (including special tokens) for each text."""
+    encoded = tokenizer(texts, truncation=True, max_length=max_length)
+    return [len(ids) for ids in encoded["input_ids"]]
 
 
 def _default_device() -> str:
@@ -0,0 +1,267 @@
+"""ONNX Runtime inference backend for SPLADE / cross-encoder models (CPU).
+
+HF models are exported once to ONNX (optionally dynamically int8-quantized) and
+cached on disk; subsequent loads only build an ``onnxruntime.InferenceSession``.
+A ``manifest.json`` next to the export records what produced it (model
+revision, opset, torch/transformers versions, quantization settings); a
+mismatch triggers a fresh export, so upgrading a model or library never reuses
+a stale graph. Requires the optional ``onnx`` extra: ``uv pip install -e '.[onnx]'``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import torch
+
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_INFERENCE_BACKEND = "torch"
+DEFAULT_ONNX_CACHE_DIR = Path.home() / ".cache" / "rob2" / "onnx"
+_ONNX_OPSET = 17
+_FP32_FILE = "model.onnx"
+_INT8_FILE = "model.int8.onnx"
+_MANIFEST_FILE = "manifest.json"
+# Weight/config files whose size and mtime identify a local model directory.
+_LOCAL_MODEL_FILES = ("config.json", "*.safetensors", "*.bin")
+
+
+def normalize_inference_backend(value: str | None) -> str:
+    """Return a validated backend name (torch|onnx|onnx-int8)."""
+    normalized = (value or DEFAULT_INFERENCE_BACKEND).strip().lower().replace("_", "-")
+    if normalized not in INFERENCE_BACKENDS:
+        raise ValueError(f"inference backend must be one of {', '.join(INFERENCE_BACKENDS)}")
+    return normalized
+
+
+def is_onnx_backend(backend: str) -> bool:
+    return backend in {"onnx", "onnx-int8"}
+
+
+class SpladePoolingHead(torch.nn.Module):
+    """Wrap a masked-LM so the exported graph emits pooled SPLADE vectors.
+
+    Pooling mirrors ``SpladeEncoder``: max over positions of ``log1p(relu(logits))``,
+    so only (batch, vocab) leaves the session instead of full token logits.
+    """
+
+    def __init__(self, model: torch.nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, *rest: torch.Tensor):
+        kwargs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if rest:
+            kwargs["token_type_ids"] = rest[0]
+        logits = self.model(**kwargs).logits
+        return torch.amax(torch.log1p(torch.relu(logits)), dim=1)
+
+
+class SequenceLogitsHead(torch.nn.Module):
+    """Wrap a sequence-classification model so the exported graph emits raw logits."""
+
+    def __init__(self, model: torch.nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, *rest: torch.Tensor):
+        kwargs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if rest:
+            kwargs["token_type_ids"] = rest[0]
+        return self.model(**kwargs).logits
+
+
+def onnx_model_dir(model_id: str, *, kind: str, cache_dir: str | Path | None = None) -> Path:
+    """Return the export directory for a model id (slug + short hash of the id)."""
+    root = Path(cache_dir) if cache_dir else DEFAULT_ONNX_CACHE_DIR
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_id.strip()).strip("_")[-64:] or "model"
+    digest = hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:8]
+    return root / kind / f"{slug}-{digest}"
+
+
+def ensure_onnx_model(
+    build_head: Callable[[], torch.nn.Module],
+    *,
+    model_id: str,
+    kind: str,
+    input_names: Sequence[str],
+    quantized: bool,
+    cache_dir: str | Path | None = None,
+) -> Path:
+    """Export ``build_head()`` to ONNX (and quantize) unless a matching export exists.
+
+    ``build_head`` is only called when an export is needed, so cached loads skip
+    instantiating the torch model entirely. An export is reused only while its
+    manifest matches the current model revision, opset and library versions.
+    """
+    target_dir = onnx_model_dir(model_id, kind=kind, cache_dir=cache_dir)
+    fp32_path = target_dir / _FP32_FILE
+    manifest_path = target_dir / _MANIFEST_FILE
+    manifest = _read_manifest(manifest_path)
+    export_info = _export_info(model_id, input_names=input_names)
+    if not fp32_path.exists() or manifest.get("export") != export_info:
+        target_dir.mkdir(parents=True, exist_ok=True)
+        _export(build_head(), fp32_path, input_names=input_names)
+        manifest = {"export": export_info}
+        _write_manifest(manifest_path, manifest)
+    if not quantized:
+        return fp32_path
+
+    int8_path = target_dir / _INT8_FILE
+    quantize_info = _quantize_info()
+    if not int8_path.exists() or manifest.get("int8") != quantize_info:
+        _quantize(fp32_path, int8_path)
+        manifest["int8"] = quantize_info
+        _write_manifest(manifest_path, manifest)
+    return int8_path
+
+
+class OnnxSession:
+    """Thin wrapper over ``onnxruntime.InferenceSession`` for single-output models."""
+
+    def __init__(self, path: str | Path, *, intra_op_num_threads: Optional[int] = None) -> None:
+        ort = _require_onnxruntime()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_num_threads:
+            options.intra_op_num_threads = int(intra_op_num_threads)
+        self.path = Path(path)
+        self._session = ort.InferenceSession(
+            str(self.path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names: List[str] = [item.name for item in self._session.get_inputs()]
+
+    def run(self, inputs: Mapping[str, Any]) -> np.ndarray:
+        feed = {
+            name: np.asarray(inputs[name], dtype=np.int64)
+            for name in self.input_names
+            if name in inputs
+        }
+        missing = [name for name in self.input_names if name not in feed]
+        if missing:
+            raise ValueError(f"Missing ONNX inputs: {', '.join(missing)}")
+        return np.asarray(self._session.run(None, feed)[0])
+
+
+def onnx_input_names(tokenizer: Any) -> List[str]:
+    """Return exported input names in positional order (input_ids, attention_mask, ...)."""
+    ordered = ["input_ids", "attention_mask"]
+    if "token_type_ids" in (getattr(tokenizer, "model_input_names", None) or []):
+        ordered.append("token_type_ids")
+    return ordered
+
+
+def model_revision(model_id: str) -> str | None:
+    """Identify the weights behind ``model_id`` without loading them.
+
+    Local directories are fingerprinted by the size and mtime of their config
+    and weight files; hub ids resolve to the cached snapshot commit, if any.
+    """
+    path = Path(model_id)
+    if path.is_dir():
+        digest = hashlib.sha256()
+        for pattern in _LOCAL_MODEL_FILES:
+            for item in sorted(path.glob(pattern)):
+                stat = item.stat()
+                digest.update(f"{item.name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+        return f"local:{digest.hexdigest()[:16]}"
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:  # pragma: no cover - transformers depends on huggingface_hub
+        return None
+    cached = try_to_load_from_cache(model_id, "config.json")
+    # Cached hub files live under .../snapshots/<commit>/.
+    return Path(cached).parent.name if isinstance(cached, str) else None
+
+
+def _export_info(model_id: str, *, input_names: Sequence[str]) -> dict[str, Any]:
+    import transformers
+
+    return {
+        "model_id": model_id,
+        "revision": model_revision(model_id),
+        "opset": _ONNX_OPSET,
+        "input_names": list(input_names),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+    }
+
+
+def _quantize_info() -> dict[str, Any]:
+    ort = _require_onnxruntime()
+    return {"weight_type": "QInt8", "method": "dynamic", "onnxruntime": ort.__version__}
+
+
+def _read_manifest(path: Path) -> dict[str, Any]:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def _write_manifest(path: Path, manifest: Mapping[str, Any]) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _export(head: torch.nn.Module, path: Path, *, input_names: Sequence[str]) -> None:
+    head = head.eval()
+    dummy = tuple(torch.ones((1, 8), dtype=torch.long) for _ in input_names)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["output"] = {0: "batch"}
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with torch.no_grad():
+        torch.onnx.export(
+            head,
+            dummy,
+            str(tmp_path),
+            input_names=list(input_names),
+            output_names=["output"],
+            dynamic_axes=dynamic_axes,
+            opset_version=_ONNX_OPSET,
+            dynamo=False,
+        )
+    os.replace(tmp_path, path)
+
+
+def _quantize(source: Path, target: Path) -> None:
+    _require_onnxruntime()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    quantize_dynamic(str(source), str(tmp_path), weight_type=QuantType.QInt8)
+    os.replace(tmp_path, target)
+
+
+def _require_onnxruntime() -> Any:
+    try:
+        import onnxruntime
+    except ModuleNotFoundError as exc:
+        raise RuntimeError(
+            "ONNX backend requires onnxruntime; install the optional extra: "
+            "uv pip install -e '.[onnx]'"
+        ) from exc
+    return onnxruntime
+
+
+__all__ = [
+    "DEFAULT_INFERENCE_BACKEND",
+    "DEFAULT_ONNX_CACHE_DIR",
+    "INFERENCE_BACKENDS",
+    "OnnxSession",
+    "SequenceLogitsHead",
+    "SpladePoolingHead",
+    "ensure_onnx_model",
+    "is_onnx_backend",
+    "model_revision",
+    "normalize_inference_backend",
+    "onnx_input_names",
+    "onnx_model_dir",
+]
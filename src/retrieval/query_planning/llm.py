@@ -106,7 +106,7 @@ def generate_query_plan_llm(
 
 
 def _init_chat_model(config: LLMQueryPlannerConfig) -> ChatModelLike:
-    from langchain.chat_models import init_chat_model
+    from utils.llm_cassette import init_chat_model
 
     kwargs: dict[str, Any] = {}
     if config.model_provider:
@@ -2,12 +2,40 @@
 
 from __future__ import annotations
 
-from typing import List, Sequence
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, MutableMapping, Sequence, Tuple
 
 from retrieval.rerankers.contracts import Reranker
 from schemas.internal.evidence import EvidenceCandidate
 
 
+@dataclass(frozen=True)
+class RerankJob:
+    """One question's rerank request: query text plus its retrieved candidates."""
+
+    query: str
+    candidates: Sequence[EvidenceCandidate]
+
+
+@dataclass(slots=True)
+class RerankBatchStats:
+    """Counters for a batched rerank call (all pairs vs. pairs actually scored)."""
+
+    pairs: int = 0
+    unique_pairs: int = 0
+    cache_hits: int = 0
+    scored: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "pairs": self.pairs,
+            "unique_pairs": self.unique_pairs,
+            "cache_hits": self.cache_hits,
+            "scored": self.scored,
+        }
+
+
 def apply_reranker(
     *,
     reranker: Reranker,
@@ -16,6 +44,7 @@ def apply_reranker(
     top_n: int,
     max_length: int,
     batch_size: int,
+    max_tokens_per_batch: int | None = None,
 ) -> List[EvidenceCandidate]:
     """Return candidates reordered by reranker score (top_n), keeping full list."""
     if top_n < 1:
@@ -27,26 +56,165 @@ def apply_reranker(
     tail = list(candidates[top_n:])
 
     passages = [_format_passage(candidate) for candidate in head]
-    result = reranker.rerank(
-        query,
-        passages,
-        max_length=max_length,
-        batch_size=batch_size,
-    )
+    rerank_kwargs: dict[str, int] = {
+        "max_length": max_length,
+        "batch_size": batch_size,
+    }
+    if max_tokens_per_batch is not None:
+        rerank_kwargs["max_tokens_per_batch"] = max_tokens_per_batch
+    result = reranker.rerank(query, passages, **rerank_kwargs)
     if len(result.scores) != len(head):
         raise RuntimeError("Reranker score count mismatch.")
     if sorted(result.order) != list(range(len(head))):
         raise RuntimeError("Reranker order must be a permutation of indices.")
 
+    return _reorder(
+        head,
+        tail,
+        scores=[float(score) for score in result.scores],
+        order=list(result.order),
+        reranker_name=reranker.name,
+    )
+
+
+def apply_reranker_batch(
+    *,
+    reranker: Reranker,
+    jobs: Mapping[str, RerankJob],
+    top_n: int,
+    max_length: int,
+    batch_size: int,
+    max_tokens_per_batch: int | None = None,
+    score_cache: MutableMapping[str, float] | None = None,
+) -> Tuple[Dict[str, List[EvidenceCandidate]], RerankBatchStats]:
+    """Rerank several questions' candidates with one deduplicated scoring pass.
+
+    (query, passage) pairs from all jobs are deduplicated and looked up in
+    ``score_cache`` (keyed by :func:`rerank_pair_key`); only missing pairs are
+    scored, in a single ``score_pairs`` call when the reranker supports it (else
+    one ``rerank`` call per distinct query). New scores are written back to
+    ``score_cache`` so validation retries and the other retrieval engine reuse them.
+    """
+    if top_n < 1:
+        raise ValueError("top_n must be >= 1")
+    cache: MutableMapping[str, float] = score_cache if score_cache is not None else {}
+    stats = RerankBatchStats()
+
+    heads: Dict[str, List[EvidenceCandidate]] = {}
+    pair_keys: Dict[str, List[str]] = {}
+    missing: Dict[str, Tuple[str, str]] = {}
+    for job_id, job in jobs.items():
+        head = list(job.candidates[: min(top_n, len(job.candidates))])
+        heads[job_id] = head
+        keys: List[str] = []
+        for candidate in head:
+            passage = _format_passage(candidate)
+            key = rerank_pair_key(job.query, passage)
+            keys.append(key)
+            stats.pairs += 1
+            if key in cache or key in missing:
+                continue
+            missing[key] = (job.query, passage)
+        pair_keys[job_id] = keys
+
+    stats.unique_pairs = len({key for keys in pair_keys.values() for key in keys})
+    stats.scored = len(missing)
+    stats.cache_hits = stats.unique_pairs - stats.scored
+    if missing:
+        cache.update(
+            _score_missing_pairs(
+                reranker,
+                missing,
+                max_length=max_length,
+                batch_size=batch_size,
+                max_tokens_per_batch=max_tokens_per_batch,
+            )
+        )
+
+    reranked: Dict[str, List[EvidenceCandidate]] = {}
+    for job_id, job in jobs.items():
+        head = heads[job_id]
+        if not head:
+            reranked[job_id] = []
+            continue
+        scores = [float(cache[key]) for key in pair_keys[job_id]]
+        order = sorted(range(len(scores)), key=lambda idx: (-scores[idx], idx))
+        reranked[job_id] = _reorder(
+            head,
+            list(job.candidates[len(head) :]),
+            scores=scores,
+            order=order,
+            reranker_name=reranker.name,
+        )
+    return reranked, stats
+
+
+def reranker_model_key(reranker: Reranker, *, max_length: int) -> str:
+    """Return the identity under which reranker scores may be reused."""
+    model_id = str(getattr(reranker, "model_id", None) or reranker.name)
+    backend = str(getattr(reranker, "backend", None) or "torch")
+    return f"{reranker.name}:{model_id}:{backend}:{int(max_length)}"
+
+
+def rerank_pair_key(query: str, passage: str) -> str:
+    """Return a stable hash for a (query, passage) pair."""
+    hasher = hashlib.sha256()
+    hasher.update(query.encode("utf-8"))
+    hasher.update(b"\x1f")
+    hasher.update(passage.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _score_missing_pairs(
+    reranker: Reranker,
+    missing: Mapping[str, Tuple[str, str]],
+    *,
+    max_length: int,
+    batch_size: int,
+    max_tokens_per_batch: int | None,
+) -> Dict[str, float]:
+    kwargs: dict[str, int] = {"max_length": max_length, "batch_size": batch_size}
+    if max_tokens_per_batch is not None:
+        kwargs["max_tokens_per_batch"] = max_tokens_per_batch
+
+    keys = list(missing)
+    score_pairs = getattr(reranker, "score_pairs", None)
+    if callable(score_pairs):
+        scores = score_pairs([missing[key] for key in keys], **kwargs)
+        if len(scores) != len(keys):
+            raise RuntimeError("Reranker score count mismatch.")
+        return {key: float(score) for key, score in zip(keys, scores, strict=True)}
+
+    by_query: Dict[str, List[str]] = {}
+    for key in keys:
+        by_query.setdefault(missing[key][0], []).append(key)
+    scored: Dict[str, float] = {}
+    for query, query_keys in by_query.items():
+        result = reranker.rerank(query, [missing[key][1] for key in query_keys], **kwargs)
+        if len(result.scores) != len(query_keys):
+            raise RuntimeError("Reranker score count mismatch.")
+        for key, score in zip(query_keys, result.scores, strict=True):
+            scored[key] = float(score)
+    return scored
+
+
+def _reorder(
+    head: Sequence[EvidenceCandidate],
+    tail: Sequence[EvidenceCandidate],
+    *,
+    scores: Sequence[float],
+    order: Sequence[int],
+    reranker_name: str,
+) -> List[EvidenceCandidate]:
     reranked: List[EvidenceCandidate] = []
-    for new_rank, old_index in enumerate(result.order, start=1):
+    for new_rank, old_index in enumerate(order, start=1):
         candidate = head[old_index]
-        score = float(result.scores[old_index])
+        score = float(scores[old_index])
         reranked.append(
             candidate.model_copy(
                 update={
                     "score": score,
-                    "reranker": reranker.name,
+                    "reranker": reranker_name,
                     "rerank_score": score,
                     "rerank_rank": new_rank,
                 }
@@ -58,7 +226,7 @@ def apply_reranker(
         reranked.append(
             candidate.model_copy(
                 update={
-                    "reranker": reranker.name,
+                    "reranker": reranker_name,
                     "rerank_rank": offset + index,
                 }
             )
@@ -75,5 +243,11 @@ def _format_passage(candidate: EvidenceCandidate) -> str:
     return text
 
 
-__all__ = ["apply_reranker"]
-
+__all__ = [
+    "RerankBatchStats",
+    "RerankJob",
+    "apply_reranker",
+    "apply_reranker_batch",
+    "rerank_pair_key",
+    "reranker_model_key",
+]
@@ -31,6 +31,7 @@ class Reranker(Protocol):
         *,
         max_length: int = 512,
         batch_size: int = 8,
+        max_tokens_per_batch: int | None = None,
     ) -> RerankResult: ...
 
 
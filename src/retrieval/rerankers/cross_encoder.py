@@ -7,12 +7,30 @@ from __future__ import annotations
 
 import os
 from functools import lru_cache
-from typing import List, Optional, Sequence
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
 import torch
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
+from retrieval.batching import plan_token_batches, resolve_max_tokens_per_batch
+from retrieval.onnx_backend import (
+    DEFAULT_INFERENCE_BACKEND,
+    OnnxSession,
+    SequenceLogitsHead,
+    ensure_onnx_model,
+    is_onnx_backend,
+    normalize_inference_backend,
+    onnx_input_names,
+)
 from retrieval.rerankers.contracts import RerankResult
+from retrieval.serving.client import (
+    InferenceServerUnavailable,
+    RemoteCrossEncoderReranker,
+    disable_inference_server,
+    get_inference_client,
+    inference_server_address,
+)
 
 DEFAULT_CROSS_ENCODER_MODEL_ID = "ncbi/MedCPT-Cross-Encoder"
 
@@ -26,21 +44,41 @@ class CrossEncoderReranker:
         model_id: str = DEFAULT_CROSS_ENCODER_MODEL_ID,
         device: Optional[str] = None,
         hf_token: Optional[str] = None,
+        backend: str = DEFAULT_INFERENCE_BACKEND,
+        onnx_cache_dir: Optional[str] = None,
     ) -> None:
-        resolved_device = device or _default_device()
+        self.backend = normalize_inference_backend(backend)
+        onnx = is_onnx_backend(self.backend)
+        resolved_device = "cpu" if onnx else (device or _default_device())
         self._device = torch.device(resolved_device)
         token = hf_token or os.environ.get("HF_TOKEN") or os.environ.get(
             "HUGGINGFACE_HUB_TOKEN"
         )
         self._tokenizer = AutoTokenizer.from_pretrained(model_id, token=token)
-        self._model = AutoModelForSequenceClassification.from_pretrained(
-            model_id, token=token
-        )
-        self._model.eval()
-        self._model.to(self._device)
         self.model_id = model_id
         self.name = "cross_encoder"
 
+        self._model = None
+        self._session: OnnxSession | None = None
+        if onnx:
+            onnx_path = ensure_onnx_model(
+                lambda: SequenceLogitsHead(
+                    AutoModelForSequenceClassification.from_pretrained(model_id, token=token)
+                ),
+                model_id=model_id,
+                kind="cross_encoder",
+                input_names=onnx_input_names(self._tokenizer),
+                quantized=self.backend == "onnx-int8",
+                cache_dir=onnx_cache_dir,
+            )
+            self._session = OnnxSession(onnx_path)
+        else:
+            self._model = AutoModelForSequenceClassification.from_pretrained(
+                model_id, token=token
+            )
+            self._model.eval()
+            self._model.to(self._device)
+
     @property
     def device(self) -> str:
         return str(self._device)
@@ -52,37 +90,80 @@ class CrossEncoderReranker:
         *,
         max_length: int = 512,
         batch_size: int = 8,
+        max_tokens_per_batch: Optional[int] = None,
     ) -> RerankResult:
+        """Score passages against the query (scores follow the input passage order)."""
+        scores = self.score_pairs(
+            [(query, passage) for passage in passages],
+            max_length=max_length,
+            batch_size=batch_size,
+            max_tokens_per_batch=max_tokens_per_batch,
+        )
+        order = sorted(range(len(scores)), key=lambda idx: (-scores[idx], idx))
+        return RerankResult(scores=scores, order=order)
+
+    def score_pairs(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        *,
+        max_length: int = 512,
+        batch_size: int = 8,
+        max_tokens_per_batch: Optional[int] = None,
+    ) -> List[float]:
+        """Return relevance scores for arbitrary (query, passage) pairs.
+
+        Pairs are sorted by token length and grouped into batches whose padded size
+        stays within ``max_tokens_per_batch`` (default: ``batch_size * max_length``);
+        scores are returned in the input order.
+        """
         if max_length < 1:
             raise ValueError("max_length must be >= 1")
         if batch_size < 1:
             raise ValueError("batch_size must be >= 1")
-        if not passages:
-            return RerankResult(scores=[], order=[])
+        token_budget = resolve_max_tokens_per_batch(
+            max_tokens_per_batch, batch_size=batch_size, max_length=max_length
+        )
+        if not pairs:
+            return []
+
+        pair_list = [[str(query), str(passage)] for query, passage in pairs]
+        lengths = _pair_token_lengths(self._tokenizer, pair_list, max_length=max_length)
+        scores: List[float] = [0.0] * len(pair_list)
 
-        pairs = [[query, passage] for passage in passages]
-        scores: List[float] = []
+        for indices in plan_token_batches(lengths, max_tokens_per_batch=token_budget):
+            batch = [pair_list[idx] for idx in indices]
+            batch_scores = self._score_batch(batch, max_length=max_length)
+            for idx, score in zip(indices, batch_scores.tolist(), strict=True):
+                scores[idx] = float(score)
 
-        for start in range(0, len(pairs), batch_size):
-            batch = pairs[start : start + batch_size]
+        return scores
+
+    def _score_batch(self, batch: List[List[str]], *, max_length: int) -> np.ndarray:
+        if self._session is not None:
             encoded = self._tokenizer(
                 batch,
                 truncation=True,
                 padding=True,
-                return_tensors="pt",
+                return_tensors="np",
                 max_length=max_length,
             )
-            encoded = {k: v.to(self._device) for k, v in encoded.items()}
-
-            with torch.inference_mode():
-                logits = self._model(**encoded).logits
-                batch_scores = _logits_to_relevance_scores(logits)
-                batch_scores = batch_scores.to(dtype=torch.float32, device="cpu")
+            logits = torch.from_numpy(self._session.run(encoded))
+            return _logits_to_relevance_scores(logits).to(dtype=torch.float32).numpy()
+
+        encoded = self._tokenizer(
+            batch,
+            truncation=True,
+            padding=True,
+            return_tensors="pt",
+            max_length=max_length,
+        )
+        encoded = {k: v.to(self._device) for k, v in encoded.items()}
 
-            scores.extend(batch_scores.numpy().tolist())
-
-        order = sorted(range(len(scores)), key=lambda idx: (-scores[idx], idx))
-        return RerankResult(scores=scores, order=order)
+        with torch.inference_mode():
+            logits = self._model(**encoded).logits
+            batch_scores = _logits_to_relevance_scores(logits)
+            batch_scores = batch_scores.to(dtype=torch.float32, device="cpu")
+        return batch_scores.numpy()
 
 
 @lru_cache(maxsize=2)
@@ -90,9 +171,42 @@ def get_cross_encoder_reranker(
     model_id: str = DEFAULT_CROSS_ENCODER_MODEL_ID,
     device: Optional[str] = None,
     hf_token: Optional[str] = None,
-) -> CrossEncoderReranker:
-    """Return a cached cross-encoder reranker instance."""
-    return CrossEncoderReranker(model_id=model_id, device=device, hf_token=hf_token)
+    backend: str = DEFAULT_INFERENCE_BACKEND,
+    onnx_cache_dir: Optional[str] = None,
+) -> CrossEncoderReranker | RemoteCrossEncoderReranker:
+    """Return a cached cross-encoder reranker instance.
+
+    When the batch parent advertises a shared inference server, a client proxy is
+    returned instead so worker processes do not load their own model copy.
+    """
+    address = inference_server_address()
+    if address is not None:
+        try:
+            return RemoteCrossEncoderReranker(
+                get_inference_client(address),
+                model_id=model_id,
+                device=device,
+                hf_token=hf_token,
+                backend=backend,
+                onnx_cache_dir=onnx_cache_dir,
+            )
+        except InferenceServerUnavailable:
+            disable_inference_server()
+    return CrossEncoderReranker(
+        model_id=model_id,
+        device=device,
+        hf_token=hf_token,
+        backend=backend,
+        onnx_cache_dir=onnx_cache_dir,
+    )
+
+
+def _pair_token_lengths(
+    tokenizer, pairs: List[List[str]], *, max_length: int
+) -> List[int]:
+    """Return truncated token counts (including special tokens) for each pair."""
+    encoded = tokenizer(pairs, truncation=True, max_length=max_length)
+    return [len(ids) for ids in encoded["input_ids"]]
 
 
 def _logits_to_relevance_scores(logits: torch.Tensor) -> torch.Tensor:
@@ -0,0 +1 @@
+"""Shared local inference server for SPLADE / cross-encoder models (batch workers)."""
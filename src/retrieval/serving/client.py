@@ -0,0 +1,312 @@
+"""Client proxies that forward SPLADE / cross-encoder calls to the shared server."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Connection
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from retrieval.rerankers.contracts import RerankResult
+
+INFERENCE_SOCKET_ENV = "ROB2_INFERENCE_SOCKET"
+INFERENCE_AUTHKEY_ENV = "ROB2_INFERENCE_AUTHKEY"
+# How long a request keeps reconnecting while the batch parent respawns a dead
+# server; models reload lazily there, so only the socket has to come back.
+_RECONNECT_TIMEOUT_S = 30.0
+_RECONNECT_INTERVAL_S = 0.2
+
+
+class InferenceServerUnavailable(RuntimeError):
+    """The shared inference server could not be reached (even after reconnecting)."""
+
+
+def inference_server_address() -> str | None:
+    """Return the advertised inference server socket path, if any."""
+    raw = os.environ.get(INFERENCE_SOCKET_ENV)
+    if raw is None or not raw.strip():
+        return None
+    return raw.strip()
+
+
+def inference_server_authkey() -> bytes:
+    """Return the connection authkey advertised alongside the socket path."""
+    raw = os.environ.get(INFERENCE_AUTHKEY_ENV)
+    if not raw:
+        raise RuntimeError(f"{INFERENCE_AUTHKEY_ENV} is required when using the inference server.")
+    return bytes.fromhex(raw.strip())
+
+
+class InferenceClient:
+    """Request/response client (one connection per thread) for the inference server."""
+
+    def __init__(
+        self,
+        address: str,
+        *,
+        authkey: bytes | None = None,
+        reconnect_timeout: float | None = None,
+    ) -> None:
+        self.address = address
+        self._authkey = authkey if authkey is not None else inference_server_authkey()
+        self._reconnect_timeout = (
+            _RECONNECT_TIMEOUT_S if reconnect_timeout is None else reconnect_timeout
+        )
+        self._local = threading.local()
+
+    def request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Send one request; requests are idempotent, so a lost one is resent
+        after reconnecting until ``reconnect_timeout`` runs out."""
+        deadline = time.monotonic() + self._reconnect_timeout
+        while True:
+            try:
+                connection = self._connection()
+                connection.send(payload)
+                response = connection.recv()
+                break
+            except (EOFError, OSError) as exc:
+                self._drop_connection()
+                if time.monotonic() >= deadline:
+                    raise InferenceServerUnavailable(
+                        f"Inference server unavailable ({self.address}): {exc}"
+                    ) from exc
+                time.sleep(_RECONNECT_INTERVAL_S)
+        if not isinstance(response, dict):
+            raise RuntimeError("Inference server returned an invalid response.")
+        if not response.get("ok"):
+            raise RuntimeError(f"Inference server error: {response.get('error')}")
+        return response
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _drop_connection(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+    def _connection(self) -> Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = Client(self.address, family="AF_UNIX", authkey=self._authkey)
+            self._local.connection = connection
+        return connection
+
+
+class RemoteSpladeEncoder:
+    """SpladeEncoder-compatible proxy backed by the shared inference server."""
+
+    def __init__(
+        self,
+        client: InferenceClient,
+        *,
+        model_id: str,
+        device: Optional[str] = None,
+        hf_token: Optional[str] = None,
+        backend: str = "torch",
+        onnx_cache_dir: Optional[str] = None,
+    ) -> None:
+        self._client = client
+        self._model = {
+            "model_id": model_id,
+            "device": device,
+            "hf_token": hf_token,
+            "backend": backend,
+            "onnx_cache_dir": onnx_cache_dir,
+        }
+        self._fallback: Any = None
+        loaded = client.request({"op": "load", "kind": "splade", **self._model})
+        self.model_id = model_id
+        self.vocab_size = int(loaded.get("vocab_size") or 0)
+        self._device = str(loaded.get("device") or device or "")
+
+    @property
+    def device(self) -> str:
+        return self._device
+
+    def _local_encoder(self) -> Any:
+        if self._fallback is None:
+            from retrieval.engines.splade import get_splade_encoder
+
+            disable_inference_server()
+            self._fallback = get_splade_encoder(**self._model)
+        return self._fallback
+
+    def encode(
+        self,
+        texts: List[str],
+        *,
+        max_length: int,
+        batch_size: int = 8,
+        max_tokens_per_batch: Optional[int] = None,
+    ) -> np.ndarray:
+        if self._fallback is None:
+            try:
+                response = self._client.request(
+                    {
+                        "op": "splade_encode",
+                        **self._model,
+                        "texts": list(texts),
+                        "max_length": max_length,
+                        "batch_size": batch_size,
+                        "max_tokens_per_batch": max_tokens_per_batch,
+                    }
+                )
+            except InferenceServerUnavailable:
+                pass
+            else:
+                return np.ascontiguousarray(response["vectors"], dtype=np.float32)
+        return self._local_encoder().encode(
+            list(texts),
+            max_length=max_length,
+            batch_size=batch_size,
+            max_tokens_per_batch=max_tokens_per_batch,
+        )
+
+
+class RemoteCrossEncoderReranker:
+    """CrossEncoderReranker-compatible proxy backed by the shared inference server."""
+
+    def __init__(
+        self,
+        client: InferenceClient,
+        *,
+        model_id: str,
+        device: Optional[str] = None,
+        hf_token: Optional[str] = None,
+        backend: str = "torch",
+        onnx_cache_dir: Optional[str] = None,
+    ) -> None:
+        self._client = client
+        self._model = {
+            "model_id": model_id,
+            "device": device,
+            "hf_token": hf_token,
+            "backend": backend,
+            "onnx_cache_dir": onnx_cache_dir,
+        }
+        self._fallback: Any = None
+        loaded = client.request({"op": "load", "kind": "cross_encoder", **self._model})
+        self.model_id = model_id
+        self.name = "cross_encoder"
+        self._device = str(loaded.get("device") or device or "")
+
+    @property
+    def device(self) -> str:
+        return self._device
+
+    def _local_reranker(self) -> Any:
+        if self._fallback is None:
+            from retrieval.rerankers.cross_encoder import get_cross_encoder_reranker
+
+            disable_inference_server()
+            self._fallback = get_cross_encoder_reranker(**self._model)
+        return self._fallback
+
+    def rerank(
+        self,
+        query: str,
+        passages: Sequence[str],
+        *,
+        max_length: int = 512,
+        batch_size: int = 8,
+        max_tokens_per_batch: Optional[int] = None,
+    ) -> RerankResult:
+        scores = self.score_pairs(
+            [(query, passage) for passage in passages],
+            max_length=max_length,
+            batch_size=batch_size,
+            max_tokens_per_batch=max_tokens_per_batch,
+        )
+        order = sorted(range(len(scores)), key=lambda idx: (-scores[idx], idx))
+        return RerankResult(scores=scores, order=order)
+
+    def score_pairs(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        *,
+        max_length: int = 512,
+        batch_size: int = 8,
+        max_tokens_per_batch: Optional[int] = None,
+    ) -> List[float]:
+        if not pairs:
+            return []
+        if self._fallback is None:
+            try:
+                response = self._client.request(
+                    {
+                        "op": "score_pairs",
+                        **self._model,
+                        "pairs": [(str(query), str(passage)) for query, passage in pairs],
+                        "max_length": max_length,
+                        "batch_size": batch_size,
+                        "max_tokens_per_batch": max_tokens_per_batch,
+                    }
+                )
+            except InferenceServerUnavailable:
+                pass
+            else:
+                return [float(score) for score in response["scores"]]
+        return self._local_reranker().score_pairs(
+            pairs,
+            max_length=max_length,
+            batch_size=batch_size,
+            max_tokens_per_batch=max_tokens_per_batch,
+        )
+
+
+_CLIENTS: dict[str, InferenceClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_inference_client(address: str) -> InferenceClient:
+    """Return a process-wide client for the given server address."""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(address)
+        if client is None:
+            client = InferenceClient(address)
+            _CLIENTS[address] = client
+        return client
+
+
+def disable_inference_server() -> None:
+    """Stop using the shared server in this process and fall back to local models.
+
+    Drops the advertised socket and the cached encoder/reranker factories, which
+    would otherwise keep handing out proxies bound to the dead server.
+    """
+    from retrieval.engines.splade import get_splade_encoder
+    from retrieval.rerankers.cross_encoder import get_cross_encoder_reranker
+
+    os.environ.pop(INFERENCE_SOCKET_ENV, None)
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        client.close()
+    get_splade_encoder.cache_clear()
+    get_cross_encoder_reranker.cache_clear()
+
+
+__all__ = [
+    "INFERENCE_AUTHKEY_ENV",
+    "INFERENCE_SOCKET_ENV",
+    "InferenceClient",
+    "InferenceServerUnavailable",
+    "RemoteCrossEncoderReranker",
+    "RemoteSpladeEncoder",
+    "disable_inference_server",
+    "get_inference_client",
+    "inference_server_address",
+    "inference_server_authkey",
+]
@@ -0,0 +1,405 @@
+"""Local inference server hosting SPLADE / cross-encoder models for batch workers.
+
+The batch parent starts one server process and advertises its Unix socket through
+environment variables; worker processes then talk to it via
+``retrieval.serving.client`` instead of loading their own model copies. Requests
+that target the same model and parameters and arrive within ``max_wait_ms`` of
+each other are merged into one call (dynamic micro-batching), so spans from
+different documents share forward passes.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import secrets
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Connection, Listener
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+from retrieval.serving.client import INFERENCE_AUTHKEY_ENV, INFERENCE_SOCKET_ENV
+
+DEFAULT_MAX_WAIT_MS = 5
+DEFAULT_MAX_BATCH_REQUESTS = 64
+_SOCKET_FILE = "inference.sock"
+
+ModelLoader = Callable[[Mapping[str, Any]], Any]
+_MODEL_FIELDS = ("model_id", "device", "hf_token", "backend", "onnx_cache_dir")
+
+
+@dataclass(slots=True)
+class _PendingRequest:
+    payload: dict[str, Any]
+    done: threading.Event = field(default_factory=threading.Event)
+    response: dict[str, Any] | None = None
+
+    def finish(self, response: dict[str, Any]) -> None:
+        self.response = response
+        self.done.set()
+
+
+def _model_kwargs(spec: Mapping[str, Any]) -> dict[str, Any]:
+    kwargs = {key: spec.get(key) for key in _MODEL_FIELDS}
+    kwargs["backend"] = kwargs.get("backend") or "torch"
+    return kwargs
+
+
+def _load_splade(spec: Mapping[str, Any]) -> Any:
+    from retrieval.engines.splade import SpladeEncoder
+
+    return SpladeEncoder(**_model_kwargs(spec))
+
+
+def _load_cross_encoder(spec: Mapping[str, Any]) -> Any:
+    from retrieval.rerankers.cross_encoder import CrossEncoderReranker
+
+    return CrossEncoderReranker(**_model_kwargs(spec))
+
+
+_DEFAULT_LOADERS: Mapping[str, ModelLoader] = {
+    "splade": _load_splade,
+    "cross_encoder": _load_cross_encoder,
+}
+_OP_KINDS = {"splade_encode": "splade", "score_pairs": "cross_encoder"}
+
+
+class InferenceServer:
+    """Serve model calls over a Unix socket with dynamic micro-batching."""
+
+    def __init__(
+        self,
+        address: str,
+        *,
+        authkey: bytes,
+        max_wait_ms: int = DEFAULT_MAX_WAIT_MS,
+        max_batch_requests: int = DEFAULT_MAX_BATCH_REQUESTS,
+        loaders: Mapping[str, ModelLoader] | None = None,
+    ) -> None:
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be >= 0")
+        if max_batch_requests < 1:
+            raise ValueError("max_batch_requests must be >= 1")
+        self.address = address
+        self._authkey = authkey
+        self._max_wait = max_wait_ms / 1000.0
+        self._max_batch_requests = max_batch_requests
+        self._loaders = dict(loaders or _DEFAULT_LOADERS)
+        self._models: Dict[Tuple[Any, ...], Any] = {}
+        self._queue: queue.Queue[_PendingRequest] = queue.Queue()
+        self._closed = threading.Event()
+        self._listener = Listener(address, family="AF_UNIX", authkey=authkey)
+        self.stats = {"requests": 0, "model_calls": 0}
+
+    def serve_forever(self) -> None:
+        dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        dispatcher.start()
+        while not self._closed.is_set():
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed.is_set():
+                    break
+                continue
+            if self._closed.is_set():
+                connection.close()
+                break
+            threading.Thread(
+                target=self._handle_connection, args=(connection,), daemon=True
+            ).start()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            # Wake the blocking accept() so serve_forever can observe the flag.
+            Client(self.address, family="AF_UNIX", authkey=self._authkey).close()
+        except OSError:
+            pass
+        self._listener.close()
+
+    def _handle_connection(self, connection: Connection) -> None:
+        with connection:
+            while not self._closed.is_set():
+                try:
+                    payload = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if not isinstance(payload, dict):
+                    connection.send({"ok": False, "error": "payload must be a dict"})
+                    continue
+                if payload.get("op") == "ping":
+                    connection.send({"ok": True, "pid": os.getpid()})
+                    continue
+                pending = _PendingRequest(payload=payload)
+                self._queue.put(pending)
+                pending.done.wait()
+                try:
+                    connection.send(pending.response)
+                except OSError:
+                    return
+
+    def _dispatch_loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            collected = [first]
+            deadline = time.monotonic() + self._max_wait
+            while len(collected) < self._max_batch_requests:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    collected.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups: Dict[Tuple[Any, ...], List[_PendingRequest]] = {}
+            for pending in collected:
+                groups.setdefault(_batch_key(pending.payload), []).append(pending)
+            for requests in groups.values():
+                self._run_group(requests)
+
+    def _run_group(self, requests: List[_PendingRequest]) -> None:
+        self.stats["requests"] += len(requests)
+        head = requests[0].payload
+        try:
+            op = str(head.get("op"))
+            if op == "load":
+                model = self._model(str(head.get("kind")), head)
+                response = {
+                    "ok": True,
+                    "device": str(getattr(model, "device", "") or ""),
+                    "vocab_size": int(getattr(model, "vocab_size", 0) or 0),
+                }
+                for pending in requests:
+                    pending.finish(response)
+                return
+            if op not in _OP_KINDS:
+                raise ValueError(f"Unsupported op: {op}")
+
+            model = self._model(_OP_KINDS[op], head)
+            item_key = "texts" if op == "splade_encode" else "pairs"
+            counts = [len(pending.payload.get(item_key) or []) for pending in requests]
+            merged = [item for pending in requests for item in pending.payload.get(item_key) or []]
+            params = {
+                "max_length": int(head["max_length"]),
+                "batch_size": int(head.get("batch_size") or 8),
+                "max_tokens_per_batch": head.get("max_tokens_per_batch"),
+            }
+            self.stats["model_calls"] += 1
+            if op == "splade_encode":
+                vectors = model.encode(merged, **params)
+                offset = 0
+                for pending, count in zip(requests, counts, strict=True):
+                    pending.finish(
+                        {"ok": True, "vectors": np.asarray(vectors[offset : offset + count])}
+                    )
+                    offset += count
+            else:
+                scores = model.score_pairs(merged, **params)
+                offset = 0
+                for pending, count in zip(requests, counts, strict=True):
+                    pending.finish({"ok": True, "scores": list(scores[offset : offset + count])})
+                    offset += count
+        except Exception as exc:  # pragma: no cover - surfaced to clients
+            response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            for pending in requests:
+                if not pending.done.is_set():
+                    pending.finish(response)
+
+    def _model(self, kind: str, payload: Mapping[str, Any]) -> Any:
+        loader = self._loaders.get(kind)
+        if loader is None:
+            raise ValueError(f"Unsupported model kind: {kind}")
+        if not payload.get("model_id"):
+            raise ValueError("model_id is required")
+        key = (kind, *(payload.get(name) for name in _MODEL_FIELDS))
+        model = self._models.get(key)
+        if model is None:
+            model = loader(payload)
+            self._models[key] = model
+        return model
+
+
+def _batch_key(payload: Mapping[str, Any]) -> Tuple[Any, ...]:
+    op = payload.get("op")
+    if op not in _OP_KINDS:
+        # Loads and unknown ops are handled one by one.
+        return ("single", id(payload))
+    return (
+        op,
+        *(payload.get(name) for name in _MODEL_FIELDS),
+        payload.get("max_length"),
+        payload.get("batch_size"),
+        payload.get("max_tokens_per_batch"),
+    )
+
+
+def _serve(address: str, authkey_hex: str, max_wait_ms: int) -> None:
+    server = InferenceServer(
+        address, authkey=bytes.fromhex(authkey_hex), max_wait_ms=max_wait_ms
+    )
+    server.serve_forever()
+
+
+_SUPERVISE_INTERVAL_S = 1.0
+DEFAULT_MAX_RESTARTS = 3
+
+
+@dataclass(slots=True)
+class InferenceServerHandle:
+    """Running inference server process owned by the batch parent.
+
+    :meth:`supervise` watches the process and respawns it at the same socket
+    address if it dies (e.g. OOM while loading a model); clients reconnect on
+    their own and the new process reloads models on first use.
+    """
+
+    address: str
+    authkey: bytes
+    process: BaseProcess
+    socket_dir: Path
+    max_wait_ms: int = DEFAULT_MAX_WAIT_MS
+    restarts: int = 0
+    _stopping: threading.Event = field(default_factory=threading.Event)
+    _supervisor: threading.Thread | None = None
+
+    def environ(self) -> dict[str, str]:
+        return {
+            INFERENCE_SOCKET_ENV: self.address,
+            INFERENCE_AUTHKEY_ENV: self.authkey.hex(),
+        }
+
+    def restart(self, *, ready_timeout: float = 30.0) -> None:
+        """Replace a dead server process with a fresh one on the same address."""
+        if self._stopping.is_set():
+            return
+        self.process.join(0)
+        # A killed server leaves its socket file behind; the new listener must bind.
+        Path(self.address).unlink(missing_ok=True)
+        self.process = _spawn_process(self.address, self.authkey, self.max_wait_ms)
+        self.restarts += 1
+        _wait_until_ready(self, ready_timeout=ready_timeout)
+
+    def supervise(
+        self,
+        *,
+        max_restarts: int = DEFAULT_MAX_RESTARTS,
+        interval: float = _SUPERVISE_INTERVAL_S,
+        on_event: Callable[[str], None] | None = None,
+    ) -> None:
+        """Respawn the server from a background thread, at most ``max_restarts`` times.
+
+        Once the limit is hit the server stays down and workers fall back to
+        in-process models (see ``retrieval.serving.client``).
+        """
+        notify = on_event or (lambda _message: None)
+
+        def watch() -> None:
+            while not self._stopping.wait(interval):
+                if self.process.is_alive():
+                    continue
+                if self.restarts >= max_restarts:
+                    notify(f"inference server exited; restart limit ({max_restarts}) reached")
+                    return
+                notify(f"inference server exited (code {self.process.exitcode}); restarting")
+                try:
+                    self.restart()
+                except RuntimeError as exc:
+                    notify(f"inference server restart failed: {exc}")
+
+        self._supervisor = threading.Thread(
+            target=watch, name="rob2-inference-supervisor", daemon=True
+        )
+        self._supervisor.start()
+
+    def stop(self, *, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._supervisor is not None:
+            self._supervisor.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout)
+        if self.process.is_alive():  # pragma: no cover - defensive
+            self.process.kill()
+            self.process.join(timeout)
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+
+def _spawn_process(address: str, authkey: bytes, max_wait_ms: int) -> BaseProcess:
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=_serve,
+        args=(address, authkey.hex(), max_wait_ms),
+        name="rob2-inference-server",
+        daemon=True,
+    )
+    process.start()
+    return process
+
+
+def _wait_until_ready(handle: InferenceServerHandle, *, ready_timeout: float) -> None:
+    deadline = time.monotonic() + ready_timeout
+    while True:
+        if not handle.process.is_alive():
+            raise RuntimeError("Inference server exited during startup.")
+        try:
+            with Client(
+                handle.address, family="AF_UNIX", authkey=handle.authkey
+            ) as connection:
+                connection.send({"op": "ping"})
+                if connection.recv().get("ok"):
+                    return
+        except (OSError, EOFError):
+            pass
+        if time.monotonic() >= deadline:
+            raise RuntimeError("Inference server did not become ready in time.")
+        time.sleep(0.05)
+
+
+def start_inference_server(
+    *,
+    max_wait_ms: int = DEFAULT_MAX_WAIT_MS,
+    ready_timeout: float = 30.0,
+) -> InferenceServerHandle:
+    """Spawn the inference server process and wait until it accepts connections."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("Inference server requires Unix domain sockets.")
+    socket_dir = Path(tempfile.mkdtemp(prefix="rob2-infer-"))
+    address = str(socket_dir / _SOCKET_FILE)
+    authkey = secrets.token_bytes(16)
+    handle = InferenceServerHandle(
+        address=address,
+        authkey=authkey,
+        process=_spawn_process(address, authkey, max_wait_ms),
+        socket_dir=socket_dir,
+        max_wait_ms=max_wait_ms,
+    )
+    try:
+        _wait_until_ready(handle, ready_timeout=ready_timeout)
+    except RuntimeError:
+        handle.stop()
+        raise
+    return handle
+
+
+__all__ = [
+    "DEFAULT_MAX_RESTARTS",
+    "DEFAULT_MAX_WAIT_MS",
+    "InferenceServer",
+    "InferenceServerHandle",
+    "start_inference_server",
+]
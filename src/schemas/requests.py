@@ -64,6 +64,13 @@ class Rob2RunOptions(BaseModel):
     rate_limit_max: int | None = Field(default=None, ge=1)
     retry_429_max: int | None = Field(default=None, ge=0)
     retry_429_backoff_ms: int | None = Field(default=None, ge=1)
+    llm_cassette_mode: Literal["none", "record", "replay", "collect"] | None = None
+    llm_cassette_dir: str | None = None
+    llm_cassette_replay_latency: bool | None = None
+    llm_hedge_delay: str | None = None
+    llm_hedge_max_rate: float | None = Field(default=None, ge=0, le=1)
+    llm_fallback_model: str | None = None
+    llm_failover: bool | None = None
 
     # Retrieval + fusion
     top_k: int | None = Field(default=None, ge=1)
@@ -84,6 +91,8 @@ class Rob2RunOptions(BaseModel):
     reranker_max_length: int | None = Field(default=None, ge=1)
     reranker_batch_size: int | None = Field(default=None, ge=1)
     rerank_top_n: int | None = Field(default=None, ge=1)
+    reranker_max_tokens_per_batch: int | None = Field(default=None, ge=1)
+    reranker_backend: Literal["torch", "onnx", "onnx-int8"] | None = None
 
     use_structure: bool | None = None
     section_bonus_weight: float | None = Field(default=None, ge=0)
@@ -103,6 +112,8 @@ class Rob2RunOptions(BaseModel):
     splade_query_max_length: int | None = Field(default=None, ge=1)
     splade_doc_max_length: int | None = Field(default=None, ge=1)
     splade_batch_size: int | None = Field(default=None, ge=1)
+    splade_max_tokens_per_batch: int | None = Field(default=None, ge=1)
+    splade_backend: Literal["torch", "onnx", "onnx-int8"] | None = None
 
     llm_locator_mode: Literal["llm", "none"] | None = None
     llm_locator_model: str | None = None
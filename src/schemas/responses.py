@@ -17,6 +17,7 @@ class Rob2RunResult(BaseModel):
     audit_reports: list[dict] | None = None
     debug: dict[str, Any] | None = None
     runtime_ms: int | None = None
+    timings: dict[str, Any] | None = None
     warnings: List[str] = Field(default_factory=list)
 
     model_config = ConfigDict(extra="forbid")
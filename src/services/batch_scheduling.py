@@ -0,0 +1,146 @@
+"""Cost estimates and dispatch-order policies for batch runs."""
+
+from __future__ import annotations
+
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Hashable, Mapping, Sequence, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+# Order keys by estimated cost; must return every key exactly once.
+SchedulingPolicy = Callable[[Sequence[K], Mapping[K, float]], list[K]]
+
+_DEFAULT_MS_PER_PAGE = 2000.0
+_DEFAULT_BYTES_PER_PAGE = 100_000.0
+_DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class CostEstimate:
+    pages: int | None
+    bytes: int
+    past_runtime_ms: int | None
+    estimated_ms: int
+    source: str  # "history" | "pages" | "bytes"
+
+
+def count_pdf_pages(path: str | Path) -> int | None:
+    """Return the page count via PyMuPDF, or None if the file cannot be opened."""
+    try:
+        import pymupdf
+    except ImportError:  # pragma: no cover - pymupdf is a core dependency
+        return None
+    try:
+        with pymupdf.open(str(path)) as document:
+            return int(document.page_count)
+    except Exception:
+        return None
+
+
+def estimate_pdf_costs(
+    paths: Sequence[Path],
+    *,
+    past_runtime_ms: Mapping[Path, int] | None = None,
+    max_workers: int | None = None,
+) -> dict[Path, CostEstimate]:
+    """Estimate per-PDF processing cost in milliseconds.
+
+    A past runtime for the same content wins. Otherwise the page count (or,
+    for unreadable PDFs, the file size) is scaled by a ms-per-page rate
+    calibrated on the files that do have history, so both kinds of estimate
+    sort on the same scale.
+    """
+    history = dict(past_runtime_ms or {})
+    sizes = {path: path.stat().st_size for path in paths}
+    workers = max(1, min(max_workers or _DEFAULT_MAX_WORKERS, len(paths) or 1))
+    if workers == 1:
+        pages = {path: count_pdf_pages(path) for path in paths}
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = dict(zip(paths, executor.map(count_pdf_pages, paths), strict=True))
+
+    page_rates = [
+        history[path] / pages[path]
+        for path in paths
+        if history.get(path) and pages[path]
+    ]
+    ms_per_page = statistics.median(page_rates) if page_rates else _DEFAULT_MS_PER_PAGE
+
+    estimates: dict[Path, CostEstimate] = {}
+    for path in paths:
+        past = history.get(path)
+        page_count = pages[path]
+        if past:
+            estimated, source = float(past), "history"
+        elif page_count:
+            estimated, source = page_count * ms_per_page, "pages"
+        else:
+            estimated = sizes[path] / _DEFAULT_BYTES_PER_PAGE * ms_per_page
+            source = "bytes"
+        estimates[path] = CostEstimate(
+            pages=page_count,
+            bytes=sizes[path],
+            past_runtime_ms=past,
+            estimated_ms=int(round(estimated)),
+            source=source,
+        )
+    return estimates
+
+
+def _fifo(keys: Sequence[K], costs: Mapping[K, float]) -> list[K]:
+    return list(keys)
+
+
+def _longest_first(keys: Sequence[K], costs: Mapping[K, float]) -> list[K]:
+    # LPT: start the expensive documents early so they do not dominate the makespan.
+    return sorted(keys, key=lambda key: -costs[key])
+
+
+def _shortest_first(keys: Sequence[K], costs: Mapping[K, float]) -> list[K]:
+    # SJF: minimise mean completion time so results arrive early.
+    return sorted(keys, key=lambda key: costs[key])
+
+
+_POLICIES: dict[str, SchedulingPolicy] = {
+    "fifo": _fifo,
+    "lpt": _longest_first,
+    "sjf": _shortest_first,
+}
+
+
+def register_scheduling_policy(name: str, policy: SchedulingPolicy) -> None:
+    """Make ``policy`` selectable by ``name`` (e.g. via ``--schedule``)."""
+    _POLICIES[name.strip().lower()] = policy
+
+
+def scheduling_policies() -> tuple[str, ...]:
+    return tuple(_POLICIES)
+
+
+def order_by_policy(
+    keys: Sequence[K],
+    costs: Mapping[K, float],
+    policy: str,
+) -> list[K]:
+    """Return ``keys`` in dispatch order for ``policy``; ties keep input order."""
+    try:
+        order = _POLICIES[policy]
+    except KeyError as exc:
+        raise ValueError(
+            f"Unknown scheduling policy {policy!r}; expected one of {scheduling_policies()}"
+        ) from exc
+    return order(keys, costs)
+
+
+__all__ = [
+    "CostEstimate",
+    "SchedulingPolicy",
+    "count_pdf_pages",
+    "estimate_pdf_costs",
+    "order_by_policy",
+    "register_scheduling_policy",
+    "scheduling_policies",
+]
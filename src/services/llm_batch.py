@@ -0,0 +1,588 @@
+"""Provider batch-API submission for LLM requests staged across documents.
+
+``rob2 batch run --llm-mode provider-batch`` runs every document with the LLM
+cassette in ``collect`` mode (:mod:`utils.llm_cassette`): a run stops at the
+first graph step whose LLM requests have no answer yet and reports them as
+staged requests. :class:`LLMBatchSubmitter` sends the requests staged by all
+documents in a round as provider batch jobs, polls them, and writes each
+answer into the requesting document's cassette. The next round then replays
+every answered step and stops at the next one (planner, relevance and
+consistency validation, domains, audits).
+
+Backends:
+
+- ``openai``: JSONL upload plus the Batch API (``/v1/chat/completions``,
+  24h completion window). Structured calls use ``response_format`` JSON schema.
+- ``anthropic``: Message Batches API. Structured calls use a forced tool.
+- ``local``: answers synchronously with the LLM stub's synthesized responses
+  (:mod:`services.llm_stub`) in the request's provider format. It is an
+  offline stand-in for tests and dry runs.
+
+``auto`` picks ``openai`` or ``anthropic`` per model. Submissions in flight
+are recorded in a state file, so an interrupted batch run resumes polling
+instead of paying for the same requests twice. Answers failing with 429, 5xx,
+expiry or cancellation are left out of the cassette and staged again in the
+next round. Other errors are recorded, and replaying them raises like the
+realtime call would.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any, Literal, Protocol
+
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+
+from utils.llm_cassette import Cassette
+
+BatchBackendName = Literal["auto", "openai", "anthropic", "local"]
+BATCH_BACKENDS: tuple[BatchBackendName, ...] = ("auto", "openai", "anthropic", "local")
+RequestFormat = Literal["openai", "anthropic"]
+
+DEFAULT_POLL_INTERVAL_S = 60.0
+_STATE_VERSION = 1
+# Well below the providers' per-batch limits (50k OpenAI / 100k Anthropic).
+_MAX_REQUESTS_PER_BATCH = 10_000
+# Anthropic requires max_tokens; used when the model was built without one.
+_DEFAULT_ANTHROPIC_MAX_TOKENS = 4096
+_RETRYABLE_ERROR_TYPES = {
+    "rate_limit_error",
+    "overloaded_error",
+    "api_error",
+    "timeout_error",
+    "batch_expired",
+    "batch_cancelled",
+    "expired",
+    "canceled",
+}
+_OPENAI_PREFIXES = ("gpt-", "o1", "o3", "o4", "chatgpt-")
+
+
+class BatchBackend(Protocol):
+    """Provider batch API: submit prepared requests, poll, fetch outcomes.
+
+    Outcomes map ``custom_id`` to ``{"body": <provider response>}`` or
+    ``{"error": {...}, "retryable": bool}``.
+    """
+
+    name: str
+
+    def submit(self, requests: Sequence[dict[str, Any]]) -> str: ...
+
+    def finished(self, batch_id: str) -> bool: ...
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]: ...
+
+
+def request_format(model_id: str, model_kwargs: dict[str, Any] | None = None) -> RequestFormat:
+    """Provider API format for an ``init_chat_model`` model id."""
+    provider = (model_kwargs or {}).get("model_provider")
+    if not provider and ":" in model_id:
+        provider = model_id.split(":", 1)[0]
+    if not provider:
+        name = model_id.lower()
+        if name.startswith("claude"):
+            provider = "anthropic"
+        elif name.startswith(_OPENAI_PREFIXES):
+            provider = "openai"
+    if provider in ("openai", "azure_openai"):
+        return "openai"
+    if provider == "anthropic":
+        return "anthropic"
+    raise ValueError(
+        f"Provider batch mode supports OpenAI and Anthropic models, got {model_id!r}"
+    )
+
+
+def _model_name(model_id: str) -> str:
+    prefix, sep, name = model_id.partition(":")
+    return name if sep and prefix in ("openai", "azure_openai", "anthropic") else model_id
+
+
+def build_request_body(request: dict[str, Any], fmt: RequestFormat) -> dict[str, Any]:
+    """Provider request body for a staged request (see ``Cassette.stage``)."""
+    messages = messages_from_dict(request.get("messages") or [])
+    kwargs = request.get("model_kwargs") or {}
+    schema = request.get("schema")
+    name = str(request.get("schema_name") or "response")
+    body: dict[str, Any] = {"model": _model_name(str(request["model"]))}
+    if fmt == "openai":
+        body["messages"] = [_openai_message(message) for message in messages]
+        if kwargs.get("temperature") is not None:
+            body["temperature"] = kwargs["temperature"]
+        if kwargs.get("max_tokens") is not None:
+            body["max_completion_tokens"] = kwargs["max_tokens"]
+        if schema is not None:
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": False},
+            }
+        return body
+
+    system = "\n\n".join(
+        _text(message.content) for message in messages if message.type == "system"
+    )
+    if system:
+        body["system"] = system
+    body["messages"] = [
+        _anthropic_message(message) for message in messages if message.type != "system"
+    ]
+    body["max_tokens"] = int(kwargs.get("max_tokens") or _DEFAULT_ANTHROPIC_MAX_TOKENS)
+    if kwargs.get("temperature") is not None:
+        body["temperature"] = kwargs["temperature"]
+    if schema is not None:
+        body["tools"] = [
+            {
+                "name": name,
+                "description": str(schema.get("description") or name),
+                "input_schema": schema,
+            }
+        ]
+        body["tool_choice"] = {"type": "tool", "name": name}
+    return body
+
+
+def cassette_entry(
+    request: dict[str, Any], fmt: RequestFormat, outcome: dict[str, Any]
+) -> dict[str, Any]:
+    """Cassette entry (the ``record`` mode format) for one batch outcome."""
+    entry: dict[str, Any] = {"model": request["model"], "latency_ms": 0.0}
+    error = outcome.get("error")
+    if error is not None:
+        entry["error"] = {
+            "type": str(error.get("type") or "BatchRequestError"),
+            "message": str(error.get("message") or "")[:500],
+            "status_code": error.get("status_code"),
+        }
+        return entry
+    body = outcome.get("body") or {}
+    if fmt == "openai":
+        text, structured_text, usage = _openai_output(body)
+    else:
+        text, structured_text, usage = _anthropic_output(body)
+    message = AIMessage(
+        content=text,
+        usage_metadata=usage,
+        response_metadata={"model_name": body.get("model"), "source": "provider_batch"},
+    )
+    entry["message"] = message_to_dict(message)
+    if request.get("schema") is not None and structured_text:
+        try:
+            entry["structured"] = json.loads(structured_text)
+        except json.JSONDecodeError:
+            # Replay then fails validation and the call site falls back to a
+            # plain invoke, which is staged in the next round.
+            pass
+    return entry
+
+
+class LLMBatchSubmitter:
+    """Send staged requests as provider batches and fill document cassettes.
+
+    ``state_path`` records submissions in flight (see :meth:`resume`).
+    """
+
+    def __init__(
+        self,
+        state_path: str | Path,
+        *,
+        backend: BatchBackendName = "auto",
+        poll_interval_s: float = DEFAULT_POLL_INTERVAL_S,
+        log: Callable[[str], None] | None = None,
+        backends: dict[str, BatchBackend] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if backend not in BATCH_BACKENDS:
+            raise ValueError(f"LLM batch backend must be one of {', '.join(BATCH_BACKENDS)}")
+        self.state_path = Path(state_path)
+        self.backend = backend
+        self.poll_interval_s = max(0.0, float(poll_interval_s))
+        self._log = log or (lambda message: None)
+        self._backends: dict[str, BatchBackend] = dict(backends or {})
+        self._sleep = sleep
+
+    def resume(self) -> dict[str, int] | None:
+        """Wait for submissions left by an interrupted run and apply their answers."""
+        submissions = self._load_state()
+        if not submissions:
+            return None
+        self._log(f"[llm-batch] 恢复 {len(submissions)} 个未完成的批处理任务")
+        return self._wait_and_apply(submissions)
+
+    def submit_and_wait(
+        self, staged: Sequence[tuple[str | Path, Sequence[dict[str, Any]]]]
+    ) -> dict[str, int]:
+        """Submit ``(cassette_path, staged requests)`` pairs and wait for every answer.
+
+        Returns counts: ``submitted``, ``answered``, ``errors`` (recorded in the
+        cassettes) and ``retry`` (left for the next round).
+        """
+        groups: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        seen: set[tuple[str, str]] = set()
+        for path, requests in staged:
+            for request in requests:
+                identity = (str(path), str(request["key"]))
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                fmt = self._format_for(request)
+                groups.setdefault((self._backend_for(fmt), str(request["model"])), []).append(
+                    {
+                        "cassette": str(path),
+                        "key": request["key"],
+                        "format": fmt,
+                        "request": request,
+                    }
+                )
+
+        submissions: list[dict[str, Any]] = []
+        for (backend_name, model), prepared in groups.items():
+            backend = self._backend(backend_name)
+            for start in range(0, len(prepared), _MAX_REQUESTS_PER_BATCH):
+                chunk = prepared[start : start + _MAX_REQUESTS_PER_BATCH]
+                for offset, item in enumerate(chunk):
+                    item["custom_id"] = f"r{start + offset:06d}"
+                    item["body"] = build_request_body(item["request"], item["format"])
+                batch_id = backend.submit(chunk)
+                submissions.append(
+                    {
+                        "backend": backend_name,
+                        "batch_id": batch_id,
+                        "submitted_at": time.time(),
+                        "requests": [_state_entry(item) for item in chunk],
+                    }
+                )
+                # Recorded right away: a crash while waiting must not resubmit.
+                self._save_state(submissions)
+                self._log(
+                    f"[llm-batch] 已提交 {backend_name} 批处理 {batch_id}（{model}，{len(chunk)} 个请求）"
+                )
+        if not submissions:
+            return {"submitted": 0, "answered": 0, "errors": 0, "retry": 0}
+        return self._wait_and_apply(submissions)
+
+    def _wait_and_apply(self, submissions: list[dict[str, Any]]) -> dict[str, int]:
+        waiting = list(submissions)
+        while True:
+            waiting = [
+                submission
+                for submission in waiting
+                if not self._backend(submission["backend"]).finished(submission["batch_id"])
+            ]
+            if not waiting:
+                break
+            self._sleep(self.poll_interval_s)
+
+        stats = {"submitted": 0, "answered": 0, "errors": 0, "retry": 0}
+        for submission in submissions:
+            outcomes = self._backend(submission["backend"]).results(submission["batch_id"])
+            entries_by_cassette: dict[str, dict[str, dict[str, Any]]] = {}
+            for item in submission["requests"]:
+                stats["submitted"] += 1
+                outcome = outcomes.get(item["custom_id"])
+                if outcome is None or outcome.get("retryable"):
+                    stats["retry"] += 1
+                    continue
+                stats["errors" if outcome.get("error") is not None else "answered"] += 1
+                entries_by_cassette.setdefault(item["cassette"], {})[item["key"]] = cassette_entry(
+                    item["request"], item["format"], outcome
+                )
+            for path, entries in entries_by_cassette.items():
+                cassette = Cassette(path, mode="collect")
+                cassette.add_entries(entries)
+                cassette.save()
+        self.state_path.unlink(missing_ok=True)
+        return stats
+
+    def _format_for(self, request: dict[str, Any]) -> RequestFormat:
+        if self.backend in ("openai", "anthropic"):
+            return self.backend
+        return request_format(str(request["model"]), request.get("model_kwargs"))
+
+    def _backend_for(self, fmt: RequestFormat) -> str:
+        return fmt if self.backend == "auto" else self.backend
+
+    def _backend(self, name: str) -> BatchBackend:
+        backend = self._backends.get(name)
+        if backend is None:
+            factories: dict[str, Callable[[], BatchBackend]] = {
+                "openai": OpenAIBatchBackend,
+                "anthropic": AnthropicBatchBackend,
+                "local": LocalBatchBackend,
+            }
+            backend = self._backends[name] = factories[name]()
+        return backend
+
+    def _load_state(self) -> list[dict[str, Any]]:
+        if not self.state_path.exists():
+            return []
+        payload = json.loads(self.state_path.read_text(encoding="utf-8"))
+        if not isinstance(payload, dict) or payload.get("version") != _STATE_VERSION:
+            raise ValueError(f"Unsupported LLM batch state file: {self.state_path}")
+        return list(payload.get("submissions") or [])
+
+    def _save_state(self, submissions: list[dict[str, Any]]) -> None:
+        payload = {"version": _STATE_VERSION, "submissions": submissions}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API (``OPENAI_API_KEY`` / ``OPENAI_BASE_URL``)."""
+
+    name = "openai"
+
+    def __init__(self, client: Any = None) -> None:
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI()
+        return self._client
+
+    def submit(self, requests: Sequence[dict[str, Any]]) -> str:
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": item["custom_id"],
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": item["body"],
+                },
+                ensure_ascii=False,
+            )
+            for item in requests
+        ]
+        upload = self.client.files.create(
+            file=("rob2_llm_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"source": "rob2"},
+        )
+        return str(batch.id)
+
+    def finished(self, batch_id: str) -> bool:
+        status = self.client.batches.retrieve(batch_id).status
+        return status in {"completed", "failed", "expired", "cancelled"}
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        outcomes: dict[str, dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    outcomes[str(item.get("custom_id"))] = _openai_outcome(item)
+        return outcomes
+
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches API (``ANTHROPIC_API_KEY`` / ``ANTHROPIC_BASE_URL``)."""
+
+    name = "anthropic"
+
+    def __init__(self, client: Any = None) -> None:
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from anthropic import Anthropic
+
+            self._client = Anthropic()
+        return self._client
+
+    def submit(self, requests: Sequence[dict[str, Any]]) -> str:
+        batch = self.client.messages.batches.create(
+            requests=[{"custom_id": item["custom_id"], "params": item["body"]} for item in requests]
+        )
+        return str(batch.id)
+
+    def finished(self, batch_id: str) -> bool:
+        return self.client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        outcomes: dict[str, dict[str, Any]] = {}
+        for item in self.client.messages.batches.results(batch_id):
+            result = item.result
+            if result.type == "succeeded":
+                outcomes[item.custom_id] = {"body": result.message.model_dump(mode="json")}
+                continue
+            if result.type == "errored":
+                error = result.error.error
+                error_type, message = str(error.type), str(error.message)
+            else:
+                error_type, message = str(result.type), f"batch request {result.type}"
+            outcomes[item.custom_id] = {
+                "error": {"type": error_type, "message": message, "status_code": None},
+                "retryable": error_type in _RETRYABLE_ERROR_TYPES,
+            }
+        return outcomes
+
+
+class LocalBatchBackend:
+    """Offline stand-in answering with the LLM stub's synthesized responses."""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        self._batches: dict[str, dict[str, dict[str, Any]]] = {}
+        self.submitted: list[int] = []
+
+    def submit(self, requests: Sequence[dict[str, Any]]) -> str:
+        from services.llm_stub import answer_chat_completion, answer_message
+
+        batch_id = f"local_{uuid.uuid4().hex[:16]}"
+        self._batches[batch_id] = {
+            item["custom_id"]: {
+                "body": (
+                    answer_chat_completion(item["body"])
+                    if item["format"] == "openai"
+                    else answer_message(item["body"])
+                )
+            }
+            for item in requests
+        }
+        self.submitted.append(len(requests))
+        return batch_id
+
+    def finished(self, batch_id: str) -> bool:
+        return True
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        # Batches from another process are unknown: their requests are staged again.
+        return self._batches.pop(batch_id, {})
+
+
+def _state_entry(item: dict[str, Any]) -> dict[str, Any]:
+    # Prompts are not needed to apply answers; keep the state file small.
+    request = {key: value for key, value in item["request"].items() if key != "messages"}
+    return {
+        "custom_id": item["custom_id"],
+        "cassette": item["cassette"],
+        "key": item["key"],
+        "format": item["format"],
+        "request": request,
+    }
+
+
+def _openai_outcome(item: dict[str, Any]) -> dict[str, Any]:
+    response = item.get("response") or {}
+    status = response.get("status_code")
+    if item.get("error") is None and status == 200:
+        return {"body": response.get("body") or {}}
+    error = item.get("error") or ((response.get("body") or {}).get("error")) or {}
+    error_type = str(error.get("code") or error.get("type") or "http_error")
+    return {
+        "error": {"type": error_type, "message": str(error.get("message") or ""), "status_code": status},
+        "retryable": (
+            status == 429
+            or (isinstance(status, int) and status >= 500)
+            or error_type in _RETRYABLE_ERROR_TYPES
+        ),
+    }
+
+
+def _openai_output(body: dict[str, Any]) -> tuple[str, str, dict[str, int] | None]:
+    choices = body.get("choices") or [{}]
+    message = choices[0].get("message") or {}
+    text = message.get("content") or ""
+    structured = text
+    for call in message.get("tool_calls") or []:
+        structured = ((call or {}).get("function") or {}).get("arguments") or structured
+        break
+    usage = body.get("usage") or {}
+    metadata = None
+    if usage:
+        metadata = {
+            "input_tokens": int(usage.get("prompt_tokens") or 0),
+            "output_tokens": int(usage.get("completion_tokens") or 0),
+            "total_tokens": int(usage.get("total_tokens") or 0),
+        }
+    return text or structured, structured, metadata
+
+
+def _anthropic_output(body: dict[str, Any]) -> tuple[str, str, dict[str, int] | None]:
+    texts: list[str] = []
+    structured = ""
+    for block in body.get("content") or []:
+        if block.get("type") == "text":
+            texts.append(str(block.get("text") or ""))
+        elif block.get("type") == "tool_use" and not structured:
+            structured = json.dumps(block.get("input") or {}, ensure_ascii=False)
+    text = "".join(texts)
+    usage = body.get("usage") or {}
+    metadata = None
+    if usage:
+        input_tokens = int(usage.get("input_tokens") or 0)
+        output_tokens = int(usage.get("output_tokens") or 0)
+        metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+    return text or structured, structured or text, metadata
+
+
+def _openai_message(message: BaseMessage) -> dict[str, Any]:
+    role = {"system": "system", "human": "user", "ai": "assistant"}.get(message.type, "user")
+    return {"role": role, "content": message.content}
+
+
+def _anthropic_message(message: BaseMessage) -> dict[str, Any]:
+    role = "assistant" if message.type == "ai" else "user"
+    content = message.content
+    if isinstance(content, str):
+        return {"role": role, "content": content}
+    blocks: list[dict[str, Any]] = []
+    for part in content:
+        if isinstance(part, str):
+            blocks.append({"type": "text", "text": part})
+        elif part.get("type") == "image_url":
+            url = str((part.get("image_url") or {}).get("url") or "")
+            header, _, data = url.partition(",")
+            media_type = header.removeprefix("data:").split(";", 1)[0] or "image/png"
+            blocks.append(
+                {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": data}}
+            )
+        else:
+            blocks.append(part)
+    return {"role": role, "content": blocks}
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else str(part.get("text") or "")
+        for part in content or []
+    )
+
+
+__all__ = [
+    "BATCH_BACKENDS",
+    "AnthropicBatchBackend",
+    "BatchBackend",
+    "LLMBatchSubmitter",
+    "LocalBatchBackend",
+    "OpenAIBatchBackend",
+    "build_request_body",
+    "cassette_entry",
+    "request_format",
+]
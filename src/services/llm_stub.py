@@ -0,0 +1,640 @@
+"""Local OpenAI/Anthropic-compatible LLM stand-in for load testing.
+
+The server answers ``POST /v1/chat/completions`` (OpenAI) and
+``POST /v1/messages`` (Anthropic), the endpoints ``init_chat_model`` clients
+call. Answers are synthesized from the pipeline's JSON user prompts (domain
+reasoning, domain audit, relevance/consistency validators, LLM locator, query
+planner) and, when the request carries a schema (tools, ``response_format`` or
+``output_format``), coerced so they validate against it.
+
+:class:`StubBehavior` controls simulated latency, random HTTP 429s with
+``retry-after``, hanging requests (client timeouts) and a tokens-per-minute
+quota. ``GET /stub/stats`` reports request counters; ``POST /stub/reset``
+clears them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Literal, Mapping, Sequence
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LatencyDistribution = Literal["fixed", "uniform", "lognormal"]
+LATENCY_DISTRIBUTIONS: tuple[LatencyDistribution, ...] = ("fixed", "uniform", "lognormal")
+
+_QUOTE_MAX_CHARS = 80
+_QUOTA_WINDOW_S = 60.0
+
+
+@dataclass(frozen=True)
+class StubBehavior:
+    """Simulated provider behaviour."""
+
+    latency_ms: float = 300.0
+    latency_distribution: LatencyDistribution = "fixed"
+    # Relative spread: +-fraction for ``uniform``, sigma for ``lognormal``.
+    latency_spread: float = 0.3
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 1.0
+    timeout_rate: float = 0.0
+    timeout_hang_s: float = 600.0
+    tokens_per_minute: int | None = None
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"latency_distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+        for name in ("rate_limit_rate", "timeout_rate"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be within [0, 1]")
+        if self.latency_ms < 0 or self.latency_spread < 0:
+            raise ValueError("latency_ms and latency_spread must be >= 0")
+        if self.tokens_per_minute is not None and self.tokens_per_minute < 1:
+            raise ValueError("tokens_per_minute must be >= 1")
+
+
+class _Rejected(Exception):
+    def __init__(self, status: int, kind: str, message: str, retry_after_s: float | None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.kind = kind
+        self.retry_after_s = retry_after_s
+
+
+class _StubState:
+    """Counters, RNG and token-quota window shared by all requests."""
+
+    def __init__(self, behavior: StubBehavior) -> None:
+        self.behavior = behavior
+        self._lock = threading.Lock()
+        self._rng = random.Random(behavior.seed)
+        self._window: deque[tuple[float, int]] = deque()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._window.clear()
+            self._stats = {
+                "requests": 0,
+                "completed": 0,
+                "rate_limited": 0,
+                "quota_limited": 0,
+                "timeouts": 0,
+                "in_flight": 0,
+                "max_in_flight": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "started_at": time.time(),
+            }
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            payload = dict(self._stats)
+        payload["behavior"] = asdict(self.behavior)
+        return payload
+
+    def admit(self, prompt_tokens: int) -> tuple[float, bool]:
+        """Return ``(latency_s, hang)`` or raise :class:`_Rejected`."""
+        behavior = self.behavior
+        with self._lock:
+            self._stats["requests"] += 1
+            if behavior.rate_limit_rate and self._rng.random() < behavior.rate_limit_rate:
+                self._stats["rate_limited"] += 1
+                raise _Rejected(429, "rate_limit", "Rate limit reached (stub).", behavior.retry_after_s)
+            if behavior.tokens_per_minute is not None:
+                wait_s = self._reserve_tokens(prompt_tokens, behavior.tokens_per_minute)
+                if wait_s is not None:
+                    self._stats["quota_limited"] += 1
+                    raise _Rejected(
+                        429,
+                        "tokens",
+                        f"Tokens per minute limit {behavior.tokens_per_minute} reached (stub).",
+                        wait_s,
+                    )
+            hang = bool(behavior.timeout_rate) and self._rng.random() < behavior.timeout_rate
+            if hang:
+                self._stats["timeouts"] += 1
+            latency_s = self._sample_latency_ms() / 1000
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+        return latency_s, hang
+
+    def finish(self, completion_tokens: int | None) -> None:
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            if completion_tokens is not None:
+                self._stats["completed"] += 1
+                self._stats["completion_tokens"] += completion_tokens
+
+    def _reserve_tokens(self, tokens: int, limit: int) -> float | None:
+        now = time.monotonic()
+        while self._window and now - self._window[0][0] >= _QUOTA_WINDOW_S:
+            self._window.popleft()
+        used = sum(count for _, count in self._window)
+        if used and used + tokens > limit:
+            return max(0.1, round(_QUOTA_WINDOW_S - (now - self._window[0][0]), 1))
+        self._window.append((now, tokens))
+        return None
+
+    def _sample_latency_ms(self) -> float:
+        behavior = self.behavior
+        base = behavior.latency_ms
+        if base <= 0 or behavior.latency_distribution == "fixed" or behavior.latency_spread <= 0:
+            return base
+        if behavior.latency_distribution == "uniform":
+            spread = base * behavior.latency_spread
+            return max(0.0, self._rng.uniform(base - spread, base + spread))
+        # lognormal with median ``latency_ms``
+        return self._rng.lognormvariate(math.log(base), behavior.latency_spread)
+
+
+def create_llm_stub_app(behavior: StubBehavior | None = None) -> FastAPI:
+    """Build the stub provider as a FastAPI app."""
+    state = _StubState(behavior or StubBehavior())
+    app = FastAPI(title="ROB2 LLM stub", docs_url=None, redoc_url=None)
+    app.state.stub = state
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        prompt_tokens = _approx_tokens(_openai_text(messages))
+        try:
+            await _wait_for_slot(state, prompt_tokens)
+        except _Rejected as exc:
+            return _openai_error(exc)
+        response = answer_chat_completion(body, prompt_tokens=prompt_tokens)
+        state.finish(response["usage"]["completion_tokens"])
+        return response
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        prompt_tokens = _approx_tokens(
+            _anthropic_content_text(body.get("system")) + _anthropic_text(messages)
+        )
+        try:
+            await _wait_for_slot(state, prompt_tokens)
+        except _Rejected as exc:
+            return _anthropic_error(exc)
+        response = answer_message(body, prompt_tokens=prompt_tokens)
+        state.finish(response["usage"]["output_tokens"])
+        return response
+
+    @app.get("/stub/stats")
+    async def stats():
+        return state.stats()
+
+    @app.post("/stub/reset")
+    async def reset():
+        state.reset()
+        return state.stats()
+
+    return app
+
+
+def run_llm_stub(behavior: StubBehavior, *, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Serve :func:`create_llm_stub_app` with uvicorn (blocking)."""
+    import uvicorn
+
+    uvicorn.run(create_llm_stub_app(behavior), host=host, port=port, log_level="warning")
+
+
+def answer_chat_completion(
+    body: Mapping[str, Any], *, prompt_tokens: int | None = None
+) -> dict[str, Any]:
+    """Synthesized OpenAI chat completion for a request body (no latency or limits)."""
+    messages = body.get("messages") or []
+    if prompt_tokens is None:
+        prompt_tokens = _approx_tokens(_openai_text(messages))
+    payload = synthesize_response(_last_user_text(messages, _openai_content_text))
+    return _openai_completion(body, payload, prompt_tokens)
+
+
+def answer_message(body: Mapping[str, Any], *, prompt_tokens: int | None = None) -> dict[str, Any]:
+    """Synthesized Anthropic message for a request body (no latency or limits)."""
+    messages = body.get("messages") or []
+    if prompt_tokens is None:
+        prompt_tokens = _approx_tokens(
+            _anthropic_content_text(body.get("system")) + _anthropic_text(messages)
+        )
+    payload = synthesize_response(_last_user_text(messages, _anthropic_content_text))
+    return _anthropic_message(body, payload, prompt_tokens)
+
+
+async def _wait_for_slot(state: _StubState, prompt_tokens: int) -> None:
+    latency_s, hang = state.admit(prompt_tokens)
+    try:
+        if hang:
+            await asyncio.sleep(state.behavior.timeout_hang_s)
+            raise _Rejected(504, "timeout", "Upstream timed out (stub).", None)
+        if latency_s > 0:
+            await asyncio.sleep(latency_s)
+    except BaseException:
+        state.finish(None)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Response synthesis
+
+
+def synthesize_response(prompt: str) -> dict[str, Any]:
+    """Deterministic answer for one of the pipeline's JSON user prompts."""
+    try:
+        payload = json.loads(prompt)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+    if isinstance(payload.get("domain_questions"), list):
+        if "document_spans" in payload:
+            return {"answers": _answers(payload["domain_questions"], {})}
+        return {
+            "domain_risk": None,
+            "domain_rationale": "stub",
+            "answers": _answers(payload["domain_questions"], payload.get("evidence") or {}),
+        }
+    if isinstance(payload.get("paragraph"), dict):
+        return {
+            "label": "relevant",
+            "confidence": 0.9,
+            "supporting_quote": _leading_quote(payload["paragraph"].get("text")),
+        }
+    if isinstance(payload.get("paragraphs"), list):
+        return {"label": "pass", "confidence": 0.9, "conflicts": []}
+    if isinstance(payload.get("candidates"), list):
+        evidence = [
+            {
+                "paragraph_id": str(item.get("paragraph_id")),
+                "quote": _leading_quote(item.get("text")),
+            }
+            for item in payload["candidates"][:2]
+            if isinstance(item, Mapping)
+        ]
+        return {"sufficient": bool(evidence), "evidence": evidence, "expand": None}
+    if isinstance(payload.get("questions"), list):
+        constraints = payload.get("constraints") or {}
+        limit = int(constraints.get("max_queries_per_question") or 3)
+        plan: dict[str, list[str]] = {}
+        for question in payload["questions"]:
+            if not isinstance(question, Mapping):
+                continue
+            hints = [str(hint) for hint in question.get("keyword_hints") or [] if hint]
+            plan[str(question.get("question_id"))] = (hints or [str(question.get("text") or "")])[
+                :limit
+            ]
+        return {"query_plan": plan}
+    return {}
+
+
+def _answers(questions: Sequence[Any], evidence: Mapping[str, Any]) -> list[dict[str, Any]]:
+    answers: list[dict[str, Any]] = []
+    for question in questions:
+        if not isinstance(question, Mapping):
+            continue
+        question_id = str(question.get("question_id"))
+        options = [str(option) for option in question.get("options") or []]
+        items = [item for item in evidence.get(question_id) or [] if isinstance(item, Mapping)]
+        if items and "Y" in options:
+            answer = "Y"
+        elif "NI" in options or not options:
+            answer = "NI"
+        else:
+            answer = options[0]
+        answers.append(
+            {
+                "question_id": question_id,
+                "answer": answer,
+                "rationale": "stub",
+                "evidence": [{"paragraph_id": str(item.get("paragraph_id"))} for item in items[:1]],
+                "confidence": 0.8,
+            }
+        )
+    return answers
+
+
+def _leading_quote(text: Any) -> str | None:
+    value = str(text or "").strip()
+    if len(value) <= _QUOTE_MAX_CHARS:
+        return value or None
+    cut = value[:_QUOTE_MAX_CHARS]
+    space = cut.rfind(" ")
+    return cut[:space] if space > _QUOTE_MAX_CHARS // 2 else cut
+
+
+def conform_to_schema(value: Any, schema: Mapping[str, Any]) -> Any:
+    """Coerce ``value`` into an instance of the JSON ``schema``.
+
+    Matching fields are kept, missing required fields get a neutral value
+    (schema default, first enum member, midpoint of numeric bounds, empty
+    string/array) and undeclared fields are dropped.
+    """
+    return _conform(value, schema, schema.get("$defs") or schema.get("definitions") or {})
+
+
+def _conform(value: Any, schema: Mapping[str, Any], defs: Mapping[str, Any]) -> Any:
+    schema = _resolve_ref(schema, defs)
+    if "const" in schema:
+        return schema["const"]
+    options = schema.get("anyOf") or schema.get("oneOf")
+    if options:
+        resolved = [_resolve_ref(option, defs) for option in options]
+        for option in resolved:
+            if _fits(value, option):
+                return _conform(value, option, defs)
+        if value is None and any(option.get("type") == "null" for option in resolved):
+            return None
+        non_null = [option for option in resolved if option.get("type") != "null"]
+        return _conform(value, (non_null or resolved)[0], defs)
+    if "allOf" in schema and len(schema["allOf"]) == 1:
+        return _conform(value, schema["allOf"][0], defs)
+    if "enum" in schema:
+        return value if value in schema["enum"] else schema["enum"][0]
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        if value is None and "null" in kind:
+            return None
+        kind = next((item for item in kind if item != "null"), None)
+    if value is None and "default" in schema:
+        return schema["default"]
+
+    if kind == "object":
+        source = value if isinstance(value, Mapping) else {}
+        properties: Mapping[str, Any] = schema.get("properties") or {}
+        required = set(schema.get("required") or [])
+        result: dict[str, Any] = {}
+        for name, sub_schema in properties.items():
+            if name in source:
+                result[name] = _conform(source[name], sub_schema, defs)
+            elif name in required:
+                result[name] = _conform(None, sub_schema, defs)
+        extra = schema.get("additionalProperties")
+        if isinstance(extra, Mapping):
+            for name, item in source.items():
+                if name not in properties:
+                    result[name] = _conform(item, extra, defs)
+        return result
+    if kind == "array":
+        item_schema = schema.get("items") or {}
+        items = [_conform(item, item_schema, defs) for item in value] if isinstance(value, list) else []
+        while len(items) < int(schema.get("minItems") or 0):
+            items.append(_conform(None, item_schema, defs))
+        max_items = schema.get("maxItems")
+        return items[: int(max_items)] if max_items is not None else items
+    if kind == "string":
+        return "" if value is None else str(value)
+    if kind in ("number", "integer"):
+        number = _neutral_number(schema) if not _is_number(value) else float(value)
+        if schema.get("minimum") is not None:
+            number = max(number, float(schema["minimum"]))
+        if schema.get("maximum") is not None:
+            number = min(number, float(schema["maximum"]))
+        return int(number) if kind == "integer" else number
+    if kind == "boolean":
+        return value if isinstance(value, bool) else False
+    if kind == "null":
+        return None
+    return value
+
+
+def _resolve_ref(schema: Mapping[str, Any], defs: Mapping[str, Any]) -> Mapping[str, Any]:
+    ref = schema.get("$ref")
+    if isinstance(ref, str):
+        target = defs.get(ref.rsplit("/", 1)[-1])
+        if isinstance(target, Mapping):
+            return target
+    return schema
+
+
+def _fits(value: Any, schema: Mapping[str, Any]) -> bool:
+    if "enum" in schema:
+        return value in schema["enum"]
+    kind = schema.get("type")
+    kinds = kind if isinstance(kind, list) else [kind]
+    checks = {
+        "object": isinstance(value, Mapping),
+        "array": isinstance(value, list),
+        "string": isinstance(value, str),
+        "number": _is_number(value),
+        "integer": isinstance(value, int) and not isinstance(value, bool),
+        "boolean": isinstance(value, bool),
+        "null": value is None,
+    }
+    return any(checks.get(item, False) for item in kinds if item)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _neutral_number(schema: Mapping[str, Any]) -> float:
+    low, high = schema.get("minimum"), schema.get("maximum")
+    if low is not None and high is not None:
+        return (float(low) + float(high)) / 2
+    return float(low) if low is not None else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Wire formats
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _openai_content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            str(part.get("text") or "")
+            for part in content
+            if isinstance(part, Mapping) and part.get("type") == "text"
+        )
+    return ""
+
+
+_anthropic_content_text = _openai_content_text
+
+
+def _openai_text(messages: Sequence[Any]) -> str:
+    return "".join(
+        _openai_content_text(message.get("content"))
+        for message in messages
+        if isinstance(message, Mapping)
+    )
+
+
+_anthropic_text = _openai_text
+
+
+def _last_user_text(messages: Sequence[Any], extract: Any) -> str:
+    for message in reversed(messages):
+        if isinstance(message, Mapping) and message.get("role") == "user":
+            return extract(message.get("content"))
+    return ""
+
+
+def _openai_completion(body: Mapping[str, Any], payload: dict[str, Any], prompt_tokens: int) -> dict[str, Any]:
+    message: dict[str, Any] = {"role": "assistant", "content": None, "refusal": None}
+    finish_reason = "stop"
+    tool = _openai_forced_tool(body)
+    response_format = body.get("response_format") or {}
+    if tool is not None:
+        arguments = json.dumps(
+            conform_to_schema(payload, tool.get("parameters") or {}), ensure_ascii=False
+        )
+        message["tool_calls"] = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": tool.get("name"), "arguments": arguments},
+            }
+        ]
+        finish_reason = "tool_calls"
+        output = arguments
+    else:
+        if response_format.get("type") == "json_schema":
+            schema = (response_format.get("json_schema") or {}).get("schema") or {}
+            payload = conform_to_schema(payload, schema)
+        output = json.dumps(payload, ensure_ascii=False)
+        message["content"] = output
+    completion_tokens = _approx_tokens(output)
+    return {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": str(body.get("model") or "stub"),
+        "choices": [
+            {"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _openai_forced_tool(body: Mapping[str, Any]) -> Mapping[str, Any] | None:
+    tools = [
+        tool.get("function")
+        for tool in body.get("tools") or []
+        if isinstance(tool, Mapping) and isinstance(tool.get("function"), Mapping)
+    ]
+    if not tools:
+        return None
+    choice = body.get("tool_choice")
+    if choice == "none":
+        return None
+    if isinstance(choice, Mapping):
+        name = (choice.get("function") or {}).get("name")
+        return next((tool for tool in tools if tool.get("name") == name), tools[0])
+    return tools[0]
+
+
+def _anthropic_message(body: Mapping[str, Any], payload: dict[str, Any], prompt_tokens: int) -> dict[str, Any]:
+    tool = _anthropic_forced_tool(body)
+    if tool is not None:
+        arguments = conform_to_schema(payload, tool.get("input_schema") or {})
+        content = [
+            {
+                "type": "tool_use",
+                "id": f"toolu_{uuid.uuid4().hex[:24]}",
+                "name": tool.get("name"),
+                "input": arguments,
+            }
+        ]
+        stop_reason = "tool_use"
+        output = json.dumps(arguments, ensure_ascii=False)
+    else:
+        output_format = body.get("output_format") or {}
+        if output_format.get("type") == "json_schema":
+            payload = conform_to_schema(payload, output_format.get("schema") or {})
+        output = json.dumps(payload, ensure_ascii=False)
+        content = [{"type": "text", "text": output}]
+        stop_reason = "end_turn"
+    return {
+        "id": f"msg_stub_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": str(body.get("model") or "stub"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": prompt_tokens, "output_tokens": _approx_tokens(output)},
+    }
+
+
+def _anthropic_forced_tool(body: Mapping[str, Any]) -> Mapping[str, Any] | None:
+    tools = [tool for tool in body.get("tools") or [] if isinstance(tool, Mapping)]
+    if not tools:
+        return None
+    choice = body.get("tool_choice") or {}
+    if choice.get("type") == "none":
+        return None
+    if choice.get("type") == "tool":
+        return next((tool for tool in tools if tool.get("name") == choice.get("name")), tools[0])
+    return tools[0]
+
+
+def _retry_headers(exc: _Rejected) -> dict[str, str]:
+    if exc.retry_after_s is None:
+        return {}
+    return {
+        "retry-after": str(max(1, math.ceil(exc.retry_after_s))),
+        "retry-after-ms": str(int(exc.retry_after_s * 1000)),
+    }
+
+
+def _openai_error(exc: _Rejected) -> JSONResponse:
+    error_type = {"rate_limit": "requests", "tokens": "tokens", "timeout": "timeout"}[exc.kind]
+    return JSONResponse(
+        status_code=exc.status,
+        headers=_retry_headers(exc),
+        content={
+            "error": {
+                "message": str(exc),
+                "type": error_type,
+                "param": None,
+                "code": "rate_limit_exceeded" if exc.status == 429 else "timeout",
+            }
+        },
+    )
+
+
+def _anthropic_error(exc: _Rejected) -> JSONResponse:
+    error_type = "rate_limit_error" if exc.status == 429 else "timeout_error"
+    return JSONResponse(
+        status_code=exc.status,
+        headers=_retry_headers(exc),
+        content={"type": "error", "error": {"type": error_type, "message": str(exc)}},
+    )
+
+
+__all__ = [
+    "LATENCY_DISTRIBUTIONS",
+    "StubBehavior",
+    "answer_chat_completion",
+    "answer_message",
+    "conform_to_schema",
+    "create_llm_stub_app",
+    "run_llm_stub",
+    "synthesize_response",
+]
@@ -0,0 +1,92 @@
+"""Preload the local Docling/SPLADE/cross-encoder models and report whether they are warm."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+from pipelines.graphs.nodes.preprocess import docling_converter_loaded, warm_docling_converter
+from retrieval.engines.splade import DEFAULT_SPLADE_MODEL_ID, get_splade_encoder
+from retrieval.onnx_backend import normalize_inference_backend
+from retrieval.rerankers.cross_encoder import (
+    DEFAULT_CROSS_ENCODER_MODEL_ID,
+    get_cross_encoder_reranker,
+)
+from schemas.requests import Rob2RunOptions
+from services.rob2_runner import build_run_state
+
+WARMABLE_MODELS = ("docling", "splade", "cross_encoder")
+
+
+def model_status() -> dict[str, bool]:
+    """Return whether each warmable model is loaded in this process."""
+    return {
+        "docling": docling_converter_loaded(),
+        "splade": get_splade_encoder.cache_info().currsize > 0,
+        "cross_encoder": get_cross_encoder_reranker.cache_info().currsize > 0,
+    }
+
+
+def parse_model_names(raw: str | None) -> tuple[str, ...]:
+    """Parse a comma separated model list (e.g. ``API_WARMUP_MODELS``)."""
+    names: list[str] = []
+    for part in (raw or "").split(","):
+        name = part.strip().lower().replace("-", "_")
+        if not name:
+            continue
+        if name not in WARMABLE_MODELS:
+            raise ValueError(
+                f"Unknown model {part.strip()!r}; expected one of {', '.join(WARMABLE_MODELS)}"
+            )
+        if name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+def warm_models(names: Iterable[str]) -> dict[str, str | None]:
+    """Load ``names`` with the arguments a default run uses; returns errors by model."""
+    # Same option resolution as run_rob2, so the cached instances are the ones
+    # the locator nodes will ask for.
+    state = build_run_state("warmup.pdf", Rob2RunOptions(), [])
+    errors: dict[str, str | None] = {}
+    for name in names:
+        try:
+            _WARMERS[name](state)
+            errors[name] = None
+        except Exception as exc:
+            errors[name] = f"{type(exc).__name__}: {exc}"
+    return errors
+
+
+def _warm_docling(state: dict[str, Any]) -> None:
+    warm_docling_converter()
+
+
+def _warm_splade(state: dict[str, Any]) -> None:
+    device = state.get("splade_device")
+    get_splade_encoder(
+        model_id=str(state.get("splade_model_id") or DEFAULT_SPLADE_MODEL_ID).strip(),
+        device=str(device).strip() if device is not None else None,
+        hf_token=state.get("splade_hf_token"),
+        backend=normalize_inference_backend(state.get("splade_backend")),
+        onnx_cache_dir=state.get("onnx_cache_dir"),
+    )
+
+
+def _warm_cross_encoder(state: dict[str, Any]) -> None:
+    device = state.get("reranker_device")
+    get_cross_encoder_reranker(
+        model_id=str(state.get("reranker_model_id") or DEFAULT_CROSS_ENCODER_MODEL_ID).strip(),
+        device=str(device).strip() if device is not None else None,
+        backend=normalize_inference_backend(state.get("reranker_backend")),
+        onnx_cache_dir=state.get("onnx_cache_dir"),
+    )
+
+
+_WARMERS: dict[str, Callable[[dict[str, Any]], None]] = {
+    "docling": _warm_docling,
+    "splade": _warm_splade,
+    "cross_encoder": _warm_cross_encoder,
+}
+
+
+__all__ = ["WARMABLE_MODELS", "model_status", "parse_model_names", "warm_models"]
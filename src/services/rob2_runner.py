@@ -8,6 +8,11 @@ from typing import Any, Mapping
 import json
 
 from core.config import get_settings
+from pipelines.graphs.nodes.state_models import (
+    MODEL_CONTEXT_KEY,
+    ValidatedModelContext,
+    expand_candidate_map,
+)
 from pipelines.graphs.rob2_graph import build_rob2_graph
 from retrieval.engines.splade import DEFAULT_SPLADE_MODEL_ID
 from retrieval.rerankers.cross_encoder import DEFAULT_CROSS_ENCODER_MODEL_ID
@@ -16,7 +21,18 @@ from schemas.internal.results import Rob2FinalOutput
 from schemas.requests import Rob2Input, Rob2RunOptions
 from schemas.responses import Rob2RunResult
 from services.io import temp_pdf
+from utils.llm_cassette import (
+    CASSETTE_MODES,
+    Cassette,
+    LLMBatchPending,
+    cassette_path,
+    use_cassette,
+)
+from utils.llm_hedging import HedgePolicy, use_hedge_policy
+from utils.profiling import RunProfiler
+from utils.tracing import RunTracer, trace_run
 from persistence import CacheManager, PersistenceManager, build_manifest
+from persistence.cache import cache_budgets_from_settings
 from persistence.hashing import sha256_bytes, sha256_file
 from persistence.models import RunSummaryRecord
 
@@ -60,8 +76,16 @@ def run_rob2(
     persistence_scope: str | None = None,
     cache_dir: str | None = None,
     cache_scope: str | None = None,
+    doc_hash: str | None = None,
+    profiler: RunProfiler | None = None,
 ) -> Rob2RunResult:
-    """Run the ROB2 graph with normalized options and return a typed result."""
+    """Run the ROB2 graph with normalized options and return a typed result.
+
+    ``doc_hash`` may carry a sha256 the caller already computed for
+    ``pdf_path`` (e.g. batch fingerprinting) so the file is not hashed twice.
+    ``profiler`` samples every graph node of this run; the caller writes its
+    output (see :meth:`utils.profiling.RunProfiler.write`).
+    """
     input_obj = input_data if isinstance(input_data, Rob2Input) else Rob2Input.model_validate(input_data)
     options_obj = options if isinstance(options, Rob2RunOptions) else Rob2RunOptions.model_validate(options or {})
 
@@ -76,7 +100,6 @@ def run_rob2(
     resolved_cache_scope = str(cache_scope or settings.cache_scope or "none").strip().lower()
     resolved_cache_dir = cache_dir or settings.cache_dir or resolved_persistence_dir
 
-    doc_hash: str
     bytes_size: int | None = None
     filename: str | None = None
     if input_obj.pdf_bytes is not None:
@@ -85,7 +108,7 @@ def run_rob2(
         filename = input_obj.filename
     else:
         doc_path = Path(str(input_obj.pdf_path))
-        doc_hash = sha256_file(doc_path)
+        doc_hash = doc_hash or sha256_file(doc_path)
         bytes_size = doc_path.stat().st_size if doc_path.exists() else None
         filename = doc_path.name
 
@@ -105,37 +128,75 @@ def run_rob2(
                 from persistence.sqlite_store import SqliteStore
 
                 store = SqliteStore(Path(resolved_cache_dir) / "metadata.sqlite")
-            cache = CacheManager(resolved_cache_dir, store, scope=resolved_cache_scope)
+            cache = CacheManager(
+                resolved_cache_dir,
+                store,
+                scope=resolved_cache_scope,
+                **cache_budgets_from_settings(settings),
+            )
+
+    cassette = _build_cassette(
+        options_obj, doc_hash=doc_hash, default_dir=resolved_cache_dir
+    )
+    # Collect-mode passes usually stop early for a provider batch
+    # (LLMBatchPending); only a pass that completes gets a run record.
+    collecting = cassette is not None and cassette.mode == "collect"
+    run_record = {
+        "doc_hash": doc_hash,
+        "filename": filename,
+        "bytes_size": bytes_size,
+        "options_payload": options_obj.model_dump(),
+        "batch_id": batch_id,
+        "batch_name": batch_name,
+    }
 
     run_ctx = None
-    if persistence is not None:
-        run_ctx = persistence.start_run(
-            doc_hash=doc_hash,
-            filename=filename,
-            bytes_size=bytes_size,
-            options_payload=options_obj.model_dump(),
-            batch_id=batch_id,
-            batch_name=batch_name,
+    if persistence is not None and not collecting:
+        run_ctx = persistence.start_run(**run_record)
+
+    hedge_policy = _build_hedge_policy(options_obj)
+    if hedge_policy is not None and cassette is not None:
+        warnings.append("LLM hedging/failover is disabled while an LLM cassette is active.")
+
+    try:
+        with (
+            trace_run(profiler) as tracer,
+            use_cassette(cassette),
+            use_hedge_policy(hedge_policy),
+        ):
+            if input_obj.pdf_bytes is not None:
+                with temp_pdf(input_obj.pdf_bytes, filename=input_obj.filename) as path:
+                    state = build_run_state(str(path), options_obj, warnings)
+                    state.update(state_overrides or {})
+                    state["doc_hash"] = doc_hash
+                    if cache is not None:
+                        state["cache_manager"] = cache
+                    state[MODEL_CONTEXT_KEY] = ValidatedModelContext()
+                    final_state = _invoke_graph(state, tracer=tracer, cassette=cassette)
+            else:
+                state = build_run_state(str(input_obj.pdf_path), options_obj, warnings)
+                state.update(state_overrides or {})
+                state["doc_hash"] = doc_hash
+                if cache is not None:
+                    state["cache_manager"] = cache
+                state[MODEL_CONTEXT_KEY] = ValidatedModelContext()
+                final_state = _invoke_graph(state, tracer=tracer, cassette=cassette)
+    finally:
+        # Also on LLMBatchPending/errors: buffered LRU touches must reach the store.
+        if cache is not None:
+            cache.flush()
+    if cassette is not None and cassette.misses:
+        warnings.append(
+            f"LLM cassette replay missed {cassette.misses} request(s): {cassette.path}"
         )
 
-    if input_obj.pdf_bytes is not None:
-        with temp_pdf(input_obj.pdf_bytes, filename=input_obj.filename) as path:
-            state = _build_run_state(str(path), options_obj, warnings)
-            state.update(state_overrides or {})
-            state["doc_hash"] = doc_hash
-            if cache is not None:
-                state["cache_manager"] = cache
-            final_state = _invoke_graph(state)
-    else:
-        state = _build_run_state(str(input_obj.pdf_path), options_obj, warnings)
-        state.update(state_overrides or {})
-        state["doc_hash"] = doc_hash
-        if cache is not None:
-            state["cache_manager"] = cache
-        final_state = _invoke_graph(state)
+    if persistence is not None and collecting:
+        run_ctx = persistence.start_run(**run_record)
 
     runtime_ms = int((perf_counter() - start) * 1000)
-    result = _build_result(final_state, options_obj, runtime_ms, warnings)
+    result = _build_result(
+        final_state, options_obj, runtime_ms, warnings, timings=tracer.summary()
+    )
     if run_ctx is None or persistence is None:
         return result
 
@@ -150,7 +211,9 @@ def run_rob2(
         run_id=run_ctx.run_id,
         doc_hash=doc_hash,
         options_payload=options_obj.model_dump(),
-        state_config={k: v for k, v in state.items() if k not in {"cache_manager"}},
+        state_config={
+            k: v for k, v in state.items() if k not in {"cache_manager", MODEL_CONTEXT_KEY}
+        },
         question_set_version=question_set_version,
     )
 
@@ -164,6 +227,11 @@ def run_rob2(
     if not any(value is not None for value in validation_reports.values()):
         validation_reports = None
 
+    validated_candidates = final_state.get("validated_candidates")
+    if isinstance(validated_candidates, Mapping):
+        # Graph state keeps candidates compact; the artifact carries their text again.
+        validated_candidates = expand_candidate_map(final_state, validated_candidates)
+
     persistence.persist_artifacts(
         run_ctx=run_ctx,
         result_payload=result.model_dump(),
@@ -171,7 +239,7 @@ def run_rob2(
         manifest=manifest,
         doc_structure=final_state.get("doc_structure"),
         question_set=question_set_payload,
-        validated_candidates=final_state.get("validated_candidates"),
+        validated_candidates=validated_candidates,
         validation_reports=validation_reports,
         audit_reports=final_state.get("domain_audit_reports"),
     )
@@ -179,9 +247,10 @@ def run_rob2(
     domain_risks = {
         domain.domain: domain.risk for domain in result.result.domains
     }
-    validated_candidates = final_state.get("validated_candidates") or {}
     validated_count = sum(
-        len(items) for items in validated_candidates.values() if isinstance(items, list)
+        len(items)
+        for items in (validated_candidates or {}).values()
+        if isinstance(items, list)
     )
     summary = RunSummaryRecord(
         run_id=run_ctx.run_id,
@@ -194,6 +263,7 @@ def run_rob2(
         run_ctx=run_ctx,
         result_payload=result.model_dump(),
         summary=summary,
+        node_timings=(result.timings or {}).get("nodes"),
         runtime_ms=runtime_ms,
         warnings=warnings,
         question_set_version=question_set_version,
@@ -201,16 +271,90 @@ def run_rob2(
     return result
 
 
-def _invoke_graph(state: dict[str, Any]) -> dict[str, Any]:
+def _invoke_graph(
+    state: dict[str, Any],
+    *,
+    tracer: RunTracer | None = None,
+    cassette: Cassette | None = None,
+) -> dict[str, Any]:
     app = build_rob2_graph()
-    return app.invoke(state)
+    # Callbacks propagate to every LLM call made inside the graph's nodes.
+    config = {"callbacks": [tracer.callback_handler()]} if tracer is not None else None
+    if cassette is None or cassette.mode != "collect":
+        return app.invoke(state, config=config)
+
+    # Collect mode: stop at the first step that staged LLM requests. Nodes may
+    # swallow the per-call LLMRequestPending, so pending requests are checked
+    # after every step rather than relying on the exception.
+    final_state = state
+    try:
+        for final_state in app.stream(state, config=config, stream_mode="values"):
+            if cassette.pending:
+                break
+    except Exception as exc:
+        if not cassette.pending:
+            raise
+        raise LLMBatchPending(cassette.pending) from exc
+    if cassette.pending:
+        raise LLMBatchPending(cassette.pending)
+    return final_state
+
+
+def _build_cassette(
+    options: Rob2RunOptions, *, doc_hash: str, default_dir: str
+) -> Cassette | None:
+    settings = get_settings()
+    mode = _resolve_choice(
+        options.llm_cassette_mode, _resolve_choice(settings.llm_cassette_mode, "none")
+    )
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"llm_cassette_mode must be one of {', '.join(CASSETTE_MODES)}")
+    if mode == "none":
+        return None
+    base_dir = (
+        _resolve_str(options.llm_cassette_dir)
+        or _resolve_str(settings.llm_cassette_dir)
+        or str(Path(default_dir) / "llm_cassettes")
+    )
+    return Cassette(
+        cassette_path(base_dir, doc_hash),
+        mode=mode,
+        replay_latency=_resolve_bool(
+            options.llm_cassette_replay_latency, settings.llm_cassette_replay_latency
+        ),
+    )
+
+
+def _build_hedge_policy(options: Rob2RunOptions) -> HedgePolicy | None:
+    settings = get_settings()
+    hedge_delay = _resolve_str(options.llm_hedge_delay) or _resolve_str(settings.llm_hedge_delay)
+    if hedge_delay is not None and hedge_delay.lower() == "none":
+        hedge_delay = None
+    failover = _resolve_bool(options.llm_failover, settings.llm_failover)
+    if hedge_delay is None and not failover:
+        return None
+    return HedgePolicy(
+        hedge_delay=hedge_delay,
+        max_rate=_resolve_float(
+            options.llm_hedge_max_rate,
+            settings.llm_hedge_max_rate if settings.llm_hedge_max_rate is not None else 0.1,
+        ),
+        fallback_model=_resolve_str(options.llm_fallback_model)
+        or _resolve_str(settings.llm_fallback_model),
+        failover=failover,
+    )
 
 
-def _build_run_state(
+def build_run_state(
     pdf_path: str | None,
     options: Rob2RunOptions,
     warnings: list[str],
 ) -> dict[str, Any]:
+    """Resolve run options against settings into the initial graph state.
+
+    Shared with model warmup and the offline benchmarks so they build the graph
+    with exactly the option resolution of a real run.
+    """
     if not pdf_path:
         raise ValueError("Rob2Input requires pdf_path or pdf_bytes.")
 
@@ -409,6 +553,12 @@ def _build_run_state(
         "rerank_top_n": _resolve_int(
             options.rerank_top_n, settings.reranker_top_n or _DEFAULT_RERANKER_TOP_N
         ),
+        "reranker_max_tokens_per_batch": _resolve_optional_int(
+            options.reranker_max_tokens_per_batch, settings.reranker_max_tokens_per_batch
+        ),
+        "reranker_backend": _resolve_choice(
+            options.reranker_backend, _resolve_choice(settings.reranker_backend, "torch")
+        ),
         "use_structure": use_structure,
         "section_bonus_weight": _resolve_float(
             options.section_bonus_weight, _DEFAULT_SECTION_BONUS_WEIGHT
@@ -427,6 +577,13 @@ def _build_run_state(
         "splade_batch_size": _resolve_int(
             options.splade_batch_size, settings.splade_batch_size or _DEFAULT_SPLADE_BATCH
         ),
+        "splade_max_tokens_per_batch": _resolve_optional_int(
+            options.splade_max_tokens_per_batch, settings.splade_max_tokens_per_batch
+        ),
+        "splade_backend": _resolve_choice(
+            options.splade_backend, _resolve_choice(settings.splade_backend, "torch")
+        ),
+        "onnx_cache_dir": _resolve_str(settings.onnx_cache_dir),
         "llm_locator_mode": _resolve_choice(
             options.llm_locator_mode, _resolve_choice(settings.llm_locator_mode, "none")
         ),
@@ -601,6 +758,8 @@ def _build_result(
     options: Rob2RunOptions,
     runtime_ms: int,
     warnings: list[str],
+    *,
+    timings: dict[str, Any] | None = None,
 ) -> Rob2RunResult:
     raw_output = final_state.get("rob2_result") or {}
     result = Rob2FinalOutput.model_validate(raw_output)
@@ -616,7 +775,7 @@ def _build_result(
         include_reports = _resolve_choice(options.debug_level, "none") != "none"
 
     debug_level = _resolve_choice(options.debug_level, "none")
-    debug_payload = _build_debug_payload(final_state, debug_level)
+    debug_payload = build_debug_payload(final_state, debug_level)
 
     reports = _collect_reports(final_state) if include_reports else None
     audit_reports = final_state.get("domain_audit_reports") if include_audit else None
@@ -628,6 +787,7 @@ def _build_result(
         audit_reports=audit_reports,
         debug=debug_payload,
         runtime_ms=runtime_ms,
+        timings=timings,
         warnings=warnings,
     )
 
@@ -651,11 +811,22 @@ def _collect_reports(state: Mapping[str, Any]) -> dict[str, Any]:
     return {key: state.get(key) for key in report_keys if key in state}
 
 
-def _build_debug_payload(state: Mapping[str, Any], level: str) -> dict[str, Any] | None:
+def build_debug_payload(state: Mapping[str, Any], level: str) -> dict[str, Any] | None:
+    """Return the ``debug`` export for ``level`` (``none``/``min``/``full``).
+
+    The full state keeps evidence candidates as paragraph references: its
+    ``doc_structure`` holds the span table they resolve against.
+    """
     if level == "none":
         return None
     if level == "full":
-        return {"state": dict(state)}
+        return {
+            "state": {
+                key: value
+                for key, value in state.items()
+                if key not in {"cache_manager", MODEL_CONTEXT_KEY}
+            }
+        }
     keys = [
         "doc_scope_report",
         "validation_attempt",
@@ -725,4 +896,4 @@ def _local_splade_model() -> Path | None:
     return candidate if candidate.exists() else None
 
 
-__all__ = ["run_rob2"]
+__all__ = ["build_debug_payload", "build_run_state", "run_rob2"]
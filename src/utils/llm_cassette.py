@@ -0,0 +1,492 @@
+"""Record and replay chat-model calls for deterministic offline runs.
+
+Every module that builds a chat model goes through :func:`init_chat_model`.
+Outside an active cassette it is ``langchain.chat_models.init_chat_model``
+(wrapped for hedging/failover while a :mod:`utils.llm_hedging` policy is
+active). Inside :func:`use_cassette`, where hedging is not applied:
+
+- ``record``: the real model is wrapped so each ``invoke`` and
+  ``with_structured_output(...).invoke`` stores its response (or error) and
+  latency under a hash of the model id, call kind and messages.
+- ``replay``: no provider client is created; a :class:`ReplayChatModel`
+  serves the recorded responses (optionally sleeping for the recorded
+  latency) and raises :class:`CassetteMissError` for unknown requests.
+- ``collect``: like ``replay``, but an unknown request is staged in
+  :attr:`Cassette.pending` (with everything needed to send it later) and
+  :class:`LLMRequestPending` is raised. Provider batch runs
+  (:mod:`services.llm_batch`) answer the staged requests offline, add them to
+  the cassette and run the document again.
+
+Identical requests are served in recording order; once exhausted the last
+response is repeated. Cassettes are JSON files, one per document.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, Literal, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    convert_to_messages,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import BaseModel, Field
+
+CassetteMode = Literal["none", "record", "replay", "collect"]
+CASSETTE_MODES: tuple[CassetteMode, ...] = ("none", "record", "replay", "collect")
+
+_FORMAT_VERSION = 1
+_INVOKE_KIND = "invoke"
+
+_ACTIVE_CASSETTE: ContextVar["Cassette | None"] = ContextVar(
+    "rob2_llm_cassette", default=None
+)
+
+
+class CassetteMissError(LookupError):
+    """Replay found no recorded response for a request."""
+
+
+class LLMRequestPending(CassetteMissError):
+    """A collect-mode request was staged; its answer arrives in a later pass."""
+
+
+class LLMBatchPending(RuntimeError):
+    """A run stopped because LLM requests were staged for a provider batch.
+
+    ``requests`` are the staged request payloads (see :meth:`Cassette.stage`).
+    """
+
+    def __init__(self, requests: list[dict[str, Any]]) -> None:
+        super().__init__(f"{len(requests)} LLM request(s) staged for a provider batch")
+        self.requests = requests
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (type(self), (self.requests,))
+
+
+class RecordedLLMError(RuntimeError):
+    """A provider error captured while recording, raised again on replay."""
+
+    def __init__(self, error_type: str, message: str, status_code: int | None = None) -> None:
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+        self.status_code = status_code
+
+
+class Cassette:
+    """Recorded chat-model responses for one document."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        mode: Literal["record", "replay", "collect"],
+        replay_latency: bool = False,
+    ) -> None:
+        if mode not in ("record", "replay", "collect"):
+            raise ValueError("cassette mode must be 'record', 'replay' or 'collect'")
+        self.path = Path(path)
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+        self._cursors: dict[str, int] = {}
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._pending_messages: set[str] = set()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == "replay" or (mode == "collect" and self.path.exists()):
+            self._entries = _load_entries(self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._entries.values())
+
+    def record(self, key: str, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            self.recorded += 1
+
+    def replay(self, key: str) -> dict[str, Any]:
+        with self._lock:
+            items = self._entries.get(key)
+            if not items:
+                self.misses += 1
+                raise CassetteMissError(
+                    f"No recorded LLM response for request {key[:12]} in {self.path}"
+                )
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            self.replayed += 1
+            return items[min(index, len(items) - 1)]
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return bool(self._entries.get(key))
+
+    def stage(self, key: str, request: dict[str, Any]) -> None:
+        """Stage an unanswered collect-mode request and raise :class:`LLMRequestPending`.
+
+        A plain ``invoke`` with the same messages as an already staged
+        structured request (the call sites' JSON fallback) is not staged again.
+        """
+        messages_key = request_key(str(request.get("model")), "*", request.get("messages") or [])
+        with self._lock:
+            duplicate_fallback = (
+                request.get("kind") == _INVOKE_KIND and messages_key in self._pending_messages
+            )
+            if not duplicate_fallback and key not in self._pending:
+                self._pending[key] = {"key": key, **request}
+                self._pending_messages.add(messages_key)
+        raise LLMRequestPending(f"LLM request {key[:12]} staged for a provider batch")
+
+    @property
+    def pending(self) -> list[dict[str, Any]]:
+        """Requests staged in ``collect`` mode, in staging order."""
+        with self._lock:
+            return list(self._pending.values())
+
+    def add_entries(self, entries: dict[str, dict[str, Any]]) -> None:
+        """Append one answer per request key (used to fill collect-mode cassettes)."""
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries.setdefault(key, []).append(entry)
+                self.recorded += 1
+
+    def save(self) -> None:
+        """Write the recorded entries (atomically replacing an older cassette)."""
+        with self._lock:
+            payload = {"version": _FORMAT_VERSION, "entries": self._entries}
+            text = json.dumps(payload, ensure_ascii=False, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+
+def cassette_path(base_dir: str | Path, doc_hash: str) -> Path:
+    return Path(base_dir) / f"{doc_hash}.json"
+
+
+@contextmanager
+def use_cassette(cassette: Cassette | None) -> Iterator[Cassette | None]:
+    """Route chat models built by :func:`init_chat_model` through ``cassette``.
+
+    Recorded entries are saved when the block exits, even if the run failed.
+    """
+    token = _ACTIVE_CASSETTE.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _ACTIVE_CASSETTE.reset(token)
+        if cassette is not None and cassette.mode == "record":
+            cassette.save()
+
+
+def active_cassette() -> Cassette | None:
+    return _ACTIVE_CASSETTE.get()
+
+
+def init_chat_model(model: str, **kwargs: Any) -> Any:
+    """``langchain.chat_models.init_chat_model`` with cassette record/replay."""
+    cassette = _ACTIVE_CASSETTE.get()
+    if cassette is not None and cassette.mode in ("replay", "collect"):
+        return ReplayChatModel(cassette=cassette, model_id=model, model_kwargs=kwargs)
+
+    from langchain.chat_models import init_chat_model as _init_chat_model
+
+    chat_model = _init_chat_model(model, **kwargs)
+    if cassette is None:
+        return _apply_hedge_policy(chat_model, model, kwargs)
+    return RecordingChatModel(chat_model, cassette=cassette, model_id=model)
+
+
+def _apply_hedge_policy(chat_model: Any, model: str, kwargs: dict[str, Any]) -> Any:
+    from utils.llm_hedging import HedgedChatModel, active_hedge_policy
+
+    policy = active_hedge_policy()
+    if policy is None or not policy.enabled:
+        return chat_model
+    fallback_factory = None
+    if policy.fallback_model:
+        from langchain.chat_models import init_chat_model as _init_chat_model
+
+        fallback_id = policy.fallback_model
+        # The fallback id carries its own provider (e.g. "anthropic:...").
+        fallback_kwargs = {key: value for key, value in kwargs.items() if key != "model_provider"}
+
+        def fallback_factory() -> Any:
+            return _init_chat_model(fallback_id, **fallback_kwargs)
+
+    return HedgedChatModel(
+        chat_model, model_id=model, policy=policy, fallback_factory=fallback_factory
+    )
+
+
+def request_key(model_id: str, kind: str, input: Any) -> str:
+    """Hash identifying a request; ``input`` may also be serialized message dicts."""
+    payload = {
+        "model": model_id,
+        "kind": kind,
+        "messages": [
+            {"type": message.type, "content": message.content}
+            for message in _as_messages(input)
+        ],
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class RecordingChatModel:
+    """Proxy around a real chat model that records every response."""
+
+    def __init__(self, model: Any, *, cassette: Cassette, model_id: str) -> None:
+        self._model = model
+        self._cassette = cassette
+        self._model_id = model_id
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        key = request_key(self._model_id, _INVOKE_KIND, input)
+        started = time.perf_counter()
+        try:
+            result = self._model.invoke(input, config, **kwargs)
+        except Exception as exc:
+            self._cassette.record(key, self._entry(started, error=exc))
+            raise
+        self._cassette.record(key, self._entry(started, message=_as_ai_message(result)))
+        return result
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> "_RecordingStructured":
+        return _RecordingStructured(self, schema, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    def _entry(
+        self,
+        started: float,
+        *,
+        message: BaseMessage | None = None,
+        structured: Any = None,
+        error: BaseException | None = None,
+    ) -> dict[str, Any]:
+        entry: dict[str, Any] = {
+            "model": self._model_id,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        if error is not None:
+            entry["error"] = {
+                "type": type(error).__name__,
+                "message": str(error)[:500],
+                "status_code": _status_code(error),
+            }
+            return entry
+        if message is not None:
+            entry["message"] = message_to_dict(message)
+        if structured is not None:
+            entry["structured"] = (
+                structured.model_dump(mode="json")
+                if isinstance(structured, BaseModel)
+                else structured
+            )
+        return entry
+
+
+class _RecordingStructured:
+    def __init__(self, owner: RecordingChatModel, schema: Any, kwargs: dict[str, Any]) -> None:
+        self._owner = owner
+        self._schema = schema
+        self._include_raw = bool(kwargs.pop("include_raw", False))
+        self._kwargs = kwargs
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        owner = self._owner
+        key = request_key(owner._model_id, _structured_kind(self._schema), input)
+        started = time.perf_counter()
+        try:
+            runnable = owner._model.with_structured_output(
+                self._schema, include_raw=True, **self._kwargs
+            )
+            output = runnable.invoke(input, config, **kwargs)
+            parsing_error = output.get("parsing_error")
+            if parsing_error is not None:
+                raise parsing_error
+        except Exception as exc:
+            owner._cassette.record(key, owner._entry(started, error=exc))
+            raise
+        parsed = output.get("parsed")
+        owner._cassette.record(
+            key,
+            owner._entry(started, message=_as_ai_message(output.get("raw")), structured=parsed),
+        )
+        return output if self._include_raw else parsed
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model answering from a cassette; never contacts a provider."""
+
+    model_id: str
+    # ``init_chat_model`` kwargs, sent along with requests staged in collect mode.
+    model_kwargs: dict[str, Any] = Field(default_factory=dict)
+    cassette: Any = Field(exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model_id": self.model_id}
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> "_ReplayStructured":  # type: ignore[override]
+        return _ReplayStructured(self, schema, include_raw=bool(kwargs.get("include_raw")))
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = kwargs.get("cassette_entry")
+        if entry is None:
+            key = request_key(self.model_id, _INVOKE_KIND, messages)
+            if self.cassette.mode == "collect" and not self.cassette.has(key):
+                self.cassette.stage(key, self._staged_request(_INVOKE_KIND, messages))
+            entry = self.cassette.replay(key)
+        if self.cassette.replay_latency:
+            time.sleep(float(entry.get("latency_ms") or 0.0) / 1000)
+        error = entry.get("error")
+        if isinstance(error, dict):
+            raise RecordedLLMError(
+                str(error.get("type") or "Error"),
+                str(error.get("message") or ""),
+                error.get("status_code"),
+            )
+        raw = entry.get("message")
+        message = messages_from_dict([raw])[0] if isinstance(raw, dict) else AIMessage(content="")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _staged_request(
+        self, kind: str, input: Any, schema: Any = None
+    ) -> dict[str, Any]:
+        request: dict[str, Any] = {
+            "model": self.model_id,
+            "model_kwargs": {
+                key: value
+                for key, value in self.model_kwargs.items()
+                if isinstance(value, (str, int, float, bool)) or value is None
+            },
+            "kind": kind,
+            "messages": [message_to_dict(message) for message in _as_messages(input)],
+        }
+        if schema is not None:
+            request["schema_name"] = getattr(schema, "__name__", None) or "response"
+            request["schema"] = (
+                schema.model_json_schema()
+                if isinstance(schema, type) and issubclass(schema, BaseModel)
+                else schema
+            )
+        return request
+
+
+class _ReplayStructured:
+    def __init__(self, owner: ReplayChatModel, schema: Any, *, include_raw: bool) -> None:
+        self._owner = owner
+        self._schema = schema
+        self._include_raw = include_raw
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        owner = self._owner
+        kind = _structured_kind(self._schema)
+        key = request_key(owner.model_id, kind, input)
+        if owner.cassette.mode == "collect" and not owner.cassette.has(key):
+            owner.cassette.stage(key, owner._staged_request(kind, input, self._schema))
+        entry = owner.cassette.replay(key)
+        # Goes through BaseChatModel.invoke so callbacks (tracing) see the call.
+        raw = owner.invoke(input, config, cassette_entry=entry, **kwargs)
+        value = entry.get("structured")
+        parsed = (
+            self._schema.model_validate(value)
+            if isinstance(self._schema, type) and issubclass(self._schema, BaseModel)
+            else value
+        )
+        if self._include_raw:
+            return {"raw": raw, "parsed": parsed, "parsing_error": None}
+        return parsed
+
+
+def _structured_kind(schema: Any) -> str:
+    name = getattr(schema, "__name__", None) or type(schema).__name__
+    return f"structured:{name}"
+
+
+def _as_messages(input: Any) -> Sequence[BaseMessage]:
+    if isinstance(input, list) and input and all(
+        isinstance(item, dict) and "data" in item for item in input
+    ):
+        return messages_from_dict(input)
+    if isinstance(input, str):
+        return convert_to_messages([("human", input)])
+    if hasattr(input, "to_messages"):
+        return input.to_messages()
+    return convert_to_messages(input)
+
+
+def _as_ai_message(result: Any) -> BaseMessage:
+    if isinstance(result, BaseMessage):
+        return result
+    return AIMessage(content="" if result is None else str(result))
+
+
+def _status_code(error: BaseException) -> int | None:
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _load_entries(path: Path) -> dict[str, list[dict[str, Any]]]:
+    if not path.exists():
+        raise FileNotFoundError(f"LLM cassette not found: {path}")
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(payload, dict) or payload.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported LLM cassette format: {path}")
+    entries = payload.get("entries")
+    if not isinstance(entries, dict):
+        raise ValueError(f"LLM cassette has no entries: {path}")
+    return {str(key): list(items) for key, items in entries.items() if isinstance(items, list)}
+
+
+__all__ = [
+    "CASSETTE_MODES",
+    "Cassette",
+    "CassetteMissError",
+    "CassetteMode",
+    "LLMBatchPending",
+    "LLMRequestPending",
+    "RecordedLLMError",
+    "ReplayChatModel",
+    "active_cassette",
+    "cassette_path",
+    "init_chat_model",
+    "request_key",
+    "use_cassette",
+]
@@ -0,0 +1,334 @@
+"""Hedged and failover chat-model requests to cut LLM tail latency.
+
+While a :class:`HedgePolicy` is active (:func:`use_hedge_policy`), chat models
+built by :func:`utils.llm_cassette.init_chat_model` are wrapped in a
+:class:`HedgedChatModel`:
+
+- **Hedging**: when a call has not answered after the hedge delay, either a
+  fixed number of milliseconds or a quantile such as ``p90`` of the latencies
+  observed for the same model and call kind (``invoke`` or
+  ``structured:<Schema>``), a duplicate request goes to the same model or
+  ``fallback_model``. The first valid response wins. A response is valid when
+  the call did not raise (structured output parsed) and did not return
+  ``None``. The loser is left to finish in the background. Hedges per call
+  kind are capped at ``max_rate`` of its calls.
+- **Failover**: when ``failover`` is on and a call ends in HTTP 429, 5xx or a
+  timeout (after the provider client's own retries), it is sent once to
+  ``fallback_model``.
+
+Latency windows and hedge budgets are per process. Outcomes are published as
+``rob2_llm_hedges_total`` / ``rob2_llm_failovers_total`` in :mod:`utils.metrics`.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from utils import metrics
+
+_INVOKE_KIND = "invoke"
+_LATENCY_WINDOW = 200
+# Quantile delays need this many observed latencies for the call kind.
+_MIN_LATENCY_SAMPLES = 20
+_DELAY_PATTERN = re.compile(r"^(?:p(?P<quantile>\d{1,2}(?:\.\d+)?)|(?P<ms>\d+(?:\.\d+)?)\s*(?:ms)?)$")
+
+_ACTIVE_POLICY: ContextVar["HedgePolicy | None"] = ContextVar(
+    "rob2_llm_hedge_policy", default=None
+)
+
+
+class InvalidLLMResponse(ValueError):
+    """A chat model returned no usable response."""
+
+
+@dataclass(frozen=True, slots=True)
+class HedgePolicy:
+    """Hedging/failover settings for one run.
+
+    ``hedge_delay`` is ``"p<quantile>"`` (e.g. ``"p90"``) or milliseconds
+    (``"1500"`` / ``"1500ms"``); ``None`` disables hedging.
+    """
+
+    hedge_delay: str | None = None
+    max_rate: float = 0.1
+    fallback_model: str | None = None
+    failover: bool = False
+
+    def __post_init__(self) -> None:
+        if self.hedge_delay is not None:
+            parse_hedge_delay(self.hedge_delay)
+        if not 0.0 <= self.max_rate <= 1.0:
+            raise ValueError("max_rate must be within [0, 1]")
+        if self.failover and not self.fallback_model:
+            raise ValueError("failover requires fallback_model")
+
+    @property
+    def enabled(self) -> bool:
+        return self.hedge_delay is not None or self.failover
+
+
+def parse_hedge_delay(text: str) -> tuple[str, float]:
+    """Parse a hedge delay into ``("quantile", q)`` or ``("fixed", seconds)``."""
+    match = _DELAY_PATTERN.match(str(text).strip().lower())
+    if match is None:
+        raise ValueError(f"hedge delay must be like 'p90' or '1500ms', got {text!r}")
+    if match.group("quantile") is not None:
+        quantile = float(match.group("quantile")) / 100
+        if not 0.0 < quantile < 1.0:
+            raise ValueError(f"hedge delay quantile must be within (0, 100): {text!r}")
+        return "quantile", quantile
+    return "fixed", float(match.group("ms")) / 1000
+
+
+class _CallStats:
+    """Latency window and hedge budget for one model/call kind."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+
+    def begin_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay_s(self, spec: str) -> float | None:
+        kind, value = parse_hedge_delay(spec)
+        if kind == "fixed":
+            return value
+        with self._lock:
+            if len(self._latencies) < _MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(value * len(ordered)))]
+
+    def acquire_hedge(self, max_rate: float) -> bool:
+        with self._lock:
+            if self.hedges + 1 > max_rate * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "hedges": self.hedges, "observed": len(self._latencies)}
+
+
+_STATS: dict[str, _CallStats] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _call_stats(key: str) -> _CallStats:
+    with _STATS_LOCK:
+        stats = _STATS.get(key)
+        if stats is None:
+            stats = _STATS[key] = _CallStats()
+        return stats
+
+
+def hedge_stats() -> dict[str, dict[str, Any]]:
+    """Per ``<model>|<call kind>``: calls, hedges issued and observed latencies."""
+    with _STATS_LOCK:
+        items = list(_STATS.items())
+    return {key: stats.snapshot() for key, stats in items}
+
+
+def reset_hedge_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+@contextmanager
+def use_hedge_policy(policy: HedgePolicy | None) -> Iterator[HedgePolicy | None]:
+    """Wrap chat models built by ``init_chat_model`` in the block with ``policy``."""
+    token = _ACTIVE_POLICY.set(policy)
+    try:
+        yield policy
+    finally:
+        _ACTIVE_POLICY.reset(token)
+
+
+def active_hedge_policy() -> HedgePolicy | None:
+    return _ACTIVE_POLICY.get()
+
+
+class HedgedChatModel:
+    """Proxy issuing hedged and failover requests around a chat model."""
+
+    def __init__(
+        self,
+        model: Any,
+        *,
+        model_id: str,
+        policy: HedgePolicy,
+        fallback_factory: Callable[[], Any] | None = None,
+    ) -> None:
+        self._model = model
+        self._model_id = model_id
+        self._policy = policy
+        self._fallback_factory = fallback_factory
+        self._fallback: Any = None
+        self._fallback_lock = threading.Lock()
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        return self._call(_INVOKE_KIND, lambda model: model.invoke(input, config, **kwargs))
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> "_HedgedStructured":
+        return _HedgedStructured(self, schema, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    def _fallback_model(self) -> Any:
+        if self._fallback_factory is None:
+            return self._model
+        with self._fallback_lock:
+            if self._fallback is None:
+                self._fallback = self._fallback_factory()
+            return self._fallback
+
+    def _call(self, kind: str, request: Callable[[Any], Any]) -> Any:
+        stats = _call_stats(f"{self._model_id}|{kind}")
+        stats.begin_call()
+        delay = (
+            stats.hedge_delay_s(self._policy.hedge_delay)
+            if self._policy.hedge_delay is not None
+            else None
+        )
+        if delay is None:
+            started = time.perf_counter()
+            try:
+                result = _checked(request(self._model))
+            except Exception as exc:
+                return self._failover(kind, request, exc)
+            stats.observe(time.perf_counter() - started)
+            return result
+        return self._hedged(kind, stats, delay, request)
+
+    def _hedged(
+        self, kind: str, stats: _CallStats, delay: float, request: Callable[[Any], Any]
+    ) -> Any:
+        primary = _submit(request, self._model, on_success=stats.observe)
+        pending: list[Future] = [primary]
+        hedge: Future | None = None
+        done, _ = wait(pending, timeout=delay)
+        if not done and stats.acquire_hedge(self._policy.max_rate):
+            hedge = _submit(request, self._fallback_model())
+            pending.append(hedge)
+
+        errors: list[BaseException] = []
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in [item for item in pending if item in done]:
+                pending.remove(future)
+                error = future.exception()
+                if error is None:
+                    if hedge is not None:
+                        winner = "primary" if future is primary else "hedge"
+                        metrics.LLM_HEDGES.inc(kind=kind, winner=winner)
+                    return future.result()
+                errors.append(error)
+        if hedge is not None:
+            metrics.LLM_HEDGES.inc(kind=kind, winner="none")
+        return self._failover(kind, request, errors[0])
+
+    def _failover(self, kind: str, request: Callable[[Any], Any], error: BaseException) -> Any:
+        if not (self._policy.failover and self._fallback_factory and is_failover_error(error)):
+            raise error
+        try:
+            result = _checked(request(self._fallback_model()))
+        except Exception:
+            metrics.LLM_FAILOVERS.inc(kind=kind, outcome="failed")
+            raise
+        metrics.LLM_FAILOVERS.inc(kind=kind, outcome="success")
+        return result
+
+
+class _HedgedStructured:
+    def __init__(self, owner: HedgedChatModel, schema: Any, kwargs: dict[str, Any]) -> None:
+        self._owner = owner
+        self._schema = schema
+        self._kwargs = kwargs
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        name = getattr(self._schema, "__name__", None) or type(self._schema).__name__
+        return self._owner._call(
+            f"structured:{name}",
+            lambda model: model.with_structured_output(self._schema, **self._kwargs).invoke(
+                input, config, **kwargs
+            ),
+        )
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """True for HTTP 429 / 5xx responses and request timeouts."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if "timeout" in type(error).__name__.lower():
+        return True
+    text = str(error).lower()
+    return "rate limit" in text or "overloaded" in text or "timed out" in text
+
+
+def _checked(result: Any) -> Any:
+    if result is None:
+        raise InvalidLLMResponse("LLM returned no response")
+    if isinstance(result, dict) and result.get("parsing_error") is not None:
+        raise result["parsing_error"]
+    return result
+
+
+def _submit(
+    request: Callable[[Any], Any],
+    model: Any,
+    *,
+    on_success: Callable[[float], None] | None = None,
+) -> Future:
+    """Run ``request(model)`` on its own thread with the caller's context."""
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def _run() -> None:
+        started = time.perf_counter()
+        try:
+            result = _checked(context.run(request, model))
+        except BaseException as exc:  # noqa: BLE001 - handed to the waiting caller
+            future.set_exception(exc)
+            return
+        if on_success is not None:
+            on_success(time.perf_counter() - started)
+        future.set_result(result)
+
+    future.set_running_or_notify_cancel()
+    threading.Thread(target=_run, name="rob2-llm-hedge", daemon=True).start()
+    return future
+
+
+__all__ = [
+    "HedgePolicy",
+    "HedgedChatModel",
+    "InvalidLLMResponse",
+    "active_hedge_policy",
+    "hedge_stats",
+    "is_failover_error",
+    "parse_hedge_delay",
+    "reset_hedge_stats",
+    "use_hedge_policy",
+]
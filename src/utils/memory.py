@@ -0,0 +1,112 @@
+"""Process memory readings (stdlib only)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+
+_MB = 1024 * 1024
+
+
+def current_rss_mb() -> float | None:
+    """Return the resident set size of this process in MiB, if available."""
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            resident_pages = int(handle.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / _MB, 1)
+
+
+def peak_rss_mb() -> float | None:
+    """Return the peak resident set size of this process in MiB, if available."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - non-POSIX
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KiB elsewhere.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(peak * scale / _MB, 1)
+
+
+class RssWindow:
+    """Track the peak RSS of this process between :meth:`open` and :meth:`close`.
+
+    ``ru_maxrss`` only reports the lifetime peak, so a long-lived worker would
+    attribute an earlier document's peak to every later one. While any window
+    is open a shared daemon thread samples :func:`current_rss_mb` every
+    ``SAMPLE_INTERVAL_S`` seconds; short spikes between samples are missed.
+    """
+
+    SAMPLE_INTERVAL_S = 0.02
+
+    _lock = threading.Lock()
+    _open: set["RssWindow"] = set()
+    _sampler: threading.Thread | None = None
+
+    def __init__(self) -> None:
+        self.start_mb: float | None = None
+        self.peak_mb: float | None = None
+
+    def __enter__(self) -> "RssWindow":
+        return self.open()
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    @property
+    def growth_mb(self) -> float | None:
+        """Peak RSS above the reading taken when the window opened."""
+        if self.start_mb is None or self.peak_mb is None:
+            return None
+        return round(self.peak_mb - self.start_mb, 1)
+
+    def open(self) -> "RssWindow":
+        self.start_mb = self.peak_mb = current_rss_mb()
+        cls = type(self)
+        with cls._lock:
+            cls._open.add(self)
+            if cls._sampler is None:
+                cls._sampler = threading.Thread(
+                    target=cls._sample_loop, name="rss-sampler", daemon=True
+                )
+                cls._sampler.start()
+        return self
+
+    def close(self) -> None:
+        self._observe(current_rss_mb())
+        with self._lock:
+            self._open.discard(self)
+
+    def _observe(self, rss_mb: float | None) -> None:
+        if rss_mb is not None and (self.peak_mb is None or rss_mb > self.peak_mb):
+            self.peak_mb = rss_mb
+
+    @classmethod
+    def _sample_loop(cls) -> None:
+        while True:
+            rss_mb = current_rss_mb()
+            with cls._lock:
+                if not cls._open:
+                    cls._sampler = None
+                    return
+                for window in cls._open:
+                    window._observe(rss_mb)
+            time.sleep(cls.SAMPLE_INTERVAL_S)
+
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        # The sampler thread does not survive fork(); let the child start its own.
+        cls._lock = threading.Lock()
+        cls._open = set()
+        cls._sampler = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=RssWindow._reset_after_fork)
+
+
+__all__ = ["RssWindow", "current_rss_mb", "peak_rss_mb"]
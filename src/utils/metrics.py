@@ -0,0 +1,267 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Only what the service needs is implemented (counters, gauges, histograms with
+labels) so no client library or external collector is required; the API
+serves :func:`render_metrics` at ``/metrics``. Values are per process.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+_LabelKey = tuple[tuple[str, str], ...]
+
+# Node and run latencies range from milliseconds (planner) to minutes (LLM domains).
+NODE_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RUN_DURATION_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> _LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[tuple[str, _LabelKey, float]]:
+        """Return ``(sample name, labels, value)`` rows in exposition order."""
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[_LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[tuple[str, _LabelKey, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        *,
+        buckets: Iterable[float] = NODE_DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        # Per label set: (bucket counts, sum, count); bucket counts are not cumulative.
+        self._values: dict[_LabelKey, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> list[tuple[str, _LabelKey, float]]:
+        samples: list[tuple[str, _LabelKey, float]] = []
+        with self._lock:
+            entries = sorted(self._values.items())
+        for key, (counts, total, count) in entries:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(
+                    (f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative)
+                )
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+RUNS_IN_FLIGHT = REGISTRY.register(
+    Gauge("rob2_runs_in_flight", "ROB2 runs currently executing the graph.")
+)
+RUNS_QUEUED = REGISTRY.register(
+    Gauge("rob2_runs_queued", "API run requests accepted but waiting for a worker thread.")
+)
+RUNS_TOTAL = REGISTRY.register(
+    Counter("rob2_runs_total", "Completed ROB2 runs by outcome.", ("status",))
+)
+RUN_DURATION = REGISTRY.register(
+    Histogram(
+        "rob2_run_duration_seconds",
+        "Wall time of whole ROB2 runs.",
+        buckets=RUN_DURATION_BUCKETS,
+    )
+)
+NODE_DURATION = REGISTRY.register(
+    Histogram("rob2_node_duration_seconds", "Wall time per graph node execution.", ("node",))
+)
+LLM_CALLS = REGISTRY.register(
+    Counter("rob2_llm_calls_total", "LLM calls by graph node.", ("node",))
+)
+LLM_ERRORS = REGISTRY.register(
+    Counter("rob2_llm_errors_total", "Failed LLM calls by graph node.", ("node",))
+)
+LLM_RATE_LIMITED = REGISTRY.register(
+    Counter(
+        "rob2_llm_rate_limited_total",
+        "LLM calls rejected with HTTP 429 / rate limit errors, by graph node.",
+        ("node",),
+    )
+)
+LLM_HEDGES = REGISTRY.register(
+    Counter(
+        "rob2_llm_hedges_total",
+        "Hedged LLM calls by call kind and winning request (primary|hedge|none).",
+        ("kind", "winner"),
+    )
+)
+LLM_FAILOVERS = REGISTRY.register(
+    Counter(
+        "rob2_llm_failovers_total",
+        "LLM calls re-sent to the fallback model after a 429/5xx/timeout, by call kind and outcome.",
+        ("kind", "outcome"),
+    )
+)
+LLM_TOKENS = REGISTRY.register(
+    Counter("rob2_llm_tokens_total", "LLM tokens by graph node and direction.", ("node", "direction"))
+)
+CACHE_LOOKUPS = REGISTRY.register(
+    Counter("rob2_cache_lookups_total", "Cache lookups by stage and result.", ("stage", "result"))
+)
+MODEL_WARM = REGISTRY.register(
+    Gauge("rob2_model_warm", "1 when the model is loaded in this process.", ("model",))
+)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def _format_labels(labels: _LabelKey) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels)
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+__all__ = [
+    "CACHE_LOOKUPS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "LLM_CALLS",
+    "LLM_ERRORS",
+    "LLM_FAILOVERS",
+    "LLM_HEDGES",
+    "LLM_RATE_LIMITED",
+    "LLM_TOKENS",
+    "MODEL_WARM",
+    "MetricsRegistry",
+    "NODE_DURATION",
+    "REGISTRY",
+    "RUNS_IN_FLIGHT",
+    "RUNS_QUEUED",
+    "RUNS_TOTAL",
+    "RUN_DURATION",
+    "render_metrics",
+]
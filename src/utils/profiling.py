@@ -0,0 +1,370 @@
+"""Per-node CPU and allocation profiling for a single run.
+
+A :class:`RunProfiler` is attached to the run's tracer (``trace_run(profiler=...)``)
+and is told when each graph node starts and finishes on a thread. While the run
+is active a background thread samples the Python stacks of every thread that is
+inside a node; each sample is rooted at the LangGraph node name, so the output
+is a flamegraph with node boundaries as the top level. Samples taken while the
+thread's CPU clock advanced are also counted as on-CPU samples.
+
+Stack sampling is used instead of :mod:`cProfile` because since Python 3.12 the
+deterministic profiler is process-wide (``sys.monitoring``) and cannot be
+scoped to the nodes that run concurrently on LangGraph's worker threads.
+
+When ``memory_top`` is positive, :mod:`tracemalloc` snapshots are taken around
+every node execution and the largest net allocations are kept per node. Nodes
+running concurrently share the allocator, so their allocation diffs overlap.
+
+:meth:`RunProfiler.write` produces ``profile.folded`` / ``profile.cpu.folded``
+(collapsed stacks, readable by ``flamegraph.pl``, speedscope and inferno) and a
+``profile.md`` summary table.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Mapping
+
+FOLDED_FILE_NAME = "profile.folded"
+CPU_FOLDED_FILE_NAME = "profile.cpu.folded"
+SUMMARY_FILE_NAME = "profile.md"
+
+_DEFAULT_INTERVAL_MS = 5.0
+_DEFAULT_MEMORY_TOP = 10
+# A sample counts as on-CPU when the thread consumed at least this share of
+# the wall time elapsed since its previous sample.
+_ON_CPU_SHARE = 0.5
+
+
+@dataclass(slots=True)
+class _ActiveNode:
+    name: str
+    anchor: FrameType | None
+    cpu_clock: int | None
+    last_cpu: float = 0.0
+    last_wall: float = 0.0
+    snapshot: tracemalloc.Snapshot | None = None
+
+
+@dataclass(slots=True)
+class _NodeAllocations:
+    size_diff: Counter = field(default_factory=Counter)
+    count_diff: Counter = field(default_factory=Counter)
+
+
+class RunProfiler:
+    """Sampling CPU profiler and allocation tracker keyed by graph node."""
+
+    def __init__(
+        self,
+        *,
+        interval_ms: float = _DEFAULT_INTERVAL_MS,
+        memory_top: int = _DEFAULT_MEMORY_TOP,
+    ) -> None:
+        if interval_ms <= 0:
+            raise ValueError("interval_ms must be positive")
+        self.interval_ms = float(interval_ms)
+        self.memory_top = max(0, int(memory_top))
+        self._lock = threading.Lock()
+        self._active: dict[int, _ActiveNode] = {}
+        self._wall_samples: Counter[tuple[str, ...]] = Counter()
+        self._cpu_samples: Counter[tuple[str, ...]] = Counter()
+        self._allocations: dict[str, _NodeAllocations] = {}
+        self._labels: dict[CodeType, str] = {}
+        self._cpu_clock_available = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started_tracemalloc = False
+        self._elapsed_s = 0.0
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.memory_top and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._sample_loop, name="rob2-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        self._elapsed_s += time.perf_counter() - self._started_at
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def node_started(self, name: str, anchor: FrameType | None = None) -> None:
+        """Mark the current thread as running ``name``.
+
+        ``anchor`` is the frame that invokes the node; sampled stacks are cut
+        below it so every flamegraph starts at the node.
+        """
+        cpu_clock = _thread_cpu_clock()
+        entry = _ActiveNode(name=name, anchor=anchor, cpu_clock=cpu_clock)
+        if cpu_clock is not None:
+            entry.last_cpu = time.clock_gettime(cpu_clock)
+        entry.last_wall = time.perf_counter()
+        if self.memory_top and tracemalloc.is_tracing():
+            entry.snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            self._active[threading.get_ident()] = entry
+            if cpu_clock is not None:
+                self._cpu_clock_available = True
+
+    def node_finished(self) -> None:
+        with self._lock:
+            entry = self._active.pop(threading.get_ident(), None)
+        if entry is None or entry.snapshot is None or not tracemalloc.is_tracing():
+            return
+        after = tracemalloc.take_snapshot()
+        diff = _exclude_profiler(after).compare_to(_exclude_profiler(entry.snapshot), "lineno")
+        with self._lock:
+            allocations = self._allocations.setdefault(entry.name, _NodeAllocations())
+            for stat in diff:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                location = f"{_short_path(frame.filename)}:{frame.lineno}"
+                allocations.size_diff[location] += stat.size_diff
+                allocations.count_diff[location] += stat.count_diff
+
+    def summary(self) -> dict[str, Any]:
+        """Return sample counts, hottest functions and allocations per node."""
+        with self._lock:
+            wall = Counter(self._wall_samples)
+            cpu = Counter(self._cpu_samples)
+            allocations = {
+                name: Counter(node.size_diff) for name, node in self._allocations.items()
+            }
+            counts = {
+                name: Counter(node.count_diff) for name, node in self._allocations.items()
+            }
+        nodes: dict[str, dict[str, Any]] = {}
+        for samples, key in ((wall, "samples"), (cpu, "cpu_samples")):
+            for stack, count in samples.items():
+                node = nodes.setdefault(stack[0], _empty_node_summary())
+                node[key] += count
+        hot_source = cpu if self._cpu_clock_available else wall
+        self_time: dict[str, Counter[str]] = {}
+        for stack, count in hot_source.items():
+            if len(stack) > 1:
+                self_time.setdefault(stack[0], Counter())[stack[-1]] += count
+        for name, functions in self_time.items():
+            nodes.setdefault(name, _empty_node_summary())["top_functions"] = [
+                {"function": function, "samples": count}
+                for function, count in functions.most_common(5)
+            ]
+        for name, sizes in allocations.items():
+            node = nodes.setdefault(name, _empty_node_summary())
+            node["alloc_net_kb"] = round(sum(sizes.values()) / 1024, 1)
+            node["top_allocations"] = [
+                {
+                    "location": location,
+                    "size_kb": round(size / 1024, 1),
+                    "count": counts[name][location],
+                }
+                for location, size in sizes.most_common(self.memory_top)
+            ]
+        return {
+            "interval_ms": self.interval_ms,
+            "elapsed_ms": round(self._elapsed_s * 1000, 1),
+            "cpu_samples_available": self._cpu_clock_available,
+            "nodes": nodes,
+        }
+
+    def write(
+        self, output_dir: Path, *, timings: Mapping[str, Any] | None = None
+    ) -> list[Path]:
+        """Write the collapsed stacks and the summary table into ``output_dir``.
+
+        ``timings`` is the run's tracer summary (``result.timings``); when given,
+        the table also lists per-node wall/CPU/LLM time and follows its node order.
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            wall = Counter(self._wall_samples)
+            cpu = Counter(self._cpu_samples)
+        written = [output_dir / FOLDED_FILE_NAME]
+        _write_folded(written[0], wall)
+        if self._cpu_clock_available:
+            written.append(output_dir / CPU_FOLDED_FILE_NAME)
+            _write_folded(written[-1], cpu)
+        written.append(output_dir / SUMMARY_FILE_NAME)
+        written[-1].write_text(
+            render_profile_markdown(self.summary(), timings=timings), encoding="utf-8"
+        )
+        return written
+
+    def _sample_loop(self) -> None:
+        interval_s = self.interval_ms / 1000
+        own_ident = threading.get_ident()
+        while not self._stop.wait(interval_s):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            with self._lock:
+                for ident, entry in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own_ident:
+                        continue
+                    stack = (entry.name, *self._stack_labels(frame, entry.anchor))
+                    self._wall_samples[stack] += 1
+                    if entry.cpu_clock is not None and _on_cpu(entry, now):
+                        self._cpu_samples[stack] += 1
+            del frames
+
+    def _stack_labels(self, frame: FrameType | None, anchor: FrameType | None) -> list[str]:
+        labels: list[str] = []
+        while frame is not None and frame is not anchor:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = (
+                    f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                )
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+
+def render_profile_markdown(
+    summary: Mapping[str, Any], *, timings: Mapping[str, Any] | None = None
+) -> str:
+    """Render :meth:`RunProfiler.summary` (plus optional node timings) as Markdown."""
+    nodes: Mapping[str, Any] = summary.get("nodes") or {}
+    node_timings: Mapping[str, Any] = (timings or {}).get("nodes") or {}
+    order = list(node_timings) + [name for name in nodes if name not in node_timings]
+    cpu_column = "on-CPU samples" if summary.get("cpu_samples_available") else "-"
+    lines = [
+        "# Run profile",
+        "",
+        f"Sampling interval: {summary.get('interval_ms')} ms; "
+        f"profiled time: {summary.get('elapsed_ms')} ms. "
+        f"Flamegraph input: `{FOLDED_FILE_NAME}`"
+        + (
+            f" (wall clock), `{CPU_FOLDED_FILE_NAME}` (on-CPU)."
+            if summary.get("cpu_samples_available")
+            else " (wall clock)."
+        ),
+        "",
+        "| Node | Calls | Wall ms | CPU ms | LLM ms | Samples | On-CPU | Alloc net KB | Hottest function |",
+        "| --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: | --- |",
+    ]
+    for name in order:
+        timing = node_timings.get(name) or {}
+        node = nodes.get(name) or _empty_node_summary()
+        top = node.get("top_functions") or []
+        lines.append(
+            "| {name} | {calls} | {wall} | {cpu} | {llm} | {samples} | {on_cpu} | {alloc} | {hot} |".format(
+                name=name,
+                calls=timing.get("calls", "-"),
+                wall=timing.get("wall_ms", "-"),
+                cpu=timing.get("cpu_ms", "-"),
+                llm=timing.get("llm_ms", "-"),
+                samples=node["samples"],
+                on_cpu=node["cpu_samples"] if cpu_column != "-" else "-",
+                alloc=node.get("alloc_net_kb", "-"),
+                hot=f"`{top[0]['function']}` ({top[0]['samples']})" if top else "-",
+            )
+        )
+
+    allocation_nodes = [name for name in order if (nodes.get(name) or {}).get("top_allocations")]
+    if allocation_nodes:
+        lines.extend(["", "## Top allocations per node (tracemalloc, net)", ""])
+        for name in allocation_nodes:
+            lines.extend([f"### {name}", "", "| Location | KB | Blocks |", "| --- | ---: | ---: |"])
+            for item in nodes[name]["top_allocations"]:
+                lines.append(f"| `{item['location']}` | {item['size_kb']} | {item['count']} |")
+            lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def _empty_node_summary() -> dict[str, Any]:
+    return {"samples": 0, "cpu_samples": 0, "top_functions": [], "top_allocations": []}
+
+
+def _on_cpu(entry: _ActiveNode, now: float) -> bool:
+    cpu_now = time.clock_gettime(entry.cpu_clock)  # type: ignore[arg-type]
+    cpu_delta = cpu_now - entry.last_cpu
+    wall_delta = now - entry.last_wall
+    entry.last_cpu = cpu_now
+    entry.last_wall = now
+    return wall_delta > 0 and cpu_delta >= wall_delta * _ON_CPU_SHARE
+
+
+def _thread_cpu_clock() -> int | None:
+    getter = getattr(time, "pthread_getcpuclockid", None)
+    if getter is None:
+        return None
+    try:
+        return getter(threading.get_ident())
+    except (OSError, OverflowError):
+        return None
+
+
+# The tracer's own bookkeeping (RSS reads, timing records) is not node work.
+_EXCLUDED_ALLOCATION_FILES = (
+    tracemalloc.__file__,
+    __file__,
+    os.path.join(os.path.dirname(__file__), "tracing.py"),
+    os.path.join(os.path.dirname(__file__), "memory.py"),
+)
+
+
+def _exclude_profiler(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces(
+        tuple(tracemalloc.Filter(False, filename) for filename in _EXCLUDED_ALLOCATION_FILES)
+    )
+
+
+def _write_folded(path: Path, samples: Counter[tuple[str, ...]]) -> None:
+    lines = [
+        f"{';'.join(_folded_frame(label) for label in stack)} {count}"
+        for stack, count in sorted(samples.items())
+    ]
+    path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+
+
+def _folded_frame(label: str) -> str:
+    # ";" separates frames and the last space separates the count.
+    return label.replace(";", ",")
+
+
+_PATH_PREFIXES = sorted(
+    {os.path.abspath(entry) + os.sep for entry in sys.path if entry and os.path.isdir(entry)},
+    key=len,
+    reverse=True,
+)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix) :]
+    return filename
+
+
+__all__ = [
+    "CPU_FOLDED_FILE_NAME",
+    "FOLDED_FILE_NAME",
+    "RunProfiler",
+    "SUMMARY_FILE_NAME",
+    "render_profile_markdown",
+]
@@ -0,0 +1,311 @@
+"""Per-run tracing of graph nodes, LLM calls and cache lookups.
+
+A :class:`RunTracer` is activated for the duration of one ``run_rob2`` call
+(:func:`trace_run`). Graph nodes are wrapped with :func:`traced_node`, LLM
+calls are observed through the LangChain callback handler returned by
+:meth:`RunTracer.callback_handler`, and the cache manager reports lookups via
+:func:`record_cache_lookup`. Everything is attributed to the node that was
+running on the current thread; outside an active run all hooks are no-ops.
+
+Every measurement is also published to the process-wide metrics in
+:mod:`utils.metrics` (served by the API at ``/metrics``). An optional
+:class:`utils.profiling.RunProfiler` is told about the same node boundaries.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Iterator, TypeVar
+
+from utils import metrics
+from utils.memory import RssWindow, current_rss_mb
+
+if TYPE_CHECKING:
+    from utils.profiling import RunProfiler
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_ACTIVE_TRACER: ContextVar["RunTracer | None"] = ContextVar("rob2_run_tracer", default=None)
+_CURRENT_NODE: ContextVar[str | None] = ContextVar("rob2_trace_node", default=None)
+
+# Work done outside any node (e.g. cache lookups in the runner).
+_UNATTRIBUTED = "(run)"
+
+
+@dataclass(slots=True)
+class NodeTiming:
+    """Accumulated measurements for one graph node within a run."""
+
+    calls: int = 0
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    llm_calls: int = 0
+    llm_ms: float = 0.0
+    llm_errors: int = 0
+    llm_retries: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    rss_delta_mb: float = 0.0
+    peak_rss_growth_mb: float = 0.0
+    peak_rss_mb: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        payload = {field.name: getattr(self, field.name) for field in fields(self)}
+        for key in ("wall_ms", "cpu_ms", "llm_ms", "rss_delta_mb", "peak_rss_growth_mb"):
+            payload[key] = round(payload[key], 1)
+        return payload
+
+
+class RunTracer:
+    """Collects :class:`NodeTiming` per node name (thread-safe)."""
+
+    def __init__(self, profiler: "RunProfiler | None" = None) -> None:
+        self.profiler = profiler
+        self._lock = threading.Lock()
+        self._nodes: dict[str, NodeTiming] = {}
+        self._llm_started: dict[Any, tuple[str, float]] = {}
+        self._started = time.perf_counter()
+        self._rss = RssWindow()
+
+    @contextmanager
+    def node(self, name: str) -> Iterator[None]:
+        """Measure wall/CPU time and memory of the enclosed node execution."""
+        token = _CURRENT_NODE.set(name)
+        if self.profiler is not None:
+            # Frame 2 is the caller of the ``with`` block (contextlib adds one).
+            self.profiler.node_started(name, anchor=sys._getframe(2))
+        rss_before = current_rss_mb()
+        window = RssWindow().open()
+        cpu_started = time.thread_time()
+        wall_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - wall_started) * 1000
+            cpu_ms = (time.thread_time() - cpu_started) * 1000
+            rss_after = current_rss_mb()
+            window.close()
+            _CURRENT_NODE.reset(token)
+            if self.profiler is not None:
+                self.profiler.node_finished()
+            metrics.NODE_DURATION.observe(wall_ms / 1000, node=name)
+            with self._lock:
+                timing = self._timing(name)
+                timing.calls += 1
+                timing.wall_ms += wall_ms
+                timing.cpu_ms += cpu_ms
+                if rss_before is not None and rss_after is not None:
+                    timing.rss_delta_mb += rss_after - rss_before
+                # Peaks are per execution, so repeated calls keep the largest.
+                if window.growth_mb is not None:
+                    timing.peak_rss_growth_mb = max(timing.peak_rss_growth_mb, window.growth_mb)
+                if window.peak_mb is not None:
+                    timing.peak_rss_mb = max(timing.peak_rss_mb or 0.0, window.peak_mb)
+
+    def llm_started(self, run_id: Any) -> None:
+        with self._lock:
+            self._llm_started[run_id] = (_current_node(), time.perf_counter())
+
+    def llm_finished(
+        self,
+        run_id: Any,
+        *,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        error: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            node, started = self._llm_started.pop(run_id, (_current_node(), None))
+            timing = self._timing(node)
+            timing.llm_calls += 1
+            if started is not None:
+                timing.llm_ms += (time.perf_counter() - started) * 1000
+            timing.input_tokens += input_tokens
+            timing.output_tokens += output_tokens
+            if error is not None:
+                timing.llm_errors += 1
+        metrics.LLM_CALLS.inc(node=node)
+        if input_tokens:
+            metrics.LLM_TOKENS.inc(input_tokens, node=node, direction="input")
+        if output_tokens:
+            metrics.LLM_TOKENS.inc(output_tokens, node=node, direction="output")
+        if error is not None:
+            metrics.LLM_ERRORS.inc(node=node)
+            if _is_rate_limited(error):
+                metrics.LLM_RATE_LIMITED.inc(node=node)
+
+    def llm_retry(self) -> None:
+        with self._lock:
+            self._timing(_current_node()).llm_retries += 1
+
+    def cache_lookup(self, *, hit: bool) -> None:
+        with self._lock:
+            timing = self._timing(_current_node())
+            if hit:
+                timing.cache_hits += 1
+            else:
+                timing.cache_misses += 1
+
+    def callback_handler(self) -> Any:
+        """Return a LangChain callback handler feeding this tracer."""
+        return _build_callback_handler(self)
+
+    def summary(self) -> dict[str, Any]:
+        """Return ``{"nodes": {...}, "totals": {...}}`` in node execution order."""
+        with self._lock:
+            nodes = {name: timing.as_dict() for name, timing in self._nodes.items()}
+        totals: dict[str, Any] = {
+            key: sum(node[key] for node in nodes.values())
+            for key in (
+                "wall_ms",
+                "cpu_ms",
+                "llm_calls",
+                "llm_ms",
+                "llm_errors",
+                "llm_retries",
+                "input_tokens",
+                "output_tokens",
+                "cache_hits",
+                "cache_misses",
+            )
+        }
+        for key in ("wall_ms", "cpu_ms", "llm_ms"):
+            totals[key] = round(totals[key], 1)
+        totals["elapsed_ms"] = round((time.perf_counter() - self._started) * 1000, 1)
+        totals["peak_rss_mb"] = self._rss.peak_mb
+        return {"nodes": nodes, "totals": totals}
+
+    def _timing(self, name: str) -> NodeTiming:
+        timing = self._nodes.get(name)
+        if timing is None:
+            timing = self._nodes[name] = NodeTiming()
+        return timing
+
+
+@contextmanager
+def trace_run(profiler: "RunProfiler | None" = None) -> Iterator[RunTracer]:
+    """Activate a fresh :class:`RunTracer` for the enclosed run.
+
+    When ``profiler`` is given it samples for the duration of the run.
+    """
+    tracer = RunTracer(profiler)
+    tracer._rss.open()
+    token = _ACTIVE_TRACER.set(tracer)
+    metrics.RUNS_IN_FLIGHT.inc()
+    if profiler is not None:
+        profiler.start()
+    status = "failed"
+    try:
+        yield tracer
+        status = "success"
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        tracer._rss.close()
+        _ACTIVE_TRACER.reset(token)
+        metrics.RUNS_IN_FLIGHT.dec()
+        metrics.RUNS_TOTAL.inc(status=status)
+        metrics.RUN_DURATION.observe(time.perf_counter() - tracer._started)
+
+
+def active_tracer() -> RunTracer | None:
+    return _ACTIVE_TRACER.get()
+
+
+def traced_node(name: str, fn: F) -> F:
+    """Wrap a graph node so each execution is recorded under ``name``."""
+
+    @wraps(fn)
+    def wrapper(state: Any) -> Any:
+        tracer = _ACTIVE_TRACER.get()
+        if tracer is None:
+            return fn(state)
+        with tracer.node(name):
+            return fn(state)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def record_cache_lookup(*, stage: str, hit: bool) -> None:
+    metrics.CACHE_LOOKUPS.inc(stage=stage, result="hit" if hit else "miss")
+    tracer = _ACTIVE_TRACER.get()
+    if tracer is not None:
+        tracer.cache_lookup(hit=hit)
+
+
+def _current_node() -> str:
+    return _CURRENT_NODE.get() or _UNATTRIBUTED
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "too many requests" in text
+
+
+def _usage_from_result(response: Any) -> tuple[int, int]:
+    """Extract (input, output) token counts from a LangChain ``LLMResult``."""
+    input_tokens = output_tokens = 0
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += int(usage.get("input_tokens") or 0)
+                output_tokens += int(usage.get("output_tokens") or 0)
+    if input_tokens or output_tokens:
+        return input_tokens, output_tokens
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if isinstance(usage, dict):
+        input_tokens = int(usage.get("prompt_tokens") or usage.get("input_tokens") or 0)
+        output_tokens = int(
+            usage.get("completion_tokens") or usage.get("output_tokens") or 0
+        )
+    return input_tokens, output_tokens
+
+
+def _build_callback_handler(tracer: RunTracer) -> Any:
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _TracingCallbackHandler(BaseCallbackHandler):
+        # Handle events on the calling thread so the current node is visible.
+        run_inline = True
+
+        def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: Any, **kwargs: Any) -> None:
+            tracer.llm_started(run_id)
+
+        def on_chat_model_start(
+            self, serialized: Any, messages: Any, *, run_id: Any, **kwargs: Any
+        ) -> None:
+            tracer.llm_started(run_id)
+
+        def on_llm_end(self, response: Any, *, run_id: Any, **kwargs: Any) -> None:
+            input_tokens, output_tokens = _usage_from_result(response)
+            tracer.llm_finished(run_id, input_tokens=input_tokens, output_tokens=output_tokens)
+
+        def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+            tracer.llm_finished(run_id, error=error)
+
+        def on_retry(self, retry_state: Any, *, run_id: Any, **kwargs: Any) -> None:
+            tracer.llm_retry()
+
+    return _TracingCallbackHandler()
+
+
+__all__ = [
+    "NodeTiming",
+    "RunTracer",
+    "active_tracer",
+    "record_cache_lookup",
+    "trace_run",
+    "traced_node",
+]
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+from api.actions import metrics as metrics_action
+from api.main import app
+from utils.tracing import trace_run, traced_node
+
+client = TestClient(app)
+
+
+def test_metrics_exposes_pipeline_instrumentation():
+    with trace_run():
+        traced_node("planner", lambda state: {})({})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE rob2_node_duration_seconds histogram" in body
+    assert 'rob2_node_duration_seconds_count{node="planner"}' in body
+    assert 'rob2_runs_total{status="success"}' in body
+    assert "rob2_runs_in_flight 0" in body
+    assert 'rob2_model_warm{model="splade"}' in body
+
+
+def test_ready_reports_models_and_required_warmup(monkeypatch):
+    monkeypatch.setattr(
+        metrics_action,
+        "model_status",
+        lambda: {"docling": True, "splade": False, "cross_encoder": False},
+    )
+    monkeypatch.setattr(metrics_action, "_warmup_required", ())
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["models"]["docling"] == {
+        "warm": True,
+        "required": False,
+        "error": None,
+    }
+
+    monkeypatch.setattr(metrics_action, "_warmup_required", ("docling", "splade"))
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
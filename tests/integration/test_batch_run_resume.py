@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import json
-from concurrent.futures import Future
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from types import SimpleNamespace
+from typing import Any
 
+import pytest
 import typer
 from typer.testing import CliRunner
 
@@ -79,6 +82,12 @@ def test_batch_run_resumes_failed_items(tmp_path: Path, monkeypatch) -> None:
             retry_429_max=0,
             retry_429_backoff_ms=1,
             prefetch=1,
+            inference_server=False,
+            schedule=None,
+            distributed=False,
+            profile_every=None,
+            profile_interval_ms=5.0,
+            llm_mode="realtime",
         )
     except typer.Exit as exc:
         assert exc.exit_code == 1
@@ -123,6 +132,12 @@ def test_batch_run_resumes_failed_items(tmp_path: Path, monkeypatch) -> None:
         retry_429_max=0,
         retry_429_backoff_ms=1,
         prefetch=1,
+        inference_server=False,
+        schedule=None,
+        distributed=False,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
     )
 
     summary_2 = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
@@ -194,6 +209,12 @@ def test_batch_run_no_plot_does_not_generate_png(tmp_path: Path, monkeypatch) ->
         retry_429_max=0,
         retry_429_backoff_ms=1,
         prefetch=1,
+        inference_server=False,
+        schedule=None,
+        distributed=False,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
     )
 
     assert not (output_dir / "batch_traffic_light.png").exists()
@@ -231,8 +252,24 @@ def test_batch_run_defaults_enable_all_report_formats(
             encoding="utf-8",
         )
 
+    rendered: list[dict] = []
+
+    class FakeRenderExecutor:
+        def __init__(self, *, max_workers: int):
+            self.max_workers = max_workers
+
+        def submit(self, fn, result_dir, **kwargs):
+            rendered.append({"result_dir": result_dir, **kwargs})
+            future = Future()
+            future.set_result(None)
+            return future
+
+        def shutdown(self, wait: bool = True):
+            return None
+
     monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
     monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+    monkeypatch.setattr(batch_command, "_RENDER_POOL_EXECUTOR", FakeRenderExecutor)
 
     runner = CliRunner()
     result = runner.invoke(
@@ -253,9 +290,89 @@ def test_batch_run_defaults_enable_all_report_formats(
 
     assert captured_kwargs is not None
     assert captured_kwargs["include_table"] is True
-    assert captured_kwargs["html"] is True
-    assert captured_kwargs["docx"] is True
-    assert captured_kwargs["pdf"] is True
+    # Reports are rendered by the deferred render queue, not by the worker.
+    assert captured_kwargs["html"] is False
+    assert len(rendered) == 1
+    assert rendered[0]["result_dir"] == (output_dir / "one").resolve()
+    assert rendered[0]["html"] is True
+    assert rendered[0]["docx"] is True
+    assert rendered[0]["pdf"] is True
+    assert rendered[0]["pdf_name"] == "one.pdf"
+
+
+def test_batch_run_resume_renders_reports_left_pending(tmp_path: Path, monkeypatch) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    (input_dir / "one.pdf").write_bytes(b"%PDF-1.4")
+    output_dir = tmp_path / "out"
+    calls: list[str] = []
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        calls.append(Path(str(input_data.pdf_path)).name)
+        domain = SimpleNamespace(domain="D1", risk="low")
+        overall = SimpleNamespace(risk="low")
+        return SimpleNamespace(
+            run_id="run_one",
+            runtime_ms=42,
+            result=SimpleNamespace(overall=overall, domains=[domain]),
+        )
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    mode = {"crash": True}
+    rendered: list[Path] = []
+
+    class FakeRenderExecutor:
+        def __init__(self, *, max_workers: int):
+            self.max_workers = max_workers
+
+        def submit(self, fn, result_dir, **kwargs):
+            if mode["crash"]:
+                raise RuntimeError("killed before rendering")
+            rendered.append(result_dir)
+            future = Future()
+            future.set_result(None)
+            return future
+
+        def shutdown(self, wait: bool = True):
+            return None
+
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+    monkeypatch.setattr(batch_command, "_RENDER_POOL_EXECUTOR", FakeRenderExecutor)
+
+    args = [
+        "run",
+        str(input_dir),
+        "--output-dir",
+        str(output_dir),
+        "--no-persist",
+        "--no-plot",
+        "--no-excel",
+        "--workers",
+        "1",
+    ]
+    runner = CliRunner()
+    first = runner.invoke(batch_command.app, args)
+    assert first.exit_code != 0
+
+    checkpoint_path = output_dir / "batch_checkpoint.json"
+    item = json.loads(checkpoint_path.read_text(encoding="utf-8"))["items"][0]
+    assert item["status"] == "success"
+    assert item["report_pending"] is True
+    assert rendered == []
+
+    mode["crash"] = False
+    second = runner.invoke(batch_command.app, args)
+    assert second.exit_code == 0
+
+    assert calls == ["one.pdf"]
+    assert rendered == [output_dir.resolve() / "one"]
+    item = json.loads(checkpoint_path.read_text(encoding="utf-8"))["items"][0]
+    assert item["status"] == "skipped"
+    assert "report_pending" not in item
 
 
 def test_batch_run_reuses_fixed_outputs_by_pdf_hash(tmp_path: Path, monkeypatch) -> None:
@@ -375,6 +492,12 @@ def test_batch_run_reuses_fixed_outputs_by_pdf_hash(tmp_path: Path, monkeypatch)
         retry_429_max=0,
         retry_429_backoff_ms=1,
         prefetch=1,
+        inference_server=False,
+        schedule=None,
+        distributed=False,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
     )
 
     assert calls == ["two.pdf"]
@@ -481,6 +604,12 @@ def test_batch_run_does_not_reuse_without_batch_meta(tmp_path: Path, monkeypatch
         retry_429_max=0,
         retry_429_backoff_ms=1,
         prefetch=1,
+        inference_server=False,
+        schedule=None,
+        distributed=False,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
     )
 
     assert calls == ["one.pdf"]
@@ -579,9 +708,764 @@ def test_batch_run_parallel_with_fake_pool(tmp_path: Path, monkeypatch) -> None:
         retry_429_max=0,
         retry_429_backoff_ms=1,
         prefetch=6,
+        inference_server=False,
+        schedule=None,
+        distributed=False,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
     )
 
     assert pool_inits == [3]
     assert sorted(calls) == ["one.pdf", "three.pdf", "two.pdf"]
     summary = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
     assert summary["counts"]["success"] == 3
+
+
+def test_batch_run_deduplicates_identical_pdfs_within_batch(
+    tmp_path: Path, monkeypatch
+) -> None:
+    input_dir = tmp_path / "pdfs"
+    (input_dir / "mirror").mkdir(parents=True)
+    (input_dir / "one.pdf").write_bytes(b"%PDF-1.4\nsame")
+    (input_dir / "mirror" / "one_copy.pdf").write_bytes(b"%PDF-1.4\nsame")
+    (input_dir / "two.pdf").write_bytes(b"%PDF-1.4\ntwo")
+
+    output_dir = tmp_path / "out"
+    calls: list[str] = []
+
+    class FakeProcessPoolExecutor:
+        def __init__(self, *, max_workers: int):
+            self.max_workers = max_workers
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return None
+
+        def submit(self, fn, *args, **kwargs):
+            future = Future()
+            future.set_result(fn(*args, **kwargs))
+            return future
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        calls.append(name)
+        domain = SimpleNamespace(domain="D1", risk="low")
+        overall = SimpleNamespace(risk="low")
+        result_payload = SimpleNamespace(overall=overall, domains=[domain])
+        return SimpleNamespace(run_id=f"run_{name}", runtime_ms=50, result=result_payload)
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(
+            json.dumps(
+                {
+                    "run_id": result.run_id,
+                    "runtime_ms": result.runtime_ms,
+                    "result": {
+                        "overall": {"risk": result.result.overall.risk},
+                        "domains": [{"domain": "D1", "risk": "low"}],
+                    },
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+
+    monkeypatch.setattr(batch_command, "_PROCESS_POOL_EXECUTOR", FakeProcessPoolExecutor)
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+
+    batch_command.run_batch(
+        input_dir=input_dir,
+        output_dir=output_dir,
+        options=None,
+        options_file=None,
+        set_values=None,
+        batch_id=None,
+        batch_name=None,
+        json_out=False,
+        table=True,
+        html=False,
+        docx=False,
+        pdf=False,
+        reset=False,
+        persist=False,
+        persist_dir=None,
+        persist_scope=None,
+        cache_dir=None,
+        cache_scope=None,
+        plot=False,
+        plot_output=None,
+        excel=False,
+        excel_output=None,
+        workers=3,
+        max_inflight_llm=3,
+        rate_limit_mode="fixed",
+        rate_limit_init=3,
+        rate_limit_max=3,
+        retry_429_max=0,
+        retry_429_backoff_ms=1,
+        prefetch=6,
+        inference_server=False,
+        schedule=None,
+        distributed=False,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
+    )
+
+    assert len(calls) == 2
+    assert "two.pdf" in calls
+    summary = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
+    assert summary["counts"]["success"] == 2
+    assert summary["counts"]["skipped"] == 1
+
+
+def test_batch_run_distributed_drains_shared_queue(tmp_path: Path, monkeypatch) -> None:
+    input_dir = tmp_path / "pdfs"
+    (input_dir / "mirror").mkdir(parents=True)
+    (input_dir / "one.pdf").write_bytes(b"%PDF-1.4\nsame")
+    (input_dir / "mirror" / "one_copy.pdf").write_bytes(b"%PDF-1.4\nsame")
+    (input_dir / "two.pdf").write_bytes(b"%PDF-1.4\ntwo")
+
+    output_dir = tmp_path / "out"
+    calls: list[str] = []
+    summary_writes: list[int] = []
+    writes_seen: list[int] = []
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        calls.append(name)
+        writes_seen.append(len(summary_writes))
+        domain = SimpleNamespace(domain="D1", risk="low")
+        overall = SimpleNamespace(risk="low")
+        result_payload = SimpleNamespace(overall=overall, domains=[domain])
+        return SimpleNamespace(run_id=f"run_{name}", runtime_ms=50, result=result_payload)
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(
+            json.dumps(
+                {
+                    "run_id": result.run_id,
+                    "runtime_ms": result.runtime_ms,
+                    "result": {
+                        "overall": {"risk": result.result.overall.risk},
+                        "domains": [{"domain": "D1", "risk": "low"}],
+                    },
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+    write_summary_files = batch_command._write_summary_files
+
+    def counting_write_summary_files(checkpoint, output_dir):
+        summary_writes.append(len(checkpoint["items"]))
+        return write_summary_files(checkpoint, output_dir)
+
+    monkeypatch.setattr(batch_command, "_write_summary_files", counting_write_summary_files)
+
+    batch_command.run_batch(
+        input_dir=input_dir,
+        output_dir=output_dir,
+        options=None,
+        options_file=None,
+        set_values=None,
+        batch_id=None,
+        batch_name=None,
+        json_out=False,
+        table=True,
+        html=False,
+        docx=False,
+        pdf=False,
+        reset=False,
+        persist=False,
+        persist_dir=None,
+        persist_scope=None,
+        cache_dir=None,
+        cache_scope=None,
+        plot=False,
+        plot_output=None,
+        excel=True,
+        excel_output=None,
+        workers=1,
+        max_inflight_llm=1,
+        rate_limit_mode="fixed",
+        rate_limit_init=1,
+        rate_limit_max=1,
+        retry_429_max=0,
+        retry_429_backoff_ms=1,
+        prefetch=1,
+        inference_server=False,
+        schedule=None,
+        distributed=True,
+        profile_every=None,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
+    )
+
+    assert sorted(calls) == ["one_copy.pdf", "two.pdf"]
+    queue = batch_command.BatchWorkQueue(output_dir / "batch_queue.sqlite")
+    assert queue.counts()["success"] == 3
+    summary = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
+    assert summary["counts"]["success"] == 2
+    assert summary["counts"]["skipped"] == 1
+    assert (output_dir / "batch_summary.xlsx").exists()
+    checkpoint = json.loads((output_dir / "batch_checkpoint.json").read_text(encoding="utf-8"))
+    assert checkpoint["runtime_meta"]["completed_items"] == 3
+    # Summaries are rewritten when the queue drains, not after every item.
+    assert writes_seen[0] == writes_seen[-1]
+    assert summary_writes
+
+    result = CliRunner().invoke(batch_command.app, ["worker", str(output_dir)])
+    assert result.exit_code == 0, result.output
+    assert "processed=0" in result.output
+    assert len(calls) == 2
+
+
+def test_batch_run_recycles_worker_pool_and_records_peak_rss(
+    tmp_path: Path, monkeypatch
+) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    for name in ("a", "b", "c"):
+        (input_dir / f"{name}.pdf").write_bytes(f"%PDF-1.4\n{name}".encode())
+    output_dir = tmp_path / "out"
+    pools: list[dict[str, Any]] = []
+
+    class FakeProcessPoolExecutor:
+        def __init__(self, **kwargs: Any):
+            pools.append(kwargs)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return None
+
+        def submit(self, fn, *args, **kwargs):
+            future = Future()
+            future.set_result(fn(*args, **kwargs))
+            return future
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        domain = SimpleNamespace(domain="D1", risk="low")
+        result_payload = SimpleNamespace(overall=SimpleNamespace(risk="low"), domains=[domain])
+        return SimpleNamespace(run_id=f"run_{name}", runtime_ms=5, result=result_payload)
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    monkeypatch.setenv("BATCH_WORKER_MAX_TASKS", "1")
+    monkeypatch.setenv("BATCH_WORKER_MAX_RSS_MB", "1")
+    batch_command.get_settings.cache_clear()
+    monkeypatch.setattr(batch_command, "_PROCESS_POOL_EXECUTOR", FakeProcessPoolExecutor)
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+
+    try:
+        batch_command.run_batch(
+            input_dir=input_dir,
+            output_dir=output_dir,
+            options=None,
+            options_file=None,
+            set_values=None,
+            batch_id=None,
+            batch_name=None,
+            json_out=False,
+            table=True,
+            html=False,
+            docx=False,
+            pdf=False,
+            reset=False,
+            persist=False,
+            persist_dir=None,
+            persist_scope=None,
+            cache_dir=None,
+            cache_scope=None,
+            plot=False,
+            plot_output=None,
+            excel=False,
+            excel_output=None,
+            workers=2,
+            max_inflight_llm=2,
+            rate_limit_mode="fixed",
+            rate_limit_init=2,
+            rate_limit_max=2,
+            retry_429_max=0,
+            retry_429_backoff_ms=1,
+            prefetch=2,
+            inference_server=False,
+            schedule=None,
+            distributed=False,
+            profile_every=None,
+            profile_interval_ms=5.0,
+            llm_mode="realtime",
+        )
+    finally:
+        batch_command.get_settings.cache_clear()
+
+    # The task limit goes to the executor; only the RSS limit drains the pool.
+    assert pools == [{"max_workers": 2, "max_tasks_per_child": 1}] * 2
+    checkpoint = json.loads((output_dir / "batch_checkpoint.json").read_text(encoding="utf-8"))
+    meta = checkpoint["runtime_meta"]
+    assert meta["worker_recycles"] == 2
+    assert set(meta["item_peak_rss_mb"]) == {"a.pdf", "b.pdf", "c.pdf"}
+    assert all(item["peak_rss_mb"] > 0 for item in checkpoint["items"])
+
+
+def test_batch_run_task_limit_keeps_other_workers_busy(tmp_path: Path, monkeypatch) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    for name in ("a", "b", "c", "d"):
+        (input_dir / f"{name}.pdf").write_bytes(f"%PDF-1.4\n{name}".encode())
+    output_dir = tmp_path / "out"
+    pools: list[dict[str, Any]] = []
+    finished: list[str] = []
+    fast_done = threading.Event()
+
+    class FakeProcessPoolExecutor(ThreadPoolExecutor):
+        def __init__(self, *, max_workers: int, **kwargs: Any):
+            pools.append(kwargs)
+            super().__init__(max_workers=max_workers)
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        if name == "a.pdf":
+            # The slow paper must not hold back the rest of the pool.
+            assert fast_done.wait(timeout=5)
+        finished.append(name)
+        if len(finished) == 3:
+            fast_done.set()
+        domain = SimpleNamespace(domain="D1", risk="low")
+        result_payload = SimpleNamespace(overall=SimpleNamespace(risk="low"), domains=[domain])
+        return SimpleNamespace(run_id=f"run_{name}", runtime_ms=5, timings=None, result=result_payload)
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    monkeypatch.setenv("BATCH_WORKER_MAX_TASKS", "1")
+    batch_command.get_settings.cache_clear()
+    monkeypatch.setattr(batch_command, "_PROCESS_POOL_EXECUTOR", FakeProcessPoolExecutor)
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+
+    try:
+        batch_command.run_batch(
+            input_dir=input_dir,
+            output_dir=output_dir,
+            options=None,
+            options_file=None,
+            set_values=None,
+            batch_id=None,
+            batch_name=None,
+            json_out=False,
+            table=True,
+            html=False,
+            docx=False,
+            pdf=False,
+            reset=False,
+            persist=False,
+            persist_dir=None,
+            persist_scope=None,
+            cache_dir=None,
+            cache_scope=None,
+            plot=False,
+            plot_output=None,
+            excel=False,
+            excel_output=None,
+            workers=2,
+            max_inflight_llm=2,
+            rate_limit_mode="fixed",
+            rate_limit_init=2,
+            rate_limit_max=2,
+            retry_429_max=0,
+            retry_429_backoff_ms=1,
+            prefetch=2,
+            inference_server=False,
+            schedule="fifo",
+            distributed=False,
+            profile_every=None,
+            profile_interval_ms=5.0,
+            llm_mode="realtime",
+        )
+    finally:
+        batch_command.get_settings.cache_clear()
+
+    assert pools == [{"max_tasks_per_child": 1}]
+    assert finished == ["b.pdf", "c.pdf", "d.pdf", "a.pdf"]
+    checkpoint = json.loads((output_dir / "batch_checkpoint.json").read_text(encoding="utf-8"))
+    assert "worker_recycles" not in checkpoint["runtime_meta"]
+    assert all(item["status"] == "success" for item in checkpoint["items"])
+
+
+def test_batch_watch_picks_up_new_files_incrementally(tmp_path: Path, monkeypatch) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    (input_dir / "one.pdf").write_bytes(b"%PDF-1.4\none")
+    output_dir = tmp_path / "out"
+    calls: list[str] = []
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        calls.append(name)
+        if name == "one.pdf":
+            # A new paper arrives while the daemon is busy.
+            (input_dir / "two.pdf").write_bytes(b"%PDF-1.4\ntwo")
+        domain = SimpleNamespace(domain="D1", risk="low")
+        result_payload = SimpleNamespace(overall=SimpleNamespace(risk="low"), domains=[domain])
+        return SimpleNamespace(run_id=f"run_{name}", runtime_ms=5, result=result_payload)
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    hashed: list[str] = []
+    original_build_file_entries = batch_command._build_file_entries
+
+    def counting_build_file_entries(input_dir_arg, pdf_files, **kwargs):
+        hashed.extend(path.name for path in pdf_files)
+        return original_build_file_entries(input_dir_arg, pdf_files, **kwargs)
+
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+    monkeypatch.setattr(batch_command, "_build_file_entries", counting_build_file_entries)
+
+    watch_kwargs = dict(
+        input_dir=input_dir,
+        output_dir=output_dir,
+        options=None,
+        options_file=None,
+        set_values=None,
+        batch_id=None,
+        table=True,
+        html=False,
+        docx=False,
+        pdf=False,
+        persist=False,
+        persist_dir=None,
+        persist_scope=None,
+        cache_dir=None,
+        cache_scope=None,
+        workers=1,
+        schedule=None,
+        poll_interval=0.01,
+        summary_interval=0.0,
+        idle_exit=0.3,
+        plot=False,
+        excel=False,
+    )
+    batch_command.watch_batch(**watch_kwargs)
+
+    assert calls == ["one.pdf", "two.pdf"]
+    assert hashed == ["one.pdf", "two.pdf"]
+    summary = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
+    assert summary["counts"]["success"] == 2
+
+    # Restart: unchanged files are neither re-hashed nor re-run; edits are.
+    (input_dir / "two.pdf").write_bytes(b"%PDF-1.4\ntwo v2")
+    batch_command.watch_batch(**watch_kwargs)
+    assert calls == ["one.pdf", "two.pdf", "two.pdf"]
+    assert hashed == ["one.pdf", "two.pdf", "two.pdf"]
+
+
+def test_batch_watch_streams_new_files_into_running_pool(
+    tmp_path: Path, monkeypatch
+) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    (input_dir / "slow.pdf").write_bytes(b"%PDF-1.4\nslow")
+    output_dir = tmp_path / "out"
+    finished: list[str] = []
+    late_done = threading.Event()
+
+    class FakeProcessPoolExecutor(ThreadPoolExecutor):
+        def __init__(self, *, max_workers: int, **_kwargs: Any):
+            super().__init__(max_workers=max_workers)
+
+    def fake_run_rob2(input_data, *_args, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        if name == "slow.pdf":
+            # A paper arriving mid-run must start on the idle slot right away,
+            # not after this straggler finishes.
+            (input_dir / "late.pdf").write_bytes(b"%PDF-1.4\nlate")
+            assert late_done.wait(timeout=5)
+        finished.append(name)
+        if name == "late.pdf":
+            late_done.set()
+        domain = SimpleNamespace(domain="D1", risk="low")
+        result_payload = SimpleNamespace(overall=SimpleNamespace(risk="low"), domains=[domain])
+        return SimpleNamespace(run_id=f"run_{name}", runtime_ms=5, timings=None, result=result_payload)
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    monkeypatch.setattr(batch_command, "_PROCESS_POOL_EXECUTOR", FakeProcessPoolExecutor)
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+
+    batch_command.watch_batch(
+        input_dir=input_dir,
+        output_dir=output_dir,
+        options=None,
+        options_file=None,
+        set_values=None,
+        batch_id=None,
+        table=True,
+        html=False,
+        docx=False,
+        pdf=False,
+        persist=False,
+        persist_dir=None,
+        persist_scope=None,
+        cache_dir=None,
+        cache_scope=None,
+        workers=2,
+        schedule=None,
+        poll_interval=0.01,
+        summary_interval=0.0,
+        idle_exit=0.3,
+        plot=False,
+        excel=False,
+    )
+
+    assert finished == ["late.pdf", "slow.pdf"]
+    summary = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
+    assert summary["counts"]["success"] == 2
+
+
+def test_batch_run_profiles_every_nth_item(tmp_path: Path, monkeypatch) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (input_dir / name).write_bytes(f"%PDF-1.4 {name}".encode())
+    output_dir = tmp_path / "out"
+    profiled: dict[str, bool] = {}
+
+    def fake_run_rob2(input_data, *_args, profiler=None, **_kwargs):
+        name = Path(str(input_data.pdf_path)).name
+        profiled[name] = profiler is not None
+        return SimpleNamespace(
+            run_id=f"run_{name}",
+            runtime_ms=42,
+            timings=None,
+            result=SimpleNamespace(overall=SimpleNamespace(risk="low"), domains=[]),
+        )
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+
+    batch_command.run_batch(
+        input_dir=input_dir,
+        output_dir=output_dir,
+        options=None,
+        options_file=None,
+        set_values=None,
+        batch_id=None,
+        batch_name=None,
+        json_out=False,
+        table=True,
+        html=False,
+        docx=False,
+        pdf=False,
+        reset=False,
+        persist=False,
+        persist_dir=None,
+        persist_scope=None,
+        cache_dir=None,
+        cache_scope=None,
+        plot=False,
+        plot_output=None,
+        excel=False,
+        excel_output=None,
+        workers=1,
+        max_inflight_llm=1,
+        rate_limit_mode="fixed",
+        rate_limit_init=1,
+        rate_limit_max=1,
+        retry_429_max=0,
+        retry_429_backoff_ms=1,
+        prefetch=1,
+        inference_server=False,
+        schedule="fifo",
+        distributed=False,
+        profile_every=2,
+        profile_interval_ms=5.0,
+        llm_mode="realtime",
+    )
+
+    assert profiled == {"a.pdf": True, "b.pdf": False, "c.pdf": True}
+    assert (output_dir / "a" / "profile.md").exists()
+    assert (output_dir / "a" / "profile.folded").exists()
+    assert not (output_dir / "b" / "profile.md").exists()
+
+
+def test_batch_run_provider_batch_mode_answers_stage_by_stage(
+    tmp_path: Path, monkeypatch
+) -> None:
+    from utils.llm_cassette import (
+        Cassette,
+        LLMBatchPending,
+        LLMRequestPending,
+        cassette_path,
+        init_chat_model,
+        use_cassette,
+    )
+
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    (input_dir / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    (input_dir / "b.pdf").write_bytes(b"%PDF-1.4 b")
+    (input_dir / "copy_of_a.pdf").write_bytes(b"%PDF-1.4 a")
+    output_dir = tmp_path / "out"
+    calls: list[str] = []
+
+    def fake_run_rob2(input_data, options, *, doc_hash, **_kwargs):
+        # Two LLM stages, each stopping the run until its answer is in the cassette.
+        name = Path(str(input_data.pdf_path)).name
+        calls.append(name)
+        assert options["llm_cassette_mode"] == "collect"
+        cassette = Cassette(
+            cassette_path(options["llm_cassette_dir"], doc_hash), mode="collect"
+        )
+        with use_cassette(cassette):
+            model = init_chat_model("openai:gpt-4o-mini", temperature=0)
+            try:
+                plan = model.invoke(
+                    json.dumps({"questions": [{"question_id": "q1", "keyword_hints": [doc_hash]}]})
+                )
+                answer = model.invoke(
+                    json.dumps({"domain_questions": [{"question_id": "q1"}], "evidence": {}})
+                )
+            except LLMRequestPending:
+                raise LLMBatchPending(cassette.pending)
+        assert json.loads(plan.content)["query_plan"] == {"q1": [doc_hash]}
+        assert "answers" in json.loads(answer.content)
+        return SimpleNamespace(
+            run_id=f"run_{name}",
+            runtime_ms=42,
+            timings=None,
+            result=SimpleNamespace(overall=SimpleNamespace(risk="low"), domains=[]),
+        )
+
+    def fake_write_run_output_dir(result, path, **_kwargs):
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "result.json").write_text(json.dumps({"run_id": result.run_id}), encoding="utf-8")
+
+    monkeypatch.setenv("LLM_BATCH_BACKEND", "local")
+    batch_command.get_settings.cache_clear()
+    monkeypatch.setattr(batch_command, "run_rob2", fake_run_rob2)
+    monkeypatch.setattr(batch_command, "write_run_output_dir", fake_write_run_output_dir)
+
+    try:
+        batch_command.run_batch(
+            input_dir=input_dir,
+            output_dir=output_dir,
+            options=None,
+            options_file=None,
+            set_values=None,
+            batch_id=None,
+            batch_name=None,
+            json_out=False,
+            table=True,
+            html=False,
+            docx=False,
+            pdf=False,
+            reset=False,
+            persist=False,
+            persist_dir=None,
+            persist_scope=None,
+            cache_dir=None,
+            cache_scope=None,
+            plot=False,
+            plot_output=None,
+            excel=False,
+            excel_output=None,
+            workers=1,
+            max_inflight_llm=1,
+            rate_limit_mode="fixed",
+            rate_limit_init=1,
+            rate_limit_max=1,
+            retry_429_max=0,
+            retry_429_backoff_ms=1,
+            prefetch=1,
+            inference_server=False,
+            schedule="fifo",
+            distributed=False,
+            profile_every=None,
+            profile_interval_ms=5.0,
+            llm_mode="provider-batch",
+        )
+    finally:
+        batch_command.get_settings.cache_clear()
+
+    # Round 1 stages the plans, round 2 the domain answers, round 3 completes.
+    # The duplicate PDF waits for a.pdf and then runs on the shared cassette.
+    assert calls == ["a.pdf", "b.pdf", "a.pdf", "b.pdf", "a.pdf", "copy_of_a.pdf", "b.pdf"]
+    summary = json.loads((output_dir / "batch_summary.json").read_text(encoding="utf-8"))
+    assert summary["counts"]["success"] == 3
+    assert summary["runtime_meta"]["llm_mode"] == "provider-batch"
+    assert summary["runtime_meta"]["llm_batch_rounds"] == 2
+    assert summary["runtime_meta"]["llm_batch_requests"] == 4
+    assert not (output_dir / "llm_batch" / "submissions.json").exists()
+
+
+def test_batch_run_provider_batch_mode_requires_stage_cache(tmp_path: Path) -> None:
+    input_dir = tmp_path / "pdfs"
+    input_dir.mkdir()
+    (input_dir / "one.pdf").write_bytes(b"%PDF-1.4\none")
+
+    with pytest.raises(typer.BadParameter, match="阶段缓存"):
+        batch_command.run_batch(
+            input_dir=input_dir,
+            output_dir=tmp_path / "out",
+            options=None,
+            options_file=None,
+            set_values=None,
+            batch_id=None,
+            batch_name=None,
+            json_out=False,
+            table=True,
+            html=False,
+            docx=False,
+            pdf=False,
+            reset=False,
+            persist=False,
+            persist_dir=None,
+            persist_scope=None,
+            cache_dir=None,
+            cache_scope="none",
+            plot=False,
+            plot_output=None,
+            excel=False,
+            excel_output=None,
+            workers=1,
+            max_inflight_llm=1,
+            rate_limit_mode="fixed",
+            rate_limit_init=1,
+            rate_limit_max=1,
+            retry_429_max=0,
+            retry_429_backoff_ms=1,
+            prefetch=1,
+            inference_server=False,
+            schedule=None,
+            distributed=False,
+            profile_every=None,
+            profile_interval_ms=5.0,
+            llm_mode="provider-batch",
+        )
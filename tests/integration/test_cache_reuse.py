@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 
 import numpy as np
 
 from persistence.cache import CacheManager
+from persistence.hashing import sha256_bytes
+from persistence.models import CacheEntry
 from persistence.sqlite_store import SqliteStore
 from pipelines.graphs.nodes.preprocess import preprocess_node
-from pipelines.graphs.nodes.locators import retrieval_splade
+from pipelines.graphs.nodes.locators import retrieval_bm25, retrieval_splade
+from retrieval.engines.bm25 import BM25Index, build_bm25_index
 from schemas.internal.documents import DocStructure, SectionSpan
 from schemas.internal.rob2 import QuestionSet, Rob2Question
 
@@ -114,3 +122,191 @@ def test_splade_cache_reuse(tmp_path: Path, monkeypatch) -> None:
     retrieval_splade.splade_retrieval_locator_node(state)
 
     assert doc_call_count["n"] == 1
+
+
+def test_cache_binary_formats_and_legacy_json(tmp_path: Path) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    cache = CacheManager(tmp_path, store, scope="deterministic")
+
+    payload = {"doc_structure": {"body": "\u968f\u673a Body", "sections": []}}
+    cache.set_json(stage="preprocess", key="k1", payload=payload)
+    assert cache.get_json(stage="preprocess", key="k1") == payload
+
+    legacy_path = tmp_path / "cache" / "preprocess" / "legacy.json"
+    legacy_text = json.dumps(payload, indent=2)
+    legacy_path.write_text(legacy_text, encoding="utf-8")
+    store.put_cache_entry(
+        CacheEntry(
+            cache_key="legacy",
+            stage="preprocess",
+            content_hash=sha256_bytes(legacy_text.encode("utf-8")),
+            path=str(legacy_path),
+            created_at=datetime.now(timezone.utc),
+            last_accessed=None,
+        )
+    )
+    assert cache.get_json(stage="preprocess", key="legacy") == payload
+    # The first hit hashes the legacy file once and records its size/mtime.
+    assert store.get_cache_entry(stage="preprocess", cache_key="legacy").mtime_ns is not None
+
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    cache.set_numpy(stage="splade_doc_vectors", key="v", array=vectors)
+    mapped = cache.get_numpy(stage="splade_doc_vectors", key="v", mmap_mode="r")
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(mapped, vectors)
+
+    spans = [
+        SectionSpan(paragraph_id="p1", title="Methods", text="random allocation sequence"),
+        SectionSpan(paragraph_id="p2", title="Results", text="allocation concealed"),
+    ]
+    index = build_bm25_index(spans)
+    cache.set_arrays(stage="bm25_index", key="b", arrays=index.to_arrays())
+    assert cache.get_json(stage="bm25_index", key="b") is None
+    restored = BM25Index.from_arrays(cache.get_arrays(stage="bm25_index", key="b") or {})
+    assert restored.search("allocation random") == index.search("allocation random")
+
+
+def test_bm25_cache_reuse(tmp_path: Path, monkeypatch) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    cache = CacheManager(tmp_path, store, scope="deterministic")
+    spans = [
+        SectionSpan(paragraph_id="p1", title="Methods", text="random allocation sequence"),
+        SectionSpan(paragraph_id="p2", title="Results", text="outcome data"),
+    ]
+    question_set = QuestionSet(
+        version="1.0",
+        variant="standard",
+        questions=[
+            Rob2Question(
+                question_id="q1",
+                rob2_id="1.1",
+                domain="D1",
+                text="randomization",
+                options=["Y", "N"],
+                order=1,
+            )
+        ],
+    )
+    build_calls = {"n": 0}
+
+    def counting_build(*args, **kwargs):
+        build_calls["n"] += 1
+        return build_bm25_index(*args, **kwargs)
+
+    monkeypatch.setattr(retrieval_bm25, "build_bm25_index", counting_build)
+    state = {
+        "doc_structure": DocStructure(body="", sections=spans).model_dump(),
+        "question_set": question_set.model_dump(),
+        "query_planner": "deterministic",
+        "reranker": "none",
+        "top_k": 2,
+        "doc_hash": "hash",
+        "cache_manager": cache,
+    }
+
+    out1 = retrieval_bm25.bm25_retrieval_locator_node(state)
+    out2 = retrieval_bm25.bm25_retrieval_locator_node(state)
+
+    assert build_calls["n"] == 1
+    assert out1["bm25_candidates"] == out2["bm25_candidates"]
+
+
+def test_cache_lru_eviction_respects_stage_budget(tmp_path: Path) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    array = np.zeros(256, dtype=np.float32)  # ~1 KiB per entry
+    cache = CacheManager(
+        tmp_path,
+        store,
+        scope="deterministic",
+        stage_max_bytes={"splade_doc_vectors": 2500},
+    )
+
+    cache.set_numpy(stage="splade_doc_vectors", key="a", array=array)
+    cache.set_numpy(stage="splade_doc_vectors", key="b", array=array)
+    assert cache.get_numpy(stage="splade_doc_vectors", key="a") is not None
+    cache.set_numpy(stage="splade_doc_vectors", key="c", array=array)
+
+    assert cache.get_numpy(stage="splade_doc_vectors", key="b") is None
+    assert cache.get_numpy(stage="splade_doc_vectors", key="a") is not None
+    assert cache.get_numpy(stage="splade_doc_vectors", key="c") is not None
+    stats = {row["stage"]: row for row in cache.stats()}
+    assert stats["splade_doc_vectors"]["count"] == 2
+    assert stats["splade_doc_vectors"]["evicted_entries"] == 1
+    assert stats["splade_doc_vectors"]["bytes"] <= 2500
+
+
+def test_cache_drops_torn_entries_and_serializes_computation(tmp_path: Path) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    cache = CacheManager(tmp_path, store, scope="deterministic")
+
+    entry = cache.set_json(stage="preprocess", key="torn", payload={"a": 1})
+    Path(entry.path).write_bytes(Path(entry.path).read_bytes()[:-4])
+    assert cache.get_json(stage="preprocess", key="torn") is None
+    assert store.get_cache_entry(stage="preprocess", cache_key="torn") is None
+    assert not list((tmp_path / "cache" / "preprocess").glob("*.tmp"))
+
+    # Same-size rewrites are caught by the recorded mtime without hashing.
+    entry = cache.set_json(stage="preprocess", key="replaced", payload={"a": 1})
+    data = Path(entry.path).read_bytes()
+    Path(entry.path).write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+    os.utime(entry.path, ns=(entry.mtime_ns + 1, entry.mtime_ns + 1))
+    assert cache.get_json(stage="preprocess", key="replaced") is None
+
+    computed = {"n": 0}
+
+    def worker() -> None:
+        with cache.single_flight(stage="preprocess", key="shared"):
+            if cache.get_json(stage="preprocess", key="shared") is None:
+                time.sleep(0.05)
+                computed["n"] += 1
+                cache.set_json(stage="preprocess", key="shared", payload={"ok": True})
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert computed["n"] == 1
+    assert cache.get_json(stage="preprocess", key="shared") == {"ok": True}
+
+
+def test_single_flight_lock_files_stay_bounded(tmp_path: Path) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    cache = CacheManager(
+        tmp_path, store, scope="deterministic", stage_max_bytes={"preprocess": 200}
+    )
+
+    for index in range(300):
+        key = f"doc{index}"
+        with cache.single_flight(stage="preprocess", key=key):
+            cache.set_json(stage="preprocess", key=key, payload={"n": index})
+
+    locks = list((tmp_path / "cache" / ".locks" / "preprocess").iterdir())
+    assert 0 < len(locks) <= 64
+    # Evicted keys leave nothing behind but the shared stripes.
+    assert len(list((tmp_path / "cache" / "preprocess").iterdir())) < 300
+
+
+def test_cache_hits_skip_hashing_and_verify_drops_corrupt_entries(
+    tmp_path: Path, monkeypatch
+) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    cache = CacheManager(tmp_path, store, scope="deterministic")
+    entry = cache.set_json(stage="preprocess", key="doc", payload={"a": 1})
+    cache.set_json(stage="preprocess", key="other", payload={"b": 2})
+
+    def no_hashing(_path):
+        raise AssertionError("cache hit must not hash the file")
+
+    monkeypatch.setattr("persistence.cache.sha256_file", no_hashing)
+    assert cache.get_json(stage="preprocess", key="doc") == {"a": 1}
+    monkeypatch.undo()
+
+    # Bit rot that keeps size and mtime is only found by a full verify.
+    data = Path(entry.path).read_bytes()
+    Path(entry.path).write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+    os.utime(entry.path, ns=(entry.mtime_ns, entry.mtime_ns))
+    assert cache.verify_all() == {"checked": 2, "removed": 1}
+    assert cache.get_json(stage="preprocess", key="doc") is None
+    assert cache.get_json(stage="preprocess", key="other") == {"b": 2}
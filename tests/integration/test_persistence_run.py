@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 from typing import Any
 
+import pytest
+
 from schemas.requests import Rob2Input
+from persistence.sqlite_store import SqliteStore
 from services import rob2_runner
+from utils.llm_cassette import LLMBatchPending
+from utils.tracing import traced_node
 
 
-def test_run_rob2_persists_minimal(tmp_path: Path, monkeypatch) -> None:
-    final_state = {
+def _final_state() -> dict[str, Any]:
+    return {
         "rob2_result": {
             "variant": "standard",
             "question_set_version": "1.0",
@@ -44,12 +50,20 @@ def test_run_rob2_persists_minimal(tmp_path: Path, monkeypatch) -> None:
         "domain_audit_reports": [],
     }
 
+
+def _use_final_state(monkeypatch, final_state: dict[str, Any]) -> None:
     class DummyGraph:
-        def invoke(self, state: dict[str, Any]) -> dict[str, Any]:
-            return final_state
+        def invoke(
+            self, state: dict[str, Any], config: dict[str, Any] | None = None
+        ) -> dict[str, Any]:
+            return traced_node("aggregate", lambda _state: final_state)(state)
 
     monkeypatch.setattr(rob2_runner, "build_rob2_graph", lambda: DummyGraph())
 
+
+def test_run_rob2_persists_minimal(tmp_path: Path, monkeypatch) -> None:
+    _use_final_state(monkeypatch, _final_state())
+
     result = rob2_runner.run_rob2(
         Rob2Input(pdf_bytes=b"%PDF-1.4", filename="test.pdf"),
         {},
@@ -63,3 +77,67 @@ def test_run_rob2_persists_minimal(tmp_path: Path, monkeypatch) -> None:
     assert (run_dir / "result.json").exists()
     assert (run_dir / "run_manifest.json").exists()
     assert (tmp_path / "metadata.sqlite").exists()
+
+    assert result.timings is not None
+    assert result.timings["nodes"]["aggregate"]["calls"] == 1
+    stored = SqliteStore(tmp_path / "metadata.sqlite").list_run_node_timings(result.run_id)
+    assert list(stored) == ["aggregate"]
+    assert stored["aggregate"]["calls"] == 1
+
+
+def test_run_rob2_exports_candidates_with_span_text(tmp_path: Path, monkeypatch) -> None:
+    final_state = _final_state()
+    text = "Participants were randomly allocated using a computer generated sequence."
+    final_state["doc_structure"] = {
+        "body": text,
+        "sections": [{"paragraph_id": "p1", "title": "Methods", "page": 3, "text": text}],
+    }
+    # Graph state references the span instead of repeating its fields.
+    final_state["validated_candidates"] = {
+        "q1": [{"question_id": "q1", "paragraph_id": "p1", "source": "fusion", "score": 1.0}]
+    }
+    _use_final_state(monkeypatch, final_state)
+
+    result = rob2_runner.run_rob2(
+        Rob2Input(pdf_bytes=b"%PDF-1.4", filename="test.pdf"),
+        {"debug_level": "full"},
+        persist_enabled=True,
+        persistence_dir=str(tmp_path),
+        cache_scope="none",
+    )
+
+    artifact = tmp_path / "runs" / result.run_id / "validated_candidates.json"
+    (exported,) = json.loads(artifact.read_text(encoding="utf-8"))["q1"]
+    assert (exported["text"], exported["title"], exported["page"]) == (text, "Methods", 3)
+    assert result.debug is not None
+    # The full debug state ships doc_structure, so candidates stay references.
+    debug_state = result.debug["state"]
+    (debug_item,) = debug_state["validated_candidates"]["q1"]
+    assert "text" not in debug_item
+    assert debug_state["doc_structure"]["sections"][0]["text"] == text
+
+
+def test_run_rob2_flushes_cache_when_graph_stops(monkeypatch) -> None:
+    class RecordingCache:
+        flushes = 0
+
+        def flush(self) -> None:
+            self.flushes += 1
+
+    class PendingGraph:
+        def invoke(
+            self, state: dict[str, Any], config: dict[str, Any] | None = None
+        ) -> dict[str, Any]:
+            raise LLMBatchPending([{"custom_id": "r1"}])
+
+    monkeypatch.setattr(rob2_runner, "build_rob2_graph", lambda: PendingGraph())
+    cache = RecordingCache()
+
+    with pytest.raises(LLMBatchPending):
+        rob2_runner.run_rob2(
+            Rob2Input(pdf_bytes=b"%PDF-1.4", filename="test.pdf"),
+            persist_enabled=False,
+            cache=cache,  # type: ignore[arg-type]
+        )
+
+    assert cache.flushes == 1
@@ -454,3 +454,32 @@ def test_fixed_concurrency_controller_keeps_limit() -> None:
     controller.observe(success=True, had_retryable_error=False)
     controller.observe(success=True, had_retryable_error=False)
     assert controller.current_limit == 3
+
+
+def test_memory_admission_controller_holds_dispatch_over_budget() -> None:
+    memory = batch_command._MemoryAdmissionController(budget_mb=1000.0, mb_per_page=10.0)
+
+    assert memory.estimate_mb({"pages": 40}) == 400.0
+    assert memory.admits(5000.0)  # nothing in flight: always admit one task
+    memory.reserve("a.pdf", 400.0)
+    memory.observe({"worker_pid": 1, "rss_mb": 300.0})
+    assert memory.admits(300.0)
+    assert not memory.admits(301.0)
+
+    memory.release("a.pdf")
+    memory.forget_workers()
+    assert memory.admits(5000.0)
+
+
+def test_worker_recycler_hands_task_limit_to_pool_and_drains_on_rss() -> None:
+    recycler = batch_command._WorkerRecycler(max_tasks=2, max_rss_mb=500.0)
+    assert recycler.pool_kwargs() == {"max_tasks_per_child": 2}
+    for _ in range(10):
+        recycler.observe({"rss_mb": 100.0})
+    assert not recycler.due
+
+    recycler.observe({"rss_mb": 800.0})
+    assert recycler.due and "RSS" in str(recycler.reason)
+    recycler.reset()
+    assert not recycler.due
+    assert batch_command._WorkerRecycler().pool_kwargs() == {}
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pymupdf
+import pytest
+
+from services import batch_scheduling
+from services.batch_scheduling import (
+    count_pdf_pages,
+    estimate_pdf_costs,
+    order_by_policy,
+    register_scheduling_policy,
+    scheduling_policies,
+)
+
+
+def _write_pdf(path: Path, pages: int) -> Path:
+    with pymupdf.open() as document:
+        for _ in range(pages):
+            document.new_page()
+        document.save(str(path))
+    return path
+
+
+def test_estimate_pdf_costs_uses_history_then_calibrated_pages(tmp_path: Path) -> None:
+    small = _write_pdf(tmp_path / "small.pdf", 2)
+    large = _write_pdf(tmp_path / "large.pdf", 10)
+    seen = _write_pdf(tmp_path / "seen.pdf", 4)
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really")
+
+    estimates = estimate_pdf_costs(
+        [small, large, seen, broken],
+        past_runtime_ms={seen: 4000},
+    )
+
+    assert count_pdf_pages(large) == 10
+    assert estimates[seen].source == "history"
+    assert estimates[seen].estimated_ms == 4000
+    # 1000 ms/page calibrated from the file with history.
+    assert estimates[small].estimated_ms == 2000
+    assert estimates[large].estimated_ms == 10000
+    assert estimates[broken].pages is None
+    assert estimates[broken].source == "bytes"
+
+
+def test_order_by_policy(monkeypatch) -> None:
+    keys = ["a", "b", "c", "d"]
+    costs = {"a": 5.0, "b": 50.0, "c": 1.0, "d": 5.0}
+
+    assert order_by_policy(keys, costs, "fifo") == keys
+    assert order_by_policy(keys, costs, "lpt") == ["b", "a", "d", "c"]
+    assert order_by_policy(keys, costs, "sjf") == ["c", "a", "d", "b"]
+    with pytest.raises(ValueError):
+        order_by_policy(keys, costs, "random")
+
+    # Restore the registry afterwards so "reverse" does not leak into other tests.
+    monkeypatch.setattr(batch_scheduling, "_POLICIES", dict(batch_scheduling._POLICIES))
+    register_scheduling_policy("reverse", lambda ks, _costs: list(reversed(ks)))
+    assert "reverse" in scheduling_policies()
+    assert order_by_policy(keys, costs, "reverse") == ["d", "c", "b", "a"]
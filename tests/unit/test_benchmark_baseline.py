@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any
+
+from benchmarks.baseline import compare
+
+_PARAMS = {"spans": 300, "language": "en", "seed": 13, "llm_latency_ms": 0.0, "llm_429_rate": 0.0}
+
+
+def _report(stages: dict[str, float], **params: Any) -> dict[str, Any]:
+    return {
+        "params": {**_PARAMS, **params},
+        "stages": {
+            name: {"median_ms": median, "units": 1, "unit": "runs"}
+            for name, median in stages.items()
+        },
+    }
+
+
+def test_compare_flags_regression_only_past_both_thresholds() -> None:
+    baseline = _report({"slower": 100.0, "jitter": 1.0, "within": 100.0})
+    current = _report({"slower": 130.0, "jitter": 1.9, "within": 115.0})
+
+    result = compare(current, baseline, tolerance=0.2, min_delta_ms=1.0)
+
+    assert result["regressions"] == ["slower"]
+    assert result["stages"]["slower"] == {
+        "status": "regression",
+        "baseline_ms": 100.0,
+        "current_ms": 130.0,
+        "ratio": 1.3,
+    }
+    # +90% but under min_delta_ms: treated as jitter.
+    assert result["stages"]["jitter"]["status"] == "ok"
+    # +15% is inside the 20% tolerance.
+    assert result["stages"]["within"]["status"] == "ok"
+    assert result["warnings"] == []
+
+
+def test_compare_treats_missing_baseline_metrics_as_new() -> None:
+    baseline = _report({"known": 10.0, "zero": 0.0, "dropped": 10.0})
+    baseline["stages"]["broken"] = {"units": 1, "unit": "runs"}
+    current = _report({"known": 10.0, "zero": 50.0, "broken": 50.0, "added": 50.0})
+
+    result = compare(current, baseline)
+
+    assert result["regressions"] == []
+    assert result["stages"]["zero"] == {"status": "new"}
+    assert result["stages"]["broken"] == {"status": "new"}
+    assert result["stages"]["added"] == {"status": "new"}
+    assert result["stages"]["known"]["status"] == "ok"
+    # Stages skipped with --stages are not compared at all.
+    assert "dropped" not in result["stages"]
+
+
+def test_compare_reports_improvements_without_regressions() -> None:
+    baseline = _report({"faster": 100.0, "tiny": 1.5})
+    current = _report({"faster": 40.0, "tiny": 0.2})
+
+    result = compare(current, baseline, tolerance=0.2, min_delta_ms=1.0)
+
+    assert result["regressions"] == []
+    assert result["stages"]["faster"]["status"] == "improvement"
+    assert result["stages"]["faster"]["ratio"] == 0.4
+    assert result["stages"]["tiny"]["status"] == "improvement"
+
+
+def test_compare_warns_when_run_parameters_differ() -> None:
+    baseline = _report({"stage": 10.0})
+    current = _report({"stage": 10.0}, spans=1000, language="zh")
+
+    result = compare(current, baseline)
+
+    assert len(result["warnings"]) == 2
+    assert result["warnings"][0].startswith("spans differs from the baseline (1000 vs 300)")
+    assert result["warnings"][1].startswith("language differs from the baseline")
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from benchmarks.stages import STAGES, BenchContext, measure
+
+
+def test_folded_stages_report_their_details() -> None:
+    ctx = BenchContext(spans=40, language="en", seed=13)
+
+    batching = measure(STAGES["token_batching"](ctx), repeat=1, warmup=0)["details"]
+    validation = measure(STAGES["state_validation"](ctx), repeat=1, warmup=0)["details"]
+    refs = measure(STAGES["candidate_refs"](ctx), repeat=1, warmup=0)["details"]
+
+    assert batching["sorted_padded_tokens"] <= batching["fixed_padded_tokens"]
+    assert batching["real_tokens"] <= batching["sorted_padded_tokens"]
+    assert validation["validations"] == 2
+    assert validation["hits"] == validation["reads"] - 2
+    assert 0 < refs["debug_bytes"] < refs["expanded_bytes"]
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from retrieval.serving.client import (
+    INFERENCE_AUTHKEY_ENV,
+    INFERENCE_SOCKET_ENV,
+    InferenceClient,
+    RemoteCrossEncoderReranker,
+    RemoteSpladeEncoder,
+)
+from retrieval.serving.server import InferenceServer, start_inference_server
+
+
+class _FakeSplade:
+    device = "cpu"
+    vocab_size = 2
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+
+    def encode(self, texts, *, max_length, batch_size=8, max_tokens_per_batch=None):
+        self.calls.append(len(texts))
+        return np.asarray(
+            [[float(len(text.split())), 1.0] for text in texts], dtype=np.float32
+        )
+
+
+class _FakeCrossEncoder:
+    device = "cpu"
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+
+    def score_pairs(self, pairs, *, max_length, batch_size=8, max_tokens_per_batch=None):
+        self.calls.append(len(pairs))
+        return [float(len(passage)) for _query, passage in pairs]
+
+
+def _start_server(tmp_path: Path, *, max_wait_ms: int = 0):
+    splade = _FakeSplade()
+    cross_encoder = _FakeCrossEncoder()
+    authkey = b"test-authkey"
+    server = InferenceServer(
+        str(tmp_path / "inference.sock"),
+        authkey=authkey,
+        max_wait_ms=max_wait_ms,
+        loaders={
+            "splade": lambda *_args: splade,
+            "cross_encoder": lambda *_args: cross_encoder,
+        },
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread, authkey, splade, cross_encoder
+
+
+def test_remote_proxies_round_trip(tmp_path: Path) -> None:
+    server, thread, authkey, _splade, _cross = _start_server(tmp_path)
+    try:
+        client = InferenceClient(server.address, authkey=authkey)
+        encoder = RemoteSpladeEncoder(client, model_id="dummy-splade")
+        reranker = RemoteCrossEncoderReranker(client, model_id="dummy-rerank")
+
+        vectors = encoder.encode(["a b", "a b c"], max_length=16)
+        result = reranker.rerank("q", ["xx", "xxxx", "x"], max_length=16)
+
+        assert encoder.vocab_size == 2
+        assert encoder.device == "cpu"
+        assert vectors.shape == (2, 2)
+        assert vectors[:, 0].tolist() == [2.0, 3.0]
+        assert result.scores == [2.0, 4.0, 1.0]
+        assert result.order == [1, 0, 2]
+        client.close()
+    finally:
+        server.close()
+        thread.join(timeout=5)
+
+
+def test_server_micro_batches_concurrent_requests(tmp_path: Path) -> None:
+    server, thread, authkey, splade, _cross = _start_server(tmp_path, max_wait_ms=200)
+    try:
+        client = InferenceClient(server.address, authkey=authkey)
+        encoder = RemoteSpladeEncoder(client, model_id="dummy-splade")
+        barrier = threading.Barrier(3)
+        outputs: dict[int, np.ndarray] = {}
+
+        def _worker(worker_id: int) -> None:
+            texts = [" ".join(["w"] * (worker_id + 1))] * (worker_id + 1)
+            barrier.wait()
+            outputs[worker_id] = encoder.encode(texts, max_length=16)
+
+        threads = [threading.Thread(target=_worker, args=(idx,)) for idx in range(3)]
+        for worker in threads:
+            worker.start()
+        for worker in threads:
+            worker.join(timeout=10)
+
+        for worker_id, vectors in outputs.items():
+            assert vectors.shape == (worker_id + 1, 2)
+            assert vectors[:, 0].tolist() == [float(worker_id + 1)] * (worker_id + 1)
+        assert sum(splade.calls) == 6
+        assert len(splade.calls) < 3
+    finally:
+        server.close()
+        thread.join(timeout=5)
+
+
+def test_get_splade_encoder_uses_server_when_advertised(tmp_path: Path, monkeypatch) -> None:
+    from retrieval.engines import splade as splade_module
+
+    server, thread, authkey, _splade, _cross = _start_server(tmp_path)
+    monkeypatch.setenv(INFERENCE_SOCKET_ENV, server.address)
+    monkeypatch.setenv(INFERENCE_AUTHKEY_ENV, authkey.hex())
+    splade_module.get_splade_encoder.cache_clear()
+    try:
+        encoder = splade_module.get_splade_encoder(model_id="dummy-splade")
+        assert isinstance(encoder, RemoteSpladeEncoder)
+        assert encoder.encode(["one two"], max_length=8)[0, 0] == 2.0
+    finally:
+        splade_module.get_splade_encoder.cache_clear()
+        server.close()
+        thread.join(timeout=5)
+
+
+def test_client_reconnects_when_server_comes_back(tmp_path: Path) -> None:
+    server, thread, authkey, _splade, _cross = _start_server(tmp_path)
+    client = InferenceClient(server.address, authkey=authkey, reconnect_timeout=10)
+    encoder = RemoteSpladeEncoder(client, model_id="dummy-splade")
+    server.close()
+    thread.join(timeout=5)
+
+    def _respawn() -> None:
+        time.sleep(0.3)
+        replacement, *_rest = _start_server(tmp_path)
+        restarted.append(replacement)
+
+    restarted: list[InferenceServer] = []
+    respawner = threading.Thread(target=_respawn)
+    respawner.start()
+    try:
+        # The in-flight request is resent once the new server listens.
+        assert encoder.encode(["a b c"], max_length=8)[0, 0] == 3.0
+    finally:
+        respawner.join(timeout=5)
+        client.close()
+        for replacement in restarted:
+            replacement.close()
+
+
+def test_splade_falls_back_to_local_encoder_when_server_is_gone(
+    tmp_path: Path, monkeypatch
+) -> None:
+    from retrieval.engines import splade as splade_module
+    from retrieval.serving import client as client_module
+
+    class _LocalSplade(_FakeSplade):
+        def __init__(self, **_kwargs) -> None:
+            super().__init__()
+
+    server, thread, authkey, _splade, _cross = _start_server(tmp_path)
+    monkeypatch.setenv(INFERENCE_SOCKET_ENV, server.address)
+    monkeypatch.setenv(INFERENCE_AUTHKEY_ENV, authkey.hex())
+    monkeypatch.setattr(client_module, "_RECONNECT_TIMEOUT_S", 0.0)
+    monkeypatch.setattr(splade_module, "SpladeEncoder", _LocalSplade)
+    splade_module.get_splade_encoder.cache_clear()
+    try:
+        remote = splade_module.get_splade_encoder(model_id="dummy-splade")
+        assert isinstance(remote, RemoteSpladeEncoder)
+        server.close()
+        thread.join(timeout=5)
+        # A dead server process also takes the open connections with it.
+        client_module.get_inference_client(server.address).close()
+
+        # The proxy already handed out keeps working through a local model ...
+        assert remote.encode(["a b"], max_length=8)[0, 0] == 2.0
+        # ... and the factory no longer returns proxies bound to the dead server.
+        assert INFERENCE_SOCKET_ENV not in os.environ
+        local = splade_module.get_splade_encoder(model_id="dummy-splade")
+        assert isinstance(local, _LocalSplade)
+        assert remote.encode(["a b c"], max_length=8)[0, 0] == 3.0
+    finally:
+        splade_module.get_splade_encoder.cache_clear()
+        server.close()
+
+
+def test_supervised_server_is_respawned_after_crash() -> None:
+    handle = start_inference_server(ready_timeout=60)
+    try:
+        handle.supervise(interval=0.05)
+        client = InferenceClient(handle.address, authkey=handle.authkey, reconnect_timeout=60)
+        assert client.request({"op": "ping"})["ok"]
+        handle.process.kill()
+
+        assert client.request({"op": "ping"})["ok"]
+        assert handle.restarts == 1
+        client.close()
+    finally:
+        handle.stop()
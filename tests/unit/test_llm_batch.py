@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from pydantic import BaseModel
+from typing_extensions import TypedDict
+
+from services import rob2_runner
+from services.llm_batch import (
+    AnthropicBatchBackend,
+    LLMBatchSubmitter,
+    LocalBatchBackend,
+    OpenAIBatchBackend,
+    build_request_body,
+    cassette_entry,
+)
+from utils.llm_cassette import (
+    Cassette,
+    LLMBatchPending,
+    LLMRequestPending,
+    init_chat_model,
+    use_cassette,
+)
+
+
+class _Plan(BaseModel):
+    query_plan: dict[str, list[str]]
+
+
+_PLANNER_PROMPT = json.dumps({"questions": [{"question_id": "q1", "keyword_hints": ["random"]}]})
+
+
+def _structured_call(model: Any, prompt: str) -> Any:
+    """The pipeline's call-site pattern: structured output, then plain JSON fallback."""
+    try:
+        return model.with_structured_output(_Plan).invoke(prompt)
+    except Exception:
+        return model.invoke(prompt)
+
+
+@pytest.mark.parametrize(
+    "model_id", ["openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"]
+)
+def test_collect_stages_structured_call_once_and_replays_batch_answer(
+    tmp_path: Path, model_id: str
+) -> None:
+    path = tmp_path / "doc.json"
+    cassette = Cassette(path, mode="collect")
+    with use_cassette(cassette):
+        with pytest.raises(LLMRequestPending):
+            _structured_call(init_chat_model(model_id, temperature=0), _PLANNER_PROMPT)
+
+    # The JSON fallback repeats the same messages and is not staged separately.
+    (request,) = cassette.pending
+    assert request["kind"] == "structured:_Plan"
+    assert request["model_kwargs"] == {"temperature": 0}
+    assert request["schema"]["title"] == "_Plan"
+
+    backend = LocalBatchBackend()
+    submitter = LLMBatchSubmitter(
+        tmp_path / "state.json", backend="local", backends={"local": backend}
+    )
+    stats = submitter.submit_and_wait([(path, cassette.pending)])
+    assert stats == {"submitted": 1, "answered": 1, "errors": 0, "retry": 0}
+
+    replay = Cassette(path, mode="collect")
+    with use_cassette(replay):
+        plan = _structured_call(init_chat_model(model_id, temperature=0), _PLANNER_PROMPT)
+    assert plan == _Plan(query_plan={"q1": ["random"]})
+    assert replay.pending == []
+
+
+def test_request_bodies_follow_provider_formats() -> None:
+    request = {
+        "model": "anthropic:claude-3-5-haiku-latest",
+        "model_kwargs": {"temperature": 0},
+        "kind": "structured:_Plan",
+        "schema_name": "_Plan",
+        "schema": _Plan.model_json_schema(),
+        "messages": [
+            {"type": "system", "data": {"content": "sys", "type": "system"}},
+            {"type": "human", "data": {"content": "hi", "type": "human"}},
+        ],
+    }
+
+    anthropic = build_request_body(request, "anthropic")
+    assert anthropic["model"] == "claude-3-5-haiku-latest"
+    assert anthropic["system"] == "sys"
+    assert anthropic["messages"] == [{"role": "user", "content": "hi"}]
+    assert anthropic["tool_choice"] == {"type": "tool", "name": "_Plan"}
+    assert anthropic["max_tokens"] > 0
+
+    openai = build_request_body(request, "openai")
+    assert [message["role"] for message in openai["messages"]] == ["system", "user"]
+    assert openai["response_format"]["json_schema"]["name"] == "_Plan"
+
+
+class _FlakyBackend:
+    """Backend whose first poll is still running and whose answers are scripted."""
+
+    name = "local"
+
+    def __init__(self, outcomes: dict[str, dict[str, Any]]) -> None:
+        self._outcomes = outcomes
+        self.polls = 0
+
+    def submit(self, requests: Any) -> str:
+        return "batch_1"
+
+    def finished(self, batch_id: str) -> bool:
+        self.polls += 1
+        return self.polls > 1
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        return self._outcomes
+
+
+def test_retryable_failures_stay_unanswered_and_interrupted_batches_resume(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "doc.json"
+    cassette = Cassette(path, mode="collect")
+    with use_cassette(cassette):
+        model = init_chat_model("openai:gpt-4o-mini")
+        for prompt in ("first", "second", "third"):
+            with pytest.raises(LLMRequestPending):
+                model.invoke(prompt)
+
+    outcomes = {
+        "r000000": {"body": {"choices": [{"message": {"content": "ok"}}]}},
+        "r000001": {"error": {"type": "rate_limit_error"}, "retryable": True},
+        "r000002": {"error": {"type": "invalid_request_error", "message": "bad"}},
+    }
+    state_path = tmp_path / "state.json"
+
+    class _Interrupted(Exception):
+        pass
+
+    def interrupt(_seconds: float) -> None:
+        raise _Interrupted
+
+    first = LLMBatchSubmitter(
+        state_path, backend="local", backends={"local": _FlakyBackend(outcomes)}, sleep=interrupt
+    )
+    with pytest.raises(_Interrupted):
+        first.submit_and_wait([(path, cassette.pending)])
+    assert state_path.exists()
+
+    resumed = LLMBatchSubmitter(
+        state_path, backend="local", backends={"local": _FlakyBackend(outcomes)}, sleep=lambda _: None
+    )
+    assert resumed.resume() == {"submitted": 3, "answered": 1, "errors": 1, "retry": 1}
+    assert not state_path.exists()
+
+    replay = Cassette(path, mode="collect")
+    with use_cassette(replay):
+        model = init_chat_model("openai:gpt-4o-mini")
+        assert model.invoke("first").content == "ok"
+        with pytest.raises(Exception, match="bad"):
+            model.invoke("third")
+        with pytest.raises(LLMRequestPending):
+            model.invoke("second")
+
+
+def _structured_request(model: str) -> dict[str, Any]:
+    return {
+        "key": "k1",
+        "model": model,
+        "model_kwargs": {"temperature": 0, "max_tokens": 256},
+        "kind": "structured:_Plan",
+        "schema_name": "_Plan",
+        "schema": _Plan.model_json_schema(),
+        "messages": [
+            {"type": "system", "data": {"content": "sys", "type": "system"}},
+            {"type": "human", "data": {"content": "hi", "type": "human"}},
+        ],
+    }
+
+
+class _FakeOpenAI:
+    """Records calls made through the subset of the ``openai`` SDK the backend uses."""
+
+    def __init__(self, *, output: list[dict[str, Any]], errors: list[dict[str, Any]]) -> None:
+        self.uploads: list[tuple[str, bytes, str]] = []
+        self.created: list[dict[str, Any]] = []
+        self.status = "in_progress"
+        self._files = {
+            "file_out": "\n".join(json.dumps(line) for line in output),
+            "file_err": "\n".join(json.dumps(line) for line in errors),
+        }
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve)
+
+    def _create_file(self, *, file: tuple[str, bytes], purpose: str) -> Any:
+        self.uploads.append((file[0], file[1], purpose))
+        return SimpleNamespace(id="file_in")
+
+    def _content(self, file_id: str) -> Any:
+        return SimpleNamespace(text=self._files[file_id])
+
+    def _create_batch(self, **kwargs: Any) -> Any:
+        self.created.append(kwargs)
+        return SimpleNamespace(id="batch_oa")
+
+    def _retrieve(self, batch_id: str) -> Any:
+        return SimpleNamespace(
+            status=self.status, output_file_id="file_out", error_file_id="file_err"
+        )
+
+
+def _openai_line(custom_id: str, status: int, body: dict[str, Any]) -> dict[str, Any]:
+    return {"custom_id": custom_id, "response": {"status_code": status, "body": body}, "error": None}
+
+
+def test_openai_backend_uploads_jsonl_and_classifies_results() -> None:
+    answer = {
+        "model": "gpt-4o-mini",
+        "choices": [{"message": {"content": json.dumps({"query_plan": {"q1": ["x"]}})}}],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 7, "total_tokens": 12},
+    }
+    client = _FakeOpenAI(
+        output=[_openai_line("r000000", 200, answer)],
+        errors=[
+            _openai_line("r000001", 429, {"error": {"type": "rate_limit_error"}}),
+            _openai_line("r000002", 400, {"error": {"code": "invalid_request_error", "message": "bad"}}),
+            {"custom_id": "r000003", "response": None, "error": {"code": "batch_expired", "message": "late"}},
+            _openai_line("r000004", 503, {"error": {"type": "server_error"}}),
+        ],
+    )
+    backend = OpenAIBatchBackend(client=client)
+    request = _structured_request("openai:gpt-4o-mini")
+    body = build_request_body(request, "openai")
+    assert body["max_completion_tokens"] == 256 and body["temperature"] == 0
+
+    batch_id = backend.submit([{"custom_id": "r000000", "body": body}])
+
+    assert batch_id == "batch_oa"
+    ((name, payload, purpose),) = client.uploads
+    assert (name.endswith(".jsonl"), purpose) == (True, "batch")
+    (line,) = [json.loads(raw) for raw in payload.decode("utf-8").splitlines()]
+    assert line == {
+        "custom_id": "r000000",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": body,
+    }
+    assert client.created[0]["input_file_id"] == "file_in"
+    assert client.created[0]["completion_window"] == "24h"
+
+    assert not backend.finished(batch_id)
+    client.status = "completed"
+    assert backend.finished(batch_id)
+
+    outcomes = backend.results(batch_id)
+    assert outcomes["r000000"] == {"body": answer}
+    assert {key: outcomes[key]["retryable"] for key in ("r000001", "r000002", "r000003", "r000004")} == {
+        "r000001": True,
+        "r000002": False,
+        "r000003": True,
+        "r000004": True,
+    }
+    assert outcomes["r000002"]["error"]["type"] == "invalid_request_error"
+
+    entry = cassette_entry(request, "openai", outcomes["r000000"])
+    assert entry["structured"] == {"query_plan": {"q1": ["x"]}}
+    assert entry["message"]["data"]["usage_metadata"]["total_tokens"] == 12
+    failed = cassette_entry(request, "openai", outcomes["r000002"])
+    assert failed["error"] == {"type": "invalid_request_error", "message": "bad", "status_code": 400}
+
+
+class _FakeAnthropicMessage:
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self._payload = payload
+
+    def model_dump(self, mode: str = "python") -> dict[str, Any]:
+        return dict(self._payload)
+
+
+class _FakeAnthropic:
+    """Records calls made through ``client.messages.batches`` of the ``anthropic`` SDK."""
+
+    def __init__(self, results: list[Any]) -> None:
+        self.created: list[list[dict[str, Any]]] = []
+        self.processing_status = "in_progress"
+        self._results = results
+        self.messages = SimpleNamespace(
+            batches=SimpleNamespace(
+                create=self._create, retrieve=self._retrieve, results=self._list_results
+            )
+        )
+
+    def _create(self, *, requests: list[dict[str, Any]]) -> Any:
+        self.created.append(requests)
+        return SimpleNamespace(id="msgbatch_1")
+
+    def _retrieve(self, batch_id: str) -> Any:
+        return SimpleNamespace(processing_status=self.processing_status)
+
+    def _list_results(self, batch_id: str) -> list[Any]:
+        return self._results
+
+
+def _anthropic_error(custom_id: str, error_type: str) -> Any:
+    error = SimpleNamespace(error=SimpleNamespace(type=error_type, message=f"{error_type}!"))
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored", error=error))
+
+
+def test_anthropic_backend_submits_params_and_classifies_results() -> None:
+    message = {
+        "model": "claude-3-5-haiku-latest",
+        "content": [{"type": "tool_use", "name": "_Plan", "input": {"query_plan": {"q1": ["y"]}}}],
+        "usage": {"input_tokens": 3, "output_tokens": 4},
+    }
+    client = _FakeAnthropic(
+        [
+            SimpleNamespace(
+                custom_id="r000000",
+                result=SimpleNamespace(type="succeeded", message=_FakeAnthropicMessage(message)),
+            ),
+            _anthropic_error("r000001", "overloaded_error"),
+            _anthropic_error("r000002", "invalid_request_error"),
+            SimpleNamespace(custom_id="r000003", result=SimpleNamespace(type="expired")),
+            SimpleNamespace(custom_id="r000004", result=SimpleNamespace(type="canceled")),
+        ]
+    )
+    backend = AnthropicBatchBackend(client=client)
+    request = _structured_request("anthropic:claude-3-5-haiku-latest")
+    body = build_request_body(request, "anthropic")
+
+    batch_id = backend.submit([{"custom_id": "r000000", "body": body}])
+
+    assert client.created == [[{"custom_id": "r000000", "params": body}]]
+    assert body["max_tokens"] == 256 and body["system"] == "sys"
+    assert not backend.finished(batch_id)
+    client.processing_status = "ended"
+    assert backend.finished(batch_id)
+
+    outcomes = backend.results(batch_id)
+    assert outcomes["r000000"] == {"body": message}
+    assert {key: outcomes[key]["retryable"] for key in ("r000001", "r000002", "r000003", "r000004")} == {
+        "r000001": True,
+        "r000002": False,
+        "r000003": True,
+        "r000004": True,
+    }
+    assert outcomes["r000002"]["error"]["message"] == "invalid_request_error!"
+
+    entry = cassette_entry(request, "anthropic", outcomes["r000000"])
+    assert entry["structured"] == {"query_plan": {"q1": ["y"]}}
+    assert entry["message"]["data"]["usage_metadata"]["total_tokens"] == 7
+
+
+def test_submitter_drives_fake_openai_sdk_end_to_end(tmp_path: Path) -> None:
+    path = tmp_path / "doc.json"
+    cassette = Cassette(path, mode="collect")
+    with use_cassette(cassette):
+        model = init_chat_model("openai:gpt-4o-mini")
+        for prompt in ("first", "second"):
+            with pytest.raises(LLMRequestPending):
+                model.invoke(prompt)
+
+    client = _FakeOpenAI(
+        output=[_openai_line("r000000", 200, {"choices": [{"message": {"content": "ok"}}]})],
+        errors=[_openai_line("r000001", 500, {"error": {"type": "server_error"}})],
+    )
+    client.status = "completed"
+    submitter = LLMBatchSubmitter(
+        tmp_path / "state.json",
+        backend="auto",
+        backends={"openai": OpenAIBatchBackend(client=client)},
+        sleep=lambda _: None,
+    )
+    stats = submitter.submit_and_wait([(path, cassette.pending)])
+
+    assert stats == {"submitted": 2, "answered": 1, "errors": 0, "retry": 1}
+    replay = Cassette(path, mode="collect")
+    with use_cassette(replay):
+        model = init_chat_model("openai:gpt-4o-mini")
+        assert model.invoke("first").content == "ok"
+        with pytest.raises(LLMRequestPending):
+            model.invoke("second")
+
+
+class _State(TypedDict, total=False):
+    plan: str
+    answer: str
+
+
+def _planner(state: dict[str, Any]) -> dict[str, Any]:
+    return {"plan": init_chat_model("openai:gpt-4o-mini").invoke("plan").content}
+
+
+def _domain(state: dict[str, Any]) -> dict[str, Any]:
+    # Nodes may swallow LLM errors; the runner still stops after this step.
+    try:
+        answer = init_chat_model("openai:gpt-4o-mini").invoke(f"answer {state['plan']}").content
+    except Exception:
+        answer = "fallback"
+    return {"answer": answer}
+
+
+def _two_stage_graph():
+    builder: StateGraph = StateGraph(_State)
+    builder.add_node("planner", _planner)
+    builder.add_node("domain", _domain)
+    builder.add_edge(START, "planner")
+    builder.add_edge("planner", "domain")
+    builder.add_edge("domain", END)
+    return builder.compile()
+
+
+def test_collect_mode_graph_stops_stage_by_stage(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(rob2_runner, "build_rob2_graph", _two_stage_graph)
+    path = tmp_path / "doc.json"
+    submitter = LLMBatchSubmitter(tmp_path / "state.json", backend="local")
+    staged_prompts: list[str] = []
+
+    for _ in range(2):
+        cassette = Cassette(path, mode="collect")
+        with use_cassette(cassette), pytest.raises(LLMBatchPending) as excinfo:
+            rob2_runner._invoke_graph({}, cassette=cassette)
+        staged_prompts.extend(
+            request["messages"][0]["data"]["content"] for request in excinfo.value.requests
+        )
+        submitter.submit_and_wait([(path, excinfo.value.requests)])
+
+    cassette = Cassette(path, mode="collect")
+    with use_cassette(cassette):
+        final_state = rob2_runner._invoke_graph({}, cassette=cassette)
+
+    assert staged_prompts == ["plan", "answer {}"]
+    assert final_state == {"plan": "{}", "answer": "{}"}
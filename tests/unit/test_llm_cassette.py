@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import langchain.chat_models
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel
+
+from schemas.requests import Rob2RunOptions
+from services.rob2_runner import _build_cassette
+from utils.llm_cassette import (
+    Cassette,
+    CassetteMissError,
+    RecordedLLMError,
+    ReplayChatModel,
+    init_chat_model,
+    use_cassette,
+)
+from utils.tracing import trace_run
+
+
+class _Verdict(BaseModel):
+    label: str
+    confidence: float
+
+
+class _StructuredModel:
+    """Provider stand-in whose structured output succeeds."""
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Any:
+        assert kwargs.get("include_raw") is True
+        return self
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        raw = AIMessage(
+            content="",
+            usage_metadata={"input_tokens": 7, "output_tokens": 2, "total_tokens": 9},
+        )
+        return {"raw": raw, "parsed": _Verdict(label="relevant", confidence=0.9), "parsing_error": None}
+
+
+_MESSAGES = [SystemMessage(content="system"), HumanMessage(content='{"question": "q1"}')]
+
+
+def _fake_model(content: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(
+        messages=iter(
+            [
+                AIMessage(
+                    content=content,
+                    usage_metadata={"input_tokens": 11, "output_tokens": 4, "total_tokens": 15},
+                )
+            ]
+        )
+    )
+
+
+def test_recorded_raw_calls_replay_without_a_provider(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "doc.json"
+    monkeypatch.setattr(
+        langchain.chat_models, "init_chat_model", lambda model, **kwargs: _fake_model('{"label": "pass"}')
+    )
+    with use_cassette(Cassette(path, mode="record")):
+        model = init_chat_model("openai:gpt-test", temperature=0.0)
+        # GenericFakeChatModel has no tool calling, like the fallback path in the nodes.
+        with pytest.raises(NotImplementedError):
+            model.with_structured_output(_Verdict).invoke(_MESSAGES)
+        assert model.invoke(_MESSAGES).content == '{"label": "pass"}'
+    assert path.exists()
+
+    monkeypatch.setattr(langchain.chat_models, "init_chat_model", None)
+    cassette = Cassette(path, mode="replay")
+    with use_cassette(cassette), trace_run() as tracer:
+        model = init_chat_model("openai:gpt-test")
+        assert isinstance(model, ReplayChatModel)
+        with pytest.raises(RecordedLLMError, match="NotImplementedError"):
+            model.with_structured_output(_Verdict).invoke(_MESSAGES)
+        replayed = model.invoke(_MESSAGES, config={"callbacks": [tracer.callback_handler()]})
+        with pytest.raises(CassetteMissError):
+            model.invoke([HumanMessage(content="unseen")])
+
+    assert replayed.content == '{"label": "pass"}'
+    assert replayed.usage_metadata["input_tokens"] == 11
+    assert tracer.summary()["totals"]["input_tokens"] == 11
+    assert cassette.stats() == {"recorded": 0, "replayed": 2, "misses": 1}
+
+
+def test_structured_output_is_replayed_as_the_schema(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "doc.json"
+    monkeypatch.setattr(
+        langchain.chat_models, "init_chat_model", lambda model, **kwargs: _StructuredModel()
+    )
+    with use_cassette(Cassette(path, mode="record")):
+        recorded = init_chat_model("anthropic:claude-test").with_structured_output(_Verdict)
+        assert recorded.invoke(_MESSAGES) == _Verdict(label="relevant", confidence=0.9)
+
+    with use_cassette(Cassette(path, mode="replay", replay_latency=True)):
+        replayed = init_chat_model("anthropic:claude-test").with_structured_output(_Verdict)
+        assert replayed.invoke(_MESSAGES) == _Verdict(label="relevant", confidence=0.9)
+        # Other model ids do not share recordings.
+        with pytest.raises(CassetteMissError):
+            init_chat_model("openai:gpt-test").with_structured_output(_Verdict).invoke(_MESSAGES)
+
+
+def test_run_options_select_cassette_per_document(tmp_path: Path) -> None:
+    assert _build_cassette(Rob2RunOptions(), doc_hash="abc", default_dir=str(tmp_path)) is None
+
+    recorder = _build_cassette(
+        Rob2RunOptions(llm_cassette_mode="record"), doc_hash="abc", default_dir=str(tmp_path)
+    )
+    assert recorder is not None
+    assert recorder.path == tmp_path / "llm_cassettes" / "abc.json"
+
+    with pytest.raises(FileNotFoundError):
+        _build_cassette(
+            Rob2RunOptions(llm_cassette_mode="replay", llm_cassette_dir=str(tmp_path / "none")),
+            doc_hash="abc",
+            default_dir=str(tmp_path),
+        )
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+import pytest
+from pydantic import BaseModel
+
+from utils import metrics
+from utils.llm_cassette import init_chat_model
+from utils.llm_hedging import (
+    HedgedChatModel,
+    HedgePolicy,
+    parse_hedge_delay,
+    reset_hedge_stats,
+    use_hedge_policy,
+)
+
+
+class _Answer(BaseModel):
+    value: str
+
+
+class _ProviderError(RuntimeError):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+class _ScriptedModel:
+    """Chat model whose n-th call sleeps/answers/raises as scripted."""
+
+    def __init__(self, name: str, script: list[tuple[float, Any]]) -> None:
+        self.name = name
+        self._script = script
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        with self._lock:
+            delay, outcome = self._script[min(self.calls, len(self._script) - 1)]
+            self.calls += 1
+        time.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> "_ScriptedModel":
+        return self
+
+
+@pytest.fixture(autouse=True)
+def _fresh_stats() -> None:
+    reset_hedge_stats()
+
+
+def test_slow_call_is_hedged_and_first_valid_response_wins() -> None:
+    primary = _ScriptedModel("primary", [(1.0, _Answer(value="slow"))])
+    fallback = _ScriptedModel("fallback", [(0.0, _Answer(value="fast"))])
+    model = HedgedChatModel(
+        primary,
+        model_id="m",
+        policy=HedgePolicy(hedge_delay="50ms", max_rate=1.0, fallback_model="f"),
+        fallback_factory=lambda: fallback,
+    )
+    before = metrics.LLM_HEDGES.value(kind="structured:_Answer", winner="hedge")
+
+    started = time.perf_counter()
+    result = model.with_structured_output(_Answer).invoke("q")
+
+    assert result == _Answer(value="fast")
+    assert time.perf_counter() - started < 0.5
+    assert (primary.calls, fallback.calls) == (1, 1)
+    assert metrics.LLM_HEDGES.value(kind="structured:_Answer", winner="hedge") == before + 1
+
+
+def test_invalid_hedge_response_falls_back_to_primary() -> None:
+    primary = _ScriptedModel("primary", [(0.2, _Answer(value="ok"))])
+    model = HedgedChatModel(
+        primary,
+        model_id="m",
+        policy=HedgePolicy(hedge_delay="20", max_rate=1.0),
+    )
+    # Same-model hedge: the duplicate returns None (no tool call) and is ignored.
+    primary._script.append((0.0, None))
+
+    assert model.invoke("q") == _Answer(value="ok")
+    assert primary.calls == 2
+
+
+def test_hedge_budget_caps_duplicates() -> None:
+    primary = _ScriptedModel("primary", [(0.05, "answer")])
+    model = HedgedChatModel(
+        primary, model_id="m", policy=HedgePolicy(hedge_delay="1ms", max_rate=0.25)
+    )
+
+    for _ in range(8):
+        assert model.invoke("q") == "answer"
+
+    # 8 calls at a 25% budget allow 2 duplicates.
+    assert primary.calls == 10
+
+
+def test_quantile_delay_waits_for_observed_latencies() -> None:
+    primary = _ScriptedModel("primary", [(0.0, "answer")])
+    model = HedgedChatModel(
+        primary, model_id="m", policy=HedgePolicy(hedge_delay="p90", max_rate=1.0)
+    )
+
+    for _ in range(25):
+        model.invoke("q")
+
+    assert primary.calls == 25
+    assert parse_hedge_delay("p90") == ("quantile", 0.9)
+    assert parse_hedge_delay("1500ms") == ("fixed", 1.5)
+    with pytest.raises(ValueError):
+        parse_hedge_delay("fast")
+
+
+def test_failover_on_server_error_uses_fallback_model() -> None:
+    primary = _ScriptedModel("primary", [(0.0, _ProviderError(503))])
+    fallback = _ScriptedModel("fallback", [(0.0, "from fallback")])
+    model = HedgedChatModel(
+        primary,
+        model_id="m",
+        policy=HedgePolicy(fallback_model="f", failover=True),
+        fallback_factory=lambda: fallback,
+    )
+    before = metrics.LLM_FAILOVERS.value(kind="invoke", outcome="success")
+
+    assert model.invoke("q") == "from fallback"
+    assert metrics.LLM_FAILOVERS.value(kind="invoke", outcome="success") == before + 1
+
+    bad_request = HedgedChatModel(
+        _ScriptedModel("primary", [(0.0, _ProviderError(400))]),
+        model_id="m",
+        policy=HedgePolicy(fallback_model="f", failover=True),
+        fallback_factory=lambda: fallback,
+    )
+    with pytest.raises(_ProviderError):
+        bad_request.invoke("q")
+    assert fallback.calls == 1
+
+
+def test_init_chat_model_wraps_models_only_under_an_active_policy() -> None:
+    plain = init_chat_model("openai:gpt-4o-mini", api_key="stub")
+    with use_hedge_policy(HedgePolicy(hedge_delay="p95")):
+        hedged = init_chat_model("openai:gpt-4o-mini", api_key="stub")
+
+    assert not isinstance(plain, HedgedChatModel)
+    assert isinstance(hedged, HedgedChatModel)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+
+from evidence.validators.consistency import _ConsistencyResponse
+from pipelines.graphs.nodes.domain_audit import _AuditOutput
+from pipelines.graphs.nodes.domains.common import _DecisionOutput
+from pipelines.graphs.nodes.locators.llm_locator import _LocatorResponse
+from retrieval.query_planning.llm import _QueryPlanResponse
+from services.llm_stub import StubBehavior, conform_to_schema, create_llm_stub_app
+
+_DOMAIN_PROMPT = json.dumps(
+    {
+        "domain_questions": [
+            {"question_id": "q1_1", "text": "Random?", "options": ["Y", "PY", "PN", "N", "NI"]},
+            {"question_id": "q1_3", "text": "Imbalance?", "options": ["Y", "PY", "PN", "N"]},
+        ],
+        "evidence": {"q1_1": [{"paragraph_id": "p3", "text": "Randomised by computer."}]},
+    }
+)
+
+
+def _client(**behavior: object) -> TestClient:
+    return TestClient(create_llm_stub_app(StubBehavior(latency_ms=0.0, seed=1, **behavior)))
+
+
+def test_openai_client_gets_schema_valid_structured_output() -> None:
+    client = _client()
+    model = ChatOpenAI(
+        model="gpt-4o-mini",
+        api_key="stub",
+        base_url="http://testserver/v1",
+        http_client=client,
+        max_retries=0,
+    )
+    messages = [SystemMessage(content="system"), HumanMessage(content=_DOMAIN_PROMPT)]
+
+    decision = model.with_structured_output(_DecisionOutput).invoke(messages)
+    raw = model.invoke(messages)
+
+    assert isinstance(decision, _DecisionOutput)
+    assert [(a.question_id, a.answer) for a in decision.answers] == [("q1_1", "Y"), ("q1_3", "Y")]
+    assert decision.answers[0].evidence[0].paragraph_id == "p3"
+    assert json.loads(str(raw.content))["answers"][1]["answer"] == "Y"
+    assert raw.usage_metadata is not None and raw.usage_metadata["input_tokens"] > 0
+    assert client.get("/stub/stats").json()["completed"] == 2
+
+
+def test_anthropic_tool_call_matches_requested_schema() -> None:
+    schema = _DecisionOutput.model_json_schema()
+    response = _client().post(
+        "/v1/messages",
+        json={
+            "model": "claude-test",
+            "max_tokens": 256,
+            "system": "system",
+            "messages": [{"role": "user", "content": [{"type": "text", "text": _DOMAIN_PROMPT}]}],
+            "tools": [{"name": "_DecisionOutput", "input_schema": schema}],
+            "tool_choice": {"type": "tool", "name": "_DecisionOutput"},
+        },
+    )
+
+    body = response.json()
+    assert response.status_code == 200 and body["stop_reason"] == "tool_use"
+    assert _DecisionOutput.model_validate(body["content"][0]["input"]).answers[1].answer == "Y"
+
+
+def test_every_pipeline_response_model_accepts_a_conformed_empty_answer() -> None:
+    for model in (
+        _DecisionOutput,
+        _AuditOutput,
+        _ConsistencyResponse,
+        _LocatorResponse,
+        _QueryPlanResponse,
+    ):
+        model.model_validate(conform_to_schema({}, model.model_json_schema()))
+
+
+def test_rate_limits_and_token_quota_return_429_with_retry_after() -> None:
+    limited = _client(rate_limit_rate=1.0, retry_after_s=2.5).post(
+        "/v1/chat/completions",
+        json={"model": "gpt", "messages": [{"role": "user", "content": "{}"}]},
+    )
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "3"
+    assert limited.json()["error"]["code"] == "rate_limit_exceeded"
+
+    client = _client(tokens_per_minute=50)
+    request = {"model": "gpt", "messages": [{"role": "user", "content": "x" * 120}]}
+    assert client.post("/v1/chat/completions", json=request).status_code == 200
+    quota = client.post("/v1/chat/completions", json=request)
+    assert quota.status_code == 429 and quota.json()["error"]["type"] == "tokens"
+    stats = client.get("/stub/stats").json()
+    assert (stats["requests"], stats["quota_limited"], stats["in_flight"]) == (2, 1, 0)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import pytest
+
+from services.model_warmup import parse_model_names
+from utils.metrics import Counter, Histogram, MetricsRegistry, _Metric
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.register(
+        Histogram("demo_seconds", "Demo latency.", ("node",), buckets=(0.1, 1))
+    )
+    counter = registry.register(Counter("demo_total", 'Demo "count".', ("stage",)))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, node="fusion")
+    counter.inc(stage='pre"process')
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{node="fusion",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{node="fusion",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{node="fusion",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{node="fusion"} 3' in lines
+    assert 'demo_total{stage="pre\\"process"} 1' in lines
+
+
+def test_metric_labels_must_match() -> None:
+    counter = Counter("demo_total", "Demo.", ("stage",))
+    with pytest.raises(ValueError):
+        counter.inc(node="x")
+
+
+def test_metric_types_must_implement_samples() -> None:
+    class _NoSamples(_Metric):
+        kind = "gauge"
+
+    with pytest.raises(TypeError):
+        _NoSamples("demo", "Demo.")
+
+
+def test_parse_model_names() -> None:
+    assert parse_model_names(" docling, cross-encoder,docling ") == ("docling", "cross_encoder")
+    assert parse_model_names(None) == ()
+    with pytest.raises(ValueError):
+        parse_model_names("docling,ocr")
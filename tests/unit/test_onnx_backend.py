@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+from transformers import (  # noqa: E402
+    BertConfig,
+    BertForMaskedLM,
+    BertForSequenceClassification,
+    BertTokenizerFast,
+)
+
+from retrieval.engines.splade import SpladeEncoder  # noqa: E402
+from retrieval.onnx_backend import (  # noqa: E402
+    ensure_onnx_model,
+    normalize_inference_backend,
+    onnx_model_dir,
+)
+from retrieval.rerankers.cross_encoder import CrossEncoderReranker  # noqa: E402
+
+_WORDS = [
+    "randomization",
+    "allocation",
+    "sequence",
+    "blinded",
+    "outcome",
+    "assessors",
+    "missing",
+    "data",
+    "protocol",
+    "analysis",
+]
+_TEXTS = [
+    "randomization allocation sequence",
+    "blinded outcome assessors",
+    "missing data",
+    "protocol analysis randomization blinded outcome missing",
+    "sequence",
+]
+
+
+def _tiny_model_dir(tmp_path: Path, *, kind: str) -> Path:
+    model_dir = tmp_path / kind
+    model_dir.mkdir()
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *_WORDS]
+    vocab_file = model_dir / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n", encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(vocab_file)).save_pretrained(model_dir)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=64,
+        num_labels=1,
+    )
+    model_cls = BertForMaskedLM if kind == "splade" else BertForSequenceClassification
+    model_cls(config).save_pretrained(model_dir)
+    return model_dir
+
+
+def test_normalize_inference_backend() -> None:
+    assert normalize_inference_backend(None) == "torch"
+    assert normalize_inference_backend("ONNX_INT8") == "onnx-int8"
+    with pytest.raises(ValueError):
+        normalize_inference_backend("tensorrt")
+
+
+def test_splade_onnx_backend_matches_torch(tmp_path: Path) -> None:
+    model_dir = str(_tiny_model_dir(tmp_path, kind="splade"))
+    cache_dir = tmp_path / "onnx"
+    torch_encoder = SpladeEncoder(model_id=model_dir, device="cpu")
+    onnx_encoder = SpladeEncoder(model_id=model_dir, backend="onnx", onnx_cache_dir=str(cache_dir))
+    int8_encoder = SpladeEncoder(
+        model_id=model_dir, backend="onnx-int8", onnx_cache_dir=str(cache_dir)
+    )
+
+    expected = torch_encoder.encode(_TEXTS, max_length=16, batch_size=2)
+    actual = onnx_encoder.encode(_TEXTS, max_length=16, batch_size=2)
+    quantized = int8_encoder.encode(_TEXTS, max_length=16, batch_size=2)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, atol=1e-4)
+    assert quantized.shape == expected.shape
+    assert np.abs(quantized - expected).max() < 0.25
+    model_root = onnx_model_dir(model_dir, kind="splade", cache_dir=cache_dir)
+    assert (model_root / "model.onnx").exists()
+    assert (model_root / "model.int8.onnx").exists()
+
+
+def test_cross_encoder_onnx_backend_matches_torch(tmp_path: Path) -> None:
+    model_dir = str(_tiny_model_dir(tmp_path, kind="cross_encoder"))
+    cache_dir = str(tmp_path / "onnx")
+    torch_reranker = CrossEncoderReranker(model_id=model_dir, device="cpu")
+    onnx_reranker = CrossEncoderReranker(
+        model_id=model_dir, backend="onnx", onnx_cache_dir=cache_dir
+    )
+
+    query = "randomization sequence"
+    expected = torch_reranker.rerank(query, _TEXTS, max_length=16, batch_size=2)
+    actual = onnx_reranker.rerank(query, _TEXTS, max_length=16, batch_size=2)
+
+    np.testing.assert_allclose(actual.scores, expected.scores, atol=1e-5)
+    assert actual.order == expected.order
+
+
+class _TinyHead(torch.nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.embed = torch.nn.Embedding(8, 4)
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        return (self.embed(input_ids) * attention_mask.unsqueeze(-1)).sum(dim=1)
+
+
+def test_onnx_export_is_redone_when_manifest_no_longer_matches(tmp_path: Path) -> None:
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    weights = model_dir / "model.safetensors"
+    weights.write_bytes(b"v1")
+    exports: list[int] = []
+
+    def build_head() -> torch.nn.Module:
+        exports.append(1)
+        return _TinyHead()
+
+    def ensure() -> Path:
+        return ensure_onnx_model(
+            build_head,
+            model_id=str(model_dir),
+            kind="tiny",
+            input_names=["input_ids", "attention_mask"],
+            quantized=True,
+            cache_dir=tmp_path / "onnx",
+        )
+
+    path = ensure()
+    ensure()
+    assert len(exports) == 1
+    manifest_path = path.parent / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["export"]["opset"] and manifest["int8"]["weight_type"] == "QInt8"
+
+    # An export produced by another torch version is not reused.
+    manifest["export"]["torch"] = "0.0"
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    ensure()
+    assert len(exports) == 2
+
+    # Neither is one made from older weights of the same local model.
+    weights.write_bytes(b"v2-weights")
+    ensure()
+    assert len(exports) == 3
@@ -41,3 +41,40 @@ def test_cache_keys_are_deterministic() -> None:
 
     splade_key = splade_cache_key(doc_hash, "model", 128, code_version="0.1.5")
     assert splade_key == splade_cache_key(doc_hash, "model", 128, code_version="0.1.5")
+    assert splade_key == splade_cache_key(
+        doc_hash, "model", 128, code_version="0.1.5", backend="torch"
+    )
+    assert splade_key != splade_cache_key(
+        doc_hash, "model", 128, code_version="0.1.5", backend="onnx-int8"
+    )
+
+
+def test_fingerprint_files_reuses_stored_hashes(tmp_path, monkeypatch) -> None:
+    from persistence import fingerprints
+    from persistence.hashing import sha256_file
+    from persistence.sqlite_store import SqliteStore
+
+    paths = []
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        path = tmp_path / name
+        path.write_bytes(name.encode("utf-8"))
+        paths.append(path)
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    hashed: list[str] = []
+
+    def counting_sha256_file(path):
+        hashed.append(path.name)
+        return sha256_file(path)
+
+    monkeypatch.setattr(fingerprints, "sha256_file", counting_sha256_file)
+
+    first = fingerprints.fingerprint_files(paths, store=store)
+    assert first == {path: sha256_file(path) for path in paths}
+    assert sorted(hashed) == ["a.pdf", "b.pdf", "c.pdf"]
+
+    hashed.clear()
+    paths[1].write_bytes(b"changed content")
+    second = fingerprints.fingerprint_files(paths, store=store)
+    assert hashed == ["b.pdf"]
+    assert second[paths[1]] == sha256_file(paths[1])
+    assert second[paths[0]] == first[paths[0]]
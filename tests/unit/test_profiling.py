@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any
+
+from langgraph.graph import END, START, StateGraph
+from typing_extensions import TypedDict
+
+from utils.profiling import FOLDED_FILE_NAME, SUMMARY_FILE_NAME, RunProfiler
+from utils.tracing import trace_run, traced_node
+
+_RETAINED: list[bytes] = []
+
+
+class _State(TypedDict, total=False):
+    total: int
+
+
+def _busy_loop(duration_s: float) -> int:
+    total = 0
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def _compute(state: dict[str, Any]) -> dict[str, Any]:
+    return {"total": _busy_loop(0.2)}
+
+
+def _allocate(state: dict[str, Any]) -> dict[str, Any]:
+    _RETAINED.append(bytes(2_000_000))
+    return {}
+
+
+def _build_graph():
+    builder: StateGraph = StateGraph(_State)
+    builder.add_node("compute", traced_node("compute", _compute))
+    builder.add_node("allocate", traced_node("allocate", _allocate))
+    builder.add_edge(START, "compute")
+    builder.add_edge("compute", "allocate")
+    builder.add_edge("allocate", END)
+    return builder.compile()
+
+
+def test_profiler_roots_samples_and_allocations_at_graph_nodes(tmp_path: Path) -> None:
+    profiler = RunProfiler(interval_ms=2)
+    with trace_run(profiler) as tracer:
+        _build_graph().invoke({})
+    _RETAINED.clear()
+
+    written = profiler.write(tmp_path, timings=tracer.summary())
+
+    summary = profiler.summary()
+    compute = summary["nodes"]["compute"]
+    assert compute["samples"] > 10
+    assert "_busy_loop" in compute["top_functions"][0]["function"]
+    assert summary["nodes"]["allocate"]["alloc_net_kb"] >= 1900
+
+    folded = (tmp_path / FOLDED_FILE_NAME).read_text(encoding="utf-8").splitlines()
+    assert folded and all(line.split(";", 1)[0] in {"compute", "allocate"} for line in folded)
+    assert any(line.startswith("compute;_compute (") and "_busy_loop" in line for line in folded)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+
+    table = (tmp_path / SUMMARY_FILE_NAME).read_text(encoding="utf-8")
+    assert "| compute | 1 |" in table and "### allocate" in table
+    assert tmp_path / SUMMARY_FILE_NAME in written
+
+
+def test_profiler_stops_tracemalloc_it_started() -> None:
+    import tracemalloc
+
+    profiler = RunProfiler(interval_ms=1)
+    with trace_run(profiler):
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    assert profiler.summary()["nodes"] == {}
@@ -112,3 +112,47 @@ def test_render_html_includes_rule_trace(mock_result):
     content = render_html(mock_result, pdf_name="test.pdf")
     assert "规则路径" in content
     assert "文献元信息" in content
+
+
+def test_render_html_reuses_compiled_template(mock_result):
+    from reporting.html import _report_template, render_html
+
+    render_html(mock_result, pdf_name="a.pdf")
+    template = _report_template()
+    render_html(mock_result, pdf_name="b.pdf")
+    assert _report_template() is template
+
+
+def test_batch_render_regenerates_reports_from_result_json(mock_result, tmp_path, monkeypatch):
+    from concurrent.futures import Future
+
+    from typer.testing import CliRunner
+
+    from cli.commands import batch as batch_command
+
+    class InlineExecutor:
+        def __init__(self, *, max_workers: int):
+            self.max_workers = max_workers
+
+        def submit(self, fn, *args, **kwargs):
+            future = Future()
+            future.set_result(fn(*args, **kwargs))
+            return future
+
+        def shutdown(self, wait: bool = True):
+            return None
+
+    monkeypatch.setattr(batch_command, "_RENDER_POOL_EXECUTOR", InlineExecutor)
+    item_dir = tmp_path / "batch" / "trial"
+    item_dir.mkdir(parents=True)
+    (item_dir / "result.json").write_text(mock_result.model_dump_json(), encoding="utf-8")
+    (item_dir / "report.docx").write_bytes(b"existing")
+
+    result = CliRunner().invoke(
+        batch_command.app,
+        ["render", str(tmp_path / "batch"), "--no-pdf", "--missing-only"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Test Study Title" in (item_dir / "report.html").read_text(encoding="utf-8")
+    assert (item_dir / "report.docx").read_bytes() == b"existing"
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Sequence
 
-from retrieval.rerankers.apply import apply_reranker
+from retrieval.rerankers.apply import RerankJob, apply_reranker, apply_reranker_batch
 from retrieval.rerankers.contracts import RerankResult
 from schemas.internal.documents import DocStructure, SectionSpan
 from schemas.internal.evidence import EvidenceCandidate
@@ -68,6 +68,75 @@ def test_apply_reranker_reorders_and_adds_scores() -> None:
     assert reranked[0].score == 0.9
 
 
+class _PairCountingReranker(_DummyReranker):
+    def __init__(self) -> None:
+        self.scored_pairs: list[tuple[str, str]] = []
+
+    def score_pairs(
+        self,
+        pairs: Sequence[tuple[str, str]],
+        *,
+        max_length: int = 512,
+        batch_size: int = 8,
+    ) -> list[float]:
+        self.scored_pairs.extend(pairs)
+        return [0.9 if "methods" in passage.casefold() else 0.1 for _, passage in pairs]
+
+
+def test_apply_reranker_batch_dedupes_pairs_and_reuses_cache() -> None:
+    def _candidate(question_id: str, paragraph_id: str, title: str) -> EvidenceCandidate:
+        return EvidenceCandidate(
+            question_id=question_id,
+            paragraph_id=paragraph_id,
+            title=title,
+            page=1,
+            text=f"text {paragraph_id}",
+            source="retrieval",
+            score=0.01,
+        )
+
+    query = "Was the allocation sequence random?"
+    jobs = {
+        "q1_1": RerankJob(
+            query=query,
+            candidates=[_candidate("q1_1", "p1", "Discussion"), _candidate("q1_1", "p2", "Methods")],
+        ),
+        "q1_2": RerankJob(
+            query=query,
+            candidates=[_candidate("q1_2", "p2", "Methods"), _candidate("q1_2", "p3", "Results")],
+        ),
+    }
+    reranker = _PairCountingReranker()
+    cache: dict[str, float] = {}
+
+    reranked, stats = apply_reranker_batch(
+        reranker=reranker,
+        jobs=jobs,
+        top_n=10,
+        max_length=64,
+        batch_size=2,
+        score_cache=cache,
+    )
+
+    assert [c.paragraph_id for c in reranked["q1_1"]] == ["p2", "p1"]
+    assert [c.paragraph_id for c in reranked["q1_2"]] == ["p2", "p3"]
+    assert stats.as_dict() == {"pairs": 4, "unique_pairs": 3, "cache_hits": 0, "scored": 3}
+    assert len(reranker.scored_pairs) == 3
+
+    _, retry_stats = apply_reranker_batch(
+        reranker=reranker,
+        jobs={"q1_2": jobs["q1_2"]},
+        top_n=10,
+        max_length=64,
+        batch_size=2,
+        score_cache=cache,
+    )
+
+    assert retry_stats.scored == 0
+    assert retry_stats.cache_hits == 2
+    assert len(reranker.scored_pairs) == 3
+
+
 def test_bm25_locator_can_apply_optional_reranker(monkeypatch) -> None:
     from pipelines.graphs.nodes.locators import retrieval_bm25
 
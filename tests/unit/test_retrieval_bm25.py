@@ -1,4 +1,6 @@
-from retrieval.engines.bm25 import build_bm25_index
+import numpy as np
+
+from retrieval.engines.bm25 import BM25Index, build_bm25_index
 from retrieval.engines.fusion import rrf_fuse
 from retrieval.query_planning.planner import generate_queries_for_question
 from schemas.internal.documents import SectionSpan
@@ -33,6 +35,31 @@ def test_bm25_search_ranks_expected_doc() -> None:
     assert hits[0].doc_index == 0
 
 
+def test_bm25_loads_v1_document_major_arrays() -> None:
+    spans = [
+        SectionSpan(paragraph_id="p1", title="A", text="random sequence random"),
+        SectionSpan(paragraph_id="p2", title="B", text="sealed envelopes sequence"),
+    ]
+    index = build_bm25_index(spans)
+    # Layout written by earlier releases: per-document postings, insertion-order vocab.
+    vocab = ["random", "sequence", "sealed", "envelopes"]
+    legacy = {
+        "format_version": np.asarray([1], dtype=np.int32),
+        "vocab": np.asarray(vocab, dtype=np.str_),
+        "idf": np.asarray([index.to_arrays()["idf"][sorted(vocab).index(term)] for term in vocab]),
+        "doc_offsets": np.asarray([0, 2, 5], dtype=np.int64),
+        "term_ids": np.asarray([0, 1, 2, 3, 1], dtype=np.int32),
+        "term_counts": np.asarray([2, 1, 1, 1, 1], dtype=np.int32),
+        "doc_lengths": np.asarray([3, 3], dtype=np.int64),
+        "params": index.to_arrays()["params"],
+    }
+
+    restored = BM25Index.from_arrays(legacy)
+
+    for query in ("random sequence", "sequence", "envelopes random", "missing"):
+        assert restored.search(query) == index.search(query)
+
+
 def test_rrf_fuse_promotes_docs_appearing_in_multiple_queries() -> None:
     rankings = {
         "q1": [(0, 10.0), (1, 1.0)],
@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
 from pathlib import Path
 
-from persistence.models import ArtifactRecord, RunRecord, RunSummaryRecord
+import pytest
+
+from persistence.models import ArtifactRecord, CacheEntry, RunRecord, RunSummaryRecord
 from persistence.sqlite_store import SqliteStore
 
 
@@ -54,3 +56,45 @@ def test_sqlite_store_roundtrip(tmp_path: Path) -> None:
     summaries = store.list_run_summaries()
     assert summaries
     assert summaries[0]["run_id"] == "run_1"
+
+
+def test_sqlite_store_transaction_groups_and_rolls_back(tmp_path: Path) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.create_batch(name="rolled-back", metadata=None)
+            raise RuntimeError("boom")
+
+    with store.transaction():
+        with store.transaction():
+            store.create_batch(name="kept", metadata=None)
+        store.create_batch(name="kept-too", metadata=None)
+
+    names = [
+        row["name"] for row in store._fetch_all("SELECT name FROM batches ORDER BY name")
+    ]
+    assert names == ["kept", "kept-too"]
+
+
+def test_sqlite_store_defers_cache_touches_until_flush(tmp_path: Path) -> None:
+    store = SqliteStore(tmp_path / "metadata.sqlite")
+    store.put_cache_entry(
+        CacheEntry(
+            cache_key="k",
+            stage="preprocess",
+            content_hash="h",
+            path=str(tmp_path / "k.json"),
+            created_at=datetime.now(timezone.utc),
+            last_accessed=None,
+        )
+    )
+
+    store.touch_cache_entry(stage="preprocess", cache_key="k")
+    entry = store.get_cache_entry(stage="preprocess", cache_key="k")
+    assert entry is not None and entry.last_accessed is None
+
+    store.close()
+    reopened = SqliteStore(tmp_path / "metadata.sqlite")
+    entry = reopened.get_cache_entry(stage="preprocess", cache_key="k")
+    assert entry is not None and entry.last_accessed is not None
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from pipelines.graphs.nodes.fusion import fusion_node
+from pipelines.graphs.nodes.locators.rule_based import rule_based_locator_node
+from pipelines.graphs.nodes.planner import planner_node
+from pipelines.graphs.nodes.state_models import (
+    MODEL_CONTEXT_KEY,
+    ValidatedModelContext,
+    compact_candidates,
+    doc_structure_ref,
+    expand_candidates,
+    load_candidates,
+    validated_doc_structure,
+    validated_question_set,
+)
+from schemas.internal.documents import DocStructure, SectionSpan
+from schemas.internal.evidence import EvidenceCandidate, FusedEvidenceCandidate
+
+
+def _doc_payload() -> dict:
+    return DocStructure(
+        body="Participants were randomly allocated.",
+        sections=[
+            SectionSpan(
+                paragraph_id="p1",
+                title="Methods",
+                text="Participants were randomly allocated using a computer generated sequence.",
+            )
+        ],
+    ).model_dump()
+
+
+def test_context_validates_each_payload_once() -> None:
+    context = ValidatedModelContext()
+    state = {
+        "doc_structure": _doc_payload(),
+        "doc_structure_ref": doc_structure_ref("hash"),
+        MODEL_CONTEXT_KEY: context,
+        **planner_node({}),
+    }
+
+    first = validated_doc_structure(state, state["doc_structure"])
+    second = validated_doc_structure(state, state["doc_structure"])
+    questions = validated_question_set(state, state["question_set"])
+
+    assert first is second
+    assert validated_question_set(state, state["question_set"]) is questions
+    assert context.stats() == {"validations": 2, "hits": 2}
+
+
+def test_context_revalidates_replaced_payload() -> None:
+    context = ValidatedModelContext()
+    state = {
+        "doc_structure": _doc_payload(),
+        "doc_structure_ref": doc_structure_ref("hash"),
+        MODEL_CONTEXT_KEY: context,
+    }
+    first = validated_doc_structure(state, state["doc_structure"])
+
+    state["doc_structure"] = {**state["doc_structure"], "body": "Replaced."}
+    second = validated_doc_structure(state, state["doc_structure"])
+
+    assert second is not first
+    assert second.body == "Replaced."
+    assert context.validations == 2
+
+
+def test_nodes_share_validated_models_within_a_run() -> None:
+    context = ValidatedModelContext()
+    state = {
+        "doc_structure": _doc_payload(),
+        "doc_structure_ref": doc_structure_ref("hash"),
+        MODEL_CONTEXT_KEY: context,
+        "top_k": 1,
+        **planner_node({}),
+    }
+
+    out1 = rule_based_locator_node(state)
+    out2 = rule_based_locator_node(state)
+
+    assert out1 == out2
+    assert context.stats() == {"validations": 2, "hits": 2}
+
+
+def test_without_context_falls_back_to_validation() -> None:
+    payload = _doc_payload()
+    doc = validated_doc_structure({}, payload)
+
+    assert isinstance(doc, DocStructure)
+    assert validated_doc_structure({}, doc) is doc
+
+
+def _candidate(text: str) -> EvidenceCandidate:
+    return EvidenceCandidate(
+        question_id="q1_1",
+        paragraph_id="p1",
+        title="Methods",
+        text=text,
+        source="retrieval",
+        score=1.0,
+    )
+
+
+def test_compact_candidates_reference_matching_spans() -> None:
+    state = {"doc_structure": _doc_payload()}
+    span_text = state["doc_structure"]["sections"][0]["text"]
+    original = _candidate(span_text)
+    edited = _candidate("Edited excerpt.")
+
+    compact = compact_candidates(state, [original, edited])
+
+    assert "text" not in compact[0] and "title" not in compact[0]
+    assert compact[1]["text"] == "Edited excerpt."
+    assert load_candidates(state, compact, EvidenceCandidate) == [original, edited]
+    assert compact_candidates({}, [original])[0]["text"] == span_text
+    assert "rerank_score" not in compact[0]
+
+
+def test_graph_state_carries_references_and_exports_expand_them() -> None:
+    state = {
+        "doc_structure": _doc_payload(),
+        "doc_structure_ref": doc_structure_ref("hash"),
+        MODEL_CONTEXT_KEY: ValidatedModelContext(),
+        "top_k": 1,
+        **planner_node({}),
+    }
+    state.update(rule_based_locator_node(state))
+    state.update(fusion_node(state))
+
+    fused = state["fusion_candidates"]["q1_1"]
+    assert fused and all("text" not in item for item in fused)
+    parsed = load_candidates(state, fused, FusedEvidenceCandidate)
+    assert parsed[0].text.startswith("Participants were randomly allocated")
+
+    exported = expand_candidates(state, state)
+    assert exported["fusion_candidates"]["q1_1"][0]["text"] == parsed[0].text
+    assert exported["fusion_evidence"][0]["items"][0]["title"] == "Methods"
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+import torch
+
+from retrieval.batching import (
+    padded_token_count,
+    plan_token_batches,
+    resolve_max_tokens_per_batch,
+)
+from retrieval.engines.splade import SpladeEncoder
+from retrieval.rerankers.cross_encoder import CrossEncoderReranker
+
+
+class _WhitespaceTokenizer:
+    """Minimal tokenizer: one token per whitespace-separated word."""
+
+    def __init__(self) -> None:
+        self.batches: List[int] = []
+
+    def _ids(self, item: object, max_length: int) -> List[int]:
+        if isinstance(item, (list, tuple)):
+            words = " ".join(str(part) for part in item).split()
+        else:
+            words = str(item).split()
+        return [len(word) for word in words][:max_length] or [0]
+
+    def __call__(
+        self,
+        items,
+        *,
+        truncation: bool = True,
+        max_length: int = 512,
+        padding: bool = False,
+        return_tensors: str | None = None,
+    ):
+        ids = [self._ids(item, max_length) for item in items]
+        if return_tensors is None:
+            return {"input_ids": ids}
+        width = max(len(row) for row in ids)
+        self.batches.append(len(ids) * width)
+        padded = [row + [0] * (width - len(row)) for row in ids]
+        mask = [[1] * len(row) + [0] * (width - len(row)) for row in ids]
+        return {
+            "input_ids": torch.tensor(padded, dtype=torch.long),
+            "attention_mask": torch.tensor(mask, dtype=torch.long),
+        }
+
+
+class _Output:
+    def __init__(self, logits: torch.Tensor) -> None:
+        self.logits = logits
+
+
+class _SpladeModel:
+    def __call__(self, *, input_ids, attention_mask):
+        # vocab of 2: dim 0 = token count, dim 1 = constant
+        counts = attention_mask.sum(dim=1).to(torch.float32)
+        logits = torch.zeros((input_ids.shape[0], input_ids.shape[1], 2))
+        logits[:, 0, 0] = counts
+        logits[:, 0, 1] = 1.0
+        return _Output(logits)
+
+
+class _RerankModel:
+    def __call__(self, *, input_ids, attention_mask):
+        counts = attention_mask.sum(dim=1).to(torch.float32)
+        return _Output((counts - 4.0).reshape(-1, 1))
+
+
+def _splade_encoder() -> SpladeEncoder:
+    encoder = SpladeEncoder.__new__(SpladeEncoder)
+    encoder._device = torch.device("cpu")
+    encoder._tokenizer = _WhitespaceTokenizer()
+    encoder._model = _SpladeModel()
+    encoder._session = None
+    encoder.model_id = "dummy"
+    encoder.vocab_size = 2
+    return encoder
+
+
+def _reranker() -> CrossEncoderReranker:
+    reranker = CrossEncoderReranker.__new__(CrossEncoderReranker)
+    reranker._device = torch.device("cpu")
+    reranker._tokenizer = _WhitespaceTokenizer()
+    reranker._model = _RerankModel()
+    reranker._session = None
+    reranker.model_id = "dummy"
+    reranker.name = "cross_encoder"
+    return reranker
+
+
+def test_plan_token_batches_respects_budget_and_covers_all_indices() -> None:
+    lengths = [3, 10, 1, 7, 7, 2, 10]
+
+    batches = plan_token_batches(lengths, max_tokens_per_batch=20)
+
+    assert sorted(idx for batch in batches for idx in batch) == list(range(len(lengths)))
+    assert batches[0] == [1, 6]
+    for batch in batches:
+        assert len(batch) * max(lengths[idx] for idx in batch) <= 20
+    assert padded_token_count(lengths, batches) <= padded_token_count(
+        lengths, [[0, 1], [2, 3], [4, 5], [6]]
+    )
+
+
+def test_plan_token_batches_isolates_over_budget_rows() -> None:
+    assert plan_token_batches([50, 2, 2], max_tokens_per_batch=8) == [[0], [1, 2]]
+    assert plan_token_batches([], max_tokens_per_batch=8) == []
+
+
+def test_resolve_max_tokens_per_batch_defaults_and_validates() -> None:
+    assert resolve_max_tokens_per_batch(None, batch_size=4, max_length=128) == 512
+    assert resolve_max_tokens_per_batch(100, batch_size=4, max_length=128) == 100
+    with pytest.raises(ValueError):
+        resolve_max_tokens_per_batch(0, batch_size=4, max_length=128)
+
+
+def test_splade_encode_restores_input_order() -> None:
+    encoder = _splade_encoder()
+    texts = ["a", "a b c d e", "a b", "a b c d e f g", "a b c"]
+
+    vectors = encoder.encode(texts, max_length=16, batch_size=2, max_tokens_per_batch=10)
+
+    expected_counts = [len(text.split()) for text in texts]
+    assert vectors.shape == (len(texts), 2)
+    assert [round(float(value), 5) for value in vectors[:, 0]] == [
+        round(float(torch.log1p(torch.tensor(float(count)))), 5)
+        for count in expected_counts
+    ]
+    assert all(size <= 10 for size in encoder._tokenizer.batches)
+
+
+def test_cross_encoder_rerank_restores_input_order() -> None:
+    reranker = _reranker()
+    passages = ["x y z w v u", "x", "x y z"]
+
+    result = reranker.rerank("q", passages, max_length=32, batch_size=1, max_tokens_per_batch=9)
+
+    assert len(result.scores) == 3
+    assert result.order == [0, 2, 1]
+    assert result.scores[0] > result.scores[2] > result.scores[1]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+from typing_extensions import TypedDict
+
+from cli.commands.batch import _build_summary_payload
+from utils.tracing import record_cache_lookup, trace_run, traced_node
+
+
+class _State(TypedDict, total=False):
+    answer: str
+
+
+def _llm_node(state: dict[str, Any]) -> dict[str, Any]:
+    model = GenericFakeChatModel(
+        messages=iter(
+            [
+                AIMessage(
+                    content="ok",
+                    usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15},
+                )
+            ]
+        )
+    )
+    record_cache_lookup(stage="preprocess", hit=False)
+    return {"answer": str(model.invoke("question").content)}
+
+
+def _build_graph():
+    builder: StateGraph = StateGraph(_State)
+    builder.add_node("ask", traced_node("ask", _llm_node))
+    builder.add_node("done", traced_node("done", lambda state: {}))
+    builder.add_edge(START, "ask")
+    builder.add_edge("ask", "done")
+    builder.add_edge("done", END)
+    return builder.compile()
+
+
+def test_traced_graph_attributes_llm_usage_to_nodes() -> None:
+    with trace_run() as tracer:
+        final = _build_graph().invoke({}, config={"callbacks": [tracer.callback_handler()]})
+
+    summary = tracer.summary()
+    ask = summary["nodes"]["ask"]
+    assert final["answer"] == "ok"
+    assert list(summary["nodes"]) == ["ask", "done"]
+    assert ask["calls"] == 1 and ask["llm_calls"] == 1
+    assert (ask["input_tokens"], ask["output_tokens"]) == (12, 3)
+    assert ask["cache_misses"] == 1
+    assert summary["nodes"]["done"]["llm_calls"] == 0
+    assert summary["totals"]["input_tokens"] == 12
+
+
+def _allocating_node(state: dict[str, Any]) -> dict[str, Any]:
+    block = b"x" * (96 * 1024 * 1024)
+    time.sleep(0.1)  # let the background sampler see the allocation
+    del block
+    return {}
+
+
+def test_node_peak_rss_is_measured_per_execution() -> None:
+    builder: StateGraph = StateGraph(_State)
+    builder.add_node("big", traced_node("big", _allocating_node))
+    builder.add_node("small", traced_node("small", lambda state: {}))
+    builder.add_edge(START, "big")
+    builder.add_edge("big", "small")
+    builder.add_edge("small", END)
+
+    with trace_run() as tracer:
+        builder.compile().invoke({})
+
+    nodes = tracer.summary()["nodes"]
+    assert nodes["big"]["peak_rss_growth_mb"] >= 64
+    # The later node must not inherit the earlier node's process-lifetime peak.
+    assert nodes["small"]["peak_rss_growth_mb"] < 64
+    assert nodes["small"]["peak_rss_mb"] < nodes["big"]["peak_rss_mb"] - 64
+    assert tracer.summary()["totals"]["peak_rss_mb"] >= nodes["big"]["peak_rss_mb"]
+
+
+def test_traced_node_is_noop_outside_a_run() -> None:
+    node = traced_node("done", lambda state: {"answer": "x"})
+
+    assert node({}) == {"answer": "x"}
+    record_cache_lookup(stage="preprocess", hit=True)
+
+
+def test_batch_summary_reports_per_node_percentiles() -> None:
+    items = [
+        {
+            "relative_path": f"{index}.pdf",
+            "status": "success",
+            "runtime_ms": 100 * index,
+            "node_timings_ms": {"preprocess": float(10 * index), "aggregate": 1.0},
+            "llm_tokens": {"input": 100, "output": 10},
+        }
+        for index in range(1, 21)
+    ]
+    summary = _build_summary_payload({"items": items, "runtime_meta": {}})
+
+    stats = summary["runtime_meta"]["node_timings"]
+    assert stats["preprocess"] == {
+        "count": 20,
+        "p50_ms": 110.0,
+        "p95_ms": 200.0,
+        "total_ms": 2100.0,
+    }
+    assert stats["aggregate"]["p95_ms"] == 1.0
+    assert summary["runtime_meta"]["llm_tokens"] == {"input": 2000, "output": 200}
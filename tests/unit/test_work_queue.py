@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from persistence.work_queue import BatchWorkQueue
+
+
+def test_work_queue_claims_in_order_and_records_results(tmp_path: Path) -> None:
+    queue = BatchWorkQueue(tmp_path / "queue.sqlite")
+    assert queue.register([("a.pdf", {"n": 1}), ("b.pdf", {"n": 2})]) == 2
+    assert queue.register([("a.pdf", {"n": 3})]) == 0
+
+    first = queue.claim("host-1", lease_seconds=30)
+    second = queue.claim("host-2", lease_seconds=30)
+    assert first is not None and first.item_key == "a.pdf" and first.payload == {"n": 3}
+    assert second is not None and second.item_key == "b.pdf"
+    assert queue.claim("host-3", lease_seconds=30) is None
+
+    assert queue.heartbeat("host-1", "a.pdf", lease_seconds=30)
+    assert not queue.heartbeat("host-2", "a.pdf", lease_seconds=30)
+    assert queue.complete("host-1", "a.pdf", status="success", result={"run_id": "r1"})
+    assert queue.complete("host-2", "b.pdf", status="failed", result={"error": "boom"})
+    assert queue.is_drained()
+
+    assert queue.requeue(["a.pdf", "b.pdf"]) == 1
+    counts = queue.counts()
+    assert counts["success"] == 1 and counts["pending"] == 1 and counts["total"] == 2
+
+
+def test_work_queue_reclaims_expired_leases(tmp_path: Path) -> None:
+    queue = BatchWorkQueue(tmp_path / "queue.sqlite")
+    queue.register([("a.pdf", {})])
+
+    stale = queue.claim("host-1", lease_seconds=0.01)
+    assert stale is not None
+    time.sleep(0.05)
+    reclaimed = queue.claim("host-2", lease_seconds=30)
+    assert reclaimed is not None and reclaimed.attempts == 2
+
+    # The original owner lost the lease; its late result is ignored.
+    assert not queue.complete("host-1", "a.pdf", status="success", result={})
+    assert queue.complete("host-2", "a.pdf", status="success", result={"run_id": "r2"})
+    (item,) = queue.items()
+    assert item.status == "success" and item.result == {"run_id": "r2"}
+
+
+def test_work_queue_fails_items_after_max_attempts(tmp_path: Path) -> None:
+    queue = BatchWorkQueue(tmp_path / "queue.sqlite")
+    queue.register([("a.pdf", {})])
+
+    assert queue.claim("host-1", lease_seconds=0.01, max_attempts=1) is not None
+    time.sleep(0.05)
+    assert queue.claim("host-2", lease_seconds=30, max_attempts=1) is None
+    (item,) = queue.items()
+    assert item.status == "failed"
+    assert "lease expired" in str((item.result or {}).get("error"))
+
+
+def test_work_queue_finds_successful_items_by_pdf_hash(tmp_path: Path) -> None:
+    queue = BatchWorkQueue(tmp_path / "queue.sqlite")
+    queue.register(
+        [
+            ("a.pdf", {"pdf_sha256": "same"}),
+            ("b.pdf", {"pdf_sha256": "same"}),
+            ("c.pdf", {"pdf_sha256": "other"}),
+        ]
+    )
+    assert queue.find_success_by_sha256("same", exclude_key="b.pdf") == []
+
+    claimed = queue.claim("host-1", lease_seconds=30)
+    assert claimed is not None and claimed.item_key == "a.pdf"
+    queue.complete("host-1", "a.pdf", status="success", result={"pdf_sha256": "same"})
+
+    (match,) = queue.find_success_by_sha256("same", exclude_key="b.pdf")
+    assert match.item_key == "a.pdf" and match.status == "success"
+    assert queue.find_success_by_sha256("same", exclude_key="a.pdf") == []
+    assert queue.find_success_by_sha256("other") == []
+    assert queue.get("a.pdf") == match
+    assert queue.get("missing.pdf") is None
+
+
+def test_work_queue_migrates_files_without_hash_column(tmp_path: Path) -> None:
+    db_path = tmp_path / "queue.sqlite"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE queue_items (
+                item_key TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                payload_json TEXT NOT NULL,
+                status TEXT NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result_json TEXT,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        conn.execute(
+            "INSERT INTO queue_items VALUES ('a.pdf', 0, ?, 'success', NULL, NULL, 1, ?, 0)",
+            (json.dumps({"pdf_sha256": "h"}), json.dumps({"pdf_sha256": "h"})),
+        )
+    conn.close()
+
+    queue = BatchWorkQueue(db_path)
+
+    (match,) = queue.find_success_by_sha256("h")
+    assert match.item_key == "a.pdf"
+    with sqlite3.connect(db_path) as conn:
+        plan = " ".join(
+            str(row[-1])
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM queue_items "
+                "WHERE status = 'success' AND pdf_sha256 = 'h'"
+            )
+        )
+    conn.close()
+    assert "idx_queue_items_sha256" in plan